@@ -12,11 +12,13 @@ from django.core.urlresolvers import resolve
 
 from contentstore.utils import course_image_url
 from contentstore.course_group_config import GroupConfiguration
+from contentstore.models import SearchIndexState
 from course_modes.models import CourseMode
 from eventtracking import tracker
 from search.search_engine_base import SearchEngine
 from xmodule.annotator_mixin import html_to_text
 from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.split_mongo import BlockKey
 from xmodule.library_tools import normalize_key_for_search
 
 # REINDEX_AGE is the default amount of time that we look back for changes
@@ -26,6 +28,10 @@ from xmodule.library_tools import normalize_key_for_search
 # how far back from the trigger point to look back in order to index
 REINDEX_AGE = timedelta(0, 60)  # 60 seconds
 
+# INDEX_BATCH_SIZE is the largest number of items sent to the search engine
+# to be added to or removed from the index at once
+INDEX_BATCH_SIZE = 100
+
 log = logging.getLogger('edx.modulestore')
 
 
@@ -41,6 +47,77 @@ def strip_html_content_to_text(html_content):
     return text_content
 
 
+def _block_parents(structure):
+    """
+    Returns the parent of each block reachable from the root of the given split
+    modulestore structure (None for the root), by block key.
+    """
+    parents = {structure['root']: None}
+    blocks_to_visit = [structure['root']]
+    while blocks_to_visit:
+        block_key = blocks_to_visit.pop()
+        for child_key in structure['blocks'][block_key].fields.get('children', []):
+            if child_key not in parents and child_key in structure['blocks']:
+                parents[child_key] = block_key
+                blocks_to_visit.append(child_key)
+    return parents
+
+
+def _block_changed(old_block, new_block):
+    """
+    Whether the index documents of the given versions of a block, or of its
+    descendants, may differ: any change but to the list of its children
+    (whose changes are found by comparing the children themselves) can change
+    what the block's descendants inherit, and the location path of their
+    documents.
+    """
+    old_fields = dict(old_block.fields, children=None)
+    new_fields = dict(new_block.fields, children=None)
+    return (
+        old_block.definition != new_block.definition or
+        old_block.defaults != new_block.defaults or
+        old_fields != new_fields
+    )
+
+
+def diff_structures(old_structure, new_structure):
+    """
+    Compares two versions of a split modulestore structure.
+
+    Returns:
+    blocks_to_index - the blocks of the new version which were added, moved
+        or changed, and all their descendants
+
+    blocks_to_walk - blocks_to_index and all their ancestors
+
+    removed_blocks - the blocks of the old version not in the new one
+    """
+    old_parents = _block_parents(old_structure)
+    new_parents = _block_parents(new_structure)
+
+    changed_blocks = [
+        block_key for block_key, parent_key in new_parents.iteritems()
+        if block_key not in old_parents or old_parents[block_key] != parent_key or _block_changed(
+            old_structure['blocks'][block_key], new_structure['blocks'][block_key]
+        )
+    ]
+    blocks_to_index = set()
+    while changed_blocks:
+        block_key = changed_blocks.pop()
+        if block_key not in blocks_to_index:
+            blocks_to_index.add(block_key)
+            changed_blocks.extend(new_structure['blocks'][block_key].fields.get('children', []))
+
+    blocks_to_walk = set()
+    for block_key in blocks_to_index:
+        while block_key is not None and block_key not in blocks_to_walk:
+            blocks_to_walk.add(block_key)
+            block_key = new_parents[block_key]
+
+    removed_blocks = set(old_parents) - set(new_parents)
+    return blocks_to_index, blocks_to_walk, removed_blocks
+
+
 def indexing_is_enabled():
     """
     Checks to see if the indexing feature is enabled
@@ -66,6 +143,7 @@ class SearchIndexerBase(object):
     INDEX_NAME = None
     DOCUMENT_TYPE = None
     ENABLE_INDEXING_KEY = None
+    PUBLISHED_BRANCH = ModuleStoreEnum.BranchName.published
 
     INDEX_EVENT = {
         'name': None,
@@ -113,6 +191,49 @@ class SearchIndexerBase(object):
         result_ids = [result["data"]["id"] for result in response["results"]]
         searcher.remove(cls.DOCUMENT_TYPE, result_ids)
 
+    @classmethod
+    def _get_split_store(cls, modulestore, structure_key):
+        """
+        Returns the split modulestore storing the structure, or None if
+        another modulestore stores it
+        """
+        if hasattr(modulestore, '_get_modulestore_for_courselike'):
+            modulestore = modulestore._get_modulestore_for_courselike(structure_key)  # pylint: disable=protected-access
+        if modulestore.get_modulestore_type(structure_key) != ModuleStoreEnum.Type.split:
+            return None
+        return modulestore
+
+    @classmethod
+    def _get_published_version(cls, split_store, structure_key):
+        """ Gets the id of the structure's published version, or None if it has none """
+        index = split_store.get_course_index(structure_key)
+        if index is None:
+            return None
+        return index['versions'].get(cls.PUBLISHED_BRANCH)
+
+    @classmethod
+    def _get_structure_changes(cls, split_store, structure_key, published_version):
+        """
+        Finds the blocks changed between the last version indexed and the
+        published version (see diff_structures), or returns None if they
+        can't be found
+        """
+        indexed_version = SearchIndexState.get_indexed_version(cls.INDEX_NAME, structure_key)
+        if indexed_version is None:
+            return None
+        try:
+            indexed_structure = split_store.get_structure(structure_key, indexed_version)
+            published_structure = split_store.get_structure(structure_key, published_version)
+            return diff_structures(indexed_structure, published_structure)
+        except Exception:  # pylint: disable=broad-except
+            # broad exception so that the structure is fully walked instead when, e.g., the version indexed is gone
+            log.warning(
+                "Could not compare the indexed and published versions of %s, indexing all of it",
+                structure_key,
+                exc_info=True,
+            )
+            return None
+
     @classmethod
     def index(cls, modulestore, structure_key, triggered_at=None, reindex_age=REINDEX_AGE):
         """
@@ -124,10 +245,13 @@ class SearchIndexerBase(object):
         structure_key (CourseKey|LibraryKey) - course or library identifier
 
         triggered_at (datetime) - provides time at which indexing was triggered;
-            useful for index updates - only things changed recently from that date
-            (within REINDEX_AGE above ^^) will have their index updated, others skip
-            updating their index but are still walked through in order to identify
-            which items may need to be removed from the index
+            useful for index updates - when the structure is stored in the split
+            modulestore, only the things changed since the version last indexed
+            are walked through and have their index updated, and the things removed
+            since then are removed from the index; otherwise, only things changed
+            recently from that date (within REINDEX_AGE above ^^) will have their
+            index updated, others skip updating their index but are still walked
+            through in order to identify which items may need to be removed from the index
             If None, then a full reindex takes place
 
         Returns:
@@ -141,6 +265,18 @@ class SearchIndexerBase(object):
         structure_key = cls.normalize_structure_key(structure_key)
         location_info = cls._get_location_info(structure_key)
 
+        # Every block of a split modulestore structure's published version is
+        # published, and the blocks changed since the version last indexed can be
+        # found from the two versions, without walking the rest of the structure.
+        # blocks_to_index and blocks_to_walk are None when walking every block.
+        split_store = cls._get_split_store(modulestore, structure_key)
+        published_version = cls._get_published_version(split_store, structure_key) if split_store else None
+        blocks_to_index = blocks_to_walk = removed_blocks = None
+        if triggered_at is not None and published_version is not None:
+            structure_changes = cls._get_structure_changes(split_store, structure_key, published_version)
+            if structure_changes is not None:
+                blocks_to_index, blocks_to_walk, removed_blocks = structure_changes
+
         # Wrap counter in dictionary - otherwise we seem to lose scope inside the embedded function `prepare_item_index`
         indexed_count = {
             "count": 0
@@ -152,9 +288,9 @@ class SearchIndexerBase(object):
         # list - those are ready to be destroyed
         indexed_items = set()
 
-        # items_index is a list of all the items index dictionaries.
-        # it is used to collect all indexes and index them using bulk API,
-        # instead of per item index API call.
+        # items_index is a list of the items index dictionaries not yet indexed.
+        # it is used to collect indexes and index them using bulk API, in batches
+        # of INDEX_BATCH_SIZE, instead of per item index API call.
         items_index = []
 
         def get_item_location(item):
@@ -163,6 +299,23 @@ class SearchIndexerBase(object):
             """
             return item.location.version_agnostic().replace(branch=None)
 
+        def get_children_to_walk(item):
+            """
+            Gets the published children of the item which are to be walked through
+            """
+            if blocks_to_walk is None:
+                return [
+                    child_item for child_item in item.get_children()
+                    if split_store or modulestore.has_published_version(child_item)
+                ]
+            return [
+                child_item for child_item in (
+                    item.get_child(child_location) for child_location in item.children
+                    if BlockKey.from_usage_key(child_location) in blocks_to_walk
+                )
+                if child_item is not None
+            ]
+
         def prepare_item_index(item, skip_index=False, groups_usage_info=None):
             """
             Add this item to the items_index and indexed_items list
@@ -178,6 +331,9 @@ class SearchIndexerBase(object):
             Returns:
             item_content_groups - content groups assigned to indexed item
             """
+            if blocks_to_index is not None:
+                skip_index = BlockKey.from_usage_key(item.location) not in blocks_to_index
+
             is_indexable = hasattr(item, "index_dictionary")
             item_index_dictionary = item.index_dictionary() if is_indexable else None
             # if it's not indexable and it does not have children, then ignore
@@ -209,19 +365,21 @@ class SearchIndexerBase(object):
             item_id = unicode(cls._id_modifier(item.scope_ids.usage_id))
             indexed_items.add(item_id)
             if item.has_children:
-                # determine if it's okay to skip adding the children herein based upon how recently any may have changed
-                skip_child_index = skip_index or \
-                    (triggered_at is not None and (triggered_at - item.subtree_edited_on) > reindex_age)
+                # determine if it's okay to skip adding the children herein based upon how recently any may have changed,
+                # unless the blocks to index are known already
+                skip_child_index = skip_index or (
+                    blocks_to_index is None and triggered_at is not None and
+                    (triggered_at - item.subtree_edited_on) > reindex_age
+                )
                 children_groups_usage = []
-                for child_item in item.get_children():
-                    if modulestore.has_published_version(child_item):
-                        children_groups_usage.append(
-                            prepare_item_index(
-                                child_item,
-                                skip_index=skip_child_index,
-                                groups_usage_info=groups_usage_info
-                            )
+                for child_item in get_children_to_walk(item):
+                    children_groups_usage.append(
+                        prepare_item_index(
+                            child_item,
+                            skip_index=skip_child_index,
+                            groups_usage_info=groups_usage_info
                         )
+                    )
                 if None in children_groups_usage:
                     item_content_groups = None
 
@@ -238,27 +396,43 @@ class SearchIndexerBase(object):
                     item_index['start_date'] = item.start
                 item_index['content_groups'] = item_content_groups if item_content_groups else None
                 item_index.update(cls.supplemental_fields(item))
-                items_index.append(item_index)
-                indexed_count["count"] += 1
-                return item_content_groups
             except Exception as err:  # pylint: disable=broad-except
                 # broad exception so that index operation does not fail on one item of many
                 log.warning('Could not index item: %s - %r', item.location, err)
                 error_list.append(_('Could not index item: {}').format(item.location))
+                return
+
+            items_index.append(item_index)
+            indexed_count["count"] += 1
+            if len(items_index) >= INDEX_BATCH_SIZE:
+                searcher.index(cls.DOCUMENT_TYPE, items_index)
+                del items_index[:]
+            return item_content_groups
 
         try:
             with modulestore.branch_setting(ModuleStoreEnum.RevisionOption.published_only):
                 structure = cls._fetch_top_level(modulestore, structure_key)
-                groups_usage_info = cls.fetch_group_usage(modulestore, structure)
 
                 # First perform any additional indexing from the structure object
                 cls.supplemental_index_information(modulestore, structure)
 
                 # Now index the content
-                for item in structure.get_children():
-                    prepare_item_index(item, groups_usage_info=groups_usage_info)
-                searcher.index(cls.DOCUMENT_TYPE, items_index)
-                cls.remove_deleted_items(searcher, structure_key, indexed_items)
+                if blocks_to_walk is None or blocks_to_walk:
+                    groups_usage_info = cls.fetch_group_usage(modulestore, structure)
+                    for item in get_children_to_walk(structure):
+                        prepare_item_index(item, groups_usage_info=groups_usage_info)
+                if items_index:
+                    searcher.index(cls.DOCUMENT_TYPE, items_index)
+
+                if removed_blocks is None:
+                    cls.remove_deleted_items(searcher, structure_key, indexed_items)
+                else:
+                    removed_ids = [
+                        unicode(cls._id_modifier(structure_key.make_usage_key(block_key.type, block_key.id)))
+                        for block_key in removed_blocks
+                    ]
+                    for index in range(0, len(removed_ids), INDEX_BATCH_SIZE):
+                        searcher.remove(cls.DOCUMENT_TYPE, removed_ids[index:index + INDEX_BATCH_SIZE])
         except Exception as err:  # pylint: disable=broad-except
             # broad exception so that index operation does not prevent the rest of the application from working
             log.exception(
@@ -271,6 +445,9 @@ class SearchIndexerBase(object):
         if error_list:
             raise SearchIndexingError('Error(s) present during indexing', error_list)
 
+        if published_version is not None:
+            SearchIndexState.set_indexed_version(cls.INDEX_NAME, structure_key, unicode(published_version))
+
         return indexed_count["count"]
 
     @classmethod
@@ -434,6 +611,7 @@ class LibrarySearchIndexer(SearchIndexerBase):
     INDEX_NAME = "library_index"
     DOCUMENT_TYPE = "library_content"
     ENABLE_INDEXING_KEY = 'ENABLE_LIBRARY_INDEX'
+    PUBLISHED_BRANCH = ModuleStoreEnum.BranchName.library
 
     INDEX_EVENT = {
         'name': 'edx.library.index.reindexed',
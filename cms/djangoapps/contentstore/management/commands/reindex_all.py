@@ -0,0 +1,198 @@
+""" Management command to rebuild the search index of every course and library, in parallel """
+import logging
+import multiprocessing
+import time
+from optparse import make_option
+from textwrap import dedent
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from contentstore import courseware_index
+from contentstore.courseware_index import CoursewareSearchIndexer, LibrarySearchIndexer, SearchIndexingError
+
+from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.locator import LibraryLocator
+
+from .prompt import query_yes_no
+
+from xmodule.modulestore.django import clear_existing_modulestores, modulestore
+
+log = logging.getLogger(__name__)
+
+
+def init_worker(batch_size):
+    """
+    Prepares a worker process: the modulestore's and database's connections
+    inherited from the parent process can't be shared with it.
+    """
+    clear_existing_modulestores()
+    connection.close()
+    courseware_index.INDEX_BATCH_SIZE = batch_size
+
+
+def reindex_structure(structure_key_string):
+    """
+    Reindexes the given course or library.
+
+    Returns:
+    (structure_key_string, number of items indexed, seconds taken, error message or None)
+    """
+    start = time.time()
+    structure_key = CourseKey.from_string(structure_key_string)
+    try:
+        if isinstance(structure_key, LibraryLocator):
+            indexed_count = LibrarySearchIndexer.do_library_reindex(modulestore(), structure_key)
+        else:
+            indexed_count = CoursewareSearchIndexer.do_course_reindex(modulestore(), structure_key)
+    except SearchIndexingError as exc:
+        return structure_key_string, None, time.time() - start, u"; ".join(exc.error_list)
+    except Exception as exc:  # pylint: disable=broad-except
+        # broad exception so that one course failing does not stop the whole run
+        log.exception(u"Error reindexing %s", structure_key_string)
+        return structure_key_string, None, time.time() - start, unicode(exc) or repr(exc)
+    return structure_key_string, indexed_count or 0, time.time() - start, None
+
+
+class Command(BaseCommand):
+    """
+    Command to rebuild the search index of every course and library, e.g. after
+    a change to the index's schema, reindexing many of them at once in separate
+    processes. Each course's items are sent to the search engine in batches of
+    --batch-size, each of which is sent once the previous one is indexed.
+
+    With --progress-file, the keys of the courses and libraries reindexed are
+    recorded in the given file, and a run interrupted or with failures can be
+    continued with --resume, which skips the ones recorded.
+
+    Examples:
+
+        ./manage.py cms reindex_all --processes=8
+        ./manage.py cms reindex_all --processes=8 --progress-file=reindex.log
+        ./manage.py cms reindex_all --processes=8 --progress-file=reindex.log --resume
+    """
+    help = dedent(__doc__)
+
+    can_import_settings = True
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--processes',
+            type='int',
+            dest='processes',
+            default=multiprocessing.cpu_count(),
+            help='Number of courses and libraries to reindex at once (default: the number of CPUs)'
+        ),
+        make_option(
+            '--batch-size',
+            type='int',
+            dest='batch_size',
+            default=courseware_index.INDEX_BATCH_SIZE,
+            help='Number of items to send to the search engine at once'
+        ),
+        make_option(
+            '--progress-file',
+            dest='progress_file',
+            default=None,
+            help='File recording the keys of the courses and libraries reindexed'
+        ),
+        make_option(
+            '--resume',
+            action='store_true',
+            dest='resume',
+            default=False,
+            help='Skip the courses and libraries recorded in the progress file'
+        ),
+        make_option(
+            '--skip-libraries',
+            action='store_true',
+            dest='skip_libraries',
+            default=False,
+            help='Reindex courses only'
+        ),
+    )
+
+    CONFIRMATION_PROMPT = u"Reindexing all courses and libraries might be a time consuming operation. " \
+                          u"Do you want to continue?"
+
+    def _get_structure_keys(self, skip_libraries):
+        """ Gets the keys of all the courses, and libraries unless skipped, to reindex """
+        store = modulestore()
+        structure_keys = [course.id for course in store.get_courses()]
+        if not skip_libraries:
+            structure_keys.extend(
+                library.location.library_key.replace(branch=None) for library in store.get_libraries()
+            )
+        return [unicode(structure_key) for structure_key in structure_keys]
+
+    def handle(self, *args, **options):
+        """
+        By convention set by Django developers, this method actually executes command's actions.
+        So, there could be no better docstring than emphasize this once again.
+        """
+        processes = options['processes']
+        batch_size = options['batch_size']
+        progress_file = options['progress_file']
+        if processes < 1 or batch_size < 1:
+            raise CommandError(u"--processes and --batch-size must be at least 1")
+        if options['resume'] and not progress_file:
+            raise CommandError(u"--resume requires --progress-file")
+
+        if not query_yes_no(self.CONFIRMATION_PROMPT, default="no"):
+            return
+
+        structure_keys = self._get_structure_keys(options['skip_libraries'])
+        if options['resume']:
+            try:
+                with open(progress_file) as progress:
+                    done = set(line.strip() for line in progress)
+            except IOError:
+                done = set()
+            structure_keys = [structure_key for structure_key in structure_keys if structure_key not in done]
+        elif progress_file:
+            open(progress_file, 'w').close()
+
+        self.stdout.write(u"Reindexing {} courses and libraries in {} processes\n".format(
+            len(structure_keys), processes
+        ))
+        start = time.time()
+        total_indexed = 0
+        failures = []
+        default_batch_size = courseware_index.INDEX_BATCH_SIZE
+        if processes == 1:
+            courseware_index.INDEX_BATCH_SIZE = batch_size
+            results = (reindex_structure(structure_key) for structure_key in structure_keys)
+            pool = None
+        else:
+            # the connections would be shared with the worker processes otherwise
+            clear_existing_modulestores()
+            connection.close()
+            pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(batch_size,))
+            results = pool.imap_unordered(reindex_structure, structure_keys)
+
+        try:
+            for structure_key, indexed_count, seconds, error in results:
+                if error is not None:
+                    failures.append(structure_key)
+                    self.stdout.write(u"{}: failed after {:.1f}s - {}\n".format(structure_key, seconds, error))
+                    continue
+                total_indexed += indexed_count
+                self.stdout.write(u"{}: {} items in {:.1f}s ({:.1f} items/s)\n".format(
+                    structure_key, indexed_count, seconds, indexed_count / seconds if seconds else 0
+                ))
+                if progress_file:
+                    with open(progress_file, 'a') as progress:
+                        progress.write(structure_key + '\n')
+        finally:
+            courseware_index.INDEX_BATCH_SIZE = default_batch_size
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        seconds = time.time() - start
+        self.stdout.write(u"Reindexed {} of {} courses and libraries, {} items in {:.1f}s ({:.1f} items/s)\n".format(
+            len(structure_keys) - len(failures), len(structure_keys), total_indexed, seconds,
+            total_indexed / seconds if seconds else 0
+        ))
+        if failures:
+            raise CommandError(u"Failed to reindex: {}".format(u", ".join(failures)))
@@ -0,0 +1,117 @@
+""" Tests for the reindex_all command """
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command, CommandError
+import mock
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from common.test.utils import nostderr
+from xmodule.modulestore.tests.factories import CourseFactory, LibraryFactory
+
+from contentstore import courseware_index
+from contentstore.management.commands.reindex_all import Command as ReindexAllCommand
+
+
+class TestReindexAll(ModuleStoreTestCase):
+    """ Tests for the reindex_all command """
+    def setUp(self):
+        """ Setup method - create courses and a library """
+        super(TestReindexAll, self).setUp()
+        self.library = LibraryFactory.create(
+            org="test", library="lib1", display_name="run1", default_store=ModuleStoreEnum.Type.split
+        )
+        self.first_course = CourseFactory.create(org="test", course="course1", display_name="run1")
+        self.second_course = CourseFactory.create(org="test", course="course2", display_name="run1")
+
+        self.course_reindex = self._patch(
+            'contentstore.management.commands.reindex_all.CoursewareSearchIndexer.do_course_reindex', return_value=3
+        )
+        self.library_reindex = self._patch(
+            'contentstore.management.commands.reindex_all.LibrarySearchIndexer.do_library_reindex', return_value=2
+        )
+        self.yes_no = self._patch('contentstore.management.commands.reindex_all.query_yes_no', return_value=True)
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.progress_file = os.path.join(self.temp_dir, 'progress')
+
+    def _patch(self, target, **kwargs):
+        """ Patches the target for the duration of the test """
+        patcher = mock.patch(target, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def _reindexed_keys(self):
+        """ The keys of the courses and libraries reindexed """
+        return [
+            unicode(reindex_call[0][1])
+            for reindex_call in self.course_reindex.mock_calls + self.library_reindex.mock_calls
+        ]
+
+    def test_reindexes_all(self):
+        """ Test that all courses and libraries are reindexed once confirmed """
+        call_command('reindex_all', processes=1)
+        self.yes_no.assert_called_once_with(ReindexAllCommand.CONFIRMATION_PROMPT, default='no')
+        self.assertItemsEqual(self._reindexed_keys(), [
+            unicode(self.first_course.id),
+            unicode(self.second_course.id),
+            unicode(self.library.location.library_key.replace(branch=None)),
+        ])
+
+    def test_cancelled(self):
+        """ Test that nothing is reindexed when cancelled """
+        self.yes_no.return_value = False
+        call_command('reindex_all', processes=1)
+        self.assertEqual(self._reindexed_keys(), [])
+
+    def test_skip_libraries(self):
+        """ Test that libraries can be skipped """
+        call_command('reindex_all', processes=1, skip_libraries=True)
+        self.assertItemsEqual(self._reindexed_keys(), [unicode(self.first_course.id), unicode(self.second_course.id)])
+
+    def test_resume(self):
+        """ Test that a run with failures can be resumed """
+        def fail_second_course(store, course_key):  # pylint: disable=unused-argument
+            """ Fails to reindex the second course """
+            if course_key == self.second_course.id:
+                raise Exception("Search engine unavailable")
+            return 3
+        self.course_reindex.side_effect = fail_second_course
+
+        with self.assertRaises(SystemExit), nostderr():
+            call_command('reindex_all', processes=1, progress_file=self.progress_file)
+        with open(self.progress_file) as progress:
+            self.assertNotIn(unicode(self.second_course.id), progress.read())
+
+        self.course_reindex.reset_mock()
+        self.library_reindex.reset_mock()
+        self.course_reindex.side_effect = None
+        call_command('reindex_all', processes=1, progress_file=self.progress_file, resume=True)
+        self.assertEqual(self._reindexed_keys(), [unicode(self.second_course.id)])
+
+        # without --resume, the run starts afresh
+        self.course_reindex.reset_mock()
+        call_command('reindex_all', processes=1, progress_file=self.progress_file)
+        self.assertEqual(len(self.course_reindex.mock_calls), 2)
+
+    def test_resume_requires_progress_file(self):
+        """ Test that --resume without --progress-file raises CommandError """
+        with self.assertRaises(SystemExit), nostderr():
+            with self.assertRaisesRegexp(CommandError, ".* requires --progress-file"):
+                call_command('reindex_all', processes=1, resume=True)
+
+    @mock.patch('contentstore.courseware_index.INDEX_BATCH_SIZE', 100)
+    def test_batch_size(self):
+        """ Test that the batch size applies while reindexing only """
+        def check_batch_size(store, course_key):  # pylint: disable=unused-argument
+            """ Checks the batch size while reindexing """
+            self.assertEqual(courseware_index.INDEX_BATCH_SIZE, 10)
+            return 3
+        self.course_reindex.side_effect = check_batch_size
+
+        call_command('reindex_all', processes=1, batch_size=10)
+        self.assertEqual(len(self.course_reindex.mock_calls), 2)
+        self.assertEqual(courseware_index.INDEX_BATCH_SIZE, 100)
@@ -3,9 +3,11 @@ Models for contentstore
 """
 # pylint: disable=no-member
 
+from django.db import models
 from django.db.models.fields import TextField
 
 from config_models.models import ConfigurationModel
+from xmodule_django.models import CourseKeyField
 
 
 class VideoUploadConfig(ConfigurationModel):
@@ -23,3 +25,35 @@ class VideoUploadConfig(ConfigurationModel):
 
 class PushNotificationConfig(ConfigurationModel):
     """Configuration for mobile push notifications."""
+
+
+class SearchIndexState(models.Model):
+    """
+    The published version of a course or library last indexed for search,
+    from which the next index update finds the changed blocks.
+    """
+    index_name = models.CharField(max_length=255)
+    structure_key = CourseKeyField(max_length=255)
+    indexed_version = models.CharField(max_length=255)
+
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = ('index_name', 'structure_key')
+
+    @classmethod
+    def get_indexed_version(cls, index_name, structure_key):
+        """
+        Returns the version of the given course or library last indexed in the given index, or None.
+        """
+        try:
+            return cls.objects.get(index_name=index_name, structure_key=structure_key).indexed_version
+        except cls.DoesNotExist:
+            return None
+
+    @classmethod
+    def set_indexed_version(cls, index_name, structure_key, indexed_version):
+        """
+        Records the version of the given course or library indexed in the given index.
+        """
+        entries = cls.objects.filter(index_name=index_name, structure_key=structure_key)
+        if not entries.update(indexed_version=indexed_version):
+            cls.objects.create(index_name=index_name, structure_key=structure_key, indexed_version=indexed_version)
@@ -461,11 +461,16 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
 
         before_time = datetime.now(UTC)
         self.publish_item(store, vertical2.location)
-        # index based on time, will include an index of the origin sequential
-        # because it is in a common subtree but not of the original vertical
-        # because the original sequential's subtree is too old
         new_indexed_count = self.index_recent_changes(store, before_time)
-        self.assertEqual(new_indexed_count, 5)
+        if store.get_modulestore_type(self.course.id) == ModuleStoreEnum.Type.split:
+            # index based on the versions of the course, will only include the new
+            # sequential, vertical and html, which are all that changed
+            self.assertEqual(new_indexed_count, 3)
+        else:
+            # index based on time, will include an index of the origin sequential
+            # because it is in a common subtree but not of the original vertical
+            # because the original sequential's subtree is too old
+            self.assertEqual(new_indexed_count, 5)
 
         # full index again
         indexed_count = self.reindex_course(store)
@@ -564,6 +569,44 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
         self.assertEqual(result["course_name"], "Search Index Test Course")
         self.assertEqual(result["location"], ["Week 1", CoursewareSearchIndexer.UNNAMED_MODULE_NAME, "Subsection 2"])
 
+    def _test_incremental_index(self, store):
+        """ Test that an index update only indexes what changed since the version last indexed """
+        self.publish_item(store, self.vertical.location)
+        self.assertEqual(self.reindex_course(store), 4)
+
+        # a changed component is indexed alone
+        html_unit = store.get_item(self.html_unit.location)
+        html_unit.display_name = "Changed Html Content"
+        self.update_item(store, html_unit)
+        self.publish_item(store, self.vertical.location)
+        self.assertEqual(self.index_recent_changes(store, self.course.start), 1)
+        response = self.search(query_string="Changed Html Content")
+        self.assertEqual(response["total"], 1)
+
+        # renaming a subsection changes the location of everything within it
+        sequential = store.get_item(self.sequential.location)
+        sequential.display_name = "Lesson One"
+        self.update_item(store, sequential)
+        self.publish_item(store, self.sequential.location)
+        self.assertEqual(self.index_recent_changes(store, self.course.start), 3)
+        result = self.search(query_string="Changed Html Content")["results"][0]["data"]
+        self.assertEqual(result["location"], ["Week 1", "Lesson One", "Subsection 1"])
+
+        # deleted components are removed from the index, without indexing anything
+        self.delete_item(store, self.html_unit.location)
+        self.publish_item(store, self.vertical.location)
+        self.assertEqual(self.index_recent_changes(store, self.course.start), 0)
+        response = self.search()
+        self.assertEqual(response["total"], 3)
+
+    def _test_index_batches(self, store):
+        """ Test that items are indexed in batches """
+        self.publish_item(store, self.vertical.location)
+        with patch('contentstore.courseware_index.INDEX_BATCH_SIZE', 3):
+            self.assertEqual(self.reindex_course(store), 4)
+        response = self.search()
+        self.assertEqual(response["total"], 4)
+
     @patch('django.conf.settings.SEARCH_ENGINE', 'search.tests.utils.ErroringIndexEngine')
     def _test_exception(self, store):
         """ Test that exception within indexing yields a SearchIndexingError """
@@ -603,6 +646,13 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
     def test_exception(self, store_type):
         self._perform_test_using_store(store_type, self._test_exception)
 
+    def test_incremental_index(self):
+        self._perform_test_using_store(ModuleStoreEnum.Type.split, self._test_incremental_index)
+
+    @ddt.data(*WORKS_WITH_STORES)
+    def test_index_batches(self, store_type):
+        self._perform_test_using_store(store_type, self._test_index_batches)
+
     @ddt.data(*WORKS_WITH_STORES)
     def test_course_about_property_index(self, store_type):
         self._perform_test_using_store(store_type, self._test_course_about_property_index)
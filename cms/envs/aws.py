@@ -268,6 +268,13 @@ DATABASES = AUTH_TOKENS['DATABASES']
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
 CONTENTSTORE = AUTH_TOKENS['CONTENTSTORE']
 DOC_STORE_CONFIG = AUTH_TOKENS['DOC_STORE_CONFIG']
+COURSE_STRUCTURE_MEMORY_CACHE_SIZE = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_MEMORY_CACHE_SIZE', COURSE_STRUCTURE_MEMORY_CACHE_SIZE
+)
+STATIC_CONTENT_FILE_CACHE_DIR = ENV_TOKENS.get('STATIC_CONTENT_FILE_CACHE_DIR', STATIC_CONTENT_FILE_CACHE_DIR)
+STATIC_CONTENT_FILE_CACHE_MAX_SIZE = ENV_TOKENS.get(
+    'STATIC_CONTENT_FILE_CACHE_MAX_SIZE', STATIC_CONTENT_FILE_CACHE_MAX_SIZE
+)
 # Datadog for events!
 DATADOG = AUTH_TOKENS.get("DATADOG", {})
 DATADOG.update(ENV_TOKENS.get("DATADOG", {}))
@@ -382,6 +382,20 @@ MODULESTORE = {
     }
 }
 
+# Total size, in bytes, of the deserialized course structures that split keeps
+# in each process's memory, in front of the course_structure_cache. Sizes are
+# measured as the length of the pickled structures. 0 disables it.
+COURSE_STRUCTURE_MEMORY_CACHE_SIZE = 0
+
+# Directory in which the StaticContentServer keeps copies of the assets too
+# large for the cache backend, so that they are served from disk rather than
+# streamed from the contentstore. It may be shared by all the processes of a
+# host, or by several hosts. None disables it.
+STATIC_CONTENT_FILE_CACHE_DIR = None
+# Total size, in bytes, of the assets kept in STATIC_CONTENT_FILE_CACHE_DIR,
+# beyond which the least recently used ones are removed.
+STATIC_CONTENT_FILE_CACHE_MAX_SIZE = 10 * 1024 * 1024 * 1024
+
 ############################ DJANGO_BUILTINS ################################
 # Change DEBUG/TEMPLATE_DEBUG in your environment settings files, not here
 DEBUG = False
@@ -742,6 +756,7 @@ INSTALLED_APPS = (
     'pipeline',
     'django.contrib.staticfiles',
     'static_replace',
+    'contentserver',
     'require',
 
     # Theming
@@ -0,0 +1,74 @@
+"""
+Management command to load the assets of courses into the file cache.
+"""
+import logging
+from textwrap import dedent
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from xmodule.contentstore.django import contentstore, file_cache
+from xmodule.exceptions import NotFoundError
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Copies every asset of the given courses into the file cache
+    (STATIC_CONTENT_FILE_CACHE_DIR), so that the first learners to request
+    them after a release don't all have to wait for the contentstore.
+
+    Example:
+
+        ./manage.py lms warm_asset_cache <course_id_1> <course_id_2>
+    """
+    help = dedent(__doc__)
+
+    args = "<course_id course_id ...>"
+
+    def handle(self, *args, **options):
+        if not args:
+            raise CommandError("warm_asset_cache requires one or more arguments: <course_id course_id ...>")
+        if file_cache() is None:
+            raise CommandError("There is no file cache: STATIC_CONTENT_FILE_CACHE_DIR isn't set.")
+        try:
+            course_keys = [CourseKey.from_string(arg) for arg in args]
+        except InvalidKeyError as exception:
+            raise CommandError(u"Invalid course_key: {}".format(exception))
+
+        for course_key in course_keys:
+            warmed, skipped = warm_course_assets(course_key)
+            self.stdout.write(u"{}: {} assets cached, {} already cached\n".format(course_key, warmed, skipped))
+
+
+def warm_course_assets(course_key):
+    """
+    Copies the assets of the given course which aren't in the file cache into
+    it, and returns the numbers of assets which were and were already cached.
+    """
+    store = contentstore()
+    cache = file_cache()
+    assets, __ = store.get_all_content_for_course(course_key)
+    warmed = skipped = 0
+    for asset in assets:
+        # touched, so that it isn't evicted before the assets of other courses
+        if cache.touch(asset['md5']):
+            skipped += 1
+            continue
+        try:
+            content = store.find(asset['asset_key'], as_stream=True)
+        except NotFoundError:
+            # it was deleted since the course's assets were listed
+            log.warning(u"Asset %s not found", unicode(asset['asset_key']))
+            continue
+        try:
+            cached_file = cache.add(asset['md5'], content.stream_data())
+        finally:
+            content.close()
+        # None if another process is adding it
+        if cached_file is not None:
+            cached_file.close()
+        warmed += 1
+    return warmed, skipped
@@ -0,0 +1,64 @@
+"""
+Tests for the warm_asset_cache management command
+"""
+import copy
+from shutil import rmtree
+from tempfile import mkdtemp
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.utils import override_settings
+
+from xmodule.contentstore.django import contentstore, file_cache
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.xml_importer import import_course_from_xml
+
+from contentserver.management.commands.warm_asset_cache import warm_course_assets
+
+TEST_DATA_CONTENTSTORE = copy.deepcopy(settings.CONTENTSTORE)
+TEST_DATA_CONTENTSTORE['DOC_STORE_CONFIG']['db'] = 'test_xcontent_%s' % uuid4().hex
+
+
+@override_settings(CONTENTSTORE=TEST_DATA_CONTENTSTORE)
+class WarmAssetCacheTest(ModuleStoreTestCase):
+    """
+    Tests for warming the file cache with the toy course's assets.
+    """
+    def setUp(self):
+        super(WarmAssetCacheTest, self).setUp()
+        store = modulestore()._get_modulestore_by_type(ModuleStoreEnum.Type.mongo)  # pylint: disable=protected-access
+        self.course_key = store.make_course_key('edX', 'toy', '2012_Fall')
+        import_course_from_xml(
+            store, self.user.id, settings.COMMON_TEST_DATA_ROOT, ['toy'], static_content_store=contentstore()
+        )
+        self.cache_dir = mkdtemp()
+        self.addCleanup(rmtree, self.cache_dir)
+
+    def test_warm_course_assets(self):
+        assets, count = contentstore().get_all_content_for_course(self.course_key)
+        self.assertGreater(count, 0)
+        # assets with the same data are cached once
+        unique_count = len(set(asset['md5'] for asset in assets))
+
+        with override_settings(STATIC_CONTENT_FILE_CACHE_DIR=self.cache_dir):
+            self.assertEqual(warm_course_assets(self.course_key), (unique_count, count - unique_count))
+            cache = file_cache()
+            for asset in assets:
+                self.assertTrue(cache.touch(asset['md5']))
+
+            # a second run finds everything cached
+            self.assertEqual(warm_course_assets(self.course_key), (0, count))
+
+    def test_without_file_cache(self):
+        with override_settings(STATIC_CONTENT_FILE_CACHE_DIR=None):
+            with self.assertRaises(CommandError):
+                call_command('warm_asset_cache', unicode(self.course_key))
+
+    def test_invalid_course_key(self):
+        with override_settings(STATIC_CONTENT_FILE_CACHE_DIR=self.cache_dir):
+            with self.assertRaises(CommandError):
+                call_command('warm_asset_cache', 'not a course key')
@@ -2,15 +2,19 @@
 Middleware to serve assets.
 """
 
+import hashlib
 import logging
+import uuid
 
+import dogstats_wrapper as dog_stats_api
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
 )
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
+from xmodule.contentstore.django import file_cache
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
@@ -23,6 +27,15 @@ from xmodule.exceptions import NotFoundError
 
 log = logging.getLogger(__name__)
 
+# Assets smaller than this (in bytes) are kept in the cache backend; larger ones
+# are streamed from the file cache if there is one, and otherwise from the contentstore.
+MAX_CACHED_CONTENT_LENGTH = 1048576
+
+# Requests for more byte ranges than this, once overlapping and adjacent ones are
+# merged, get the full content instead, as do requests whose ranges add up to more
+# than the content. http://tools.ietf.org/html/rfc7233#section-6.1
+MAX_BYTE_RANGES = 10
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -44,6 +57,7 @@ class StaticContentServer(object):
             # first look in our cache so we don't have to round-trip to the DB
             content = get_cached_content(loc)
             if content is None:
+                dog_stats_api.increment('contentserver.cache', tags=[u'result:miss'])
                 # nope, not in cache, let's fetch from DB
                 try:
                     content = AssetManager.find(loc, as_stream=True)
@@ -55,13 +69,14 @@ class StaticContentServer(object):
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
                 # this is because I haven't been able to find a means to stream data out of memcached
                 if content.length is not None:
-                    if content.length < 1048576:
+                    if content.length < MAX_CACHED_CONTENT_LENGTH:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
-                        content = content.copy_to_in_mem()
+                        stream_content = content
+                        content = stream_content.copy_to_in_mem()
+                        stream_content.close()
                         set_cached_content(content)
             else:
-                # NOP here, but we may wish to add a "cache-hit" counter in the future
-                pass
+                dog_stats_api.increment('contentserver.cache', tags=[u'result:hit'])
 
             # Check that user has access to content
             if getattr(content, "locked", False):
@@ -80,26 +95,40 @@ class StaticContentServer(object):
             # convert over the DB persistent last modified timestamp to a HTTP compatible
             # timestamp, so we can simply compare the strings
             last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            etag = get_content_etag(content)
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            # see if the client has cached this content, if so then compare its
+            # validators with ours, if they are the same then just return a 304 (Not Modified).
+            # If-None-Match takes precedence over If-Modified-Since.
+            # http://tools.ietf.org/html/rfc7232#section-6
+            if 'HTTP_IF_NONE_MATCH' in request.META:
+                not_modified = etag_matches(request.META['HTTP_IF_NONE_MATCH'], etag)
+            else:
+                not_modified = request.META.get('HTTP_IF_MODIFIED_SINCE') == last_modified_at_str
+            if not_modified:
+                close_content(content)
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
 
-            # *** File streaming within a byte range ***
+            # Now that the user is known to have access to the content, read its data from
+            # the file cache, if there is one, rather than the DB.
+            file_cached_content = get_file_cached_content(content)
+            if file_cached_content is not None:
+                content = file_cached_content
+
+            # *** File streaming within byte ranges ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
-            # Request -> Range attribute structure: "Range: bytes=first-[last]"
+            # Request -> Range attribute structure: "Range: bytes=first-[last][, first-[last]]..."
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
+            # A Range is only honored if the If-Range header, if any, still matches the content.
+            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.27
             response = None
-            if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
+            if request.META.get('HTTP_RANGE') and request.META.get('HTTP_IF_RANGE', etag) in (
+                etag, last_modified_at_str
+            ):
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -109,46 +138,205 @@ class StaticContentServer(object):
                         u"%s in Range header: %s for content: %s", exception.message, header_value, unicode(loc)
                     )
                 else:
+                    # Unsatisfiable ranges are ignored, unless all of them are
+                    # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35.1
+                    ranges = [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
+                    elif not ranges:
                         log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
                         )
+                        close_content(content)
+                        return HttpResponse(status=416)  # Requested Range Not Satisfiable
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                        requested_length = sum(last - first + 1 for first, last in ranges)
+                        ranges = coalesce_ranges(ranges)
+                        if len(ranges) > MAX_BYTE_RANGES or requested_length > content.length:
+                            log.warning(
+                                u"Ignoring excessive ranges in Range header: %s for content: %s",
+                                header_value, unicode(loc)
+                            )
+                        elif len(ranges) == 1:
+                            first, last = ranges[0]
+                            response = HttpResponse(
+                                stream_and_close(content, content.stream_data_in_range(first, last))
+                            )
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
+                            response['Content-Type'] = content.content_type
                             response.status_code = 206  # Partial Content
                         else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                            )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            # Content for multiple ranges is sent as a multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec19.html#sec19.2
+                            response = multipart_byteranges_response(content, ranges)
 
-            # If Range header is absent or syntactically invalid return a full content response.
+            # If Range header is absent, syntactically invalid or excessive return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                if file_cached_content is None:
+                    # data read from the DB is copied into the file cache as it is sent
+                    chunks = stream_data_to_file_cache(content)
+                else:
+                    chunks = content.stream_data()
+                response = HttpResponse(stream_and_close(content, chunks))
                 response['Content-Length'] = content.length
+                response['Content-Type'] = content.content_type
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
             response['Last-Modified'] = last_modified_at_str
+            response['ETag'] = etag
 
             return response
 
 
+def get_content_etag(content):
+    """
+    Returns a strong ETag for the given content.
+
+    It is the content's digest if it has one, and otherwise a hash of its
+    location and its last modification time, which changes whenever the content
+    is saved.
+    """
+    # getattr b/c caching may mean some pickled instances don't have attr
+    content_digest = getattr(content, 'content_digest', None)
+    if content_digest is None:
+        content_digest = hashlib.md5(
+            u'{}@{}'.format(content.location, content.last_modified_at.isoformat()).encode('utf-8')
+        ).hexdigest()
+    return '"{}"'.format(content_digest)
+
+
+def etag_matches(header_value, etag):
+    """
+    Returns whether the given If-None-Match header value matches etag, using
+    the weak comparison function.
+
+    See spec for details: http://tools.ietf.org/html/rfc7232#section-3.2
+    """
+    if header_value.strip() == '*':
+        return True
+    for tag in header_value.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def close_content(content):
+    """
+    Closes the underlying stream of the given content, if it has one.
+    """
+    if isinstance(content, StaticContentStream):
+        content.close()
+
+
+def stream_and_close(content, chunks):
+    """
+    Yields the given chunks of the content's data, then closes the content.
+
+    The response closes the generator once it has been sent, even if the
+    client disconnected part way, which also closes the chunks if they are a
+    generator, so that they can clean up after data that wasn't all read.
+    """
+    try:
+        for chunk in chunks:
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        close_content(content)
+
+
+def multipart_byteranges_response(content, ranges):
+    """
+    Returns a 206 (Partial Content) response streaming the given (first, last)
+    byte ranges of the content as a multipart/byteranges message.
+    """
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        '--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: bytes {first}-{last}/{length}\r\n\r\n'.format(
+            boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+        )
+        for first, last in ranges
+    ]
+    closing_boundary = '--{}--\r\n'.format(boundary)
+
+    def _stream_parts():
+        """
+        Yields each part's headers, data and terminating CRLF, then the closing boundary.
+        """
+        for part_header, (first, last) in zip(part_headers, ranges):
+            yield part_header
+            for chunk in content.stream_data_in_range(first, last):
+                yield chunk
+            yield '\r\n'
+        yield closing_boundary
+
+    response = HttpResponse(
+        stream_and_close(content, _stream_parts()),
+        content_type='multipart/byteranges; boundary={}'.format(boundary),
+        status=206,  # Partial Content
+    )
+    response['Content-Length'] = str(
+        sum(len(part_header) + (last - first + 1) + 2 for part_header, (first, last) in zip(part_headers, ranges)) +
+        len(closing_boundary)
+    )
+    return response
+
+
+def get_file_cached_content(content):
+    """
+    Returns the given content streamed from the contentstore, reading its data
+    from the file cache instead, or None if it isn't in the file cache.
+
+    None is also returned if there is no file cache, or if the content has no
+    digest to be cached by.
+    """
+    cache = file_cache()
+    # getattr b/c caching may mean some pickled instances don't have attr
+    content_digest = getattr(content, 'content_digest', None)
+    if cache is None or not isinstance(content, StaticContentStream) or content_digest is None:
+        return None
+
+    try:
+        stream = cache.open(content_digest)
+    except (IOError, OSError):
+        log.exception(u"Could not use the file cache for content: %s", unicode(content.location))
+        return None
+    if stream is None:
+        return None
+
+    content.close()
+    return StaticContentStream(
+        content.location, content.name, content.content_type, stream, last_modified_at=content.last_modified_at,
+        thumbnail_location=content.thumbnail_location, import_path=content.import_path, length=content.length,
+        locked=content.locked, content_digest=content_digest
+    )
+
+
+def stream_data_to_file_cache(content):
+    """
+    Returns the chunks of the data of the given content streamed from the
+    contentstore, copying them into the file cache, if there is one, as they
+    are read.
+
+    The data is only cached once it has been read to the end, without ever
+    holding all of it in memory.
+    """
+    cache = file_cache()
+    # getattr b/c caching may mean some pickled instances don't have attr
+    content_digest = getattr(content, 'content_digest', None)
+    if cache is None or not isinstance(content, StaticContentStream) or content_digest is None:
+        return content.stream_data()
+    return cache.tee(content_digest, content.stream_data())
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
@@ -190,3 +378,17 @@ def parse_range_header(header_value, content_length):
         raise ValueError('Invalid syntax')
 
     return unit, ranges
+
+
+def coalesce_ranges(ranges):
+    """
+    Returns the given (first, last) byte ranges sorted, with overlapping and
+    adjacent ranges merged.
+    """
+    coalesced = []
+    for first, last in sorted(ranges):
+        if coalesced and first <= coalesced[-1][1] + 1:
+            coalesced[-1] = (coalesced[-1][0], max(coalesced[-1][1], last))
+        else:
+            coalesced.append((first, last))
+    return coalesced
@@ -5,19 +5,24 @@ import copy
 import ddt
 import logging
 import unittest
+from mock import patch
+from shutil import rmtree
+from tempfile import mkdtemp
 from uuid import uuid4
 
 from django.conf import settings
 from django.test.client import Client
 from django.test.utils import override_settings
 
-from xmodule.contentstore.django import contentstore
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore, file_cache
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_course_from_xml
 
-from contentserver.middleware import parse_range_header
+from cache_toolbox.core import del_cached_content
+from contentserver.middleware import coalesce_ranges, parse_range_header
 from student.models import CourseEnrollment
 
 log = logging.getLogger(__name__)
@@ -146,7 +151,7 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart/byteranges message of the ranges.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
@@ -154,10 +159,133 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
             first=first_byte, last=last_byte)
         )
 
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertNotIn('Content-Range', resp)
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        boundary = resp['Content-Type'].split('boundary=')[1]
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+        parts = resp.content.split('--{}'.format(boundary))
+        self.assertEqual(len(parts), 4)
+        self.assertIn('Content-Range: bytes {first}-{last}/{length}'.format(
+            first=first_byte, last=last_byte, length=self.length_unlocked), parts[1])
+        self.assertIn('Content-Range: bytes {first}-{last}/{length}'.format(
+            first=self.length_unlocked - 100, last=self.length_unlocked - 1, length=self.length_unlocked), parts[2])
+        self.assertEqual(parts[3], '--\r\n')
+
+    def test_range_request_coalesced_ranges(self):
+        """
+        Test that overlapping and adjacent ranges are merged.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=100-199, 0-49, 50-99, 150-299')
+
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertEqual(resp['Content-Range'], 'bytes 0-299/{length}'.format(length=self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], '300')
+
+    @ddt.data(
+        # more ranges than MAX_BYTE_RANGES
+        ', '.join('{0}-{0}'.format(index * 2) for index in range(11)),
+        # ranges adding up to more than the content
+        '0-, 0-, 0-',
+    )
+    def test_range_request_excessive_ranges(self, ranges):
+        """
+        Test that excessive ranges are ignored, and the full content returned.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={}'.format(ranges))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('Content-Range', resp)
+        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+
+    def test_range_request_if_range(self):
+        """
+        Test that a range request is only honored if its If-Range matches the content.
+        """
+        etag = self.client.get(self.url_unlocked)['ETag']
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-', HTTP_IF_RANGE=etag)
+        self.assertEqual(resp.status_code, 206)
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-', HTTP_IF_RANGE='"stale"')
         self.assertEqual(resp.status_code, 200)
         self.assertNotIn('Content-Range', resp)
         self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
 
+    @ddt.data(
+        ('{etag}', 304),
+        ('W/{etag}', 304),
+        ('"stale", {etag}', 304),
+        ('*', 304),
+        ('"stale"', 200),
+    )
+    @ddt.unpack
+    def test_if_none_match(self, header_value, expected_status_code):
+        """
+        Test that a request whose If-None-Match matches the content's ETag gets a 304 (Not Modified).
+        """
+        etag = self.client.get(self.url_unlocked)['ETag']
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=header_value.format(etag=etag))
+        self.assertEqual(resp.status_code, expected_status_code)
+        self.assertEqual(resp['ETag'], etag)
+
+    def test_etag_changes_with_content(self):
+        """
+        Test that the ETag of an asset changes when it is uploaded again with different content.
+        """
+        etag = self.client.get(self.url_unlocked)['ETag']
+        content = self.contentstore.find(self.unlocked_asset)
+        del_cached_content(self.unlocked_asset)
+        self.contentstore.save(StaticContent(
+            self.unlocked_asset, content.name, content.content_type, content.data + 'more'
+        ))
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_file_cache(self):
+        """
+        Test that assets are copied to the file cache, and that the ones too large for the cache
+        backend are served from it.
+        """
+        cache_dir = mkdtemp()
+        self.addCleanup(rmtree, cache_dir)
+        content = self.contentstore.find(self.unlocked_asset)
+        del_cached_content(self.unlocked_asset)
+
+        with override_settings(STATIC_CONTENT_FILE_CACHE_DIR=cache_dir):
+            with patch('contentserver.middleware.MAX_CACHED_CONTENT_LENGTH', 0):
+                resp = self.client.get(self.url_unlocked)
+                self.assertEqual(resp.status_code, 200)
+                self.assertEqual(resp.content, content.data)
+                self.assertTrue(file_cache().touch(content.content_digest))
+
+                with patch('gridfs.grid_file.GridOut.read') as mock_read:
+                    resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=1-2')
+                self.assertFalse(mock_read.called)
+                self.assertEqual(resp.status_code, 206)
+                self.assertEqual(resp.content, content.data[1:3])
+
+    def test_file_cache_locked_asset(self):
+        """
+        Test that a locked asset isn't copied to the file cache for a user without access to it.
+        """
+        cache_dir = mkdtemp()
+        self.addCleanup(rmtree, cache_dir)
+        content = self.contentstore.find(self.locked_asset)
+        del_cached_content(self.locked_asset)
+
+        with override_settings(STATIC_CONTENT_FILE_CACHE_DIR=cache_dir):
+            with patch('contentserver.middleware.MAX_CACHED_CONTENT_LENGTH', 0):
+                resp = self.client.get(self.url_locked)
+                self.assertEqual(resp.status_code, 403)
+                self.assertFalse(file_cache().touch(content.content_digest))
+
+                self.client.login(username=self.staff_usr, password=self.staff_pwd)
+                resp = self.client.get(self.url_locked)
+                self.assertEqual(resp.status_code, 200)
+                self.assertEqual(resp.content, content.data)
+                self.assertTrue(file_cache().touch(content.content_digest))
+
     @ddt.data(
         'bytes 0-',
         'bits=0-',
@@ -221,6 +349,17 @@ class ParseRangeHeaderTestCase(unittest.TestCase):
         self.assertEqual(len(ranges), excepted_ranges_length)
         self.assertEqual(ranges, expected_ranges)
 
+    @ddt.data(
+        ([(100, 199)], [(100, 199)]),
+        ([(200, 299), (100, 199)], [(100, 299)]),
+        ([(100, 199), (150, 249), (0, 9)], [(0, 9), (100, 249)]),
+        ([(100, 199), (120, 129)], [(100, 199)]),
+        ([(100, 199), (201, 299)], [(100, 199), (201, 299)]),
+    )
+    @ddt.unpack
+    def test_coalesce_ranges(self, ranges, expected_ranges):
+        self.assertEqual(coalesce_ranges(ranges), expected_ranges)
+
     @ddt.data(
         ('bytes=one-20', ValueError, 'invalid literal for int()'),
         ('bytes=-one', ValueError, 'invalid literal for int()'),
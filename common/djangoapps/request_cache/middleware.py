@@ -1,5 +1,7 @@
 import threading
 
+from celery.signals import task_postrun, task_prerun
+
 
 class _RequestCache(threading.local):
     """
@@ -48,3 +50,16 @@ class RequestCache(object):
     def process_response(self, request, response):
         self.clear_request_cache()
         return response
+
+
+def clear_request_cache_for_task(**kwargs):  # pylint: disable=unused-argument
+    """
+    Empty the request cache before and after each Celery task, which, unlike
+    requests, don't go through the middleware, so that the values cached by
+    a task are neither served to the next ones nor kept forever.
+    """
+    RequestCache.clear_request_cache()
+
+
+task_prerun.connect(clear_request_cache_for_task)
+task_postrun.connect(clear_request_cache_for_task)
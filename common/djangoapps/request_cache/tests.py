@@ -1,10 +1,11 @@
 """
 Tests for the request cache.
 """
+from celery.signals import task_postrun, task_prerun
 from django.conf import settings
 from django.test import TestCase
 
-from request_cache import get_request_or_stub
+from request_cache import get_cache, get_request_or_stub
 
 
 class TestRequestCache(TestCase):
@@ -18,3 +19,9 @@ class TestRequestCache(TestCase):
         stub = get_request_or_stub()
         expected_url = "http://{site_name}/foobar".format(site_name=settings.SITE_NAME)
         self.assertEqual(stub.build_absolute_uri("foobar"), expected_url)
+
+    def test_cleared_around_celery_tasks(self):
+        for signal in (task_prerun, task_postrun):
+            get_cache('test')['key'] = 'value'
+            signal.send(sender=None)
+            self.assertEqual(get_cache('test'), {})
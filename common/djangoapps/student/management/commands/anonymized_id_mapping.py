@@ -13,7 +13,7 @@ import csv
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand, CommandError
 
-from student.models import anonymous_id_for_user
+from student.models import anonymous_ids_for_users
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 
@@ -57,11 +57,13 @@ class Command(BaseCommand):
                     "Per-Student anonymized user ID",
                     "Per-course anonymized user id"
                 ))
+                unique_ids = anonymous_ids_for_users(students, None)
+                anonymous_ids = anonymous_ids_for_users(students, course_key)
                 for student in students:
                     csv_writer.writerow((
                         student.id,
-                        anonymous_id_for_user(student, None),
-                        anonymous_id_for_user(student, course_key)
+                        unique_ids[student.id],
+                        anonymous_ids[student.id]
                     ))
         except IOError:
             raise CommandError("Error writing to file: %s" % output_filename)
@@ -0,0 +1,73 @@
+"""
+Management command to save the anonymous ids of enrolled learners, for the
+SAVE_ANONYMOUS_IDS_ON_ENROLLMENT feature.
+"""
+from optparse import make_option
+from textwrap import dedent
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from student.models import CourseEnrollment, save_anonymous_ids
+
+
+class Command(BaseCommand):
+    """
+    Command to save the AnonymousUserId objects missing for the learners
+    enrolled in the given courses, or in every course if none is given: their
+    per-course ids, and their ids across courses. The objects of each batch of
+    --batch-size learners are saved with a single query.
+
+    Once the SAVE_ANONYMOUS_IDS_ON_ENROLLMENT feature is enabled, anonymous ids
+    are saved when learners enroll, and otherwise the first time they are
+    computed. Saving the ids of the learners enrolled before with this
+    command spares those computations the query.
+
+    Examples:
+
+        ./manage.py lms backfill_anonymous_ids
+        ./manage.py lms backfill_anonymous_ids edX/DemoX/Demo_Course --batch-size=5000
+    """
+    help = dedent(__doc__)
+    args = '[course_id ...]'
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--batch-size',
+            type='int',
+            dest='batch_size',
+            default=1000,
+            help='Number of learners whose ids are saved with a single query'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        """
+        By convention set by Django developers, this method actually executes command's actions.
+        So, there could be no better docstring than emphasize this once again.
+        """
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError(u"--batch-size must be at least 1")
+
+        if args:
+            try:
+                course_keys = [CourseKey.from_string(arg) for arg in args]
+            except InvalidKeyError as exc:
+                raise CommandError(u"Invalid course id: {}".format(exc))
+        else:
+            # values_list returns the course ids as strings
+            course_keys = [
+                CourseKey.from_string(course_id)
+                for course_id in CourseEnrollment.objects.values_list('course_id', flat=True).distinct()
+            ]
+
+        total_saved = 0
+        for course_key in course_keys:
+            learners = User.objects.filter(courseenrollment__course_id=course_key).only('id')
+            saved = sum(save_anonymous_ids(learners, course_id, batch_size) for course_id in (course_key, None))
+            total_saved += saved
+            self.stdout.write(u"{}: saved {} anonymous ids\n".format(course_key, saved))
+        self.stdout.write(u"Saved {} anonymous ids\n".format(total_saved))
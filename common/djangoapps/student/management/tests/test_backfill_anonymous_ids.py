@@ -0,0 +1,41 @@
+"""
+Tests the backfill_anonymous_ids management command
+"""
+from django.core.management import call_command
+from django.test import TestCase
+from mock import patch
+from opaque_keys.edx.locator import CourseLocator
+
+from student.models import AnonymousUserId, CourseEnrollment, anonymous_id_for_user, user_by_anonymous_id
+from student.tests.factories import UserFactory
+
+
+@patch.dict('django.conf.settings.FEATURES', {'SAVE_ANONYMOUS_IDS_ON_ENROLLMENT': False})
+class TestBackfillAnonymousIds(TestCase):
+    """Tests for saving the anonymous ids of enrolled learners."""
+
+    def setUp(self):
+        super(TestBackfillAnonymousIds, self).setUp()
+        patcher = patch('student.models.tracker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.course_keys = [CourseLocator('edX', 'Backfill{}'.format(index), 'run') for index in range(2)]
+        self.users = [UserFactory() for __ in range(3)]
+        for user in self.users:
+            for course_key in self.course_keys:
+                CourseEnrollment.enroll(user, course_key)
+        AnonymousUserId.objects.all().delete()
+
+    def test_no_arguments(self):
+        # every course with enrollments is backfilled
+        call_command('backfill_anonymous_ids', batch_size=2)
+        for user in self.users:
+            for course_id in self.course_keys + [None]:
+                self.assertEqual(user_by_anonymous_id(anonymous_id_for_user(user, course_id, save=False)), user)
+        self.assertEqual(AnonymousUserId.objects.count(), 9)
+
+    def test_given_course(self):
+        call_command('backfill_anonymous_ids', unicode(self.course_keys[0]))
+        self.assertEqual(AnonymousUserId.objects.filter(course_id=self.course_keys[0]).count(), 3)
+        self.assertEqual(AnonymousUserId.objects.filter(course_id=self.course_keys[1]).count(), 0)
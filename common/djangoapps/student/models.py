@@ -99,6 +99,52 @@ class AnonymousUserId(models.Model):
     course_id = CourseKeyField(db_index=True, max_length=255, blank=True)
     unique_together = (user, course_id)
 
+    SAVED_CACHE_KEY = u"anonymous_user_id.{anonymous_user_id}.saved"
+    SAVED_CACHE_TIMEOUT = 60 * 60 * 24
+
+    @classmethod
+    def saved_cache_key_name(cls, anonymous_user_id):
+        """Return cache key name to be used to note that an id is saved.
+        Args:
+            anonymous_user_id(unicode): The anonymous user id.
+
+        Returns:
+            Unicode cache key
+        """
+        return cls.SAVED_CACHE_KEY.format(anonymous_user_id=anonymous_user_id)
+
+
+def _anonymous_id_digest(user_id, course_id):
+    """
+    Return the anonymous id of the user with the given id in the course, or
+    across courses if `course_id` is None.
+    """
+    # include the secret key as a salt, and to make the ids unique across different LMS installs.
+    hasher = hashlib.md5()
+    hasher.update(settings.SECRET_KEY)
+    hasher.update(unicode(user_id))
+    if course_id:
+        hasher.update(course_id.to_deprecated_string().encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def _anonymous_ids_saved_on_enrollment():
+    """
+    Return whether the AnonymousUserId rows are saved when learners enroll,
+    and only checked once per cache timeout when their ids are computed.
+    """
+    return settings.FEATURES.get('SAVE_ANONYMOUS_IDS_ON_ENROLLMENT', False)
+
+
+def _cache_saved_anonymous_ids(anonymous_user_ids):
+    """
+    Note in the cache that the AnonymousUserId rows of the given ids are saved.
+    """
+    cache.set_many(
+        {AnonymousUserId.saved_cache_key_name(anonymous_user_id): True for anonymous_user_id in anonymous_user_ids},
+        AnonymousUserId.SAVED_CACHE_TIMEOUT
+    )
+
 
 def anonymous_id_for_user(user, course_id, save=True):
     """
@@ -108,7 +154,10 @@ def anonymous_id_for_user(user, course_id, save=True):
     If user is an `AnonymousUser`, returns `None`
 
     Keyword arguments:
-    save -- Whether the id should be saved in an AnonymousUserId object.
+    save -- Whether the id should be saved in an AnonymousUserId object if
+            it isn't already. When the SAVE_ANONYMOUS_IDS_ON_ENROLLMENT
+            feature is enabled, the database is only checked if the cache
+            doesn't note the id as saved, which it does for enrolled learners.
     """
     # This part is for ability to get xblock instance in xblock_noauth handlers, where user is unauthenticated.
     if user.is_anonymous():
@@ -118,13 +167,7 @@ def anonymous_id_for_user(user, course_id, save=True):
     if cached_id is not None:
         return cached_id
 
-    # include the secret key as a salt, and to make the ids unique across different LMS installs.
-    hasher = hashlib.md5()
-    hasher.update(settings.SECRET_KEY)
-    hasher.update(unicode(user.id))
-    if course_id:
-        hasher.update(course_id.to_deprecated_string().encode('utf-8'))
-    digest = hasher.hexdigest()
+    digest = _anonymous_id_digest(user.id, course_id)
 
     if not hasattr(user, '_anonymous_id'):
         user._anonymous_id = {}  # pylint: disable=protected-access
@@ -134,6 +177,10 @@ def anonymous_id_for_user(user, course_id, save=True):
     if save is False:
         return digest
 
+    saved_on_enrollment = _anonymous_ids_saved_on_enrollment()
+    if saved_on_enrollment and cache.get(AnonymousUserId.saved_cache_key_name(digest)):
+        return digest
+
     try:
         anonymous_user_id, __ = AnonymousUserId.objects.get_or_create(
             defaults={'anonymous_user_id': digest},
@@ -154,9 +201,81 @@ def anonymous_id_for_user(user, course_id, save=True):
         # continue
         pass
 
+    if saved_on_enrollment:
+        _cache_saved_anonymous_ids([digest])
+
     return digest
 
 
+def anonymous_ids_for_users(users, course_id, save=True):
+    """
+    Return a dict of the anonymous ids of the given users in the course, by
+    user id, as returned by `anonymous_id_for_user`.
+
+    The ids missing from the AnonymousUserId table are saved with
+    `save_anonymous_ids` rather than one user at a time, unless `save` is
+    False. When the SAVE_ANONYMOUS_IDS_ON_ENROLLMENT feature is enabled, only
+    the ids the cache doesn't note as saved are checked.
+    """
+    users = [user for user in users if not user.is_anonymous()]
+    anonymous_ids = {user.id: anonymous_id_for_user(user, course_id, save=False) for user in users}
+    if save:
+        if _anonymous_ids_saved_on_enrollment():
+            cached = cache.get_many([
+                AnonymousUserId.saved_cache_key_name(anonymous_id) for anonymous_id in anonymous_ids.itervalues()
+            ])
+            unsaved = [
+                user for user in users
+                if AnonymousUserId.saved_cache_key_name(anonymous_ids[user.id]) not in cached
+            ]
+            save_anonymous_ids(unsaved, course_id)
+            _cache_saved_anonymous_ids(anonymous_ids[user.id] for user in unsaved)
+        else:
+            save_anonymous_ids(users, course_id)
+    return anonymous_ids
+
+
+def save_anonymous_ids(users, course_id, batch_size=1000):
+    """
+    Save the AnonymousUserId objects missing for the given users in the
+    course, those of each batch of `batch_size` users with a single query,
+    and return the number of objects saved.
+    """
+    saved = 0
+    user_ids = sorted(set(user.id for user in users))
+    for start in xrange(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        existing = set(
+            AnonymousUserId.objects.filter(user_id__in=batch, course_id=course_id).values_list('user_id', flat=True)
+        )
+        missing = [
+            AnonymousUserId(
+                user_id=user_id,
+                course_id=course_id,
+                anonymous_user_id=_anonymous_id_digest(user_id, course_id)
+            )
+            for user_id in batch if user_id not in existing
+        ]
+        if not missing:
+            continue
+        try:
+            AnonymousUserId.objects.bulk_create(missing)
+        except IntegrityError:
+            # Another thread has created some of these entries, so
+            # create the others one at a time
+            for anonymous_user_id in missing:
+                try:
+                    AnonymousUserId.objects.get_or_create(
+                        defaults={'anonymous_user_id': anonymous_user_id.anonymous_user_id},
+                        user_id=anonymous_user_id.user_id,
+                        course_id=course_id
+                    )
+                except IntegrityError:
+                    pass
+        saved += len(missing)
+    return saved
+
+
 def user_by_anonymous_id(uid):
     """
     Return user by anonymous_user_id using AnonymousUserId lookup table.
@@ -1479,6 +1598,18 @@ def invalidate_enrollment_mode_cache(sender, instance, **kwargs):  # pylint: dis
     cache.delete(cache_key)
 
 
+@receiver(models.signals.post_save, sender=CourseEnrollment)
+def save_anonymous_ids_on_enrollment(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Save the learner's anonymous ids when enrolling, if they are only checked
+    once per cache timeout when computed.
+    """
+    if created and _anonymous_ids_saved_on_enrollment():
+        for course_id in (instance.course_id, None):
+            save_anonymous_ids([instance.user], course_id)
+            _cache_saved_anonymous_ids([_anonymous_id_digest(instance.user.id, course_id)])
+
+
 class ManualEnrollmentAudit(models.Model):
     """
     Table for tracking which enrollments were performed through manual enrollment.
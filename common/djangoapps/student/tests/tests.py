@@ -19,8 +19,8 @@ from django.test import TestCase
 from django.test.client import Client
 
 from student.models import (
-    anonymous_id_for_user, user_by_anonymous_id, CourseEnrollment,
-    unique_id_for_user, LinkedInAddToProfileConfiguration
+    anonymous_id_for_user, anonymous_ids_for_users, save_anonymous_ids, user_by_anonymous_id, AnonymousUserId,
+    CourseEnrollment, unique_id_for_user, LinkedInAddToProfileConfiguration
 )
 from student.views import (
     process_survey_link,
@@ -886,6 +886,53 @@ class AnonymousLookupTable(ModuleStoreTestCase):
         self.assertEqual(self.user, real_user)
         self.assertEqual(anonymous_id, anonymous_id_for_user(self.user, course2.id, save=False))
 
+    def test_anonymous_ids_for_users(self):
+        users = [self.user, UserFactory(), UserFactory()]
+        # the missing ids are saved at once, and memoized on the users
+        with self.assertNumQueries(2):
+            anonymous_ids = anonymous_ids_for_users(users, self.course.id)
+        with self.assertNumQueries(0):
+            for user in users:
+                self.assertEqual(anonymous_ids[user.id], anonymous_id_for_user(user, self.course.id))
+        for user in users:
+            self.assertEqual(user_by_anonymous_id(anonymous_ids[user.id]), user)
+
+    def test_save_anonymous_ids(self):
+        users = [UserFactory() for __ in range(5)]
+        anonymous_id_for_user(users[0], self.course.id)
+        self.assertEqual(save_anonymous_ids(users, self.course.id, batch_size=2), 4)
+        self.assertEqual(save_anonymous_ids(users, self.course.id), 0)
+        self.assertEqual(AnonymousUserId.objects.filter(course_id=self.course.id).count(), 5)
+
+    @patch.dict(settings.FEATURES, {'SAVE_ANONYMOUS_IDS_ON_ENROLLMENT': True})
+    def test_ids_saved_on_enrollment(self):
+        cache.clear()
+        CourseEnrollment.enroll(self.user, self.course.id)
+        with self.assertNumQueries(0):
+            anonymous_id = anonymous_id_for_user(self.user, self.course.id)
+            unique_id = unique_id_for_user(self.user)
+        self.assertEqual(user_by_anonymous_id(anonymous_id), self.user)
+        self.assertEqual(user_by_anonymous_id(unique_id), self.user)
+
+    @patch.dict(settings.FEATURES, {'SAVE_ANONYMOUS_IDS_ON_ENROLLMENT': True})
+    def test_ids_saved_on_enrollment_unenrolled(self):
+        # staff who never enrolled, and learners enrolled before the ids were
+        # backfilled, still get their ids saved the first time they're computed
+        cache.clear()
+        anonymous_id = anonymous_id_for_user(self.user, self.course.id)
+        self.assertEqual(user_by_anonymous_id(anonymous_id), self.user)
+        user = User.objects.get(id=self.user.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(anonymous_id_for_user(user, self.course.id), anonymous_id)
+
+        users = [self.user, UserFactory(), UserFactory()]
+        anonymous_ids = anonymous_ids_for_users(users, self.course.id)
+        for user in users:
+            self.assertEqual(user_by_anonymous_id(anonymous_ids[user.id]), user)
+        users = [User.objects.get(id=user.id) for user in users]
+        with self.assertNumQueries(0):
+            self.assertEqual(anonymous_ids_for_users(users, self.course.id), anonymous_ids)
+
 
 @unittest.skipUnless(settings.ROOT_URLCONF == 'lms.urls', 'Test only valid in lms')
 @ddt.ddt
@@ -26,3 +26,12 @@ class BaseBackend(object):
     def send(self, event):
         """Send event to tracker."""
         pass
+
+    def send_batch(self, events):
+        """
+        Send a list of events to tracker, at once if the backend can. Backends
+        sending them at once raise their errors, for the caller to retry the
+        batch or count the events lost.
+        """
+        for event in events:
+            self.send(event)
@@ -0,0 +1,215 @@
+"""
+Event tracker backend that buffers events, and sends them in batches to
+another backend from a background thread, so that requests don't wait for
+the other backend's storage.
+
+For example::
+
+  TRACKING_BACKENDS = {
+      'mongo': {
+          'ENGINE': 'track.backends.batching.BatchingBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.mongodb.MongoBackend',
+                  'OPTIONS': {...}
+              },
+              'max_batch_size': 100,
+              'max_batch_seconds': 1,
+          }
+      }
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import threading
+import time
+from Queue import Queue, Empty, Full
+
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+
+DROP_NEWEST = 'newest'
+DROP_OLDEST = 'oldest'
+
+# Queued to wake the background thread up when closing
+_STOP = object()
+
+
+class BatchingBackend(BaseBackend):
+    """
+    Event tracker backend that queues events, and sends them to another
+    backend with its `send_batch` method from a background thread, in batches
+    of up to `max_batch_size` events, each sent within `max_batch_seconds` of
+    being queued.
+
+    At most `max_queued_events` events are queued: when the queue is full, the
+    event sent is dropped, or the oldest queued event is dropped in its place,
+    according to `drop_policy`. The numbers of events queued, flushed (sent to
+    the other backend) and dropped are counted in `counts`, and in
+    dog_stats_api.
+
+    The events still queued are sent when the process exits, or when `close`
+    or `flush` is called.
+    """
+
+    def __init__(self, backend, max_batch_size=100, max_batch_seconds=1.0, max_queued_events=10000,
+                 drop_policy=DROP_NEWEST, **kwargs):
+        """
+        :Parameters:
+
+          - `backend`: the configuration of the backend to send the events
+            to, a dict with its 'ENGINE' and 'OPTIONS', as in
+            TRACKING_BACKENDS
+          - `max_batch_size`: the largest number of events to send at once
+          - `max_batch_seconds`: the longest time an event waits for more
+            events to be sent with
+          - `max_queued_events`: the largest number of events queued
+          - `drop_policy`: which event to drop when the queue is full,
+            'newest' or 'oldest'
+
+        """
+        super(BatchingBackend, self).__init__(**kwargs)
+
+        # Imported here, as track.tracker initializes its backends when imported
+        from track import tracker
+        self.backend = tracker._instantiate_backend_from_name(  # pylint: disable=protected-access
+            backend['ENGINE'], backend.get('OPTIONS', {})
+        )
+
+        if drop_policy not in (DROP_NEWEST, DROP_OLDEST):
+            raise ValueError('Invalid drop policy %s' % drop_policy)
+
+        self.max_batch_size = max_batch_size
+        self.max_batch_seconds = max_batch_seconds
+        self.drop_policy = drop_policy
+
+        self.queue = Queue(max_queued_events)
+        self.counts = {'queued': 0, 'flushed': 0, 'dropped': 0}
+        self._lock = threading.Lock()
+
+        # The thread is started with the first event, in the process sending
+        # it: threads don't survive a fork, and the backends are initialized
+        # before web servers fork their workers.
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+
+        atexit.register(self.close)
+
+    def _count(self, name, count=1):
+        """Count the given number of events."""
+        with self._lock:
+            self.counts[name] += count
+        dog_stats_api.increment('track.batching.{0}'.format(name), count)
+
+    def _ensure_thread(self):
+        """Start the background thread, if this process hasn't started it."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name='track-batching')
+                self._thread.daemon = True
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def send(self, event):
+        """Queue the event, to be sent from the background thread."""
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(event)
+        except Full:
+            if self.drop_policy == DROP_NEWEST:
+                self._count('dropped')
+                return
+            try:
+                self.queue.get_nowait()
+                self._count('dropped')
+            except Empty:
+                pass
+            try:
+                self.queue.put_nowait(event)
+            except Full:
+                self._count('dropped')
+                return
+        self._count('queued')
+
+    def _next_batch(self):
+        """
+        Wait for events until the batch is full, `max_batch_seconds` have
+        passed or the backend is closed, and return the batch.
+        """
+        batch = []
+        deadline = time.time() + self.max_batch_seconds
+        while len(batch) < self.max_batch_size and not self._stopping.is_set():
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                event = self.queue.get(timeout=timeout)
+            except Empty:
+                break
+            if event is _STOP:
+                break
+            batch.append(event)
+        return batch
+
+    def _send_batch(self, batch):
+        """Send the batch to the backend."""
+        try:
+            self.backend.send_batch(batch)
+        except Exception:  # pylint: disable=broad-except
+            # The events are lost, but the thread must keep sending the next ones.
+            log.exception('Error sending a batch of %d events to the event tracker backend', len(batch))
+            self._count('dropped', len(batch))
+        else:
+            self._count('flushed', len(batch))
+
+    def _run(self):
+        """Send the batches of events queued, until closed."""
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._send_batch(batch)
+
+    def flush(self):
+        """Send the events queued, in batches, from the calling thread."""
+        batch = []
+        while True:
+            try:
+                event = self.queue.get_nowait()
+            except Empty:
+                break
+            if event is _STOP:
+                continue
+            batch.append(event)
+            if len(batch) == self.max_batch_size:
+                self._send_batch(batch)
+                batch = []
+        if batch:
+            self._send_batch(batch)
+
+    def close(self, timeout=5):
+        """
+        Stop the background thread, waiting up to `timeout` seconds for it
+        to send the batch it's collecting, and send the events still queued.
+        """
+        self._stopping.set()
+        if self._thread is not None and self._pid == os.getpid():
+            try:
+                self.queue.put_nowait(_STOP)
+            except Full:
+                # the thread isn't waiting for events then
+                pass
+            self._thread.join(timeout)
+        self.flush()
@@ -81,3 +81,11 @@ class DjangoBackend(BaseBackend):
             tldat.save(using=self.name)
         except Exception as e:  # pylint: disable=broad-except
             log.exception(e)
+
+    def send_batch(self, events):
+        """
+        Save the events with a single query. Unlike `send`, errors are raised,
+        for the caller to retry the batch or count the events lost.
+        """
+        tldats = [TrackingLog(**{x: event.get(x, '') for x in LOGFIELDS}) for event in events]
+        TrackingLog.objects.using(self.name).bulk_create(tldats)
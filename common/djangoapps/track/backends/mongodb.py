@@ -97,3 +97,11 @@ class MongoBackend(BaseBackend):
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+
+    def send_batch(self, events):
+        """
+        Insert the events in to the Mongo collection at once. Unlike `send`,
+        errors are raised, for the caller to retry the batch or count the
+        events lost.
+        """
+        self.collection.insert(events, manipulate=False)
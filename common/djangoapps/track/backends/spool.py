@@ -0,0 +1,347 @@
+"""
+Event tracker backend that appends events to files on the local disk, the
+spool, so that requests never wait for the network, and events aren't lost
+while other backends' storage is down. The `forward_tracking_spool`
+management command, run on the same host, sends the spooled events to those
+backends in batches, replaying the events spooled during outages once they're
+back.
+
+For example::
+
+  TRACKING_BACKENDS = {
+      'spool': {
+          'ENGINE': 'track.backends.spool.SpoolBackend',
+          'OPTIONS': {
+              'directory': '/edx/var/tracking/spool',
+              'backends': {
+                  'mongo': {
+                      'ENGINE': 'track.backends.mongodb.MongoBackend',
+                      'OPTIONS': {...}
+                  }
+              }
+          }
+      }
+  }
+
+and::
+
+  ./manage.py lms forward_tracking_spool spool
+
+Each process appends events, one JSON document per line, to its own segment
+file, named after the time it was started and the process id. A segment is
+open (suffixed '.open') while events are appended to it, and closed (renamed
+with the suffix '.events') once it's large or old enough, or when its process
+exits. The forwarder records the offset it has sent each segment up to in a
+checkpoint file, and deletes the segments it has sent entirely once they're
+closed, or once their process has died.
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import errno
+import json
+import logging
+import os
+import threading
+import time
+
+import dateutil.parser
+
+from track.backends import BaseBackend
+from track.utils import DateTimeJSONEncoder
+
+
+log = logging.getLogger(__name__)
+
+
+OPEN_SEGMENT_SUFFIX = '.open'
+CLOSED_SEGMENT_SUFFIX = '.events'
+CHECKPOINT_FILENAME = 'checkpoint'
+
+
+def _segment_pid(segment_id):
+    """Return the id of the process that wrote the segment with the given id."""
+    return int(segment_id.split('-')[1])
+
+
+def _is_running(pid):
+    """Return whether a process with the given id is running on this host."""
+    try:
+        os.kill(pid, 0)
+    except OSError as exc:
+        return exc.errno == errno.EPERM
+    return True
+
+
+class SpoolBackend(BaseBackend):
+    """
+    Event tracker backend that appends events to this process' segment file in
+    `directory`. The file is flushed after every event, so that the events
+    survive the process crashing, and synced to the disk after `fsync_events`
+    events or `fsync_seconds` seconds, whichever comes first, so that most of
+    them survive the host crashing.
+
+    A segment is closed once it's `max_segment_bytes` long or
+    `max_segment_seconds` old, when the next event is sent.
+    """
+
+    def __init__(self, directory, backends=None, max_segment_bytes=64 * 1024 * 1024, max_segment_seconds=300,
+                 fsync_events=100, fsync_seconds=1.0, **kwargs):
+        """
+        :Parameters:
+
+          - `directory`: the directory of the segment files, which is created
+            if it doesn't exist
+          - `backends`: the configurations of the backends the forwarder sends
+            the events to, as in TRACKING_BACKENDS; they aren't used by this
+            backend
+          - `max_segment_bytes`: the size after which a segment is closed
+          - `max_segment_seconds`: the age after which a segment is closed
+          - `fsync_events`: the largest number of events written without
+            syncing the segment to the disk
+          - `fsync_seconds`: the longest time after which events written are
+            synced to the disk, when the next event is sent
+
+        """
+        super(SpoolBackend, self).__init__(**kwargs)
+
+        self.directory = directory
+        self.backends = backends or {}
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.fsync_events = fsync_events
+        self.fsync_seconds = fsync_seconds
+
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+
+        self._lock = threading.Lock()
+        self._segment = None
+        self._segment_id = None
+        self._segment_count = 0
+        # The segment is opened with the first event, in the process sending
+        # it: web servers fork their workers after initializing the backends.
+        self._pid = None
+        self._opened_at = None
+        self._synced_at = None
+        self._unsynced_events = 0
+
+        atexit.register(self.close)
+
+    def send(self, event):
+        """Append the event to this process' segment."""
+        line = json.dumps(event, cls=DateTimeJSONEncoder) + '\n'
+        with self._lock:
+            try:
+                self._write(line)
+            except (IOError, OSError):
+                # As with the other backends, the event is lost when the
+                # storage fails.
+                log.exception('Error writing to the spool event tracker backend')
+
+    def _write(self, line):
+        """Append the line to the segment, opening, syncing and closing it as needed."""
+        now = time.time()
+        if self._pid != os.getpid():
+            # The segment open, if any, is the parent process'.
+            self._segment = None
+            self._pid = os.getpid()
+        if self._segment is None:
+            self._open_segment(now)
+
+        self._segment.write(line)
+        self._segment.flush()
+        self._unsynced_events += 1
+        if self._unsynced_events >= self.fsync_events or now - self._synced_at >= self.fsync_seconds:
+            self._sync(now)
+
+        if self._segment.tell() >= self.max_segment_bytes or now - self._opened_at >= self.max_segment_seconds:
+            self._close_segment()
+
+    def _open_segment(self, now):
+        """Open a new segment for this process."""
+        self._segment_count += 1
+        self._segment_id = '{0:013d}-{1}-{2:06d}'.format(int(now * 1000), os.getpid(), self._segment_count)
+        self._segment = open(self._segment_path(OPEN_SEGMENT_SUFFIX), 'ab')
+        self._opened_at = self._synced_at = now
+        self._unsynced_events = 0
+
+    def _segment_path(self, suffix):
+        """Return the path of the current segment with the given suffix."""
+        return os.path.join(self.directory, self._segment_id + suffix)
+
+    def _sync(self, now):
+        """Sync the segment to the disk."""
+        os.fsync(self._segment.fileno())
+        self._synced_at = now
+        self._unsynced_events = 0
+
+    def _close_segment(self):
+        """Sync and close the segment, and mark it closed for the forwarder."""
+        segment, self._segment = self._segment, None
+        try:
+            os.fsync(segment.fileno())
+        finally:
+            segment.close()
+        os.rename(self._segment_path(OPEN_SEGMENT_SUFFIX), self._segment_path(CLOSED_SEGMENT_SUFFIX))
+
+    def close(self):
+        """Close this process' segment, if it's open."""
+        with self._lock:
+            if self._segment is not None and self._pid == os.getpid():
+                try:
+                    self._close_segment()
+                except (IOError, OSError):
+                    log.exception('Error closing a spool event tracker backend segment')
+
+
+class SpoolForwarder(object):
+    """
+    Sends the events spooled in `directory` by `SpoolBackend`s to other
+    backends, in the order of their segments, in batches of up to
+    `batch_size` events.
+
+    The offsets the segments are sent up to are checkpointed after each
+    batch, so that the events aren't sent twice after a failure, unless the
+    batch was sent to some of the backends only. Events are sent to the
+    backends as decoded from the spool, with their 'time' parsed back to a
+    datetime.
+    """
+
+    def __init__(self, directory, backends, batch_size=500):
+        """
+        :Parameters:
+
+          - `directory`: the spool backend's directory
+          - `backends`: the configurations of the backends to send the
+            events to, as in TRACKING_BACKENDS
+          - `batch_size`: the largest number of events to send at once
+
+        """
+        # Imported here, as track.tracker initializes its backends when imported
+        from track import tracker
+
+        self.directory = directory
+        self.batch_size = batch_size
+        self.backends = {
+            name: tracker._instantiate_backend_from_name(  # pylint: disable=protected-access
+                config['ENGINE'], config.get('OPTIONS', {})
+            )
+            for name, config in backends.iteritems()
+        }
+        self.checkpoint_path = os.path.join(directory, CHECKPOINT_FILENAME)
+
+    def _load_checkpoint(self):
+        """Return the offsets the segments were sent up to, by segment id."""
+        try:
+            with open(self.checkpoint_path) as checkpoint_file:
+                return json.load(checkpoint_file)
+        except IOError as exc:
+            if exc.errno != errno.ENOENT:
+                raise
+            return {}
+
+    def _save_checkpoint(self, checkpoint):
+        """Replace the checkpoint file atomically with the given offsets."""
+        temporary_path = self.checkpoint_path + '.tmp'
+        with open(temporary_path, 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.rename(temporary_path, self.checkpoint_path)
+
+    def _segments(self):
+        """Return the (segment id, path, closed) of the spool's segments, in order."""
+        segments = []
+        for filename in os.listdir(self.directory):
+            for suffix, closed in ((OPEN_SEGMENT_SUFFIX, False), (CLOSED_SEGMENT_SUFFIX, True)):
+                if filename.endswith(suffix):
+                    segments.append((filename[:-len(suffix)], os.path.join(self.directory, filename), closed))
+        return sorted(segments)
+
+    def _parse(self, segment_id, line):
+        """Return the event spooled in the line, or None if it's invalid."""
+        try:
+            event = json.loads(line)
+        except ValueError:
+            log.error('Skipping an invalid event in tracking spool segment %s', segment_id)
+            return None
+        if isinstance(event.get('time'), basestring):
+            try:
+                event['time'] = dateutil.parser.parse(event['time'])
+            except ValueError:
+                pass
+        return event
+
+    def _read_batch(self, segment_id, segment):
+        """
+        Read up to `batch_size` events from the segment, and return them with
+        the number of bytes read. A last line not written entirely isn't read.
+        """
+        events = []
+        read_bytes = 0
+        while len(events) < self.batch_size:
+            position = segment.tell()
+            line = segment.readline()
+            if not line.endswith('\n'):
+                segment.seek(position)
+                break
+            read_bytes += len(line)
+            event = self._parse(segment_id, line)
+            if event is not None:
+                events.append(event)
+        return events, read_bytes
+
+    def _send_batch(self, events):
+        """Send the events to each backend, raising their errors."""
+        for backend in self.backends.itervalues():
+            backend.send_batch(events)
+
+    def forward(self):
+        """
+        Send the events spooled since the checkpoint, delete the segments sent
+        which are complete, and return the number of events sent. The
+        backends' errors are raised, once the batches sent before are
+        checkpointed.
+        """
+        checkpoint = self._load_checkpoint()
+        forwarded = 0
+        for segment_id, path, closed in self._segments():
+            # checked before reading, as the process could write to the
+            # segment and exit in between
+            complete = closed or not _is_running(_segment_pid(segment_id))
+            offset = checkpoint.get(segment_id, 0)
+            try:
+                segment = open(path, 'rb')
+            except IOError as exc:
+                if exc.errno != errno.ENOENT:
+                    raise
+                # the segment was closed meanwhile, and is sent on the next call
+                continue
+
+            with segment:
+                segment.seek(offset)
+                while True:
+                    events, read_bytes = self._read_batch(segment_id, segment)
+                    if not read_bytes:
+                        break
+                    if events:
+                        self._send_batch(events)
+                        forwarded += len(events)
+                    offset += read_bytes
+                    checkpoint[segment_id] = offset
+                    self._save_checkpoint(checkpoint)
+
+            if complete:
+                if offset < os.path.getsize(path):
+                    log.error('Dropping the last event of tracking spool segment %s, written partially', segment_id)
+                os.remove(path)
+                if checkpoint.pop(segment_id, None) is not None:
+                    self._save_checkpoint(checkpoint)
+        return forwarded
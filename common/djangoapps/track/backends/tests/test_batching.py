@@ -0,0 +1,93 @@
+from __future__ import absolute_import
+
+import threading
+
+from django.test import TestCase
+
+from track.backends import BaseBackend
+from track.backends.batching import BatchingBackend
+
+
+class MemoryBackend(BaseBackend):
+    """Backend recording the batches of events sent to it."""
+    def __init__(self, **kwargs):
+        super(MemoryBackend, self).__init__(**kwargs)
+        self.batches = []
+        self.sent = threading.Event()
+
+    def send(self, event):
+        self.send_batch([event])
+
+    def send_batch(self, events):
+        self.batches.append(list(events))
+        self.sent.set()
+
+
+BACKEND_CONFIG = {'ENGINE': 'track.backends.tests.test_batching.MemoryBackend'}
+
+
+class TestBatchingBackend(TestCase):
+    def create_backend(self, **kwargs):
+        backend = BatchingBackend(backend=BACKEND_CONFIG, **kwargs)
+        self.addCleanup(backend.close)
+        return backend
+
+    def test_batches_by_size(self):
+        backend = self.create_backend(max_batch_size=2, max_batch_seconds=60)
+        # Without the background thread, only the events queued are flushed
+        backend._ensure_thread = lambda: None  # pylint: disable=protected-access
+        for index in range(5):
+            backend.send({'test': index})
+        self.assertEqual(backend.backend.batches, [])
+
+        backend.flush()
+        self.assertEqual(backend.backend.batches, [
+            [{'test': 0}, {'test': 1}],
+            [{'test': 2}, {'test': 3}],
+            [{'test': 4}],
+        ])
+        self.assertEqual(backend.counts, {'queued': 5, 'flushed': 5, 'dropped': 0})
+
+    def test_batches_by_time(self):
+        backend = self.create_backend(max_batch_size=100, max_batch_seconds=0.01)
+        backend.send({'test': 1})
+        self.assertTrue(backend.backend.sent.wait(5))
+        self.assertEqual(backend.backend.batches, [[{'test': 1}]])
+
+    def test_drop_newest(self):
+        backend = self.create_backend(max_queued_events=2)
+        backend._ensure_thread = lambda: None  # pylint: disable=protected-access
+        for index in range(3):
+            backend.send({'test': index})
+        backend.flush()
+        self.assertEqual(backend.backend.batches, [[{'test': 0}, {'test': 1}]])
+        self.assertEqual(backend.counts, {'queued': 2, 'flushed': 2, 'dropped': 1})
+
+    def test_drop_oldest(self):
+        backend = self.create_backend(max_queued_events=2, drop_policy='oldest')
+        backend._ensure_thread = lambda: None  # pylint: disable=protected-access
+        for index in range(3):
+            backend.send({'test': index})
+        backend.flush()
+        self.assertEqual(backend.backend.batches, [[{'test': 1}, {'test': 2}]])
+        self.assertEqual(backend.counts, {'queued': 3, 'flushed': 2, 'dropped': 1})
+
+    def test_invalid_drop_policy(self):
+        with self.assertRaises(ValueError):
+            BatchingBackend(backend=BACKEND_CONFIG, drop_policy='random')
+
+    def test_close_sends_queued_events(self):
+        backend = self.create_backend(max_batch_seconds=60)
+        for index in range(3):
+            backend.send({'test': index})
+        backend.close()
+        self.assertEqual(sum(backend.backend.batches, []), [{'test': 0}, {'test': 1}, {'test': 2}])
+        self.assertFalse(backend._thread.is_alive())  # pylint: disable=protected-access
+
+    def test_failing_backend(self):
+        backend = self.create_backend()
+        backend._ensure_thread = lambda: None  # pylint: disable=protected-access
+        backend.backend.send_batch = lambda events: 1 / 0
+        backend.send({'test': 1})
+        backend.flush()
+        self.assertEqual(backend.counts, {'queued': 1, 'flushed': 0, 'dropped': 1})
@@ -0,0 +1,155 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from django.test import TestCase
+from mock import patch
+from pytz import UTC
+
+from track.backends.spool import SpoolBackend, SpoolForwarder
+from track.backends.tests.test_batching import MemoryBackend
+
+
+class FailingBackend(MemoryBackend):
+    """Backend failing to send batches while `failing` is set."""
+    failing = False
+
+    def send_batch(self, events):
+        if self.failing:
+            raise IOError('storage is down')
+        super(FailingBackend, self).send_batch(events)
+
+
+BACKENDS_CONFIG = {'memory': {'ENGINE': 'track.backends.tests.test_spool.FailingBackend'}}
+
+
+class TestSpoolBackend(TestCase):
+    def setUp(self):
+        super(TestSpoolBackend, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        FailingBackend.failing = False
+
+    def create_backend(self, **kwargs):
+        backend = SpoolBackend(directory=self.directory, backends=BACKENDS_CONFIG, **kwargs)
+        self.addCleanup(backend.close)
+        return backend
+
+    def create_forwarder(self, batch_size=500):
+        return SpoolForwarder(self.directory, BACKENDS_CONFIG, batch_size)
+
+    def sent_events(self, forwarder):
+        return [event for batch in forwarder.backends['memory'].batches for event in batch]
+
+    def segment_names(self):
+        return sorted(name for name in os.listdir(self.directory) if name != 'checkpoint')
+
+    def test_spool_and_forward(self):
+        backend = self.create_backend()
+        backend.send({'event_type': 'first', 'time': datetime(2015, 1, 1, 12, 0, tzinfo=UTC)})
+        backend.send({'event_type': 'second'})
+        self.assertEqual(len(self.segment_names()), 1)
+        self.assertTrue(self.segment_names()[0].endswith('.open'))
+
+        forwarder = self.create_forwarder()
+        self.assertEqual(forwarder.forward(), 2)
+        events = self.sent_events(forwarder)
+        self.assertEqual([event['event_type'] for event in events], ['first', 'second'])
+        self.assertEqual(events[0]['time'], datetime(2015, 1, 1, 12, 0, tzinfo=UTC))
+
+        # the open segment is kept, and only the new events are sent
+        backend.send({'event_type': 'third'})
+        self.assertEqual(forwarder.forward(), 1)
+        self.assertEqual(self.sent_events(forwarder)[-1]['event_type'], 'third')
+
+        # closed segments are deleted once sent
+        backend.close()
+        self.assertTrue(self.segment_names()[0].endswith('.events'))
+        self.assertEqual(forwarder.forward(), 0)
+        self.assertEqual(self.segment_names(), [])
+
+    def test_segment_rotation(self):
+        backend = self.create_backend(max_segment_bytes=100)
+        for index in range(5):
+            backend.send({'event_type': 'event', 'data': 'x' * 100, 'index': index})
+        self.assertEqual(len(self.segment_names()), 5)
+
+        forwarder = self.create_forwarder(batch_size=2)
+        self.assertEqual(forwarder.forward(), 5)
+        self.assertEqual([event['index'] for event in self.sent_events(forwarder)], range(5))
+
+    def test_fsync_batching(self):
+        backend = self.create_backend(fsync_events=3, fsync_seconds=3600)
+        with patch('track.backends.spool.os.fsync') as mock_fsync:
+            for __ in range(7):
+                backend.send({'event_type': 'event'})
+        self.assertEqual(mock_fsync.call_count, 2)
+
+    def test_replay_after_outage(self):
+        backend = self.create_backend()
+        forwarder = self.create_forwarder(batch_size=2)
+        for index in range(3):
+            backend.send({'index': index})
+        backend.close()
+
+        FailingBackend.failing = True
+        with self.assertRaises(IOError):
+            forwarder.forward()
+        self.assertEqual(len(self.segment_names()), 1)
+
+        # a new forwarder, e.g. after a restart, sends the events once the backend is back
+        FailingBackend.failing = False
+        forwarder = self.create_forwarder(batch_size=2)
+        self.assertEqual(forwarder.forward(), 3)
+        self.assertEqual([event['index'] for event in self.sent_events(forwarder)], range(3))
+        self.assertEqual(self.segment_names(), [])
+
+    def test_checkpoint(self):
+        backend = self.create_backend()
+        for index in range(4):
+            backend.send({'index': index})
+        backend.close()
+
+        forwarder = self.create_forwarder(batch_size=2)
+        with patch.object(FailingBackend, 'send_batch', side_effect=[None, IOError]):
+            with self.assertRaises(IOError):
+                forwarder.forward()
+
+        # the first batch isn't sent again
+        forwarder = self.create_forwarder(batch_size=2)
+        self.assertEqual(forwarder.forward(), 2)
+        self.assertEqual([event['index'] for event in self.sent_events(forwarder)], [2, 3])
+
+    def test_partial_and_invalid_lines(self):
+        backend = self.create_backend()
+        backend.send({'index': 0})
+        segment_path = os.path.join(self.directory, self.segment_names()[0])
+        with open(segment_path, 'ab') as segment:
+            segment.write('not json\n{"index": 1}\n{"index"')
+
+        forwarder = self.create_forwarder()
+        self.assertEqual(forwarder.forward(), 2)
+        with open(segment_path, 'ab') as segment:
+            segment.write(': 2}\n')
+        self.assertEqual(forwarder.forward(), 1)
+        self.assertEqual([event['index'] for event in self.sent_events(forwarder)], [0, 1, 2])
+
+    def test_dead_writer(self):
+        backend = self.create_backend()
+        backend.send({'index': 0})
+
+        forwarder = self.create_forwarder()
+        with patch('track.backends.spool._is_running', return_value=False):
+            self.assertEqual(forwarder.forward(), 1)
+        self.assertEqual(self.segment_names(), [])
+
+    def test_write_errors(self):
+        backend = self.create_backend()
+        with patch('track.backends.spool.open', create=True, side_effect=IOError):
+            backend.send({'index': 0})
+        backend.send({'index': 1})
+        forwarder = self.create_forwarder()
+        self.assertEqual(forwarder.forward(), 1)
@@ -0,0 +1,110 @@
+""" Management command to send the events spooled by a spool event tracker backend to its backends """
+import logging
+import time
+from optparse import make_option
+from textwrap import dedent
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from track.backends.spool import SpoolForwarder
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Command to send the events spooled on this host by the given spool event
+    tracker backend, named as in TRACKING_BACKENDS, to the backends in its
+    'backends' option, in batches of --batch-size.
+
+    Unless --once is given, the command runs until interrupted, checking for
+    new events every --interval seconds. When a backend fails, the batch is
+    sent again after --retry-delay seconds, doubled after each failure up to
+    --max-retry-delay, so that the events spooled during an outage are sent
+    once the backend is back.
+
+    Examples:
+
+        ./manage.py lms forward_tracking_spool spool
+        ./manage.py lms forward_tracking_spool spool --once --batch-size=1000
+    """
+    help = dedent(__doc__)
+    args = '<spool backend name>'
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--once',
+            action='store_true',
+            dest='once',
+            default=False,
+            help='Send the events spooled so far, and exit'
+        ),
+        make_option(
+            '--batch-size',
+            type='int',
+            dest='batch_size',
+            default=500,
+            help='Number of events to send at once'
+        ),
+        make_option(
+            '--interval',
+            type='float',
+            dest='interval',
+            default=1.0,
+            help='Seconds to wait for new events after sending those spooled'
+        ),
+        make_option(
+            '--retry-delay',
+            type='float',
+            dest='retry_delay',
+            default=1.0,
+            help='Seconds to wait before sending events again after a failure'
+        ),
+        make_option(
+            '--max-retry-delay',
+            type='float',
+            dest='max_retry_delay',
+            default=60.0,
+            help='Longest wait before sending events again after failures'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        """
+        By convention set by Django developers, this method actually executes command's actions.
+        So, there could be no better docstring than emphasize this once again.
+        """
+        if len(args) != 1:
+            raise CommandError(u"forward_tracking_spool requires the name of a spool backend")
+        if options['batch_size'] < 1:
+            raise CommandError(u"--batch-size must be at least 1")
+
+        config = getattr(settings, 'TRACKING_BACKENDS', {}).get(args[0])
+        if config is None or 'directory' not in config.get('OPTIONS', {}):
+            raise CommandError(u"{} is not a spool backend in TRACKING_BACKENDS".format(args[0]))
+        forwarder = SpoolForwarder(
+            config['OPTIONS']['directory'], config['OPTIONS'].get('backends', {}), options['batch_size']
+        )
+
+        if options['once']:
+            try:
+                forwarded = forwarder.forward()
+            except Exception as exc:  # pylint: disable=broad-except
+                log.exception(u"Error forwarding the tracking spool")
+                raise CommandError(u"Failed to forward the tracking spool: {}".format(unicode(exc) or repr(exc)))
+            self.stdout.write(u"Forwarded {} events\n".format(forwarded))
+            return
+
+        retry_delay = options['retry_delay']
+        while True:
+            try:
+                forwarder.forward()
+            except Exception:  # pylint: disable=broad-except
+                # broad exception so that the events are sent again once the backend is back
+                log.exception(u"Error forwarding the tracking spool, retrying in %.1fs", retry_delay)
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, options['max_retry_delay'])
+            else:
+                retry_delay = options['retry_delay']
+                time.sleep(options['interval'])
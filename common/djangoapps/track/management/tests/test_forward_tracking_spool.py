@@ -0,0 +1,64 @@
+"""Tests for the forward_tracking_spool management command."""
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.test.utils import override_settings
+from mock import patch
+
+from track.backends.spool import SpoolBackend
+from track.backends.tests.test_spool import BACKENDS_CONFIG, FailingBackend
+
+
+class ForwardTrackingSpoolTest(TestCase):
+    def setUp(self):
+        super(ForwardTrackingSpoolTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        FailingBackend.failing = False
+        tracking_backends = {
+            'spool': {
+                'ENGINE': 'track.backends.spool.SpoolBackend',
+                'OPTIONS': {'directory': self.directory, 'backends': BACKENDS_CONFIG},
+            }
+        }
+        override = override_settings(TRACKING_BACKENDS=tracking_backends)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        backend = SpoolBackend(directory=self.directory)
+        backend.send({'index': 0})
+        backend.close()
+
+    def test_once(self):
+        out = StringIO()
+        call_command('forward_tracking_spool', 'spool', once=True, stdout=out)
+        self.assertIn('Forwarded 1 events', out.getvalue())
+
+    def test_once_failure(self):
+        FailingBackend.failing = True
+        with self.assertRaises(CommandError):
+            call_command('forward_tracking_spool', 'spool', once=True)
+
+    def test_not_a_spool(self):
+        with self.assertRaises(CommandError):
+            call_command('forward_tracking_spool', 'missing', once=True)
+
+    @patch('track.management.commands.forward_tracking_spool.time.sleep')
+    def test_retry(self, mock_sleep):
+        FailingBackend.failing = True
+
+        def recover(seconds):
+            """Brings the backend back after two failures, then stops the command."""
+            if mock_sleep.call_count == 2:
+                FailingBackend.failing = False
+            elif mock_sleep.call_count == 3:
+                raise KeyboardInterrupt
+
+        mock_sleep.side_effect = recover
+        with self.assertRaises(KeyboardInterrupt):
+            call_command('forward_tracking_spool', 'spool', retry_delay=1.0)
+        self.assertEqual([call[0][0] for call in mock_sleep.call_args_list], [1.0, 2.0, 1.0])
@@ -0,0 +1,116 @@
+"""
+Benchmark of parsing the expressions learners submit to formula and numerical
+problems.
+
+A course's learners submit the same few expressions over and over, and each
+submission is parsed for checking and again for its preview, so this compares
+parsing them:
+
+ * by building the grammar for every expression, as calc used to;
+ * with the module's grammar, but without the parse cache;
+ * with the module's grammar and the parse cache, as calc.evaluator and
+   preview.latex_preview do.
+
+Run from common/lib/calc:
+
+    python benchmark_parse.py [<file of expressions, one per line>]
+
+Without a file, a representative sample of submissions is used.
+"""
+import random
+import sys
+import timeit
+
+import calc
+from calc.calc import ParseAugmenter, _build_grammar
+
+# Expressions typical of formula and numerical problem submissions.
+SAMPLE_EXPRESSIONS = [
+    '2*x+3', '2x+3', '3+2*x', 'x*2+3',
+    'm*g*h', 'g*m*h', '1/2*m*v^2', '0.5*m*v^2', 'm*v^2/2',
+    'sqrt(2)/2', '1/sqrt(2)', '0.7071',
+    '(x^2+1)/(x-1)', '(x^2 + 1) / (x - 1)',
+    'R1||R2', 'R1*R2/(R1+R2)', '5k||10k',
+    'e^(-t/tau)', 'exp(-t/tau)',
+    'sin(x)^2+cos(x)^2', '1', 'pi*r^2', '2*pi*r',
+    'a*x^2+b*x+c', '(-b+sqrt(b^2-4*a*c))/(2*a)',
+    'k*q1*q2/r^2', '9e9*q1*q2/r^2', '6.67e-11*M*m/r^2',
+    'log(x)/log(2)', 'ln(x)', 'x^(1/3)', 'abs(x-1)',
+]
+
+
+def make_submissions(expressions, count, seed=0):
+    """
+    Returns `count` submissions drawn from the given expressions, the first
+    ones much more often than the last, as the right answers (and the
+    commonest mistakes) are.
+    """
+    rand = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(expressions))]
+    total = sum(weights)
+    submissions = []
+    for __ in range(count):
+        point = rand.random() * total
+        for expression, weight in zip(expressions, weights):
+            point -= weight
+            if point <= 0:
+                break
+        submissions.append(expression)
+    return submissions
+
+
+def parse_building_grammar(submissions):
+    """
+    Parses each submission with a grammar built for it.
+    """
+    for math_expr in submissions:
+        _build_grammar().parseString(math_expr)
+
+
+def parse_uncached(submissions):
+    """
+    Parses each submission with the module's grammar.
+    """
+    for math_expr in submissions:
+        ParseAugmenter(math_expr).parse_algebra()
+
+
+def parse_cached(submissions):
+    """
+    Parses each submission through the parse cache.
+    """
+    for math_expr in submissions:
+        calc.parse_expression(math_expr)
+
+
+def main(argv):
+    """
+    Times parsing the submissions each way and prints the results.
+    """
+    if len(argv) > 1:
+        with open(argv[1]) as expressions_file:
+            expressions = [line.strip() for line in expressions_file if line.strip()]
+    else:
+        expressions = SAMPLE_EXPRESSIONS
+    submissions = make_submissions(expressions, 2000)
+    print "{} submissions of {} distinct expressions".format(len(submissions), len(set(submissions)))
+
+    for name, parse in [
+            ('building the grammar', parse_building_grammar),
+            ('module grammar, uncached', parse_uncached),
+            ('module grammar, cached', parse_cached),
+    ]:
+        calc.clear_parse_cache()
+        seconds = min(timeit.repeat(lambda: parse(submissions), repeat=3, number=1))
+        print "{:<28}{:8.1f} ms".format(name, seconds * 1000)
+
+    calc.clear_parse_cache()
+    parse_cached(submissions)
+    info = calc.parse_cache_info()
+    print "cache hit ratio: {:.1%} ({hits} hits, {misses} misses)".format(
+        float(info['hits']) / (info['hits'] + info['misses']), **info
+    )
+
+
+if __name__ == '__main__':
+    main(sys.argv)
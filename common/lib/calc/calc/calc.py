@@ -7,6 +7,9 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import operator
 import numbers
+import threading
+from collections import OrderedDict
+
 import numpy
 import scipy.constants
 import functions
@@ -61,6 +64,9 @@ DEFAULT_VARIABLES = {
     'q': scipy.constants.e  # Fund. Charge: 1.602176565e-19 (Coulombs)
 }
 
+# Maximum number of parsed expressions kept by parse_expression().
+PARSE_CACHE_SIZE = 1000
+
 # We eliminated the following extreme suffixes:
 #   P (1e15), E (1e18), Z (1e21), Y (1e24),
 #   f (1e-15), a (1e-18), z (1e-21), y (1e-24)
@@ -121,8 +127,8 @@ def eval_atom(parse_result):
 
     In the case of parenthesis, ignore them.
     """
-    # Find first number in the list
-    result = next(k for k in parse_result if isinstance(k, numbers.Number))
+    # Find first number (or array of numbers) in the list
+    result = next(k for k in parse_result if not isinstance(k, basestring))
     return result
 
 
@@ -136,7 +142,7 @@ def eval_power(parse_result):
     # `reduce` will go from left to right; reverse the list.
     parse_result = reversed(
         [k for k in parse_result
-         if isinstance(k, numbers.Number)]  # Ignore the '^' marks.
+         if not isinstance(k, basestring)]  # Ignore the '^' marks.
     )
     # Having reversed it, raise `b` to the power of `a`.
     power = reduce(lambda a, b: b ** a, parse_result)
@@ -162,6 +168,20 @@ def eval_parallel(parse_result):
     return 1. / sum(reciprocals)
 
 
+def eval_parallel_vectorized(parse_result):
+    """
+    Like eval_parallel, for arrays of numbers.
+
+    A zero among the inputs makes it divide by zero, which the vectorized
+    evaluation turns into an error.
+    """
+    if len(parse_result) == 1:
+        return parse_result[0]
+    reciprocals = [1. / e for e in parse_result
+                   if not isinstance(e, basestring)]
+    return 1. / sum(reciprocals)
+
+
 def eval_sum(parse_result):
     """
     Add the inputs, keeping in mind their sign.
@@ -173,12 +193,12 @@ def eval_sum(parse_result):
     total = 0.0
     current_op = operator.add
     for token in parse_result:
-        if token == '+':
+        if not isinstance(token, basestring):
+            total = current_op(total, token)
+        elif token == '+':
             current_op = operator.add
         elif token == '-':
             current_op = operator.sub
-        else:
-            total = current_op(total, token)
     return total
 
 
@@ -191,12 +211,12 @@ def eval_product(parse_result):
     prod = 1.0
     current_op = operator.mul
     for token in parse_result:
-        if token == '*':
+        if not isinstance(token, basestring):
+            prod = current_op(prod, token)
+        elif token == '*':
             current_op = operator.mul
         elif token == '/':
             current_op = operator.truediv
-        else:
-            prod = current_op(prod, token)
     return prod
 
 
@@ -216,6 +236,67 @@ def add_defaults(variables, functions, case_sensitive):
     return (all_variables, all_functions)
 
 
+_PARSE_CACHE = OrderedDict()
+_PARSE_CACHE_LOCK = threading.Lock()
+_PARSE_CACHE_STATS = {'hits': 0, 'misses': 0}
+
+
+def parse_expression(math_expr, case_sensitive=False):
+    """
+    Parse an expression into a `ParseAugmenter`, which can then be evaluated
+    (by `evaluator`) or rendered (by `preview.latex_preview`) any number of
+    times.
+
+    Parsing is the slowest part of evaluating an expression, and the same
+    expressions (instructors' answers especially) are evaluated over and over,
+    so the most recently used parses are kept in a cache keyed by the
+    expression and its case-sensitivity. The returned `ParseAugmenter` is
+    shared: don't modify it.
+    """
+    key = (math_expr, case_sensitive)
+    with _PARSE_CACHE_LOCK:
+        math_interpreter = _PARSE_CACHE.pop(key, None)
+        if math_interpreter is not None:
+            _PARSE_CACHE[key] = math_interpreter
+            _PARSE_CACHE_STATS['hits'] += 1
+            return math_interpreter
+        _PARSE_CACHE_STATS['misses'] += 1
+
+    # Parse outside of the lock; parse errors are raised and not cached.
+    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+    math_interpreter.parse_algebra()
+
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE[key] = math_interpreter
+        while len(_PARSE_CACHE) > PARSE_CACHE_SIZE:
+            _PARSE_CACHE.popitem(last=False)
+    return math_interpreter
+
+
+def parse_cache_info():
+    """
+    Return a dictionary of the numbers of `parse_expression` calls which did
+    ('hits') and didn't ('misses') find their expression in the cache, and the
+    current and maximum numbers of cached expressions ('size', 'max_size').
+    """
+    with _PARSE_CACHE_LOCK:
+        return {
+            'hits': _PARSE_CACHE_STATS['hits'],
+            'misses': _PARSE_CACHE_STATS['misses'],
+            'size': len(_PARSE_CACHE),
+            'max_size': PARSE_CACHE_SIZE,
+        }
+
+
+def clear_parse_cache():
+    """
+    Empty the cache of `parse_expression` and reset its statistics.
+    """
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE.clear()
+        _PARSE_CACHE_STATS['hits'] = _PARSE_CACHE_STATS['misses'] = 0
+
+
 def evaluator(variables, functions, math_expr, case_sensitive=False):
     """
     Evaluate an expression; that is, take a string of math and return a float.
@@ -229,9 +310,67 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
         return float('nan')
 
     # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    math_interpreter = parse_expression(math_expr, case_sensitive)
+
+    return _evaluate(math_interpreter, variables, functions, case_sensitive)
+
 
+def evaluate_samples(variables_list, functions, math_expr, case_sensitive=False, vectorize=False):
+    """
+    Evaluate an expression once for each dictionary of variables in
+    `variables_list`, and return the list of results.
+
+    This gives the same results as calling `evaluator` for each dictionary,
+    but parses the expression only once.
+
+    With `vectorize`, if all the dictionaries have the same variables, the
+    expression is evaluated just once, over NumPy arrays of the variables'
+    values. If that fails (e.g. a function doesn't accept arrays, or a
+    floating point error happens, which the evaluation of a single sample may
+    handle differently), each sample is evaluated in turn instead.
+    """
+    if not variables_list:
+        return []
+    # No need to go further.
+    if math_expr.strip() == "":
+        return [float('nan')] * len(variables_list)
+
+    math_interpreter = parse_expression(math_expr, case_sensitive)
+
+    if vectorize:
+        variable_names = set(variables_list[0])
+        if all(set(variables) == variable_names for variables in variables_list):
+            variable_arrays = {
+                name: numpy.array([variables[name] for variables in variables_list])
+                for name in variable_names
+            }
+            try:
+                with numpy.errstate(all='raise', under='ignore'):
+                    result = _evaluate(
+                        math_interpreter, variable_arrays, functions, case_sensitive, vectorized=True
+                    )
+            except UndefinedVariable:
+                raise
+            except Exception:  # pylint: disable=broad-except
+                pass
+            else:
+                if numpy.ndim(result) == 0:
+                    # The expression doesn't depend on the variables.
+                    return [result] * len(variables_list)
+                if numpy.shape(result) == (len(variables_list),):
+                    return list(result)
+
+    return [
+        _evaluate(math_interpreter, variables, functions, case_sensitive)
+        for variables in variables_list
+    ]
+
+
+def _evaluate(math_interpreter, variables, functions, case_sensitive, vectorized=False):
+    """
+    Evaluate the tree of a parsed expression with the given variables and
+    functions, which may be arrays of values if `vectorized`.
+    """
     # Get our variables together.
     all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
 
@@ -250,7 +389,7 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
         'function': lambda x: all_functions[casify(x[0])](x[1]),
         'atom': eval_atom,
         'power': eval_power,
-        'parallel': eval_parallel,
+        'parallel': eval_parallel_vectorized if vectorized else eval_parallel,
         'product': eval_product,
         'sum': eval_sum
     }
@@ -258,6 +397,71 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     return math_interpreter.reduce_tree(evaluate_actions)
 
 
+def _build_grammar():
+    """
+    Build the pyparsing grammar of algebraic expressions.
+
+    The `pyparsing.ParseResult` it produces has proper groupings to reflect
+    parenthesis and order of operations. It leaves all operators in the tree
+    and does not parse any strings of numbers into their float versions.
+
+    The grammar has no parse actions, and so is shared by all parses.
+    """
+    # 0.33 or 7 or .34 or 16.
+    number_part = Word(nums)
+    inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
+    # pyparsing allows spaces between tokens--`Combine` prevents that.
+    inner_number = Combine(inner_number)
+
+    # SI suffixes and percent.
+    number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
+
+    # 0.33k or 17
+    plus_minus = Literal('+') | Literal('-')
+    number = Group(
+        Optional(plus_minus) +
+        inner_number +
+        Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
+        Optional(number_suffix)
+    )
+    number = number("number")
+
+    # Predefine recursive variables.
+    expr = Forward()
+
+    # Handle variables passed in. They must start with letters/underscores
+    # and may contain numbers afterward.
+    inner_varname = Word(alphas + "_", alphanums + "_")
+    varname = Group(inner_varname)("variable")
+
+    # Same thing for functions.
+    function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
+
+    atom = number | function | varname | "(" + expr + ")"
+    atom = Group(atom)("atom")
+
+    # Do the following in the correct order to preserve order of operation.
+    pow_term = atom + ZeroOrMore("^" + atom)
+    pow_term = Group(pow_term)("power")
+
+    par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
+    par_term = Group(par_term)("parallel")
+
+    prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
+    prod_term = Group(prod_term)("product")
+
+    sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
+    sum_term = Group(sum_term)("sum")
+
+    # Finish the recursion.
+    expr << sum_term  # pylint: disable=pointless-statement
+    return expr + stringEnd
+
+
+# Building the grammar takes about as long as parsing with it, so do it once.
+GRAMMAR = _build_grammar()
+
+
 class ParseAugmenter(object):
     """
     Holds the data for a particular parse.
@@ -278,86 +482,35 @@ class ParseAugmenter(object):
         self.variables_used = set()
         self.functions_used = set()
 
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
-
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
-
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
-
     def parse_algebra(self):
         """
         Parse an algebraic expression into a tree.
 
-        Store a `pyparsing.ParseResult` in `self.tree` with proper groupings to
-        reflect parenthesis and order of operations. Leave all operators in the
-        tree and do not parse any strings of numbers into their float versions.
+        Store a `pyparsing.ParseResult` in `self.tree` (see `_build_grammar`),
+        and the names of the variables and functions it uses in
+        `self.variables_used` and `self.functions_used`.
 
         Adding the groups and result names makes the `repr()` of the result
         really gross. For debugging, use something like
           print OBJ.tree.asXML()
         """
-        # 0.33 or 7 or .34 or 16.
-        number_part = Word(nums)
-        inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
-        # pyparsing allows spaces between tokens--`Combine` prevents that.
-        inner_number = Combine(inner_number)
-
-        # SI suffixes and percent.
-        number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
-
-        # 0.33k or 17
-        plus_minus = Literal('+') | Literal('-')
-        number = Group(
-            Optional(plus_minus) +
-            inner_number +
-            Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
-            Optional(number_suffix)
-        )
-        number = number("number")
-
-        # Predefine recursive variables.
-        expr = Forward()
-
-        # Handle variables passed in. They must start with letters/underscores
-        # and may contain numbers afterward.
-        inner_varname = Word(alphas + "_", alphanums + "_")
-        varname = Group(inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
-
-        # Same thing for functions.
-        function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
-
-        atom = number | function | varname | "(" + expr + ")"
-        atom = Group(atom)("atom")
-
-        # Do the following in the correct order to preserve order of operation.
-        pow_term = atom + ZeroOrMore("^" + atom)
-        pow_term = Group(pow_term)("power")
-
-        par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
-        par_term = Group(par_term)("parallel")
-
-        prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
-        prod_term = Group(prod_term)("product")
-
-        sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
-        sum_term = Group(sum_term)("sum")
-
-        # Finish the recursion.
-        expr << sum_term  # pylint: disable=pointless-statement
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+        self.tree = GRAMMAR.parseString(self.math_expr)[0]
+
+        def find_names(node):
+            """
+            Store the names of the variables and functions used under `node`.
+            """
+            if not isinstance(node, ParseResults):
+                return
+            node_name = node.getName()
+            if node_name == 'variable':
+                self.variables_used.add(node[0])
+            elif node_name == 'function':
+                self.functions_used.add(node[0])
+            for child in node:
+                find_names(child)
+
+        find_names(self.tree)
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
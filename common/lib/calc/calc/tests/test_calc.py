@@ -5,6 +5,8 @@ Unit tests for calc.py
 import unittest
 import numpy
 import calc
+from calc import preview
+from mock import patch
 from pyparsing import ParseException
 
 # numpy's default behavior when it evaluates a function outside its domain
@@ -559,3 +561,99 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class EvaluateSamplesTest(unittest.TestCase):
+    """
+    Run tests for calc.parse_expression and calc.evaluate_samples
+    """
+    def setUp(self):
+        super(EvaluateSamplesTest, self).setUp()
+        self.variables_list = [{'x': float(x), 'y': float(x) / 3} for x in range(1, 11)]
+
+    def assert_samples(self, math_expr, functions=None, case_sensitive=False):
+        """
+        Assert that evaluate_samples gives the results of evaluator, with and
+        without vectorizing.
+        """
+        functions = functions or {}
+        expected = [
+            calc.evaluator(variables, functions, math_expr, case_sensitive)
+            for variables in self.variables_list
+        ]
+        for vectorize in (False, True):
+            results = calc.evaluate_samples(
+                self.variables_list, functions, math_expr, case_sensitive, vectorize=vectorize
+            )
+            self.assertEqual(len(results), len(expected))
+            for result, expected_result in zip(results, expected):
+                self.assertAlmostEqual(result, expected_result)
+
+    def test_parse_cache(self):
+        parsed = calc.parse_expression('x^2 + 3*y')
+        self.assertIs(calc.parse_expression('x^2 + 3*y'), parsed)
+        self.assertIsNot(calc.parse_expression('x^2 + 3*y', case_sensitive=True), parsed)
+
+    def test_evaluate_samples(self):
+        self.assert_samples('x^2 + 3*y')
+        self.assert_samples('-(x - y) / 2 * sin(x) || 5k')
+        self.assert_samples('e^(i*pi) + X', case_sensitive=False)
+        self.assert_samples('2^3^2')
+        self.assert_samples('sqrt(x) + f(y)', functions={'f': lambda arg: arg + 1})
+
+    def test_fallback(self):
+        # arccot doesn't accept arrays
+        self.assert_samples('fact(3) * x + arccot(y)')
+        # parallel resistors with zero give NaN, rather than dividing by zero
+        self.assertTrue(all(
+            numpy.isnan(result)
+            for result in calc.evaluate_samples(self.variables_list, {}, 'x || 0', vectorize=True)
+        ))
+
+    def test_errors(self):
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'z'):
+            calc.evaluate_samples(self.variables_list, {}, 'x + z', vectorize=True)
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples(self.variables_list, {}, 'fact(y)', vectorize=True)
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluate_samples(self.variables_list, {}, 'x/0', vectorize=True)
+        with self.assertRaises(ParseException):
+            calc.evaluate_samples(self.variables_list, {}, 'x +', vectorize=True)
+
+    def test_empty(self):
+        self.assertEqual(calc.evaluate_samples([], {}, 'x +'), [])
+        self.assertTrue(all(numpy.isnan(result) for result in calc.evaluate_samples(self.variables_list, {}, ' ')))
+
+
+class ParseCacheTest(unittest.TestCase):
+    """
+    Run tests for the parse cache shared by calc.evaluator and preview.latex_preview
+    """
+    def setUp(self):
+        super(ParseCacheTest, self).setUp()
+        calc.clear_parse_cache()
+        self.addCleanup(calc.clear_parse_cache)
+
+    def test_names_used(self):
+        parsed = calc.parse_expression('f(x^2, 1) + g(y) * (z || R1) - sin(t)')
+        self.assertEqual(parsed.variables_used, {'x', 'y', 'z', 'R1', 't'})
+        self.assertEqual(parsed.functions_used, {'f', 'g', 'sin'})
+
+    def test_cache_info(self):
+        calc.evaluator({'x': 1}, {}, 'x + 1')
+        calc.evaluator({'x': 2}, {}, 'x + 1')
+        preview.latex_preview('x + 1')
+        with self.assertRaises(ParseException):
+            calc.evaluator({}, {}, '1 +')
+        self.assertEqual(
+            calc.parse_cache_info(),
+            {'hits': 2, 'misses': 2, 'size': 1, 'max_size': calc.PARSE_CACHE_SIZE}
+        )
+
+    def test_cache_size(self):
+        with patch('calc.calc.PARSE_CACHE_SIZE', 2):
+            for math_expr in ('1', '2', '3', '1'):
+                calc.parse_expression(math_expr)
+        self.assertEqual(calc.parse_cache_info()['size'], 2)
+        # '1' was evicted before it was parsed again
+        self.assertEqual(calc.parse_cache_info()['misses'], 4)
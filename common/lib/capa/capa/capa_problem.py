@@ -13,11 +13,14 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
+import threading
 
 from lxml import etree
 from pytz import UTC
@@ -29,7 +32,7 @@ import capa.customrender as customrender
 import capa.responsetypes as responsetypes
 from capa.util import contextualize_text, convert_files_to_filenames
 import capa.xqueue_interface as xqueue_interface
-from capa.safe_exec import safe_exec
+from capa.safe_exec import safe_exec, safe_exec_batch
 
 
 # extra things displayed after "show answers" is pressed
@@ -58,6 +61,12 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# The number of parsed problem texts each process keeps (see LoncapaProblem._parse_problem_text).
+PROBLEM_TREE_CACHE_SIZE = 500
+
+_PROBLEM_TREE_CACHE = OrderedDict()
+_PROBLEM_TREE_CACHE_LOCK = threading.Lock()
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -73,6 +82,10 @@ class LoncapaSystem(object):
     Attributes:
         i18n: an object implementing the `gettext.Translations` interface so
             that we can use `.ugettext` to localize strings.
+        context_cache: a cache like `cache`, for the results of problems'
+            scripts which depend only on the problem and seed, so can be
+            precomputed (see `LoncapaProblem.precompute_script_contexts`).
+            None to use `cache`.
 
     See :class:`ModuleSystem` for documentation of other attributes.
 
@@ -92,7 +105,8 @@ class LoncapaSystem(object):
         seed,      # Why do we do this if we have self.seed?
         STATIC_URL,                                     # pylint: disable=invalid-name
         xqueue,
-        matlab_api_key=None
+        matlab_api_key=None,
+        context_cache=None,
     ):
         self.ajax_url = ajax_url
         self.anonymous_student_id = anonymous_student_id
@@ -108,6 +122,7 @@ class LoncapaSystem(object):
         self.STATIC_URL = STATIC_URL                    # pylint: disable=invalid-name
         self.xqueue = xqueue
         self.matlab_api_key = matlab_api_key
+        self.context_cache = context_cache
 
 
 class LoncapaProblem(object):
@@ -156,15 +171,7 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        self.make_xml_compatible(self.tree)
+        self.problem_text, self.tree = self._parse_problem_text(problem_text)
 
         # handle any <include file="foo"> tags
         self._process_includes()
@@ -195,6 +202,43 @@ class LoncapaProblem(object):
 
         self.extracted_tree = self._extract_html(self.tree)
 
+    def _parse_problem_text(self, problem_text):
+        """
+        Returns the problem text with startouttext and endouttext converted to
+        proper <text></text>, and its element tree, made compatible (see
+        `make_xml_compatible`).
+
+        All the learners of a course share its problems' texts, and this part
+        of creating a problem doesn't depend on the learner or seed, so each
+        process keeps the most recently used results, keyed by a hash of the
+        text. Every problem gets its own copy of the cached tree, which is
+        much cheaper than parsing the text again.
+        """
+        is_unicode = isinstance(problem_text, unicode)
+        key = (is_unicode, hashlib.sha1(problem_text.encode('utf-8') if is_unicode else problem_text).digest())
+        with _PROBLEM_TREE_CACHE_LOCK:
+            cached = _PROBLEM_TREE_CACHE.pop(key, None)
+            if cached is not None:
+                _PROBLEM_TREE_CACHE[key] = cached
+
+        if cached is None:
+            # Convert startouttext and endouttext to proper <text></text>
+            problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+            problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+
+            # parse problem XML file into an element tree
+            tree = etree.XML(problem_text)
+            self.make_xml_compatible(tree)
+
+            cached = (problem_text, tree)
+            with _PROBLEM_TREE_CACHE_LOCK:
+                _PROBLEM_TREE_CACHE[key] = cached
+                while len(_PROBLEM_TREE_CACHE) > PROBLEM_TREE_CACHE_SIZE:
+                    _PROBLEM_TREE_CACHE.popitem(last=False)
+
+        problem_text, tree = cached
+        return problem_text, deepcopy(tree)
+
     def make_xml_compatible(self, tree):
         """
         Adjust tree xml in-place for compatibility before creating
@@ -671,6 +715,46 @@ class LoncapaProblem(object):
         context = {}
         context['seed'] = self.seed
         context['anonymous_student_id'] = self.capa_system.anonymous_student_id
+        all_code, python_path, extra_files = self._extract_script(tree)
+
+        if all_code:
+            # Unless the code uses the learner's anonymous id, its results
+            # depend only on the problem and seed, so they're shared by all
+            # the learners with the seed (see precompute_script_contexts).
+            if 'anonymous_student_id' in all_code:
+                script_globals = dict(context)
+                cache = self.capa_system.cache
+            else:
+                script_globals = {'seed': self.seed}
+                cache = self.capa_system.context_cache or self.capa_system.cache
+            try:
+                safe_exec(
+                    all_code,
+                    script_globals,
+                    random_seed=self.seed,
+                    python_path=python_path,
+                    extra_files=extra_files,
+                    cache=cache,
+                    slug=self.problem_id,
+                    unsafely=self.capa_system.can_execute_unsafe_code(),
+                )
+            except Exception as err:
+                log.exception("Error while execing script code: " + all_code)
+                msg = "Error while executing script code: %s" % str(err).replace('<', '&lt;')
+                raise responsetypes.LoncapaProblemError(msg)
+            context.update(script_globals)
+
+        # Store code source in context, along with the Python path needed to run it correctly.
+        context['script_code'] = all_code
+        context['python_path'] = python_path
+        context['extra_files'] = extra_files or None
+        return context
+
+    def _extract_script(self, tree):
+        """
+        Returns the Python code of the problem's <script>s, the Python path
+        needed to run it, and the extra files (python_lib.zip) to run it with.
+        """
         all_code = ''
 
         python_path = []
@@ -701,27 +785,45 @@ class LoncapaProblem(object):
                 extra_files.append(("python_lib.zip", zip_lib))
                 python_path.append("python_lib.zip")
 
-            try:
-                safe_exec(
-                    all_code,
-                    context,
-                    random_seed=self.seed,
-                    python_path=python_path,
-                    extra_files=extra_files,
-                    cache=self.capa_system.cache,
-                    slug=self.problem_id,
-                    unsafely=self.capa_system.can_execute_unsafe_code(),
-                )
-            except Exception as err:
-                log.exception("Error while execing script code: " + all_code)
-                msg = "Error while executing script code: %s" % str(err).replace('<', '&lt;')
-                raise responsetypes.LoncapaProblemError(msg)
+        return all_code, python_path, extra_files
 
-        # Store code source in context, along with the Python path needed to run it correctly.
-        context['script_code'] = all_code
-        context['python_path'] = python_path
-        context['extra_files'] = extra_files or None
-        return context
+    @classmethod
+    def precompute_script_contexts(cls, problem_text, id, capa_system, seeds):  # pylint: disable=redefined-builtin
+        """
+        Executes a problem's script code with each of the given seeds, in
+        batches, caching the results in `capa_system.context_cache` so that
+        learners with those seeds don't have to wait for it.
+
+        Only the parts of a problem needed for its scripts are set up, so
+        `capa_system` needs only `cache`, `context_cache`,
+        `can_execute_unsafe_code`, `get_python_lib_zip`, `DEBUG` and
+        `filestore`.
+
+        Returns the number of seeds with which the code raised an exception,
+        or None if the code uses the learner's anonymous id, so its results
+        can't be precomputed.
+        """
+        problem = cls.__new__(cls)
+        problem.problem_id = id
+        problem.capa_system = capa_system
+        problem.problem_text, problem.tree = problem._parse_problem_text(problem_text)
+        problem._process_includes()
+
+        all_code, python_path, extra_files = problem._extract_script(problem.tree)
+        if not all_code:
+            return 0
+        if 'anonymous_student_id' in all_code:
+            return None
+
+        errors = safe_exec_batch(
+            [(all_code, {'seed': seed}, seed) for seed in seeds],
+            python_path=python_path,
+            extra_files=extra_files,
+            cache=capa_system.context_cache or capa_system.cache,
+            slug=id,
+            unsafely=capa_system.can_execute_unsafe_code(),
+        )
+        return len([error for error in errors if error])
 
     def _extract_html(self, problemtree):  # private
         """
@@ -7,6 +7,8 @@ from . import lazymod
 from dogapi import dog_stats_api
 
 import hashlib
+from multiprocessing.pool import ThreadPool
+import threading
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -46,6 +48,84 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The most jobs `safe_exec_batch` runs in one sandbox.  Codejail's limits apply
+# to the sandbox as a whole, so a batch which exceeds them is retried one job
+# at a time.
+BATCH_SIZE = 20
+
+# The code run in a sandbox to execute a batch of jobs.  Each job gets its own
+# globals and seeded `random`, as it would from `safe_exec`, and the results
+# are a list of [exception message, cleaned globals] pairs, one per job.
+#
+# The jobs share the interpreter, so `sys.modules` is restored after each job:
+# the modules imported from `python_path` (a course's python_lib.zip, say) are
+# imported again by the next job, with its own seeded `random`, and the modules
+# a job replaced are put back.
+BATCH_DRIVER = """\
+import json
+import os
+import sys
+import traceback
+
+_lib_paths = [os.path.abspath(_path) for _path in python_path]
+_ok_types = (type(None), int, long, float, str, unicode, list, tuple, dict)
+
+def _jsonable(value):
+    if not isinstance(value, _ok_types):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:
+        return False
+    return True
+
+# The prolog is executed on its own, with the seed, and stood in for by its
+# first line (the future import) and blank lines when compiling the code.
+_prolog_lines = code_prolog.split("\\n")
+_code_start = _prolog_lines[0] + "\\n" * len(_prolog_lines[1:]) + lazy_imports
+
+def _from_python_path(module):
+    filename = getattr(module, '__file__', None)
+    if filename is None:
+        return False
+    filename = os.path.abspath(filename)
+    return any(filename == _path or filename.startswith(_path + os.sep) for _path in _lib_paths)
+
+def _restore_modules():
+    for _name, _module in sys.modules.items():
+        if _name not in _modules and (_module is None or _from_python_path(_module)):
+            del sys.modules[_name]
+    sys.modules.update(_modules)
+
+_modules = dict(
+    (_name, _module) for _name, _module in sys.modules.items()
+    if _module is not None and not _from_python_path(_module)
+)
+_restore_modules()
+
+_compiled = {}
+results = []
+for _code, _globals, _seed in jobs:
+    try:
+        if _code not in _compiled:
+            _compiled[_code] = compile(_code_start + _code, 'jailed_code', 'exec')
+        exec code_prolog % _seed in _globals
+        exec _compiled[_code] in _globals
+    except BaseException:
+        results.append([traceback.format_exc(), None])
+    else:
+        results.append([None, dict(
+            (key, value) for key, value in _globals.iteritems() if key != '__builtins__' and _jsonable(value)
+        )])
+    _restore_modules()
+"""
+
+# The pool of threads running batches of jobs, and the number of threads in it
+# (see `configure_pool`).
+_POOL = None
+_POOL_SIZE = 1
+_POOL_LOCK = threading.Lock()
+
 
 def update_hash(hasher, obj):
     """
@@ -70,6 +150,114 @@ def update_hash(hasher, obj):
         hasher.update(repr(obj))
 
 
+def configure_pool(size):
+    """
+    Set the number of sandboxes `safe_exec_batch` runs at once.
+
+    Each sandbox runs a batch of jobs, so a few of them keep the machine's
+    CPUs busy while amortizing the start-up of the sandboxed interpreter.
+    """
+    global _POOL, _POOL_SIZE  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.close()
+            _POOL = None
+        _POOL_SIZE = size
+
+
+def _get_pool():
+    """
+    Return the pool of threads running batches, started on first use.
+    """
+    global _POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPool(_POOL_SIZE)
+        return _POOL
+
+
+def _cache_key(code, globals_dict, random_seed, extra_files):
+    """
+    Return the cache key of the execution of `code` with `globals_dict`,
+    `random_seed` and `extra_files`.
+    """
+    md5er = hashlib.md5()
+    md5er.update(repr(code))
+    update_hash(md5er, json_safe(globals_dict))
+    # The extra files (a course's python_lib.zip) can change the results too.
+    for filename, contents in extra_files or ():
+        md5er.update(filename)
+        md5er.update(contents)
+    return "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+
+
+def _exec(code, globals_dict, random_seed, python_path, extra_files, slug, unsafely):
+    """
+    Execute `code` in a sandbox (or not, if `unsafely`), without caching.
+
+    Returns the SafeExecException raised, or None.
+    """
+    # Create the complete code we'll run.
+    code_prolog = CODE_PROLOG % random_seed
+
+    # Decide which code executor to use.
+    if unsafely:
+        exec_fn = codejail_not_safe_exec
+    else:
+        exec_fn = codejail_safe_exec
+
+    # Run the code!  Results are side effects in globals_dict.
+    try:
+        exec_fn(
+            code_prolog + LAZY_IMPORTS + code, globals_dict,
+            python_path=python_path, extra_files=extra_files, slug=slug,
+        )
+    except SafeExecException as e:
+        return e
+    return None
+
+
+def _exec_batch(jobs, python_path, extra_files, slug, unsafely):
+    """
+    Execute a batch of (code, globals_dict, random_seed) jobs in one sandbox.
+
+    Returns a list of (exception message or None, cleaned globals or None)
+    pairs, one per job.  The globals dicts aren't changed.
+    """
+    if len(jobs) > 1:
+        exec_fn = codejail_not_safe_exec if unsafely else codejail_safe_exec
+        batch_globals = {
+            'code_prolog': CODE_PROLOG,
+            'lazy_imports': LAZY_IMPORTS,
+            'python_path': python_path or [],
+            'jobs': [[code, json_safe(globals_dict), random_seed] for code, globals_dict, random_seed in jobs],
+        }
+        try:
+            exec_fn(
+                BATCH_DRIVER, batch_globals,
+                python_path=python_path, extra_files=extra_files, slug=slug,
+            )
+        except SafeExecException:
+            # The batch as a whole failed, most likely by running out of
+            # time: fall back to running the jobs one at a time.
+            pass
+        else:
+            return [
+                (u"Couldn't execute jailed code: %s" % emsg if emsg else None, cleaned_results)
+                for emsg, cleaned_results in batch_globals['results']
+            ]
+
+    results = []
+    for code, globals_dict, random_seed in jobs:
+        job_globals = dict(globals_dict)
+        error = _exec(code, job_globals, random_seed, python_path, extra_files, slug, unsafely)
+        if error:
+            results.append((error.message, None))
+        else:
+            results.append((None, json_safe(job_globals)))
+    return results
+
+
 @dog_stats_api.timed('capa.safe_exec.time')
 def safe_exec(
     code,
@@ -99,7 +287,7 @@ def safe_exec(
 
     `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
     to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    the random seed, and the extra files.
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -109,11 +297,7 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+        key = _cache_key(code, globals_dict, random_seed, extra_files)
         cached = cache.get(key)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
@@ -124,25 +308,8 @@ def safe_exec(
                 raise SafeExecException(emsg)
             return
 
-    # Create the complete code we'll run.
-    code_prolog = CODE_PROLOG % random_seed
-
-    # Decide which code executor to use.
-    if unsafely:
-        exec_fn = codejail_not_safe_exec
-    else:
-        exec_fn = codejail_safe_exec
-
-    # Run the code!  Results are side effects in globals_dict.
-    try:
-        exec_fn(
-            code_prolog + LAZY_IMPORTS + code, globals_dict,
-            python_path=python_path, extra_files=extra_files, slug=slug,
-        )
-    except SafeExecException as e:
-        emsg = e.message
-    else:
-        emsg = None
+    error = _exec(code, globals_dict, random_seed, python_path, extra_files, slug, unsafely)
+    emsg = error.message if error else None
 
     # Put the result back in the cache.  This is complicated by the fact that
     # the globals dict might not be entirely serializable.
@@ -152,4 +319,71 @@ def safe_exec(
 
     # If an exception happened, raise it now.
     if emsg:
-        raise e
+        raise error
+
+
+@dog_stats_api.timed('capa.safe_exec.batch_time')
+def safe_exec_batch(
+    jobs,
+    python_path=None,
+    extra_files=None,
+    cache=None,
+    slug=None,
+    unsafely=False,
+):
+    """
+    Execute many pieces of python code safely, in as few sandboxes as possible.
+
+    `jobs` is a list of (code, globals_dict, random_seed) triples, typically
+    one problem's code with the globals and seed of each of many learners.
+    Each job is executed as `safe_exec(code, globals_dict, random_seed=random_seed)`
+    would, updating its `globals_dict`, except that its exception isn't raised.
+    The jobs are cached individually, sharing `safe_exec`'s cache keys, and
+    the ones which aren't cached are run in batches of up to `BATCH_SIZE`, by
+    the pool of threads configured with `configure_pool`.
+
+    The other arguments are those of `safe_exec`, and apply to every job.
+
+    Returns a list with, for each job, the SafeExecException it raised, or None.
+
+    """
+    errors = [None] * len(jobs)
+    keys = {}
+    pending = []
+    for index, (code, globals_dict, random_seed) in enumerate(jobs):
+        if cache:
+            keys[index] = _cache_key(code, globals_dict, random_seed, extra_files)
+            cached = cache.get(keys[index])
+            if cached is not None:
+                emsg, cleaned_results = cached
+                globals_dict.update(cleaned_results)
+                if emsg:
+                    errors[index] = SafeExecException(emsg)
+                continue
+        pending.append(index)
+
+    batches = [pending[start:start + BATCH_SIZE] for start in xrange(0, len(pending), BATCH_SIZE)]
+
+    def run_batch(batch):
+        """
+        Run the jobs with the given indexes in one sandbox.
+        """
+        return _exec_batch([jobs[index] for index in batch], python_path, extra_files, slug, unsafely)
+
+    if unsafely or len(batches) < 2:
+        # Unsafe execution changes the directory and path of this process,
+        # so those batches mustn't run concurrently.
+        batch_results = [run_batch(batch) for batch in batches]
+    else:
+        batch_results = _get_pool().map(run_batch, batches)
+
+    for batch, results in zip(batches, batch_results):
+        for index, (emsg, cleaned_results) in zip(batch, results):
+            globals_dict = jobs[index][1]
+            if cleaned_results is not None:
+                globals_dict.update(cleaned_results)
+            if cache:
+                cache.set(keys[index], (emsg, json_safe(globals_dict)))
+            if emsg:
+                errors[index] = SafeExecException(emsg)
+    return errors
@@ -4,12 +4,16 @@ import hashlib
 import os
 import os.path
 import random
+import sys
 import textwrap
 import unittest
+import zipfile
+from StringIO import StringIO
 
+from mock import patch
 from nose.plugins.skip import SkipTest
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import configure_pool, safe_exec, safe_exec_batch, update_hash
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -177,6 +181,96 @@ class TestSafeExecCaching(unittest.TestCase):
                 self.fail("Tried executing code with non-ASCII unicode: {0}".format(code))
 
 
+class TestSafeExecBatch(unittest.TestCase):
+    """Test running jobs in batches with safe_exec_batch."""
+
+    code = "rnums = [random.randint(0, 999) for _ in xrange(n)]; half = n/2"
+
+    def setUp(self):
+        super(TestSafeExecBatch, self).setUp()
+        self.safe_exec_module = sys.modules['capa.safe_exec.safe_exec']
+
+    def assert_same_as_safe_exec(self, jobs):
+        """
+        Assert that the jobs' globals are those safe_exec would have left them with.
+        """
+        for code, globals_dict, random_seed in jobs:
+            expected = {'n': globals_dict['n']}
+            safe_exec(code, expected, random_seed=random_seed)
+            self.assertEqual(globals_dict, expected)
+
+    def make_jobs(self, count):
+        """
+        Return `count` jobs of the same code, each with its own seed and globals.
+        """
+        return [(self.code, {'n': 10 + seed}, seed) for seed in xrange(count)]
+
+    def test_batch(self):
+        jobs = self.make_jobs(5)
+        self.assertEqual(safe_exec_batch(jobs), [None] * 5)
+        self.assertEqual(jobs[2][1]['half'], 6)
+        self.assert_same_as_safe_exec(jobs)
+
+    def test_exceptions(self):
+        jobs = [("a = 1/0", {}, 1), ("import random\na = random.randint(0, 999)", {}, 2)]
+        errors = safe_exec_batch(jobs)
+        self.assertIsInstance(errors[0], SafeExecException)
+        self.assertIn("ZeroDivisionError", errors[0].message)
+        self.assertEqual(jobs[0][1], {})
+        self.assertIsNone(errors[1])
+        self.assertEqual(jobs[1][1], {'a': random.Random(2).randint(0, 999)})
+
+    def test_cache_shared_with_safe_exec(self):
+        cache = {}
+        jobs = [("a = 17", {}, 1), ("a = 1/0", {}, 1)]
+        safe_exec_batch(jobs, cache=DictCache(cache))
+        self.assertEqual(sorted(cache.values())[0], (None, {'a': 17}))
+
+        # safe_exec finds the results in the cache
+        cache[cache.keys()[0]] = (None, {'a': 42})
+        cache[cache.keys()[1]] = (None, {'a': 42})
+        g = {}
+        safe_exec("a = 17", g, random_seed=1, cache=DictCache(cache))
+        self.assertEqual(g['a'], 42)
+
+        # and so does safe_exec_batch
+        jobs = [("a = 1/0", {}, 1)]
+        self.assertEqual(safe_exec_batch(jobs, cache=DictCache(cache)), [None])
+        self.assertEqual(jobs[0][1], {'a': 42})
+
+    def test_failed_batch(self):
+        # When a whole batch fails, its jobs are run one at a time.
+        jobs = self.make_jobs(3)
+        with patch.object(self.safe_exec_module, 'BATCH_DRIVER', "raise Exception('Too slow')"):
+            self.assertEqual(safe_exec_batch(jobs), [None] * 3)
+        self.assert_same_as_safe_exec(jobs)
+
+    def test_python_lib_using_random(self):
+        # A module of the course's python_lib.zip seeding itself at import
+        # gets each job's seeded random, as it would with safe_exec.
+        zip_file = StringIO()
+        with zipfile.ZipFile(zip_file, 'w') as zip_lib:
+            zip_lib.writestr('seeded.py', "import random\nNUMBER = random.randint(0, 10 ** 9)\n")
+        extra_files = [('python_lib.zip', zip_file.getvalue())]
+        python_path = ['python_lib.zip']
+
+        jobs = [("import seeded\nnumber = seeded.NUMBER", {}, seed) for seed in xrange(3)]
+        self.assertEqual(safe_exec_batch(jobs, python_path=python_path, extra_files=extra_files), [None] * 3)
+        for __, globals_dict, random_seed in jobs:
+            self.assertEqual(globals_dict['number'], random.Random(random_seed).randint(0, 10 ** 9))
+
+    def test_pool(self):
+        configure_pool(3)
+        self.addCleanup(configure_pool, 1)
+        jobs = self.make_jobs(10)
+        exec_batch = self.safe_exec_module._exec_batch  # pylint: disable=protected-access
+        with patch.object(self.safe_exec_module, 'BATCH_SIZE', 3):
+            with patch.object(self.safe_exec_module, '_exec_batch', wraps=exec_batch) as mock_batch:
+                self.assertEqual(safe_exec_batch(jobs), [None] * 10)
+        self.assertEqual(mock_batch.call_count, 4)
+        self.assert_same_as_safe_exec(jobs)
+
+
 class TestUpdateHash(unittest.TestCase):
     """Test the safe_exec.update_hash function to be sure it canonicalizes properly."""
 
@@ -0,0 +1,132 @@
+"""
+Tests for capa.capa_problem
+"""
+import random
+import sys
+import textwrap
+import unittest
+
+from lxml import etree
+from mock import patch
+
+from capa.capa_problem import LoncapaProblem
+from capa.safe_exec import safe_exec
+from capa.tests import new_loncapa_problem, test_capa_system
+
+
+@patch.dict('capa.capa_problem._PROBLEM_TREE_CACHE', clear=True)
+class ProblemTreeCacheTest(unittest.TestCase):
+    """
+    Tests for the cache of parsed problem texts shared by LoncapaProblems.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+            <startouttext/>What is 1 + 1?<endouttext/>
+            <stringresponse answer="2">
+                <additional_answer>two</additional_answer>
+                <textline size="20"/>
+            </stringresponse>
+        </problem>
+    """)
+
+    def _problems_parsed(self, mock_xml):
+        """
+        Returns the number of problem texts parsed with the given mock of etree.XML.
+        """
+        return len([call for call in mock_xml.call_args_list if '<problem>' in call[0][0]])
+
+    def test_parsed_once(self):
+        with patch('capa.capa_problem.etree.XML', wraps=etree.XML) as mock_xml:
+            problem = new_loncapa_problem(self.xml, seed=1)
+            other_problem = new_loncapa_problem(self.xml, seed=2)
+        self.assertEqual(self._problems_parsed(mock_xml), 1)
+
+        for each_problem in (problem, other_problem):
+            self.assertIn('<text>What is 1 + 1?</text>', each_problem.problem_text)
+            self.assertEqual(each_problem.tree.find('.//additional_answer').get('answer'), 'two')
+        self.assertEqual(problem.get_html(), other_problem.get_html())
+
+    def test_trees_not_shared(self):
+        problem = new_loncapa_problem(self.xml)
+        problem.tree.find('.//textline').set('size', '40')
+        self.assertEqual(new_loncapa_problem(self.xml).tree.find('.//textline').get('size'), '20')
+
+    def test_cache_size(self):
+        with patch('capa.capa_problem.PROBLEM_TREE_CACHE_SIZE', 1):
+            with patch('capa.capa_problem.etree.XML', wraps=etree.XML) as mock_xml:
+                new_loncapa_problem(self.xml)
+                new_loncapa_problem('<problem><p>Another problem</p></problem>')
+                new_loncapa_problem(self.xml)
+        self.assertEqual(self._problems_parsed(mock_xml), 3)
+
+
+class DictCache(object):
+    """
+    A cache over a dict, for testing.
+    """
+    def __init__(self):
+        self.cache = {}
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache[key] = value
+
+
+class ScriptContextTest(unittest.TestCase):
+    """
+    Tests for caching and precomputing the results of problems' scripts.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+        <script type="loncapa/python">
+        number = random.randint(0, 1000)
+        </script>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(ScriptContextTest, self).setUp()
+        self.capa_system = test_capa_system()
+        self.capa_system.cache = DictCache()
+        self.capa_system.context_cache = DictCache()
+
+    def test_context_shared_by_learners(self):
+        problem = new_loncapa_problem(self.xml, capa_system=self.capa_system, seed=3)
+        self.assertEqual(problem.context['number'], random.Random(3).randint(0, 1000))
+        self.assertEqual(problem.context['anonymous_student_id'], 'student')
+        self.assertEqual(len(self.capa_system.context_cache.cache), 1)
+        self.assertEqual(self.capa_system.cache.cache, {})
+
+        # another learner with the same seed uses the same results
+        self.capa_system.anonymous_student_id = 'another student'
+        with patch('capa.capa_problem.safe_exec', wraps=safe_exec) as mock_safe_exec:
+            problem = new_loncapa_problem(self.xml, capa_system=self.capa_system, seed=3)
+        self.assertEqual(problem.context['anonymous_student_id'], 'another student')
+        self.assertEqual(len(self.capa_system.context_cache.cache), 1)
+        self.assertEqual(mock_safe_exec.call_args[1]['cache'], self.capa_system.context_cache)
+
+    def test_context_using_anonymous_id(self):
+        xml = self.xml.replace('random.randint(0, 1000)', 'len(anonymous_student_id)')
+        problem = new_loncapa_problem(xml, capa_system=self.capa_system)
+        self.assertEqual(problem.context['number'], len('student'))
+        self.assertEqual(self.capa_system.context_cache.cache, {})
+        self.assertEqual(len(self.capa_system.cache.cache), 1)
+
+        self.assertIsNone(LoncapaProblem.precompute_script_contexts(xml, '1', self.capa_system, [1, 2]))
+
+    def test_precompute_script_contexts(self):
+        self.assertEqual(LoncapaProblem.precompute_script_contexts(self.xml, '1', self.capa_system, range(5)), 0)
+        self.assertEqual(len(self.capa_system.context_cache.cache), 5)
+
+        # learners with those seeds don't execute the script
+        with patch.object(sys.modules['capa.safe_exec.safe_exec'], '_exec') as mock_exec:
+            problem = new_loncapa_problem(self.xml, capa_system=self.capa_system, seed=4)
+        self.assertFalse(mock_exec.called)
+        self.assertEqual(problem.context['number'], random.Random(4).randint(0, 1000))
+
+    def test_precompute_failures(self):
+        xml = self.xml.replace('random.randint(0, 1000)', '1 / (seed - 2)')
+        self.assertEqual(LoncapaProblem.precompute_script_contexts(xml, '1', self.capa_system, range(5)), 1)
+        self.assertEqual(LoncapaProblem.precompute_script_contexts('<problem/>', '1', self.capa_system, range(5)), 0)
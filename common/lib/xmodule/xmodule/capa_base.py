@@ -311,7 +311,8 @@ class CapaMixin(CapaFields):
             seed=self.runtime.seed,      # Why do we do this if we have self.seed?
             STATIC_URL=self.runtime.STATIC_URL,
             xqueue=self.runtime.xqueue,
-            matlab_api_key=self.matlab_api_key
+            matlab_api_key=self.matlab_api_key,
+            context_cache=self.runtime.service(self, 'script_context_cache'),
         )
 
         return LoncapaProblem(
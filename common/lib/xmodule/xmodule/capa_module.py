@@ -6,6 +6,7 @@ import re
 from lxml import etree
 
 from pkg_resources import resource_string
+from xblock.core import XBlock
 
 import dogstats_wrapper as dog_stats_api
 from .capa_base import CapaMixin, CapaFields, ComplexEncoder
@@ -19,6 +20,7 @@ from xmodule.exceptions import NotFoundError, ProcessingError
 log = logging.getLogger("edx.courseware")
 
 
+@XBlock.wants('script_context_cache')
 class CapaModule(CapaMixin, XModule):
     """
     An XModule implementing LonCapa format problems, implemented by way of
@@ -3,7 +3,10 @@ from importlib import import_module
 
 from django.conf import settings
 
+from xmodule.contentstore.file_cache import ContentFileCache
+
 _CONTENTSTORE = {}
+_FILE_CACHES = {}
 
 
 def load_function(path):
@@ -28,3 +31,20 @@ def contentstore(name='default'):
         _CONTENTSTORE[name] = class_(**options)
 
     return _CONTENTSTORE[name]
+
+
+def file_cache():
+    """
+    Returns the ContentFileCache in settings.STATIC_CONTENT_FILE_CACHE_DIR, or
+    None if there is none.
+
+    The same instance is returned for the process' lifetime, as it keeps track
+    of the cache's size.
+    """
+    directory = getattr(settings, 'STATIC_CONTENT_FILE_CACHE_DIR', None)
+    if not directory:
+        return None
+    max_size = settings.STATIC_CONTENT_FILE_CACHE_MAX_SIZE
+    if (directory, max_size) not in _FILE_CACHES:
+        _FILE_CACHES[(directory, max_size)] = ContentFileCache(directory, max_size)
+    return _FILE_CACHES[(directory, max_size)]
@@ -0,0 +1,292 @@
+"""
+A cache of asset data in a directory of the local (or a shared) filesystem.
+
+The files are named by the digest of their data, so every version of an asset
+gets its own file, and the processes sharing the directory never need to
+invalidate anything. Each hit updates the modification time of its file, so
+that when the total size of the files exceeds the cache's maximum size, the
+least recently used ones are removed.
+
+Each process keeps a running total of the cache's size, counting the data it
+adds, and only scans the directory when that total exceeds the maximum size.
+The scan evicts files down to a fraction of the maximum size, so that it's
+needed once per that many bytes added rather than on every miss. As each
+process only counts its own additions, the processes sharing the directory can
+together exceed the maximum size until one of them scans it.
+
+A lock file is created exclusively while a file is written, so that only one
+process at a time fetches and writes the data with a given digest.
+"""
+import errno
+import logging
+import os
+import tempfile
+import time
+
+import dogstats_wrapper as dog_stats_api
+
+log = logging.getLogger(__name__)
+
+# Prefix of the temporary files that data is written to before being moved into place.
+TEMP_FILE_PREFIX = '.tmp'
+# Prefix of the files locking the data with a digest while it's written.
+LOCK_FILE_PREFIX = '.lock'
+# Age, in seconds, after which a lock is considered left by a process which died.
+LOCK_TIMEOUT = 10 * 60
+# Fraction of the maximum size the cache is evicted down to.
+EVICTION_RATIO = 0.9
+
+
+class ContentFileCache(object):
+    """
+    A size-bounded, least recently used cache of asset data, keyed by the
+    digest of the data.
+    """
+    def __init__(self, directory, max_size):
+        """
+        Arguments:
+            directory (str): the directory of the cache, created if needed.
+            max_size (int): the maximum total size, in bytes, of the cached data.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        # the total size of the cache as of the last scan, plus the data added
+        # since, or None before the first scan
+        self._size = None
+
+    def _path(self, content_digest):
+        """
+        Returns the path of the file for the given digest, in a subdirectory
+        per 2-character prefix to keep directory sizes down.
+        """
+        return os.path.join(self.directory, content_digest[:2], content_digest)
+
+    def _lock_path(self, content_digest):
+        """
+        Returns the path of the file locking the data with the given digest.
+        """
+        return os.path.join(self.directory, content_digest[:2], LOCK_FILE_PREFIX + content_digest)
+
+    def touch(self, content_digest):
+        """
+        Marks the data with the given digest as just used, and returns whether
+        it is in the cache.
+        """
+        try:
+            os.utime(self._path(content_digest), None)
+        except OSError:
+            return False
+        return True
+
+    def open(self, content_digest):
+        """
+        Returns a file open for reading the data with the given digest, or
+        None if it isn't in the cache.
+        """
+        path = self._path(content_digest)
+        try:
+            cached_file = open(path, 'rb')
+        except IOError:
+            dog_stats_api.increment('contentstore.file_cache', tags=[u'result:miss'])
+            return None
+        # if it was just evicted, the open file remains readable
+        self.touch(content_digest)
+        dog_stats_api.increment('contentstore.file_cache', tags=[u'result:hit'])
+        return cached_file
+
+    def add(self, content_digest, chunks):
+        """
+        Adds the data with the given digest to the cache, evicting the least
+        recently used data if the cache gets too large, and returns a file
+        open for reading it, or None if another process is adding it.
+
+        The data is written to a temporary file which is then renamed, so that
+        other processes never read partially written data.
+
+        Arguments:
+            content_digest (str): the digest of the data.
+            chunks (iterable): the strings of the data, only read if the data
+                isn't added by another process.
+        """
+        path = self._path(content_digest)
+        _makedirs(os.path.dirname(path))
+        if not self._lock(content_digest):
+            dog_stats_api.increment('contentstore.file_cache', tags=[u'result:locked'])
+            return None
+        try:
+            # another process may have added it since it was looked up
+            if os.path.exists(path):
+                return open(path, 'rb')
+            temp_file = _temp_file(path)
+            try:
+                for chunk in chunks:
+                    temp_file.write(chunk)
+                size = temp_file.tell()
+                temp_file.close()
+                os.rename(temp_file.name, path)
+            finally:
+                _discard(temp_file)
+        finally:
+            os.remove(self._lock_path(content_digest))
+
+        cached_file = open(path, 'rb')
+        self._count_added(size)
+        return cached_file
+
+    def tee(self, content_digest, chunks):
+        """
+        Yields the given chunks of the data with the given digest, adding the
+        data to the cache as they are read, so that data being sent to a client
+        is only fetched once.
+
+        The data is only added once all of its chunks have been read, and isn't
+        if another process is adding it. As the chunks are being sent on,
+        failures to add the data are logged rather than raised.
+
+        Arguments:
+            content_digest (str): the digest of the data.
+            chunks (iterable): the strings of the data.
+        """
+        path = self._path(content_digest)
+        try:
+            _makedirs(os.path.dirname(path))
+            locked = self._lock(content_digest)
+        except OSError:
+            log.exception(u"Could not add %s to the file cache", content_digest)
+            locked = None
+        if not locked:
+            if locked is False:
+                dog_stats_api.increment('contentstore.file_cache', tags=[u'result:locked'])
+            for chunk in chunks:
+                yield chunk
+            return
+
+        temp_file = None
+        try:
+            # another process may have added it since it was looked up
+            if not os.path.exists(path):
+                temp_file = _temp_file(path)
+            for chunk in chunks:
+                if temp_file is not None:
+                    try:
+                        temp_file.write(chunk)
+                    except (IOError, OSError):
+                        log.exception(u"Could not add %s to the file cache", content_digest)
+                        _discard(temp_file)
+                        temp_file = None
+                yield chunk
+            if temp_file is not None:
+                size = temp_file.tell()
+                try:
+                    temp_file.close()
+                    os.rename(temp_file.name, path)
+                except (IOError, OSError):
+                    log.exception(u"Could not add %s to the file cache", content_digest)
+                else:
+                    self._count_added(size)
+        finally:
+            # also reached if the chunks aren't all read, e.g. if the client disconnects
+            if temp_file is not None:
+                _discard(temp_file)
+            os.remove(self._lock_path(content_digest))
+
+    def _count_added(self, size):
+        """
+        Counts size bytes of data added to the cache, evicting the least
+        recently used data if the cache has become too large.
+        """
+        if self._size is not None:
+            self._size += size
+        if self._size is None or self._size > self.max_size:
+            self.evict()
+
+    def _lock(self, content_digest):
+        """
+        Locks the data with the given digest, and returns whether it could,
+        i.e. whether no other process is adding it. Locks older than
+        LOCK_TIMEOUT are broken.
+        """
+        lock_path = self._lock_path(content_digest)
+        for __ in range(2):
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except OSError as exception:
+                if exception.errno != errno.EEXIST:
+                    raise
+            try:
+                if time.time() - os.path.getmtime(lock_path) < LOCK_TIMEOUT:
+                    return False
+                os.remove(lock_path)
+            except OSError:
+                # the other process just removed it
+                pass
+        return False
+
+    def evict(self):
+        """
+        Scans the cache, removing the least recently used files if its total
+        size is more than its maximum size, until it is no more than
+        EVICTION_RATIO of it, and returns the number of files removed.
+        """
+        files = []
+        total_size = 0
+        for dirpath, __, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.startswith((TEMP_FILE_PREFIX, LOCK_FILE_PREFIX)):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # another process just evicted it
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        evicted = 0
+        if total_size > self.max_size:
+            files.sort()
+            for __, size, path in files:
+                if total_size <= self.max_size * EVICTION_RATIO:
+                    break
+                try:
+                    os.remove(path)
+                    evicted += 1
+                except OSError:
+                    pass
+                total_size -= size
+        self._size = total_size
+
+        if evicted:
+            dog_stats_api.increment('contentstore.file_cache.evictions', value=evicted)
+        return evicted
+
+
+def _temp_file(path):
+    """
+    Returns a new temporary file, open for writing, to be renamed to path once
+    written.
+    """
+    return tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=TEMP_FILE_PREFIX, delete=False)
+
+
+def _discard(temp_file):
+    """
+    Closes the given temporary file, and removes it unless it was renamed.
+    """
+    temp_file.close()
+    if os.path.exists(temp_file.name):
+        os.remove(temp_file.name)
+
+
+def _makedirs(directory):
+    """
+    Creates the given directory, if another process hasn't already.
+    """
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
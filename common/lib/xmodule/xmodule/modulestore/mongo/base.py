@@ -15,8 +15,8 @@ structure:
 import pymongo
 import sys
 import logging
-import copy
 import re
+from time import time
 from uuid import uuid4
 
 from bson.son import SON
@@ -48,6 +48,7 @@ from xmodule.modulestore.draft_and_published import ModuleStoreDraftAndPublished
 from xmodule.modulestore.edit_info import EditInfoRuntimeMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError
 from xmodule.modulestore.inheritance import InheritanceMixin, inherit_metadata, InheritanceKeyValueStore
+from xmodule.modulestore.mongo import inheritance_tree
 from xmodule.modulestore.xml import CourseLocationManager
 from xmodule.services import SettingsService
 
@@ -182,7 +183,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
             unicode(self.course_id),
             [unicode(key) for key in self.module_data.keys()],
             self.default_class,
-            [unicode(key) for key in self.cached_metadata.keys()],
+            [unicode(key) for key in self.cached_metadata.get('metadata', {}).keys()],
         ))
 
     def __init__(self, modulestore, course_key, module_data, default_class, cached_metadata, **kwargs):
@@ -261,7 +262,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 parent = None
                 if self.cached_metadata is not None:
                     # fish the parent out of here if it's available
-                    parent_url = self.cached_metadata.get(unicode(location), {}).get('parent', {}).get(
+                    parent_url = self.cached_metadata.get('parents', {}).get(unicode(location), {}).get(
                         ModuleStoreEnum.Branch.published_only if location.revision is None
                         else ModuleStoreEnum.Branch.draft_preferred
                     )
@@ -300,7 +301,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
 
                     # Convert the serialized fields values in self.cached_metadata
                     # to python values
-                    metadata_to_inherit = self.cached_metadata.get(unicode(non_draft_loc), {})
+                    metadata_to_inherit = self.cached_metadata.get('metadata', {}).get(unicode(non_draft_loc), {})
                     inherit_metadata(module, metadata_to_inherit)
 
                 module._edit_info = json_data.get('edit_info')
@@ -676,9 +677,13 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             return ParentLocationCache()
 
-    def _compute_metadata_inheritance_tree(self, course_id):
+    def _query_metadata_inheritance_records(self, course_id, location=None):
         '''
-        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        Find the inheritable fields and children of all xblocks in the course which may
+        define inheritable data, or of just the xblock at location if given.
+
+        Returns a tuple of dicts mapping the url of each xblock to its own inheritable
+        metadata, and to its children, and the url of the course root if found.
         '''
         # get all collections in the course, this query should not return any leaf nodes
         course_id = self.fill_in_run(course_id)
@@ -688,6 +693,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             ('_id.course', course_id.course),
             ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN})
         ])
+        if location is not None:
+            query['_id.category'] = location.category
+            query['_id.name'] = location.name
         # if we're only dealing in the published branch, then only get published containers
         if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
             query['_id.revision'] = None
@@ -704,7 +712,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         # it's ok to keep these as deprecated strings b/c the overall cache is indexed by course_key and this
         # is a dictionary relative to that course
-        results_by_url = {}
+        own_metadata = {}
+        children = {}
         root = None
 
         # now go through the results and order them by the location url
@@ -713,52 +722,112 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             location = as_published(Location._from_deprecated_son(result['_id'], course_id.run))
 
             location_url = unicode(location)
-            if location_url in results_by_url:
+            result_children = result.get('definition', {}).get('children', [])
+            if location_url in children:
                 # found either draft or live to complement the other revision
                 # FIXME this is wrong. If the child was moved in draft from one parent to the other, it will
                 # show up under both in this logic: https://openedx.atlassian.net/browse/TNL-1075
-                existing_children = results_by_url[location_url].get('definition', {}).get('children', [])
-                additional_children = result.get('definition', {}).get('children', [])
-                total_children = existing_children + additional_children
                 # use set to get rid of duplicates. We don't care about order; so, it shouldn't matter.
-                results_by_url[location_url].setdefault('definition', {})['children'] = set(total_children)
+                children[location_url] = list(set(children[location_url] + result_children))
             else:
-                results_by_url[location_url] = result
+                own_metadata[location_url] = result.get('metadata', {})
+                children[location_url] = result_children
             if location.category == 'course':
                 root = location_url
 
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
+        return own_metadata, children, root
 
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
-                # WARNING: 'parent' is not part of inherited metadata, but
-                # we're piggybacking on this recursive traversal to grab
-                # and cache the child's parent, as a performance optimization.
-                # The 'parent' key will be popped out of the dictionary during
-                # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
+    def _compute_metadata_inheritance_tree(self, course_id):
+        '''
+        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        '''
+        own_metadata, children, root = self._query_metadata_inheritance_records(course_id)
+        return inheritance_tree.compute_tree(own_metadata, children, root, self.get_branch_setting())
 
-        if root is not None:
-            _compute_inherited_metadata(root)
+    def _update_metadata_inheritance_tree(self, course_id, location, generation):
+        '''
+        Update the metadata inheritance tree of the course for a change to the container at
+        location, recomputing only its subtree.  generation is the generation of the course's
+        tree that the change bumped the cache to (see _bump_metadata_inheritance_generation).
 
-        return metadata_to_inherit
+        Returns the updated tree, or None if it has to be recomputed entirely.
+        '''
+        own_metadata, children, __ = self._query_metadata_inheritance_records(course_id, location)
+        url = unicode(as_published(location))
+        if url not in children:
+            return None
+
+        course_id = self.fill_in_run(course_id)
+        tree = None
+        if self.metadata_inheritance_cache_subsystem is not None:
+            # start from the shared tree rather than this request's copy, which
+            # may not have other processes' changes
+            tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id))
+            # the shared tree can only be patched if it is of the generation just
+            # before this change: otherwise, another process has changed the course
+            # concurrently, and its change may be missing from the tree
+            if generation is None or not isinstance(tree, dict) or tree.get('generation') != generation - 1:
+                return None
+        elif self.request_cache is not None:
+            tree = self.request_cache.data.get('metadata_inheritance', {}).get(unicode(course_id))
+        if not inheritance_tree.is_current_tree(tree):
+            return None
+
+        # the subtrees of containers which aren't in the tree yet are unknown
+        if any(
+                child not in tree['children'] and UsageKey.from_string(child).block_type in BLOCK_TYPES_WITH_CHILDREN
+                for child in children[url]
+        ):
+            return None
+
+        inheritance_tree.update_subtree(
+            tree, url, own_metadata[url], children[url], self.get_branch_setting(),
+            is_root=location.category == 'course',
+        )
+        self._set_cached_metadata_inheritance_tree(course_id, tree, generation)
+        return tree
+
+    def _metadata_inheritance_generation_key(self, course_id):
+        '''
+        Return the key of the generation of the course's metadata inheritance tree in the
+        caching subsystem.
+        '''
+        return u'{}.generation'.format(course_id)
+
+    def _get_metadata_inheritance_generation(self, course_id):
+        '''
+        Return the current generation of the course's metadata inheritance tree in the
+        caching subsystem.
+
+        Every change to the course which affects the tree bumps its generation, and a tree
+        in the caching subsystem is only used if it was computed at the current generation.
+        '''
+        key = self._metadata_inheritance_generation_key(course_id)
+        generation = self.metadata_inheritance_cache_subsystem.get(key)
+        if generation is None:
+            # start from the time, so that a generation that has been evicted from
+            # the cache doesn't start over, and match trees of earlier generations
+            self.metadata_inheritance_cache_subsystem.add(key, int(time() * 1000))
+            generation = self.metadata_inheritance_cache_subsystem.get(key)
+        return generation
+
+    def _bump_metadata_inheritance_generation(self, course_id):
+        '''
+        Atomically increment the generation of the course's metadata inheritance tree in the
+        caching subsystem, for a change to the course, and return it.
+
+        Returns None if there is no caching subsystem, or the generation can't be incremented.
+        '''
+        if self.metadata_inheritance_cache_subsystem is None:
+            return None
+        key = self._metadata_inheritance_generation_key(course_id)
+        for __ in range(2):
+            try:
+                return self.metadata_inheritance_cache_subsystem.incr(key)
+            except ValueError:
+                # not in the cache
+                self._get_metadata_inheritance_generation(course_id)
+        return None
 
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
@@ -767,6 +836,11 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         tree = {}
 
         course_id = self.fill_in_run(course_id)
+        generation = None
+        if self.metadata_inheritance_cache_subsystem is not None:
+            # read before the tree is computed, so that changes made while it is computed
+            # make it outdated
+            generation = self._get_metadata_inheritance_generation(course_id)
         if not force_refresh:
             # see if we are first in the request cache (if present)
             if self.request_cache is not None and unicode(course_id) in self.request_cache.data.get('metadata_inheritance', {}):
@@ -775,6 +849,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             # then look in any caching subsystem (e.g. memcached)
             if self.metadata_inheritance_cache_subsystem is not None:
                 tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
+                if not inheritance_tree.is_current_tree(tree) or tree.get('generation') != generation:
+                    tree = {}
             else:
                 logging.warning(
                     'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
@@ -786,12 +862,29 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             tree = self._compute_metadata_inheritance_tree(course_id)
 
             # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+            self._set_cached_metadata_inheritance_tree(course_id, tree, generation)
+            return tree
+
+        # now populate a request_cache, if available, so that after a memcache hit,
+        # it'll get put into the request_cache
+        self._set_request_cached_metadata_inheritance_tree(course_id, tree)
+        return tree
+
+    def _set_cached_metadata_inheritance_tree(self, course_id, tree, generation):
+        '''
+        Write the metadata inheritance tree of the course, as of generation, to the caching
+        subsystem (e.g. memcached), if available, and to the request cache.
+        '''
+        course_id = self.fill_in_run(course_id)
+        if self.metadata_inheritance_cache_subsystem is not None:
+            tree['generation'] = generation
+            self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+        self._set_request_cached_metadata_inheritance_tree(course_id, tree)
 
-        # now populate a request_cache, if available. NOTE, we are outside of the
-        # scope of the above if: statement so that after a memcache hit, it'll get
-        # put into the request_cache
+    def _set_request_cached_metadata_inheritance_tree(self, course_id, tree):
+        '''
+        Put the metadata inheritance tree of the course into the request cache, if available.
+        '''
         if self.request_cache is not None:
             # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
             # defined
@@ -799,20 +892,30 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 self.request_cache.data['metadata_inheritance'] = {}
             self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
 
-        return tree
-
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, location=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
+
+        If given the location of the only xblock which changed, only the subtree of that xblock
+        is recomputed.
         """
         course_id = course_id.for_branch(None)
         if not self._is_in_bulk_operation(course_id):
             # below is done for side effects when runtime is None
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
+            if location is not None and location.category not in BLOCK_TYPES_WITH_CHILDREN:
+                # leaves don't pass any metadata down, so the tree is unaffected
+                cached_metadata = self._get_cached_metadata_inheritance_tree(course_id)
+            else:
+                generation = self._bump_metadata_inheritance_generation(self.fill_in_run(course_id))
+                cached_metadata = None
+                if location is not None:
+                    cached_metadata = self._update_metadata_inheritance_tree(course_id, location, generation)
+                if cached_metadata is None:
+                    cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
@@ -1480,8 +1583,10 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             # update the edit info of the instantiated xblock
             xblock._edit_info = payload['edit_info']
 
-            # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            # update the metadata inheritance tree which is cached
+            self.refresh_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id.course_key, xblock.runtime, xblock.scope_ids.usage_id
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
@@ -0,0 +1,152 @@
+"""
+The metadata inheritance tree of a course in the old Mongo modulestore.
+
+The tree records, for every block below the root of a course, the inheritable
+metadata that the block inherits and the url of its parent, so that loading a
+block doesn't require loading its ancestors.  It is a dict of:
+
+    'version': TREE_VERSION
+    'own_metadata': {container url: the container's own inheritable metadata}
+    'children': {container url: [child urls]}
+    'metadata': {url: the metadata inherited by the block}
+    'parents': {url: {branch: parent url}}
+
+Only containers (blocks which may have children) define inheritable metadata
+that matters to other blocks, so 'own_metadata' and 'children' cover just the
+containers, and are what an edited container's subtree is recomputed from.
+
+The 'metadata' of a container includes its own metadata.  Blocks that don't
+set any inheritable metadata of their own share their parent's dict rather
+than a copy of it, which keeps both the computation and the pickled tree
+small.  The dicts are therefore never modified once in the tree: changes
+always replace them.
+"""
+
+# Version of the tree's format.  Cached trees of any other version are
+# recomputed.
+TREE_VERSION = 2
+
+
+def empty_tree():
+    """
+    Return a tree without any blocks.
+    """
+    return {
+        'version': TREE_VERSION,
+        'own_metadata': {},
+        'children': {},
+        'metadata': {},
+        'parents': {},
+    }
+
+
+def is_current_tree(tree):
+    """
+    Return whether tree (as read from a cache) is in the current format.
+    """
+    return isinstance(tree, dict) and tree.get('version') == TREE_VERSION
+
+
+def compute_tree(own_metadata, children, root, branch):
+    """
+    Return the tree of the blocks below root.
+
+    Arguments:
+        own_metadata (dict): maps the url of each container to its own inheritable metadata.
+        children (dict): maps the url of each container to the urls of its children.
+        root (unicode): the url of the course, or None if the course has no root.
+        branch (str): the branch whose parent pointers are recorded.
+    """
+    tree = empty_tree()
+    tree['own_metadata'] = own_metadata
+    tree['children'] = children
+    if root is not None:
+        _inherit_down(tree, root, own_metadata.get(root, {}), branch)
+    return tree
+
+
+def update_subtree(tree, url, own_metadata, children, branch, is_root=False):
+    """
+    Update tree in place for a change to the own inheritable metadata or the
+    children of the container at url, recomputing only its subtree.
+
+    The containers among children must already be in the tree.
+
+    Arguments:
+        tree (dict): the tree to update.
+        url (unicode): the url of the changed container.
+        own_metadata (dict): the container's own inheritable metadata.
+        children (list): the urls of the container's children.
+        branch (str): the branch whose parent pointers are recorded.
+        is_root (bool): whether the container is the course.
+    """
+    removed_children = set(tree['children'].get(url, [])) - set(children)
+    tree['own_metadata'][url] = own_metadata
+    tree['children'][url] = children
+
+    # Forget the subtrees of the removed children, unless they have already
+    # been added to another parent.
+    for child in removed_children:
+        if tree['parents'].get(child, {}).get(branch) == url:
+            _remove_subtree(tree, child, branch)
+
+    if is_root:
+        _inherit_down(tree, url, own_metadata, branch)
+    else:
+        parent = tree['parents'].get(url, {}).get(branch)
+        # A container without a parent isn't in the course (yet); its subtree
+        # will be computed when it is added to a parent.
+        if parent is not None:
+            my_metadata = _merge_metadata(_metadata_passed_down(tree, parent), own_metadata)
+            tree['metadata'][url] = my_metadata
+            _inherit_down(tree, url, my_metadata, branch)
+
+
+def _metadata_passed_down(tree, url):
+    """
+    Return the metadata which the block at url passes down to its children.
+    """
+    if url in tree['metadata']:
+        return tree['metadata'][url]
+    # the root doesn't inherit anything
+    return tree['own_metadata'].get(url, {})
+
+
+def _merge_metadata(inherited_metadata, own_metadata):
+    """
+    Return the metadata of a block which inherits inherited_metadata and sets
+    own_metadata, sharing the inherited dict if the block sets nothing.
+    """
+    if not own_metadata:
+        return inherited_metadata
+    metadata = dict(inherited_metadata)
+    metadata.update(own_metadata)
+    return metadata
+
+
+def _inherit_down(tree, url, my_metadata, branch):
+    """
+    Record the metadata inherited by, and the parent of, each block below the
+    container at url, which passes my_metadata down to its children.
+    """
+    for child in tree['children'].get(url, []):
+        if child in tree['children']:
+            child_metadata = _merge_metadata(my_metadata, tree['own_metadata'].get(child, {}))
+            tree['metadata'][child] = child_metadata
+            _inherit_down(tree, child, child_metadata, branch)
+        else:
+            # this is likely a leaf node, which only inherits
+            tree['metadata'][child] = my_metadata
+        tree['parents'][child] = {branch: url}
+
+
+def _remove_subtree(tree, url, branch):
+    """
+    Remove the inherited metadata and parent of the block at url, and of all
+    the blocks below it whose parent is in the removed subtree.
+    """
+    tree['metadata'].pop(url, None)
+    tree['parents'].pop(url, None)
+    for child in tree['children'].get(url, []):
+        if tree['parents'].get(child, {}).get(branch) == url:
+            _remove_subtree(tree, child, branch)
@@ -0,0 +1,126 @@
+"""
+Benchmark of the old Mongo modulestore's metadata inheritance tree.
+
+Builds a synthetic course of about 10,000 blocks and compares:
+
+    - the time to recompute the whole tree with the legacy algorithm (a deep
+      copy of the parent's metadata per container, and a shallow copy per leaf)
+      and with inheritance_tree.compute_tree
+    - the time to update the tree for an edit of one sequential's inheritable
+      metadata with inheritance_tree.update_subtree
+    - the pickled (cached) size of both tree formats
+
+Run with:
+
+    python -m xmodule.modulestore.perf_tests.benchmark_inheritance_tree
+"""
+import copy
+import cPickle as pickle
+import timeit
+
+from xmodule.modulestore.mongo import inheritance_tree
+
+
+BRANCH = 'draft-preferred'
+
+
+def make_course(chapters=10, sequentials=10, verticals=10, leaves=9):
+    """
+    Returns (own_metadata, children, root, a sequential url) for a synthetic
+    course with chapters * sequentials * verticals * (leaves + 1) blocks, in
+    which every sequential sets its own inheritable metadata.
+    """
+    url = 'i4x://edX/bench/{}/{}'.format
+    root = url('course', 'bench')
+    own_metadata = {root: {'start': '2015-01-01T00:00:00Z', 'graceperiod': '1 day', 'showanswer': 'attempted'}}
+    children = {root: []}
+    for chapter_index in xrange(chapters):
+        chapter = url('chapter', chapter_index)
+        children[root].append(chapter)
+        own_metadata[chapter] = {}
+        children[chapter] = []
+        for sequential_index in xrange(sequentials):
+            sequential = url('sequential', '{}_{}'.format(chapter_index, sequential_index))
+            children[chapter].append(sequential)
+            own_metadata[sequential] = {'graded': True, 'format': 'Homework', 'due': '2015-02-01T00:00:00Z'}
+            children[sequential] = []
+            for vertical_index in xrange(verticals):
+                vertical = url('vertical', '{}_{}_{}'.format(chapter_index, sequential_index, vertical_index))
+                children[sequential].append(vertical)
+                own_metadata[vertical] = {}
+                children[vertical] = [
+                    url('problem', '{}_{}_{}_{}'.format(chapter_index, sequential_index, vertical_index, leaf_index))
+                    for leaf_index in xrange(leaves)
+                ]
+    return own_metadata, children, root, url('sequential', '0_0')
+
+
+def legacy_compute_tree(own_metadata, children, root):
+    """
+    The tree computation which MongoModuleStore used before inheritance_tree.
+    """
+    results_by_url = {
+        url: {'metadata': dict(metadata), 'definition': {'children': children[url]}}
+        for url, metadata in own_metadata.iteritems()
+    }
+    metadata_to_inherit = {}
+
+    def _compute_inherited_metadata(url):
+        """
+        Helper method for computing inherited metadata for a specific location url
+        """
+        my_metadata = results_by_url[url].get('metadata', {})
+        for child in results_by_url[url].get('definition', {}).get('children', []):
+            if child in results_by_url:
+                new_child_metadata = copy.deepcopy(my_metadata)
+                new_child_metadata.update(results_by_url[child].get('metadata', {}))
+                results_by_url[child]['metadata'] = new_child_metadata
+                metadata_to_inherit[child] = new_child_metadata
+                _compute_inherited_metadata(child)
+            else:
+                metadata_to_inherit[child] = my_metadata.copy()
+            metadata_to_inherit[child].setdefault('parent', {})[BRANCH] = url
+
+    _compute_inherited_metadata(root)
+    return metadata_to_inherit
+
+
+def main(repeat=5):
+    """
+    Prints the benchmark's results.
+    """
+    own_metadata, children, root, sequential = make_course()
+    block_count = 1 + sum(len(block_children) for block_children in children.itervalues())
+    print 'Course of {} blocks ({} containers)'.format(block_count, len(children))
+
+    def best_time(func):
+        """
+        Returns the best time in ms of repeat calls of func.
+        """
+        return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+    legacy_tree = legacy_compute_tree(own_metadata, children, root)
+    tree = inheritance_tree.compute_tree(own_metadata, children, root, BRANCH)
+
+    print 'Full recompute, legacy:       {:8.2f} ms'.format(
+        best_time(lambda: legacy_compute_tree(own_metadata, children, root))
+    )
+    print 'Full recompute, shared dicts: {:8.2f} ms'.format(
+        best_time(lambda: inheritance_tree.compute_tree(own_metadata, children, root, BRANCH))
+    )
+    print 'Update of one sequential:     {:8.2f} ms'.format(
+        best_time(lambda: inheritance_tree.update_subtree(
+            tree, sequential, {'graded': False}, children[sequential], BRANCH
+        ))
+    )
+
+    print 'Pickled size, legacy:         {:8d} bytes'.format(
+        len(pickle.dumps(legacy_tree, pickle.HIGHEST_PROTOCOL))
+    )
+    print 'Pickled size, shared dicts:   {:8d} bytes'.format(
+        len(pickle.dumps(tree, pickle.HIGHEST_PROTOCOL))
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 """
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
+from collections import OrderedDict
+import copy
 import datetime
 import cPickle as pickle
 import math
@@ -15,6 +17,7 @@ from time import time
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
 try:
+    from django.conf import settings
     from django.core.cache import get_cache, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
@@ -213,6 +216,101 @@ def structure_to_mongo(structure, course_context=None):
         return new_structure
 
 
+class StructureMemoryCache(object):
+    """
+    A process-local, least-recently-used cache of deserialized course structures,
+    bounded by the total size of the structures it holds.
+
+    Structures are immutable by version GUID, so they never need invalidating.
+    But callers do modify the blocks of the structures they are given (for
+    instance, non-lazy loading merges definition fields into block fields), so
+    each structure is copied going in and coming out of the cache.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+        Return a copy of the structure stored for key, or None if not found.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        # Re-insert to mark the key as the most recently used.
+        self._entries[key] = entry
+        return _copy_structure(entry[0])
+
+    def set(self, key, structure, size):
+        """
+        Store a copy of the structure for key, evicting the least recently used
+        structures as needed to stay within max_size. Structures larger than
+        max_size are not stored.
+
+        Arguments:
+            key: The version GUID of the structure.
+            structure: The structure to store.
+            size (int): The size of the structure, which is measured as the length
+                of its pickled data.
+
+        Returns:
+            The number of structures evicted.
+        """
+        self.delete(key)
+        if size > self.max_size:
+            return 0
+        evictions = 0
+        while self._entries and self.size + size > self.max_size:
+            __, (__, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            evictions += 1
+        self._entries[key] = (_copy_structure(structure), size)
+        self.size += size
+        return evictions
+
+    def delete(self, key):
+        """
+        Remove the structure stored for key, if any.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+def _copy_structure(structure):
+    """
+    Return a copy of structure with its own blocks dict, BlockData objects and
+    block fields dicts, which is much cheaper than a deep copy.
+    """
+    new_structure = dict(structure)
+    new_structure['blocks'] = new_blocks = {}
+    for block_key, block_data in structure['blocks'].iteritems():
+        new_block_data = copy.copy(block_data)
+        new_block_data.fields = dict(block_data.fields)
+        new_blocks[block_key] = new_block_data
+    return new_structure
+
+
+# The process-wide StructureMemoryCache, created on first use.
+_STRUCTURE_MEMORY_CACHE = None
+
+
+def get_structure_memory_cache():
+    """
+    Return the process-wide :class:`StructureMemoryCache`, sized by the
+    COURSE_STRUCTURE_MEMORY_CACHE_SIZE setting, or None if that setting is 0
+    or Django isn't available.
+    """
+    global _STRUCTURE_MEMORY_CACHE  # pylint: disable=global-statement
+    max_size = getattr(settings, 'COURSE_STRUCTURE_MEMORY_CACHE_SIZE', 0) if DJANGO_AVAILABLE else 0
+    if not max_size:
+        return None
+    if _STRUCTURE_MEMORY_CACHE is None or _STRUCTURE_MEMORY_CACHE.max_size != max_size:
+        _STRUCTURE_MEMORY_CACHE = StructureMemoryCache(max_size)
+    return _STRUCTURE_MEMORY_CACHE
+
+
 class CourseStructureCache(object):
     """
     Wrapper around django cache object to cache course structure objects.
@@ -220,6 +318,11 @@ class CourseStructureCache(object):
 
     If the 'course_structure_cache' doesn't exist, then don't do anything for
     for set and get.
+
+    If the COURSE_STRUCTURE_MEMORY_CACHE_SIZE setting is not 0, deserialized
+    structures are also kept in a process-local :class:`StructureMemoryCache`
+    in front of the django cache, which saves decompressing and unpickling
+    them on every request.
     """
     def __init__(self):
         self.cache = None
@@ -228,13 +331,24 @@ class CourseStructureCache(object):
                 self.cache = get_cache('course_structure_cache')
             except InvalidCacheBackendError:
                 pass
+        self.memory_cache = get_structure_memory_cache()
 
     def get(self, key, course_context=None):
         """Pull the compressed, pickled struct data from cache and deserialize."""
-        if self.cache is None:
+        if self.cache is None and self.memory_cache is None:
             return None
 
         with TIMER.timer("CourseStructureCache.get", course_context) as tagger:
+            if self.memory_cache is not None:
+                structure = self.memory_cache.get(key)
+                tagger.tag(from_memory=str(structure is not None).lower())
+                tagger.measure('memory_cache_size', self.memory_cache.size)
+                if structure is not None:
+                    return structure
+
+            if self.cache is None:
+                return None
+
             compressed_pickled_data = self.cache.get(key)
             tagger.tag(from_cache=str(compressed_pickled_data is not None).lower())
 
@@ -248,17 +362,27 @@ class CourseStructureCache(object):
             pickled_data = zlib.decompress(compressed_pickled_data)
             tagger.measure('uncompressed_size', len(pickled_data))
 
-            return pickle.loads(pickled_data)
+            structure = pickle.loads(pickled_data)
+            if self.memory_cache is not None:
+                tagger.measure('memory_evictions', self.memory_cache.set(key, structure, len(pickled_data)))
+            return structure
 
     def set(self, key, structure, course_context=None):
         """Given a structure, will pickle, compress, and write to cache."""
-        if self.cache is None:
+        if self.cache is None and self.memory_cache is None:
             return None
 
         with TIMER.timer("CourseStructureCache.set", course_context) as tagger:
             pickled_data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
             tagger.measure('uncompressed_size', len(pickled_data))
 
+            if self.memory_cache is not None:
+                tagger.measure('memory_evictions', self.memory_cache.set(key, structure, len(pickled_data)))
+                tagger.measure('memory_cache_size', self.memory_cache.size)
+
+            if self.cache is None:
+                return None
+
             # 1 = Fastest (slightly larger results)
             compressed_pickled_data = zlib.compress(pickled_data, 1)
             tagger.measure('compressed_size', len(compressed_pickled_data))
@@ -792,12 +792,49 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             return
 
         if course_version_guid:
-            try:
-                del self.request_cache.data.setdefault('course_cache', {})[course_version_guid]
-            except KeyError:
-                pass
+            for cache_name in ('course_cache', 'structure_indexes'):
+                self.request_cache.data.setdefault(cache_name, {}).pop(course_version_guid, None)
         else:
             self.request_cache.data['course_cache'] = {}
+            self.request_cache.data['structure_indexes'] = {}
+
+    def _get_structure_index(self, course_key, structure):
+        """
+        Return the secondary indexes of the blocks in structure, as a dict of:
+            'block_type': {block_type: [BlockKey]}
+            'block_id': {block_id: [BlockKey]}
+            'parents': {BlockKey: [parent BlockKey]}
+
+        The indexes are built on first use and kept in the request cache
+        alongside the course cache. Only the structures which can't change are
+        indexed: those being edited in an active bulk operation are changed in
+        place, so None is returned for them (and if there's no request cache).
+
+        :param course_key: the course the structure was looked up for, to respect bulk operations
+        :param structure: the structure to index
+        """
+        if self.request_cache is None:
+            return None
+
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        if bulk_write_record.active and structure['_id'] not in bulk_write_record.structures_in_db:
+            return None
+
+        indexes = self.request_cache.data.setdefault('structure_indexes', {})
+        index = indexes.get(structure['_id'])
+        if index is None:
+            index = {
+                'block_type': defaultdict(list),
+                'block_id': defaultdict(list),
+                'parents': defaultdict(list),
+            }
+            for block_key, block_data in structure['blocks'].iteritems():
+                index['block_type'][block_key.type].append(block_key)
+                index['block_id'][block_key.id].append(block_key)
+                for child_key in set(block_data.fields.get('children', [])):
+                    index['parents'][child_key].append(block_key)
+            indexes[structure['_id']] = index
+        return index
 
     def _lookup_course(self, course_key, head_validation=True):
         """
@@ -1085,35 +1122,46 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             return []
 
         course = self._lookup_course(course_locator)
-        items = []
+        blocks = course.structure['blocks']
+        index = self._get_structure_index(course_locator, course.structure)
         qualifiers = qualifiers.copy() if qualifiers else {}  # copy the qualifiers (destructively manipulated here)
 
-        def _block_matches_all(block_data):
+        def _blocks_matching_all(block_keys):
             """
-            Check that the block matches all the criteria
+            Return the keys of the blocks which match all the criteria
             """
             # do the checks which don't require loading any additional data
-            if (  # pylint: disable=bad-continuation
-                self._block_matches(block_data, qualifiers) and
-                self._block_matches(block_data.fields, settings)
-            ):
-                if content:
-                    definition_block = self.get_definition(course_locator, block_data.definition)
-                    return self._block_matches(definition_block['fields'], content)
-                else:
-                    return True
+            matches = [
+                block_key for block_key in block_keys
+                if self._block_matches(blocks[block_key], qualifiers) and
+                self._block_matches(blocks[block_key].fields, settings)
+            ]
+            if content and matches:
+                # fetch the definitions of all the candidates at once
+                definitions = {
+                    definition['_id']: definition
+                    for definition in self.get_definitions(
+                        course_locator, [blocks[block_key].definition for block_key in matches]
+                    )
+                }
+                matches = [
+                    block_key for block_key in matches
+                    if blocks[block_key].definition in definitions and
+                    self._block_matches(definitions[blocks[block_key].definition]['fields'], content)
+                ]
+            return matches
 
         if settings is None:
             settings = {}
         if 'name' in qualifiers:
             # odd case where we don't search just confirm
             block_name = qualifiers.pop('name')
-            block_ids = []
-            for block_id, block in course.structure['blocks'].iteritems():
-                if block_name == block_id.id and _block_matches_all(block):
-                    block_ids.append(block_id)
+            if index is not None:
+                candidates = index['block_id'].get(block_name, [])
+            else:
+                candidates = [block_key for block_key in blocks if block_key.id == block_name]
 
-            return self._load_items(course, block_ids, **kwargs)
+            return self._load_items(course, _blocks_matching_all(candidates), **kwargs)
 
         if 'category' in qualifiers:
             qualifiers['block_type'] = qualifiers.pop('category')
@@ -1121,9 +1169,15 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # don't expect caller to know that children are in fields
         if 'children' in qualifiers:
             settings['children'] = qualifiers.pop('children')
-        for block_id, value in course.structure['blocks'].iteritems():
-            if _block_matches_all(value):
-                items.append(block_id)
+
+        # narrow down the blocks to check using the indexes, if the criteria allow
+        candidates = blocks
+        if index is not None:
+            if isinstance(settings.get('children'), BlockKey):
+                candidates = index['parents'].get(settings['children'], [])
+            elif isinstance(qualifiers.get('block_type'), basestring):
+                candidates = index['block_type'].get(qualifiers['block_type'], [])
+        items = _blocks_matching_all(candidates)
 
         if len(items) > 0:
             return self._load_items(course, items, depth=0, **kwargs)
@@ -1140,7 +1194,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         :return Bool: whether or not component has path to the root
         """
 
-        xblock_parents = self._get_parents_from_structure(block_key, course.structure)
+        xblock_parents = self._get_parents_from_structure(block_key, course.structure, course.course_key)
         if len(xblock_parents) == 0 and block_key.type in ["course", "library"]:
             # Found, xblock has the path to the root
             return True
@@ -1160,7 +1214,9 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             raise ItemNotFoundError(locator)
 
         course = self._lookup_course(locator.course_key)
-        all_parent_ids = self._get_parents_from_structure(BlockKey.from_usage_key(locator), course.structure)
+        all_parent_ids = self._get_parents_from_structure(
+            BlockKey.from_usage_key(locator), course.structure, locator.course_key
+        )
 
         # Check and verify the found parent_ids are not orphans; Remove parent which has no valid path
         # to the course root
@@ -2956,11 +3012,19 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         }
 
     @contract(block_key=BlockKey)
-    def _get_parents_from_structure(self, block_key, structure):
+    def _get_parents_from_structure(self, block_key, structure, course_key=None):
         """
         Given a structure, find block_key's parent in that structure. Note returns
         the encoded format for parent
+
+        If the structure's course_key is given, use the structure's index of parents
+        when it can be cached.
         """
+        if course_key is not None:
+            index = self._get_structure_index(course_key, structure)
+            if index is not None:
+                return list(index['parents'].get(block_key, []))
+
         return [
             parent_block_key
             for parent_block_key, value in structure['blocks'].iteritems()
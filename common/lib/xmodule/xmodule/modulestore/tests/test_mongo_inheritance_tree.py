@@ -0,0 +1,187 @@
+"""
+Tests for mongo/inheritance_tree.py
+"""
+import copy
+import unittest
+
+from mock import patch
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.mongo import inheritance_tree
+from xmodule.modulestore.tests.utils import MongoModulestoreBuilder
+
+
+BRANCH = 'draft-preferred'
+
+
+class TestInheritanceTree(unittest.TestCase):
+    """
+    Tests for computing and incrementally updating metadata inheritance trees.
+
+        course (start=1)
+          |
+        chapter (graded=True)
+         /      \\
+    sequential   html
+        |
+      problem
+    """
+    def setUp(self):
+        super(TestInheritanceTree, self).setUp()
+        self.own_metadata = {
+            'course': {'start': 1},
+            'chapter': {'graded': True},
+            'sequential': {},
+        }
+        self.children = {
+            'course': ['chapter'],
+            'chapter': ['sequential', 'html'],
+            'sequential': ['problem'],
+        }
+
+    def _compute(self):
+        """
+        Compute the tree from scratch from the current own_metadata and children.
+        """
+        return inheritance_tree.compute_tree(
+            copy.deepcopy(self.own_metadata), copy.deepcopy(self.children), 'course', BRANCH
+        )
+
+    def _update(self, tree, url, **kwargs):
+        """
+        Change the own metadata and/or children of url, and update tree for the change.
+        """
+        if 'own_metadata' in kwargs:
+            self.own_metadata[url] = kwargs['own_metadata']
+        if 'children' in kwargs:
+            self.children[url] = kwargs['children']
+        inheritance_tree.update_subtree(
+            tree, url, self.own_metadata[url], self.children[url], BRANCH, is_root=(url == 'course')
+        )
+
+    def test_compute(self):
+        tree = self._compute()
+        self.assertTrue(inheritance_tree.is_current_tree(tree))
+        self.assertEqual(tree['metadata']['chapter'], {'start': 1, 'graded': True})
+        self.assertEqual(tree['metadata']['problem'], {'start': 1, 'graded': True})
+        self.assertEqual(tree['parents']['problem'], {BRANCH: 'sequential'})
+        self.assertNotIn('course', tree['metadata'])
+
+        # blocks which don't set any inheritable metadata share their parent's
+        self.assertIs(tree['metadata']['sequential'], tree['metadata']['chapter'])
+        self.assertIs(tree['metadata']['problem'], tree['metadata']['chapter'])
+
+    def test_update_metadata(self):
+        tree = self._compute()
+        course_metadata = tree['metadata']['chapter']
+        self._update(tree, 'sequential', own_metadata={'graded': False})
+        self.assertEqual(tree, self._compute())
+        self.assertEqual(tree['metadata']['problem'], {'start': 1, 'graded': False})
+        # blocks outside the subtree keep their metadata
+        self.assertIs(tree['metadata']['html'], course_metadata)
+
+    def test_update_root(self):
+        tree = self._compute()
+        self._update(tree, 'course', own_metadata={'start': 2})
+        self.assertEqual(tree, self._compute())
+        self.assertEqual(tree['metadata']['problem'], {'start': 2, 'graded': True})
+
+    def test_add_and_remove_children(self):
+        tree = self._compute()
+        # a new container isn't in the course until it is added to a parent
+        self._update(tree, 'vertical', own_metadata={'graded': False}, children=['video'])
+        self.assertNotIn('video', tree['metadata'])
+
+        self._update(tree, 'chapter', children=['vertical', 'html'])
+        self.assertEqual(tree, self._compute())
+        self.assertEqual(tree['metadata']['video'], {'start': 1, 'graded': False})
+        self.assertNotIn('problem', tree['metadata'])
+
+    def test_move_child(self):
+        tree = self._compute()
+        self.own_metadata['vertical'] = {}
+        self.children['vertical'] = []
+        self._update(tree, 'vertical')
+        self._update(tree, 'chapter', children=['sequential', 'html', 'vertical'])
+
+        # the new parent is updated before the old one
+        self._update(tree, 'vertical', children=['problem'])
+        self._update(tree, 'sequential', children=[])
+        self.assertEqual(tree, self._compute())
+        self.assertEqual(tree['parents']['problem'], {BRANCH: 'vertical'})
+
+    def test_is_current_tree(self):
+        self.assertFalse(inheritance_tree.is_current_tree({}))
+        self.assertFalse(inheritance_tree.is_current_tree({'i4x://org/course/chapter/chapter': {'start': 1}}))
+        self.assertTrue(inheritance_tree.is_current_tree(inheritance_tree.empty_tree()))
+
+
+class TestCachedInheritanceTree(unittest.TestCase):
+    """
+    Tests for keeping the metadata inheritance tree of a Mongo course in the
+    caching subsystem up to date.
+    """
+    def setUp(self):
+        super(TestCachedInheritanceTree, self).setUp()
+        builder = MongoModulestoreBuilder().build()
+        __, self.store = builder.__enter__()  # pylint: disable=no-member
+        self.addCleanup(builder.__exit__, None, None, None)  # pylint: disable=no-member
+
+        self.user_id = ModuleStoreEnum.UserID.test
+        self.course = self.store.create_course('org', 'course', 'run', self.user_id)
+        self.chapters = [
+            self.store.create_child(self.user_id, self.course.location, 'chapter', block_id='chapter{}'.format(index))
+            for index in range(2)
+        ]
+        self.store.refresh_cached_metadata_inheritance_tree(self.course.id)
+
+    def _cached_metadata(self, block):
+        """
+        Return the metadata inherited by block according to the cached tree.
+        """
+        tree = self.store.metadata_inheritance_cache_subsystem.get(unicode(self.course.id))
+        return tree['metadata'][unicode(block.location)]
+
+    def _hide(self, chapter):
+        """
+        Save chapter as only visible to staff.
+        """
+        chapter = self.store.get_item(chapter.location)
+        chapter.visible_to_staff_only = True
+        self.store.update_item(chapter, self.user_id)
+
+    def test_update(self):
+        with patch.object(self.store, '_compute_metadata_inheritance_tree') as mock_compute:
+            self._hide(self.chapters[0])
+        self.assertFalse(mock_compute.called)
+        self.assertTrue(self._cached_metadata(self.chapters[0])['visible_to_staff_only'])
+        self.assertNotIn('visible_to_staff_only', self._cached_metadata(self.chapters[1]))
+
+    def test_concurrent_update(self):
+        # Another process has saved the second chapter, but not yet updated the
+        # cached tree.
+        self.store.collection.update(
+            {'_id.category': 'chapter', '_id.name': 'chapter1'},
+            {'$set': {'metadata.visible_to_staff_only': True}},
+            multi=True,
+        )
+        self.store._bump_metadata_inheritance_generation(self.course.id)  # pylint: disable=protected-access
+
+        # The tree is recomputed, rather than updated without that change.
+        self._hide(self.chapters[0])
+        self.assertTrue(self._cached_metadata(self.chapters[0])['visible_to_staff_only'])
+        self.assertTrue(self._cached_metadata(self.chapters[1])['visible_to_staff_only'])
+
+    def test_outdated_tree(self):
+        # A tree which was cached by a process that missed a concurrent change
+        # isn't used, and is recomputed.
+        tree = self.store.metadata_inheritance_cache_subsystem.get(unicode(self.course.id))
+        self.store._bump_metadata_inheritance_generation(self.course.id)  # pylint: disable=protected-access
+        self.store.metadata_inheritance_cache_subsystem.set(unicode(self.course.id), tree)
+
+        # pylint: disable=protected-access
+        with patch.object(
+                self.store, '_compute_metadata_inheritance_tree', wraps=self.store._compute_metadata_inheritance_tree
+        ) as mock_compute:
+            self.store._get_cached_metadata_inheritance_tree(self.course.id)
+        self.assertTrue(mock_compute.called)
@@ -1,7 +1,7 @@
 """
     Test split modulestore w/o using any django stuff.
 """
-from mock import patch
+from mock import Mock, patch
 import datetime
 from importlib import import_module
 from path import Path as path
@@ -14,6 +14,7 @@ import ddt
 from contracts import contract
 from nose.plugins.attrib import attr
 from django.core.cache import get_cache, InvalidCacheBackendError
+from django.test.utils import override_settings
 
 from openedx.core.lib import tempdir
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict
@@ -32,6 +33,7 @@ from xmodule.fields import Date, Timedelta
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import StructureMemoryCache
 from xmodule.modulestore.tests.factories import check_mongo_calls
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import mock_tab_from_json
@@ -980,6 +982,41 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
+    @override_settings(COURSE_STRUCTURE_MEMORY_CACHE_SIZE=10 * 1024 * 1024)
+    def test_memory_cache(self):
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # the memory cache is in front of the dummy cache
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+
+        self.assertEqual(cached_structure, not_cached_structure)
+
+        # changes to the blocks of a structure don't affect the cached copy
+        for block in cached_structure['blocks'].itervalues():
+            block.fields['display_name'] = 'changed'
+        with check_mongo_calls(0):
+            self.assertEqual(self._get_structure(self.new_course), not_cached_structure)
+
+    def test_memory_cache_eviction(self):
+        memory_cache = StructureMemoryCache(100)
+        structures = [{'_id': index, 'blocks': {}} for index in range(3)]
+        self.assertEqual(memory_cache.set(0, structures[0], 40), 0)
+        self.assertEqual(memory_cache.set(1, structures[1], 40), 0)
+        self.assertEqual(memory_cache.get(0), structures[0])
+
+        # the least recently used structure is evicted to make room
+        self.assertEqual(memory_cache.set(2, structures[2], 40), 1)
+        self.assertEqual(memory_cache.size, 80)
+        self.assertIsNone(memory_cache.get(1))
+        self.assertEqual(memory_cache.get(0), structures[0])
+        self.assertEqual(memory_cache.get(2), structures[2])
+
+        # structures larger than the cache aren't stored
+        self.assertEqual(memory_cache.set(3, structures[0], 101), 0)
+        self.assertIsNone(memory_cache.get(3))
+
     def test_dummy_cache(self):
         with check_mongo_calls(1):
             not_cached_structure = self._get_structure(self.new_course)
@@ -1209,6 +1246,36 @@ class SplitModuleItemTests(SplitModuleTest):
         matches = modulestore().get_items(locator, settings={'group_access': {'$exists': False}})
         self.assertEqual(len(matches), 6)
 
+    def test_get_items_indexed(self):
+        '''
+        get_items and get_parent_location find the same blocks with the structure's indexes
+        '''
+        store = modulestore()
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        queries = [
+            {},
+            {'qualifiers': {'category': 'chapter'}},
+            {'qualifiers': {'name': 'chapter1'}},
+            {'qualifiers': {'category': 'chapter'}, 'settings': {'display_name': re.compile(r'Hera')}},
+            {'qualifiers': {'children': BlockKey('chapter', 'chapter1')}},
+            {'qualifiers': {'category': 'chapter'}, 'content': {'data': {'$exists': False}}},
+        ]
+        chapter_locator = locator.make_usage_key('chapter', 'chapter1')
+
+        def _find_blocks():
+            """
+            Return the locations found by each query, and the parent of chapter1
+            """
+            return (
+                [sorted(unicode(item.location) for item in store.get_items(locator, **query)) for query in queries],
+                store.get_parent_location(chapter_locator),
+            )
+
+        expected = _find_blocks()
+        with patch.object(store, 'request_cache', Mock(data={})) as request_cache:
+            self.assertEqual(_find_blocks(), expected)
+            self.assertEqual(len(request_cache.data['structure_indexes']), 1)
+
     def test_get_parents(self):
         '''
         get_parent_location(locator): BlockUsageLocator
@@ -216,6 +216,38 @@ class MemoryCache(object):
         """
         self._data[key] = value
 
+    def add(self, key, value):
+        """
+        Set a key in the cache, if it isn't set already.
+
+        Args:
+            key: The key to add.
+            value: The value to set the key to.
+
+        Returns:
+            Whether the key was set.
+        """
+        if key in self._data:
+            return False
+        self._data[key] = value
+        return True
+
+    def incr(self, key, delta=1):
+        """
+        Increment the value of a key in the cache, raising ValueError if it isn't set.
+
+        Args:
+            key: The key to increment.
+            delta: The amount to add to its value.
+
+        Returns:
+            The new value.
+        """
+        if key not in self._data:
+            raise ValueError("Key '{}' not found".format(key))
+        self._data[key] += delta
+        return self._data[key]
+
 
 class MongoContentstoreBuilder(object):
     """
@@ -0,0 +1,93 @@
+"""
+Benchmark of constructing CapaModules, as grade reports and progress pages do
+for every learner and problem of a course.
+
+Compares the number of modules constructed per second with and without the
+cache of parsed problem texts in capa.capa_problem.
+
+Run from common/lib/xmodule:
+
+    python -m xmodule.tests.benchmark_capa_module [<file of problem xml>] [<number of modules>]
+"""
+import sys
+import textwrap
+import timeit
+
+from mock import patch
+
+from xmodule.tests.test_capa_module import CapaFactory
+
+# A problem of the size and kinds of responses typical of courses.
+SAMPLE_PROBLEM_XML = textwrap.dedent("""\
+    <problem>
+        <p>A ball of mass <i>m</i> is dropped from a height <i>h</i> above the ground.</p>
+        <p>Ignore air resistance throughout.</p>
+        <multiplechoiceresponse>
+            <p>Which quantity is conserved as it falls?</p>
+            <choicegroup type="MultipleChoice">
+                <choice correct="false">Its kinetic energy</choice>
+                <choice correct="false">Its potential energy</choice>
+                <choice correct="true">Its total mechanical energy</choice>
+                <choice correct="false">Its momentum</choice>
+            </choicegroup>
+        </multiplechoiceresponse>
+        <p>Enter the speed of the ball when it reaches the ground, in terms of g and h.</p>
+        <formularesponse type="ci" samples="g,h@1,1:10,10#10" answer="sqrt(2*g*h)">
+            <responseparam type="tolerance" default="0.01"/>
+            <formulaequationinput size="40"/>
+        </formularesponse>
+        <p>For h = 20 m, how long, in seconds, does the ball take to fall?</p>
+        <numericalresponse answer="2.02">
+            <responseparam type="tolerance" default="1%"/>
+            <formulaequationinput size="10"/>
+        </numericalresponse>
+        <p>Which of these would change the time it takes to fall?</p>
+        <choiceresponse>
+            <checkboxgroup>
+                <choice correct="false">Doubling its mass</choice>
+                <choice correct="true">Doubling the height</choice>
+                <choice correct="true">Dropping it on the Moon</choice>
+            </checkboxgroup>
+        </choiceresponse>
+        <p>What is the name of the constant g?</p>
+        <stringresponse answer="gravitational acceleration" type="ci">
+            <additional_answer>acceleration due to gravity</additional_answer>
+            <textline size="40"/>
+        </stringresponse>
+        <solution>
+            <div class="detailed-solution">
+                <p>Explanation</p>
+                <p>Energy is conserved, so m*g*h = m*v^2/2 and v = sqrt(2*g*h).</p>
+            </div>
+        </solution>
+    </problem>
+""")
+
+
+def construct_modules(xml, count):
+    """
+    Constructs `count` CapaModules of the given problem, each with its own seed.
+    """
+    for seed in range(count):
+        CapaFactory.create(xml=xml, seed=seed)
+
+
+def main(argv):
+    """
+    Times constructing the modules with and without the cache and prints the results.
+    """
+    if len(argv) > 1:
+        with open(argv[1]) as xml_file:
+            xml = xml_file.read()
+    else:
+        xml = SAMPLE_PROBLEM_XML
+    count = int(argv[2]) if len(argv) > 2 else 500
+
+    for name, cache_size in [('uncached', 0), ('cached', 500)]:
+        with patch('capa.capa_problem.PROBLEM_TREE_CACHE_SIZE', cache_size):
+            seconds = min(timeit.repeat(lambda: construct_modules(xml, count), repeat=3, number=1))
+        print "{:<10}{:8.1f} modules/s".format(name, count / seconds)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
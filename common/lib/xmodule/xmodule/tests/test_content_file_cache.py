@@ -0,0 +1,150 @@
+"""
+Tests for xmodule.contentstore.file_cache
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import Mock, patch
+
+from xmodule.contentstore.file_cache import ContentFileCache, LOCK_FILE_PREFIX, LOCK_TIMEOUT
+
+
+class ContentFileCacheTest(unittest.TestCase):
+    """
+    Tests for ContentFileCache.
+    """
+    def setUp(self):
+        super(ContentFileCacheTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = ContentFileCache(self.directory, max_size=100)
+
+    def _set_last_used(self, content_digest, timestamp):
+        """
+        Sets the time the data with the given digest was last used.
+        """
+        os.utime(os.path.join(self.directory, content_digest[:2], content_digest), (timestamp, timestamp))
+
+    def test_add_and_open(self):
+        self.assertIsNone(self.cache.open('abcdef'))
+        self.assertFalse(self.cache.touch('abcdef'))
+
+        with self.cache.add('abcdef', ['some ', 'data']) as cached_file:
+            self.assertEqual(cached_file.read(), 'some data')
+        with self.cache.open('abcdef') as cached_file:
+            self.assertEqual(cached_file.read(), 'some data')
+        self.assertTrue(self.cache.touch('abcdef'))
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'ab')), ['abcdef'])
+
+    def test_add_failure(self):
+        def _chunks():
+            """
+            Yields some data, then fails.
+            """
+            yield 'some data'
+            raise IOError()
+
+        with self.assertRaises(IOError):
+            self.cache.add('abcdef', _chunks())
+        self.assertIsNone(self.cache.open('abcdef'))
+        # the partially written data is removed
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'ab')), [])
+
+    def test_tee(self):
+        chunks = self.cache.tee('abcdef', ['some ', 'data'])
+        self.assertEqual(next(chunks), 'some ')
+        # the data is only added once it has all been read
+        self.assertIsNone(self.cache.open('abcdef'))
+        self.assertEqual(list(chunks), ['data'])
+        with self.cache.open('abcdef') as cached_file:
+            self.assertEqual(cached_file.read(), 'some data')
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'ab')), ['abcdef'])
+
+    def test_tee_not_read_to_the_end(self):
+        chunks = self.cache.tee('abcdef', ['some ', 'data'])
+        self.assertEqual(next(chunks), 'some ')
+        chunks.close()
+        self.assertIsNone(self.cache.open('abcdef'))
+        # the partially written data and the lock are removed
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'ab')), [])
+
+    def test_tee_write_failure(self):
+        temp_file = Mock()
+        temp_file.name = os.path.join(self.directory, 'ab', 'temp')
+        temp_file.write.side_effect = IOError()
+        with patch('xmodule.contentstore.file_cache._temp_file', return_value=temp_file):
+            # the data is still all read
+            self.assertEqual(list(self.cache.tee('abcdef', ['some ', 'data'])), ['some ', 'data'])
+        self.assertIsNone(self.cache.open('abcdef'))
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'ab')), [])
+
+    def test_evict_least_recently_used(self):
+        for index, content_digest in enumerate(['aa', 'bb', 'cc']):
+            self.cache.add(content_digest, ['x' * 40]).close()
+            self._set_last_used(content_digest, 1000 + index)
+        # adding cc evicted aa, the least recently used
+        self.assertFalse(self.cache.touch('aa'))
+
+        # using bb makes cc the least recently used
+        self.cache.open('bb').close()
+        self.cache.add('dd', ['x' * 40]).close()
+        self.assertTrue(self.cache.touch('bb'))
+        self.assertFalse(self.cache.touch('cc'))
+        self.assertTrue(self.cache.touch('dd'))
+
+    def test_evicted_file_remains_readable(self):
+        self.cache.add('aa', ['x' * 40]).close()
+        self._set_last_used('aa', 1000)
+        with self.cache.open('aa') as cached_file:
+            self._set_last_used('aa', 1000)
+            self.cache.add('bb', ['y' * 80]).close()
+            self.assertFalse(self.cache.touch('aa'))
+            self.assertEqual(cached_file.read(), 'x' * 40)
+
+    def test_evict_only_when_full(self):
+        with patch.object(self.cache, 'evict', wraps=self.cache.evict) as mock_evict:
+            # the first addition scans the cache for its size
+            self.cache.add('aa', ['x' * 40]).close()
+            self.assertEqual(mock_evict.call_count, 1)
+            self.cache.add('bb', ['x' * 40]).close()
+            self.assertEqual(mock_evict.call_count, 1)
+            self.cache.add('cc', ['x' * 40]).close()
+            self.assertEqual(mock_evict.call_count, 2)
+        # evicted down to 90 bytes
+        self.assertEqual(sum(self.cache.touch(content_digest) for content_digest in ['aa', 'bb', 'cc']), 2)
+
+    def _lock(self, content_digest, timestamp=None):
+        """
+        Creates the lock file of another process adding the data with the given digest.
+        """
+        lock_path = os.path.join(self.directory, content_digest[:2], LOCK_FILE_PREFIX + content_digest)
+        os.makedirs(os.path.dirname(lock_path))
+        open(lock_path, 'w').close()
+        if timestamp is not None:
+            os.utime(lock_path, (timestamp, timestamp))
+
+    def test_add_locked(self):
+        self._lock('abcdef')
+
+        def _chunks():
+            """
+            Fails if the data is read.
+            """
+            raise AssertionError('the data is read')
+            yield  # pylint: disable=unreachable
+
+        self.assertIsNone(self.cache.add('abcdef', _chunks()))
+        self.assertIsNone(self.cache.open('abcdef'))
+
+    def test_tee_locked(self):
+        self._lock('abcdef')
+        self.assertEqual(list(self.cache.tee('abcdef', ['some ', 'data'])), ['some ', 'data'])
+        self.assertIsNone(self.cache.open('abcdef'))
+
+    def test_add_stale_lock(self):
+        self._lock('abcdef', timestamp=1000 - LOCK_TIMEOUT)
+        with self.cache.add('abcdef', ['some data']) as cached_file:
+            self.assertEqual(cached_file.read(), 'some data')
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'ab')), ['abcdef'])
@@ -2,9 +2,16 @@
 API entry point to the course_blocks app with top-level
 get_course_blocks and clear_course_from_cache functions.
 """
+from django.conf import settings
 from django.core.cache import cache
 
 from openedx.core.lib.block_cache.block_cache import get_blocks, clear_block_cache
+from openedx.core.lib.block_cache.tiered_cache import (
+    ChunkedDjangoCacheTier,
+    FileSystemTier,
+    LocalMemoryTier,
+    TieredCache,
+)
 from xmodule.modulestore.django import modulestore
 
 from .transformers import (
@@ -25,6 +32,42 @@ COURSE_BLOCK_ACCESS_TRANSFORMERS = [
     visibility.VisibilityTransformer(),
 ]
 
+# The tiered cache of serialized block structures, created on first use.
+_BLOCK_STRUCTURE_CACHE = None
+
+
+def get_block_structure_cache():
+    """
+    Returns the TieredCache used to store the block structures of courses,
+    configured by the BLOCK_STRUCTURES_CACHE setting.
+    """
+    global _BLOCK_STRUCTURE_CACHE  # pylint: disable=global-statement
+    if _BLOCK_STRUCTURE_CACHE is None:
+        config = settings.BLOCK_STRUCTURES_CACHE
+        tiers = [
+            LocalMemoryTier(config['MEMORY_CACHE_SIZE']),
+            ChunkedDjangoCacheTier(cache, config['CHUNK_SIZE']),
+        ]
+        if config.get('FILE_CACHE_ROOT'):
+            tiers.append(FileSystemTier(config['FILE_CACHE_ROOT'], config.get('FILE_CACHE_MAX_SIZE')))
+        _BLOCK_STRUCTURE_CACHE = TieredCache(tiers)
+    return _BLOCK_STRUCTURE_CACHE
+
+
+def _get_course_block_structure_cache(store, course_key):
+    """
+    Returns the block structure cache for the published version of the
+    given course, identified by the last time something was published to
+    it (an empty string for courses without subtree_edited_on, e.g. old
+    XML courses, or for deleted courses).
+    """
+    course = store.get_course(course_key, depth=0)
+    if course is None or course.subtree_edited_on is None:
+        version = u""
+    else:
+        version = course.subtree_edited_on.isoformat()
+    return get_block_structure_cache().for_version(version)
+
 
 def get_course_blocks(
         user,
@@ -73,7 +116,7 @@ def get_course_blocks(
         raise NotImplementedError
 
     return get_blocks(
-        cache,
+        _get_course_block_structure_cache(store, root_block_usage_key.course_key),
         store,
         CourseUsageInfo(root_block_usage_key.course_key, user),
         root_block_usage_key,
@@ -93,5 +136,6 @@ def clear_course_from_cache(course_key):
     entire block structure of the course is cached, even though
     arbitrary access to an intermediate block will be supported.
     """
-    course_usage_key = modulestore().make_course_usage_key(course_key)
-    return clear_block_cache(cache, course_usage_key)
+    store = modulestore()
+    course_usage_key = store.make_course_usage_key(course_key)
+    return clear_block_cache(_get_course_block_structure_cache(store, course_key), course_usage_key)
@@ -0,0 +1,92 @@
+"""
+Performance test of get_course_blocks and its tiered block structure cache.
+"""
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+import unittest
+
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+from student.tests.factories import UserFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+from .. import api
+
+
+# Shape of the test course: 5 chapters of 10 sequentials of 10 verticals of
+# 9 problems, i.e. 5,056 blocks.
+CHAPTERS, SEQUENTIALS, VERTICALS, PROBLEMS = 5, 10, 10, 9
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class GetCourseBlocksPerformance(ModuleStoreTestCase):
+    """
+    Times get_course_blocks on a course of about 5,000 blocks, cold (the
+    block structure is collected from the modulestore) and warm, served by
+    each tier of the block structure cache in turn.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(GetCourseBlocksPerformance, self).setUp()
+        file_cache_root = mkdtemp()
+        self.addCleanup(rmtree, file_cache_root, ignore_errors=True)
+        settings_override = override_settings(BLOCK_STRUCTURES_CACHE={
+            'MEMORY_CACHE_SIZE': 64 * 1024 * 1024,
+            'CHUNK_SIZE': 1000 * 1000,
+            'FILE_CACHE_ROOT': file_cache_root,
+            'FILE_CACHE_MAX_SIZE': None,
+        })
+        settings_override.__enter__()
+        self.addCleanup(settings_override.__exit__, None, None, None)
+        self._reset_block_structure_cache()
+        self.addCleanup(self._reset_block_structure_cache)
+
+        self.user = UserFactory.create()
+        self.course = CourseFactory.create()
+        with self.store.bulk_operations(self.course.id):
+            for __ in xrange(CHAPTERS):
+                chapter = ItemFactory.create(parent=self.course, category='chapter')
+                for __ in xrange(SEQUENTIALS):
+                    sequential = ItemFactory.create(parent=chapter, category='sequential')
+                    for __ in xrange(VERTICALS):
+                        vertical = ItemFactory.create(parent=sequential, category='vertical')
+                        for __ in xrange(PROBLEMS):
+                            ItemFactory.create(parent=vertical, category='problem')
+
+    def _reset_block_structure_cache(self):
+        """
+        Discards the block structure cache, as a new process would have it.
+        """
+        api._BLOCK_STRUCTURE_CACHE = None  # pylint: disable=protected-access
+
+    def _time_get_course_blocks(self):
+        """
+        Returns the time in ms taken by get_course_blocks, and the number of
+        blocks it returned.
+        """
+        start = time()
+        block_structure = api.get_course_blocks(self.user, self.store.make_course_usage_key(self.course.id))
+        return (time() - start) * 1000, len(list(block_structure.get_block_keys()))
+
+    def test_get_course_blocks(self):
+        api.clear_course_from_cache(self.course.id)
+        print 'Cold:                 {:8.2f} ms ({} blocks)'.format(*self._time_get_course_blocks())
+        print 'Warm, memory tier:    {:8.2f} ms ({} blocks)'.format(*self._time_get_course_blocks())
+
+        self._reset_block_structure_cache()
+        print 'Warm, django tier:    {:8.2f} ms ({} blocks)'.format(*self._time_get_course_blocks())
+
+        self._reset_block_structure_cache()
+        cache.clear()
+        print 'Warm, file tier:      {:8.2f} ms ({} blocks)'.format(*self._time_get_course_blocks())
+
+        print 'Tier stats: {}'.format(api.get_block_structure_cache().stats())
@@ -26,6 +26,11 @@ from xmodule.modulestore.inheritance import InheritanceMixin
 NOTSET = object()
 ENABLED_OVERRIDE_PROVIDERS_KEY = "courseware.field_overrides.enabled_providers.{course_id}"
 
+# Names of the request caches holding resolved overrides and lookup counters.
+RESOLVED_OVERRIDES_CACHE_NAME = "courseware.field_overrides.resolved"
+INHERITED_OVERRIDES_CACHE_NAME = "courseware.field_overrides.inherited"
+OVERRIDE_LOOKUP_STATS_CACHE_NAME = "courseware.field_overrides.lookup_stats"
+
 
 def resolve_dotted(name):
     """
@@ -113,18 +118,64 @@ class OverrideFieldData(FieldData):
     def __init__(self, user, fallback, providers):
         self.fallback = fallback
         self.providers = tuple(provider(user) for provider in providers)
+        self._user_key = getattr(user, 'id', user)
 
     def get_override(self, block, name):
         """
         Checks for an override for the field identified by `name` in `block`.
         Returns the overridden value or `NOTSET` if no override is found.
+
+        The result is cached for the rest of the request.
         """
-        if not overrides_disabled():
-            for provider in self.providers:
-                value = provider.get(block, name, NOTSET)
-                if value is not NOTSET:
-                    return value
-        return NOTSET
+        if overrides_disabled():
+            return NOTSET
+
+        resolved_overrides = RequestCache.get_request_cache(RESOLVED_OVERRIDES_CACHE_NAME)
+        cache_key = self._cache_key(block, name)
+        if cache_key in resolved_overrides:
+            _increment_lookup_stat('cache_hits')
+            return resolved_overrides[cache_key]
+
+        value = NOTSET
+        for provider in self.providers:
+            _increment_lookup_stat('provider_lookups')
+            value = provider.get(block, name, NOTSET)
+            if value is not NOTSET:
+                break
+        resolved_overrides[cache_key] = value
+        return value
+
+    def get_inherited_override(self, block, name):
+        """
+        Returns the override of the field identified by `name` in the nearest
+        ancestor of `block` that overrides it, or `NOTSET` if no ancestor
+        does.
+
+        The result is cached for the rest of the request, along with those of
+        all ancestors of `block`, so each block's overrides are looked up at
+        most once no matter how many of its descendants are read.
+        """
+        if overrides_disabled():
+            return NOTSET
+
+        inherited_overrides = RequestCache.get_request_cache(INHERITED_OVERRIDES_CACHE_NAME)
+        cache_key = self._cache_key(block, name)
+        if cache_key not in inherited_overrides:
+            value = NOTSET
+            parent = block.get_parent()
+            if parent:
+                value = self.get_override(parent, name)
+                if value is NOTSET:
+                    value = self.get_inherited_override(parent, name)
+            inherited_overrides[cache_key] = value
+        return inherited_overrides[cache_key]
+
+    def _cache_key(self, block, name):
+        """
+        Returns the key under which the override of the field identified by
+        `name` in `block` is cached for this user.
+        """
+        return (self._user_key, getattr(block, 'location', block), name)
 
     def get(self, block, name):
         value = self.get_override(block, name)
@@ -149,9 +200,8 @@ class OverrideFieldData(FieldData):
             # override and not the original value for this block.
             inheritable = InheritanceMixin.fields.keys()
             if name in inheritable:
-                for ancestor in _lineage(block):
-                    if self.get_override(ancestor, name) is not NOTSET:
-                        return False
+                if self.get_inherited_override(block, name) is not NOTSET:
+                    return False
 
         return has is not NOTSET or self.fallback.has(block, name)
 
@@ -164,13 +214,47 @@ class OverrideFieldData(FieldData):
         if self.providers and not overrides_disabled():
             inheritable = InheritanceMixin.fields.keys()
             if name in inheritable:
-                for ancestor in _lineage(block):
-                    value = self.get_override(ancestor, name)
-                    if value is not NOTSET:
-                        return value
+                value = self.get_inherited_override(block, name)
+                if value is not NOTSET:
+                    return value
         return self.fallback.default(block, name)
 
 
+def clear_resolved_overrides():
+    """
+    Discards the overrides resolved so far in this request.  This must be
+    called whenever an override is written, so that subsequent reads in the
+    same request see the new value.
+
+    Outside of HTTP requests the request cache is only cleared between Celery
+    tasks, so code grading or rescoring students in a loop must also call this
+    once it is done with each student.
+    """
+    RequestCache.get_request_cache(RESOLVED_OVERRIDES_CACHE_NAME).clear()
+    RequestCache.get_request_cache(INHERITED_OVERRIDES_CACHE_NAME).clear()
+
+
+def get_override_lookup_stats():
+    """
+    Returns a dictionary of the counters of override lookups made in this
+    request:
+
+        provider_lookups: the number of calls to providers' `get` methods.
+        cache_hits: the number of overrides found already resolved.
+    """
+    stats = {'provider_lookups': 0, 'cache_hits': 0}
+    stats.update(RequestCache.get_request_cache(OVERRIDE_LOOKUP_STATS_CACHE_NAME))
+    return stats
+
+
+def _increment_lookup_stat(name):
+    """
+    Increments the named override lookup counter of this request.
+    """
+    stats = RequestCache.get_request_cache(OVERRIDE_LOOKUP_STATS_CACHE_NAME)
+    stats[name] = stats.get(name, 0) + 1
+
+
 class _OverridesDisabled(threading.local):
     """
     A thread local used to manage state of overrides being disabled or not.
@@ -235,14 +319,3 @@ class FieldOverrideProvider(object):
         Concrete implementations are responsible for implementing this method
         """
         return False
-
-
-def _lineage(block):
-    """
-    Returns an iterator over all ancestors of the given block, starting with
-    its immediate parent and ending at the root of the block tree.
-    """
-    parent = block.get_parent()
-    while parent:
-        yield parent
-        parent = parent.get_parent()
@@ -2,6 +2,7 @@
 from __future__ import division
 from collections import defaultdict
 from functools import partial
+from itertools import islice
 import json
 import random
 import logging
@@ -16,17 +17,20 @@ import dogstats_wrapper as dog_stats_api
 
 from courseware import courses
 from courseware.access import has_access
-from courseware.model_data import FieldDataCache, ScoresClient
-from student.models import anonymous_id_for_user
+from courseware.field_overrides import clear_resolved_overrides
+from courseware.model_data import FieldDataCache, ScoresClient, get_child_descriptors
+from student.models import anonymous_id_for_user, anonymous_ids_for_users
 from util.module_utils import yield_dynamic_descriptor_descendants
 from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
-from .models import StudentModule
+from .models import PersistentSubsectionGrade, StudentModule
 from .module_render import get_module_for_descriptor
+from .student_field_overrides import clear_prefetched_overrides, prefetch_overrides_for_users
+from ccx_keys.locator import CCXLocator
 from opaque_keys import InvalidKeyError
-from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from openedx.core.djangoapps.signals.signals import GRADES_UPDATED
 
 
@@ -172,6 +176,128 @@ class ProgressSummary(object):
         return earned, possible
 
 
+def _course_version(course):
+    """
+    Return a string identifying the last time something was published to the
+    live version of `course`.
+    """
+    return course.subtree_edited_on.isoformat()
+
+
+class PersistedSubsectionGrades(object):
+    """
+    The persisted subsection grades of a single student in a single course.
+
+    Each subsection's grade is stored as a list of score entries, one for each
+    of the subsection's descendants that the student has access to, in the
+    order they are visited while grading. An entry is a dict with the keys
+    'location', 'parent', 'earned', 'possible', 'graded' and 'display_name'.
+
+    Grades computed against a different version of the course are ignored, and
+    are overwritten the next time the subsection is graded. The receivers in
+    `courseware.models` discard the grades that changes to the student's
+    scores, cohorts, course roles and partition groups may affect.
+
+    Subsections containing blocks the student can't access, which may become
+    accessible without any of those changes (e.g. once they start), aren't
+    persisted, nor are the subsections of CCX courses, whose schedule can be
+    changed without publishing the course, nor those of old XML courses, which
+    have no version (subtree_edited_on) to detect content changes by.
+    """
+    def __init__(self, student, course):
+        self.student = student
+        self.course_key = course.id
+        self.course_version = _course_version(course)
+        self._grades = {
+            subsection_grade.usage_key.map_into_course(self.course_key): subsection_grade
+            for subsection_grade in PersistentSubsectionGrade.objects.filter(
+                user=student, course_id=self.course_key
+            )
+        }
+
+    @classmethod
+    def create_for_student(cls, student, course):
+        """
+        Return the PersistedSubsectionGrades of `student` in `course`, or None
+        if persistent subsection grades are not enabled, `course` is a CCX, or
+        it has no version.
+        """
+        if not settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES'):
+            return None
+        if isinstance(course.id, CCXLocator) or course.subtree_edited_on is None:
+            return None
+        return cls(student, course)
+
+    def get(self, location):
+        """
+        Return the score entries of the subsection at `location`, or None if
+        there are no valid persisted grades for it.
+        """
+        subsection_grade = self._grades.get(location)
+        if subsection_grade is None or subsection_grade.course_version != self.course_version:
+            return None
+
+        entries = json.loads(subsection_grade.scores)
+        for entry in entries:
+            entry['location'] = self._usage_key(entry['location'])
+            entry['parent'] = self._usage_key(entry['parent'])
+        return entries
+
+    def set(self, location, entries):
+        """
+        Persist the score entries of the subsection at `location`.
+        """
+        scores = json.dumps([
+            dict(entry, location=unicode(entry['location']), parent=unicode(entry['parent']) if entry['parent'] else None)
+            for entry in entries
+        ])
+        subsection_grade, created = PersistentSubsectionGrade.objects.get_or_create(
+            user=self.student,
+            course_id=self.course_key,
+            usage_key=location,
+            defaults={'course_version': self.course_version, 'scores': scores},
+        )
+        if not created:
+            subsection_grade.course_version = self.course_version
+            subsection_grade.scores = scores
+            subsection_grade.save()
+        self._grades[location] = subsection_grade
+
+    def _usage_key(self, serialized_key):
+        """Convert a serialized location back into a UsageKey in this course."""
+        if serialized_key is None:
+            return None
+        return UsageKey.from_string(serialized_key).map_into_course(self.course_key)
+
+
+def invalidate_subsection_grade(user_id, course_id, usage_id):
+    """
+    Discard the persisted grade of the subsection (the child of a chapter)
+    that contains the block `usage_id`, for the given user.
+
+    If the subsection can't be found, all of the user's persisted grades in
+    the course are discarded.
+    """
+    course_key = CourseKey.from_string(course_id) if isinstance(course_id, basestring) else course_id
+    grades = PersistentSubsectionGrade.objects.filter(user__id=user_id, course_id=course_key)
+    if not grades.exists():
+        return
+
+    store = modulestore()
+    try:
+        location = UsageKey.from_string(unicode(usage_id)).map_into_course(course_key)
+        parent = store.get_parent_location(location)
+        while parent is not None and parent.block_type != 'chapter':
+            location, parent = parent, store.get_parent_location(parent)
+    except (InvalidKeyError, ItemNotFoundError):
+        parent = None
+
+    if parent is None:
+        grades.delete()
+    else:
+        grades.filter(usage_key=location).delete()
+
+
 def descriptor_affects_grading(block_types_affecting_grading, descriptor):
     """
     Returns True if the descriptor could have any impact on grading, else False.
@@ -296,14 +422,17 @@ def answer_distributions(course_key):
 
 
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False, field_data_cache=None, scores_client=None):
+def grade(student, request, course, keep_raw_scores=False, field_data_cache=None, scores_client=None,
+          max_scores_cache=None):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     Send a signal to update the minimum grade requirement status.
     """
     with manual_transaction():
-        grade_summary = _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client)
+        grade_summary = _grade(
+            student, request, course, keep_raw_scores, field_data_cache, scores_client, max_scores_cache
+        )
         responses = GRADES_UPDATED.send_robust(
             sender=None,
             username=student.username,
@@ -318,7 +447,7 @@ def grade(student, request, course, keep_raw_scores=False, field_data_cache=None
         return grade_summary
 
 
-def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client):
+def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client, max_scores_cache=None):
     """
     Unwrapped version of "grade"
 
@@ -337,6 +466,9 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
 
+    If a `max_scores_cache` is passed in, the caller owns it and is
+    responsible for pushing its updates to the remote cache.
+
     More information on the format is in the docstring for CourseGrader.
     """
     if field_data_cache is None:
@@ -353,13 +485,18 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
     # Django translation --> ... --> courseware --> submissions
     from submissions import api as sub_api  # installed from the edx-submissions repository
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
-    max_scores_cache = MaxScoresCache.create_for_course(course)
 
-    # For the moment, we have to get scorable_locations from field_data_cache
-    # and not from scores_client, because scores_client is ignorant of things
-    # in the submissions API. As a further refactoring step, submissions should
-    # be hidden behind the ScoresClient.
-    max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
+    owns_max_scores_cache = max_scores_cache is None
+    if owns_max_scores_cache:
+        max_scores_cache = MaxScoresCache.create_for_course(course)
+
+        # For the moment, we have to get scorable_locations from field_data_cache
+        # and not from scores_client, because scores_client is ignorant of things
+        # in the submissions API. As a further refactoring step, submissions should
+        # be hidden behind the ScoresClient.
+        max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
+
+    persisted_grades = PersistedSubsectionGrades.create_for_student(student, course)
 
     grading_context = course.grading_context
     raw_scores = []
@@ -398,30 +535,36 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
             # If we haven't seen a single problem in the section, we don't have
             # to grade it at all! We can assume 0%
             if should_grade_section:
-                scores = []
-
-                def create_module(descriptor):
-                    '''creates an XModule instance given a descriptor'''
-                    # TODO: We need the request to pass into here. If we could forego that, our arguments
-                    # would be simpler
-                    return get_module_for_descriptor(
-                        student, request, descriptor, field_data_cache, course.id, course=course
-                    )
-
-                descendants = yield_dynamic_descriptor_descendants(section_descriptor, student.id, create_module)
-                for module_descriptor in descendants:
-                    user_access = has_access(student, 'load', module_descriptor, module_descriptor.location.course_key)
-                    if not user_access:
-                        continue
+                section_location = section_descriptor.location
+                score_entries = persisted_grades.get(section_location) if persisted_grades else None
+                if score_entries is None:
+                    def create_module(descriptor):
+                        '''creates an XModule instance given a descriptor'''
+                        # TODO: We need the request to pass into here. If we could forego that, our arguments
+                        # would be simpler
+                        return get_module_for_descriptor(
+                            student, request, descriptor, field_data_cache, course.id, course=course
+                        )
 
-                    (correct, total) = get_score(
+                    score_entries, all_accessible = _section_score_entries(
                         student,
-                        module_descriptor,
+                        section_descriptor,
                         create_module,
                         scores_client,
                         submissions_scores,
                         max_scores_cache,
                     )
+                    # Sections whose problems always need to be regraded,
+                    # or with blocks the student can't access (yet), can
+                    # never be served from persisted grades.
+                    if persisted_grades and all_accessible and not any(
+                            descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
+                    ):
+                        persisted_grades.set(section_location, score_entries)
+
+                scores = []
+                for entry in score_entries:
+                    correct, total = entry['earned'], entry['possible']
                     if correct is None and total is None:
                         continue
 
@@ -431,7 +574,7 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
                         else:
                             correct = total
 
-                    graded = module_descriptor.graded
+                    graded = entry['graded']
                     if not total > 0:
                         # We simply cannot grade a problem that is 12/0, because we might need it as a percentage
                         graded = False
@@ -441,8 +584,8 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
                             correct,
                             total,
                             graded,
-                            module_descriptor.display_name_with_default,
-                            module_descriptor.location
+                            entry['display_name'],
+                            entry['location']
                         )
                     )
 
@@ -479,11 +622,97 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
         # so grader can be double-checked
         grade_summary['raw_scores'] = raw_scores
 
-    max_scores_cache.push_to_remote()
+    if owns_max_scores_cache:
+        max_scores_cache.push_to_remote()
 
     return grade_summary
 
 
+def _section_score_entries(student, section_descriptor, create_module, scores_client, submissions_scores,
+                           max_scores_cache):
+    """
+    Walk the descendants of `section_descriptor` that `student` has access to
+    and return a score entry (see PersistedSubsectionGrades) for each of them,
+    and whether `student` has access to all of them.
+    """
+    entries = []
+    all_accessible = True
+    descendants = yield_dynamic_descriptor_descendants(section_descriptor, student.id, create_module)
+    for module_descriptor in descendants:
+        user_access = has_access(student, 'load', module_descriptor, module_descriptor.location.course_key)
+        if not user_access:
+            all_accessible = False
+            continue
+
+        (correct, total) = get_score(
+            student,
+            module_descriptor,
+            create_module,
+            scores_client,
+            submissions_scores,
+            max_scores_cache,
+        )
+        entries.append({
+            'location': module_descriptor.location,
+            'parent': module_descriptor.parent,
+            'earned': correct,
+            'possible': total,
+            'graded': module_descriptor.graded,
+            'display_name': module_descriptor.display_name_with_default,
+        })
+    return entries, all_accessible
+
+
+def mismatched_persisted_grades(student, course):
+    """
+    Compare the persisted subsection grades of `student` in `course` against
+    a full recomputation, and return a list of the locations of subsections
+    whose persisted scores differ from the recomputed ones.
+
+    Subsections without valid persisted grades are not checked.
+    """
+    if course.subtree_edited_on is None:
+        # grades of courses without a version are never persisted
+        return []
+    persisted_grades = PersistedSubsectionGrades(student, course)
+    request = _get_mock_request(student)
+    request.session = {}
+    with manual_transaction():
+        field_data_cache = field_data_cache_for_grading(course, student)
+    scores_client = ScoresClient.from_field_data_cache(field_data_cache)
+
+    # See _grade for why this is imported here.
+    from submissions import api as sub_api  # installed from the edx-submissions repository
+    submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
+    max_scores_cache = MaxScoresCache.create_for_course(course)
+    max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id, course=course)
+
+    mismatched = []
+    for sections in course.grading_context['graded_sections'].itervalues():
+        for section in sections:
+            section_location = section['section_descriptor'].location
+            score_entries = persisted_grades.get(section_location)
+            if score_entries is None:
+                continue
+
+            recomputed_entries, __ = _section_score_entries(
+                student,
+                section['section_descriptor'],
+                create_module,
+                scores_client,
+                submissions_scores,
+                max_scores_cache,
+            )
+            if score_entries != recomputed_entries:
+                mismatched.append(section_location)
+
+    return mismatched
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -554,6 +783,15 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
     If the student does not have access to load the course module, this function
     will return None.
 
+    If ENABLE_PERSISTENT_SUBSECTION_GRADES is enabled, the scores of a
+    subsection with persisted grades are the score entries persisted the last
+    time grade() graded it, instead of being read again from the subsection's
+    descendants: scores that changed since without a SCORE_CHANGED signal, or
+    without any of the other changes that discard persisted grades (see
+    PersistedSubsectionGrades), aren't shown until the subsection is graded
+    again. Subsections without persisted grades are walked as before, and
+    their scores aren't persisted.
+
     """
     with manual_transaction():
         if field_data_cache is None:
@@ -582,6 +820,10 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
     # be hidden behind the ScoresClient.
     max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
 
+    # Graded subsections that have already been graded for this student can
+    # be summarized from their persisted grades, without walking them again.
+    persisted_grades = PersistedSubsectionGrades.create_for_student(student, course)
+
     chapters = []
     locations_to_children = defaultdict(list)
     locations_to_weighted_scores = {}
@@ -601,33 +843,27 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
                 graded = section_module.graded
                 scores = []
 
-                module_creator = section_module.xmodule_runtime.get_module
-
-                for module_descriptor in yield_dynamic_descriptor_descendants(
-                        section_module, student.id, module_creator
-                ):
-                    locations_to_children[module_descriptor.parent].append(module_descriptor.location)
-                    (correct, total) = get_score(
-                        student,
-                        module_descriptor,
-                        module_creator,
-                        scores_client,
-                        submissions_scores,
-                        max_scores_cache,
+                score_entries = persisted_grades.get(section_module.location) if persisted_grades else None
+                if score_entries is None:
+                    score_entries = _progress_score_entries(
+                        student, section_module, scores_client, submissions_scores, max_scores_cache
                     )
-                    if correct is None and total is None:
+
+                for entry in score_entries:
+                    locations_to_children[entry['parent']].append(entry['location'])
+                    if entry['earned'] is None and entry['possible'] is None:
                         continue
 
                     weighted_location_score = Score(
-                        correct,
-                        total,
+                        entry['earned'],
+                        entry['possible'],
                         graded,
-                        module_descriptor.display_name_with_default,
-                        module_descriptor.location
+                        entry['display_name'],
+                        entry['location']
                     )
 
                     scores.append(weighted_location_score)
-                    locations_to_weighted_scores[module_descriptor.location] = weighted_location_score
+                    locations_to_weighted_scores[entry['location']] = weighted_location_score
 
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
@@ -656,6 +892,30 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
     return ProgressSummary(chapters, locations_to_weighted_scores, locations_to_children)
 
 
+def _progress_score_entries(student, section_module, scores_client, submissions_scores, max_scores_cache):
+    """
+    Yield a score entry (see PersistedSubsectionGrades) for each of the
+    descendants of the bound `section_module`.
+    """
+    module_creator = section_module.xmodule_runtime.get_module
+    for module_descriptor in yield_dynamic_descriptor_descendants(section_module, student.id, module_creator):
+        (correct, total) = get_score(
+            student,
+            module_descriptor,
+            module_creator,
+            scores_client,
+            submissions_scores,
+            max_scores_cache,
+        )
+        yield {
+            'location': module_descriptor.location,
+            'parent': module_descriptor.parent,
+            'earned': correct,
+            'possible': total,
+            'display_name': module_descriptor.display_name_with_default,
+        }
+
+
 def weighted_score(raw_correct, raw_total, weight):
     """Return a tuple that represents the weighted (correct, total) score."""
     # If there is no weighting, or weighting can't be applied, return input.
@@ -758,7 +1018,7 @@ def manual_transaction():
         transaction.commit()
 
 
-def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
+def iterate_grades_for(course_or_id, students, keep_raw_scores=False, batch_size=None):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
@@ -775,34 +1035,115 @@ def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
     - grade_breakdown : A breakdown of the major components that
         make up the final grade. (For display)
     - raw_scores: contains scores for every graded module
+
+    If `batch_size` is given, students are graded in bulk: the descriptors that
+    affect grading are collected once for the whole run, and the scores of each
+    batch of `batch_size` students are fetched with a single query, as are
+    their individual field overrides if PREFETCH_STUDENT_FIELD_OVERRIDES is
+    enabled. The gradesets produced are identical to those produced one
+    student at a time.
     """
     if isinstance(course_or_id, (basestring, CourseKey)):
         course = courses.get_course_by_id(course_or_id)
     else:
         course = course_or_id
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
-            try:
-                request = _get_mock_request(student)
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course, keep_raw_scores)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course.id,
-                    exc.message
+    if batch_size is None:
+        for student in students:
+            gradeset = _grade_for_iteration(course, student, keep_raw_scores)
+            # discard the overrides prefetched for this student
+            clear_prefetched_overrides()
+            yield gradeset
+        return
+
+    with modulestore().bulk_operations(course.id):
+        descriptors = get_child_descriptors(
+            course,
+            depth=None,
+            descriptor_filter=partial(descriptor_affects_grading, course.block_types_affecting_grading),
+        )
+    scorable_locations = set(descriptor.location for descriptor in descriptors if descriptor.has_score)
+    prefetch_overrides = settings.FEATURES.get('PREFETCH_STUDENT_FIELD_OVERRIDES')
+
+    for batch in _batches(students, batch_size):
+        with dog_stats_api.timer('lms.grades.iterate_grades_for.batch', tags=[u'action:{}'.format(course.id)]):
+            scores_clients = ScoresClient.create_for_users(
+                course.id, [student.id for student in batch], scorable_locations
+            )
+            max_scores_cache = MaxScoresCache.create_for_course(course)
+            max_scores_cache.fetch_from_remote(scorable_locations)
+            if prefetch_overrides:
+                prefetch_overrides_for_users(batch, course.id)
+            # memoized on the students, for grading them without saving their ids one at a time
+            anonymous_ids_for_users(batch, course.id)
+
+        try:
+            for student in batch:
+                yield _grade_for_iteration(
+                    course,
+                    student,
+                    keep_raw_scores,
+                    descriptors=descriptors,
+                    scores_client=scores_clients[student.id],
+                    max_scores_cache=max_scores_cache,
                 )
-                yield student, {}, exc.message
+            max_scores_cache.push_to_remote()
+        finally:
+            # The overrides prefetched for the batch are discarded even if the
+            # iteration is abandoned, as the request cache is only cleared
+            # once the request or Celery task is done.
+            clear_prefetched_overrides()
+
+
+def _grade_for_iteration(course, student, keep_raw_scores, descriptors=None, **grade_kwargs):
+    """
+    Grade a single student for iterate_grades_for, returning a tuple of
+    (student, gradeset, err_msg).
+
+    If `descriptors` is given, the student's FieldDataCache is built from that
+    pre-collected list instead of walking the course again. Any other keyword
+    arguments are passed through to grade().
+    """
+    with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
+        try:
+            request = _get_mock_request(student)
+            # Grading calls problem rendering, which calls masquerading,
+            # which checks session vars -- thus the empty session dict below.
+            # It's not pretty, but untangling that is currently beyond the
+            # scope of this feature.
+            request.session = {}
+            if descriptors is not None:
+                grade_kwargs['field_data_cache'] = FieldDataCache(descriptors, course.id, student)
+            gradeset = grade(student, request, course, keep_raw_scores, **grade_kwargs)
+            return student, gradeset, ""
+        except Exception as exc:  # pylint: disable=broad-except
+            # Keep marching on even if this student couldn't be graded for
+            # some reason, but log it for future reference.
+            log.exception(
+                'Cannot grade student %s (%s) in course %s because of exception: %s',
+                student.username,
+                student.id,
+                course.id,
+                exc.message
+            )
+            return student, {}, exc.message
+        finally:
+            # The request cache is only cleared once the request or Celery
+            # task is done, so the overrides resolved for this student are
+            # discarded here.
+            clear_resolved_overrides()
+
+
+def _batches(iterable, batch_size):
+    """
+    Yield successive lists of at most `batch_size` items from `iterable`.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
 
 
 def _get_mock_request(student):
@@ -0,0 +1,62 @@
+"""
+Command to check the persisted subsection grades of a course against a full
+recomputation of those grades.
+"""
+from optparse import make_option
+from textwrap import dedent
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from courseware.courses import get_course_by_id
+from courseware.grades import mismatched_persisted_grades
+from courseware.models import PersistentSubsectionGrade
+
+
+class Command(BaseCommand):
+    """
+    Compare the persisted subsection grades of every student enrolled in a
+    course against a full recomputation, and report any subsections whose
+    persisted grades differ.
+
+    With --delete, mismatched persisted grades are discarded, so that they are
+    recomputed the next time the student is graded.
+    """
+    help = dedent(__doc__).strip()
+    args = '<course_id>'
+    option_list = BaseCommand.option_list + (
+        make_option('--delete',
+                    action='store_true',
+                    dest='delete',
+                    default=False,
+                    help='Delete persisted grades that do not match the recomputed grades'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("check_persistent_grades requires exactly one argument: <course_id>")
+
+        try:
+            course_key = CourseKey.from_string(args[0])
+        except InvalidKeyError:
+            raise CommandError("Invalid course_id: '{}'".format(args[0]))
+
+        course = get_course_by_id(course_key)
+        students = User.objects.filter(
+            courseenrollment__course_id=course_key,
+            courseenrollment__is_active=True,
+        ).order_by('id')
+
+        mismatch_count = 0
+        for student in students:
+            for location in mismatched_persisted_grades(student, course):
+                mismatch_count += 1
+                self.stdout.write(u"Mismatch: user {} subsection {}\n".format(student.id, location))
+                if options['delete']:
+                    PersistentSubsectionGrade.objects.filter(
+                        user=student, course_id=course_key, usage_key=location
+                    ).delete()
+
+        self.stdout.write(u"{} mismatched subsection grades found.\n".format(mismatch_count))
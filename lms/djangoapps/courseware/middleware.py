@@ -4,8 +4,10 @@ Middleware for the courseware app
 
 from django.shortcuts import redirect
 from django.core.urlresolvers import reverse
+import dogstats_wrapper as dog_stats_api
 
 from courseware.courses import UserNotEnrolled
+from courseware.field_overrides import get_override_lookup_stats
 
 
 class RedirectUnenrolledMiddleware(object):
@@ -22,3 +24,19 @@ class RedirectUnenrolledMiddleware(object):
                     args=[course_key.to_deprecated_string()]
                 )
             )
+
+
+class FieldOverrideLookupStatsMiddleware(object):
+    """
+    Report the numbers of field override provider lookups and resolved
+    override cache hits of each request that looked up any overrides.
+
+    Must come after `request_cache.middleware.RequestCache`, which clears
+    the counters.
+    """
+    def process_response(self, _request, response):
+        stats = get_override_lookup_stats()
+        if stats['provider_lookups'] or stats['cache_hits']:
+            for name, value in stats.iteritems():
+                dog_stats_api.histogram('lms.field_overrides.{}'.format(name), value)
+        return response
@@ -682,6 +682,30 @@ class UserInfoCache(DjangoOrmFieldCache):
         return key.field_name
 
 
+def get_child_descriptors(descriptor, depth=None, descriptor_filter=lambda descriptor: True):
+    """
+    Return a list of all child descriptors down to the specified depth
+    that match the descriptor filter. Includes `descriptor`
+
+    descriptor: The parent to search inside
+    depth: The number of levels to descend, or None for infinite depth
+    descriptor_filter(descriptor): A function that returns True
+        if descriptor should be included in the results
+    """
+    if descriptor_filter(descriptor):
+        descriptors = [descriptor]
+    else:
+        descriptors = []
+
+    if depth is None or depth > 0:
+        new_depth = depth - 1 if depth is not None else depth
+
+        for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
+            descriptors.extend(get_child_descriptors(child, new_depth, descriptor_filter))
+
+    return descriptors
+
+
 class FieldDataCache(object):
     """
     A cache of django model objects needed to supply the data
@@ -752,29 +776,6 @@ class FieldDataCache(object):
                 should be cached
         """
 
-        def get_child_descriptors(descriptor, depth, descriptor_filter):
-            """
-            Return a list of all child descriptors down to the specified depth
-            that match the descriptor filter. Includes `descriptor`
-
-            descriptor: The parent to search inside
-            depth: The number of levels to descend, or None for infinite depth
-            descriptor_filter(descriptor): A function that returns True
-                if descriptor should be included in the results
-            """
-            if descriptor_filter(descriptor):
-                descriptors = [descriptor]
-            else:
-                descriptors = []
-
-            if depth is None or depth > 0:
-                new_depth = depth - 1 if depth is not None else depth
-
-                for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
-                    descriptors.extend(get_child_descriptors(child, new_depth, descriptor_filter))
-
-            return descriptors
-
         with modulestore().bulk_operations(descriptor.location.course_key):
             descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
 
@@ -990,6 +991,37 @@ class ScoresClient(object):
         client.fetch_scores(fd_cache.scorable_locations)
         return client
 
+    @classmethod
+    def create_for_users(cls, course_key, user_ids, locations):
+        """
+        Create a ScoresClient for each of `user_ids` with a single query.
+
+        Returns a dict mapping user_id to a fetched ScoresClient. Users with no
+        scores in this course still get an (empty) fetched client.
+        """
+        clients = {}
+        for user_id in user_ids:
+            client = cls(course_key, user_id)
+            client._has_fetched = True  # pylint: disable=protected-access
+            clients[user_id] = client
+
+        if not clients:
+            return clients
+
+        scores_qset = StudentModule.objects.filter(
+            student_id__in=clients.keys(),
+            course_id=course_key,
+            module_state_key__in=set(locations),
+        )
+        for user_id, location, correct, total in scores_qset.values_list(
+                'student_id', 'module_state_key', 'grade', 'max_grade'
+        ):
+            # See fetch_scores() for why we map into the course here.
+            usage_key = UsageKey.from_string(location).map_into_course(course_key)
+            clients[user_id]._locations_to_scores[usage_key] = cls.Score(correct, total)  # pylint: disable=protected-access
+
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 @donottrack(StudentModule)
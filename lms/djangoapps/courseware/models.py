@@ -18,14 +18,16 @@ import itertools
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver, Signal
 
 from model_utils.models import TimeStampedModel
-from student.models import user_by_anonymous_id
+from student.models import CourseAccessRole, user_by_anonymous_id
 from submissions.models import score_set, score_reset
 
 from openedx.core.djangoapps.call_stack_manager import CallStackManager, CallStackMixin
+from openedx.core.djangoapps.course_groups.models import CourseUserGroup, CourseUserGroupPartitionGroup
+from openedx.core.djangoapps.user_api.models import UserCourseTag
 from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField  # pylint: disable=import-error
 log = logging.getLogger(__name__)
 
@@ -310,6 +312,34 @@ class StudentFieldOverride(TimeStampedModel):
     value = models.TextField(default='null')
 
 
+class PersistentSubsectionGrade(TimeStampedModel):
+    """
+    Holds the scores a student has earned on the blocks within a single graded
+    subsection of a course.  This is maintained by `courseware.grades` so that
+    grading does not need to instantiate every problem in a subsection each
+    time a grade is computed.  A row is discarded whenever a score within its
+    subsection changes or is reset, all of a student's rows in a course are
+    discarded whenever the student's cohorts, course roles or partition groups
+    change, and rows are ignored if they were computed against a different
+    version of the course.
+    """
+    user = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    usage_key = LocationKeyField(max_length=255, db_index=True)
+
+    class Meta(object):
+        unique_together = (('user', 'course_id', 'usage_key'),)
+
+    # Identifies the published version of the course the scores were computed against
+    course_version = models.CharField(max_length=255)
+
+    # The subsection's descendants and their scores, stored as JSON
+    scores = models.TextField(default='[]')
+
+    def __unicode__(self):
+        return u"[PersistentSubsectionGrade] {}: {} ({})".format(self.user_id, self.usage_key, self.course_version)
+
+
 # Signal that indicates that a user's score for a problem has been updated.
 # This signal is generated when a scoring event occurs either within the core
 # platform or in the Submissions module. Note that this signal will be triggered
@@ -406,3 +436,98 @@ def submissions_score_reset_handler(sender, **kwargs):  # pylint: disable=unused
             u"Failed to process score_reset signal from Submissions API. "
             "user: %s, course_id: %s, usage_id: %s", user, course_id, usage_id
         )
+
+
+@receiver(SCORE_CHANGED)
+def invalidate_subsection_grade_handler(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Consume the SCORE_CHANGED signal and discard the persisted grade of the
+    subsection containing the block whose score changed, so that only that
+    subsection is recomputed the next time the student is graded.
+    """
+    # Imported here to avoid a circular dependency between courseware.models
+    # and courseware.grades.
+    from courseware.grades import invalidate_subsection_grade
+
+    invalidate_subsection_grade(kwargs['user_id'], kwargs['course_id'], kwargs['usage_id'])
+
+
+@receiver(post_delete, sender=StudentModule)
+def invalidate_subsection_grade_on_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the persisted grade of the subsection containing a block whose
+    student state is deleted, e.g. when an instructor resets the student's
+    attempts and deletes their state.
+    """
+    from courseware.grades import invalidate_subsection_grade
+
+    invalidate_subsection_grade(instance.student_id, instance.course_id, instance.module_state_key)
+
+
+@receiver(m2m_changed, sender=CourseUserGroup.users.through)
+def invalidate_grades_on_group_membership_change(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the persisted grades of the users added to or removed from a
+    cohort (or another course user group) in its course, since the content
+    groups they have access to may have changed.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if reverse:
+        # `instance` is a user, and `pk_set` the ids of groups.
+        if action == 'pre_clear':
+            groups = instance.course_groups.all()
+        else:
+            groups = CourseUserGroup.objects.filter(pk__in=pk_set)
+        for course_id in set(group.course_id for group in groups):
+            PersistentSubsectionGrade.objects.filter(user=instance, course_id=course_id).delete()
+    else:
+        # `instance` is a group, and `pk_set` the ids of users.
+        if action == 'pre_clear':
+            user_ids = list(instance.users.values_list('id', flat=True))
+        else:
+            user_ids = list(pk_set)
+        PersistentSubsectionGrade.objects.filter(user__id__in=user_ids, course_id=instance.course_id).delete()
+
+
+@receiver(post_save, sender=CourseUserGroupPartitionGroup)
+@receiver(post_delete, sender=CourseUserGroupPartitionGroup)
+def invalidate_grades_on_partition_group_change(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the persisted grades of the members of a cohort whose content
+    group is changed.
+    """
+    try:
+        group = CourseUserGroup.objects.get(id=instance.course_user_group_id)
+    except CourseUserGroup.DoesNotExist:
+        # The cohort is being deleted along with its members.
+        return
+    PersistentSubsectionGrade.objects.filter(
+        user__id__in=list(group.users.values_list('id', flat=True)), course_id=group.course_id
+    ).delete()
+
+
+@receiver(post_save, sender=UserCourseTag)
+@receiver(post_delete, sender=UserCourseTag)
+def invalidate_grades_on_course_tag_change(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the persisted grades of a user in a course when one of their
+    course tags changes, since these hold the user's groups in random
+    partitions (e.g. of content experiments).
+    """
+    PersistentSubsectionGrade.objects.filter(user__id=instance.user_id, course_id=instance.course_id).delete()
+
+
+@receiver(post_save, sender=CourseAccessRole)
+@receiver(post_delete, sender=CourseAccessRole)
+def invalidate_grades_on_course_role_change(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the persisted grades of a user whose role in a course (or in all
+    of the courses of an organization) changes, since roles such as staff and
+    beta tester give access to content students can't access.
+    """
+    grades = PersistentSubsectionGrade.objects.filter(user__id=instance.user_id)
+    if instance.course_id:
+        grades = grades.filter(course_id=instance.course_id)
+    grades.delete()
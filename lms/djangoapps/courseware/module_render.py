@@ -81,6 +81,7 @@ from verify_student.services import ReverificationService
 
 from edx_proctoring.services import ProctoringService
 from openedx.core.djangoapps.credit.services import CreditService
+from openedx.core.djangoapps.content.script_contexts.services import ScriptContextCache
 
 from .field_overrides import OverrideFieldData
 
@@ -743,6 +744,7 @@ def get_module_system_for_user(user, student_data,  # TODO  # pylint: disable=to
             "reverification": ReverificationService(),
             'proctoring': ProctoringService(),
             'credit': CreditService(),
+            'script_context_cache': ScriptContextCache(course_id),
         },
         get_user_role=lambda: get_user_role(user, course_id),
         descriptor_runtime=descriptor._runtime,  # pylint: disable=protected-access
@@ -3,11 +3,20 @@ API related to providing field overrides for individual students.  This is used
 by the individual due dates feature.
 """
 import json
+from collections import defaultdict
 
-from .field_overrides import FieldOverrideProvider
+from django.conf import settings
+from opaque_keys.edx.keys import UsageKey
+from request_cache.middleware import RequestCache
+
+from .field_overrides import FieldOverrideProvider, clear_resolved_overrides
 from .models import StudentFieldOverride
 
 
+# Name of the request cache holding the prefetched overrides of users.
+PREFETCHED_OVERRIDES_CACHE_NAME = "courseware.student_field_overrides.prefetched"
+
+
 class IndividualStudentOverrideProvider(FieldOverrideProvider):
     """
     A concrete implementation of
@@ -15,6 +24,10 @@ class IndividualStudentOverrideProvider(FieldOverrideProvider):
     overrides to be made on a per user basis.
     """
     def get(self, block, name, default):
+        if settings.FEATURES.get('PREFETCH_STUDENT_FIELD_OVERRIDES'):
+            course_key = block.runtime.course_id
+            if _get_prefetched_overrides(self.user.id, course_key) is None:
+                prefetch_overrides_for_users([self.user], course_key)
         return get_override_for_user(self.user, block, name, default)
 
     @classmethod
@@ -42,20 +55,84 @@ def _get_overrides_for_user(user, block):
     """
     Gets all of the individual student overrides for given user and block.
     Returns a dictionary of field override values keyed by field name.
+
+    If the user's overrides for the course have been prefetched in this
+    request, no query is made.
     """
-    query = StudentFieldOverride.objects.filter(
-        course_id=block.runtime.course_id,
-        location=block.location,
-        student_id=user.id,
-    )
+    prefetched_overrides = _get_prefetched_overrides(user.id, block.runtime.course_id)
+    if prefetched_overrides is None:
+        query = StudentFieldOverride.objects.filter(
+            course_id=block.runtime.course_id,
+            location=block.location,
+            student_id=user.id,
+        )
+        json_values = {override.field: override.value for override in query}
+    else:
+        json_values = prefetched_overrides.get(block.location, {})
+
     overrides = {}
-    for override in query:
-        field = block.fields[override.field]
-        value = field.from_json(json.loads(override.value))
-        overrides[override.field] = value
+    for field_name, json_value in json_values.iteritems():
+        field = block.fields[field_name]
+        overrides[field_name] = field.from_json(json.loads(json_value))
     return overrides
 
 
+def prefetch_overrides_for_users(users, course_key):
+    """
+    Loads all of the individual student overrides in the course for each of
+    the given `users` with a single query, and caches them for the rest of
+    the request.  Subsequent lookups of these users' overrides in the course
+    don't query the database.
+    """
+    user_ids = [user.id for user in users]
+    prefetched = {user_id: defaultdict(dict) for user_id in user_ids}
+    query = StudentFieldOverride.objects.filter(
+        course_id=course_key,
+        student_id__in=user_ids,
+    ).values_list('student_id', 'location', 'field', 'value')
+    # values_list doesn't convert the locations to keys, and they don't
+    # necessarily have the course run (old mongo identifiers don't).
+    for student_id, location, field_name, json_value in query:
+        usage_key = UsageKey.from_string(location).map_into_course(course_key)
+        prefetched[student_id][usage_key][field_name] = json_value
+
+    cache = RequestCache.get_request_cache(PREFETCHED_OVERRIDES_CACHE_NAME)
+    for user_id, overrides in prefetched.iteritems():
+        cache[(user_id, course_key)] = overrides
+
+
+def clear_prefetched_overrides():
+    """
+    Discards all of the overrides prefetched in this request.
+    """
+    RequestCache.get_request_cache(PREFETCHED_OVERRIDES_CACHE_NAME).clear()
+
+
+def _get_prefetched_overrides(user_id, course_key):
+    """
+    Returns the overrides prefetched in this request for the given user in
+    the given course, as a dictionary mapping block locations to
+    dictionaries of JSON field values keyed by field name, or None if they
+    haven't been prefetched.
+    """
+    return RequestCache.get_request_cache(PREFETCHED_OVERRIDES_CACHE_NAME).get((user_id, course_key))
+
+
+def _update_prefetched_override(user, block, name, json_value):
+    """
+    Updates the user's prefetched overrides, if any, with the given JSON
+    value of the field `name` in `block`.  A `json_value` of None clears the
+    override.
+    """
+    prefetched_overrides = _get_prefetched_overrides(user.id, block.runtime.course_id)
+    if prefetched_overrides is None:
+        return
+    if json_value is None:
+        prefetched_overrides[block.location].pop(name, None)
+    else:
+        prefetched_overrides[block.location][name] = json_value
+
+
 def override_field_for_user(user, block, name, value):
     """
     Overrides a field for the `user`.  `block` and `name` specify the block
@@ -70,6 +147,8 @@ def override_field_for_user(user, block, name, value):
     field = block.fields[name]
     override.value = json.dumps(field.to_json(value))
     override.save()
+    _update_prefetched_override(user, block, name, override.value)
+    clear_resolved_overrides()
 
 
 def clear_override_for_user(user, block, name):
@@ -87,3 +166,5 @@ def clear_override_for_user(user, block, name):
             field=name).delete()
     except StudentFieldOverride.DoesNotExist:
         pass
+    _update_prefetched_override(user, block, name, None)
+    clear_resolved_overrides()
@@ -1,6 +1,7 @@
 """
 Tests for `field_overrides` module.
 """
+import mock
 import unittest
 from nose.plugins.attrib import attr
 
@@ -12,8 +13,10 @@ from xmodule.modulestore.tests.django_utils import (
 )
 
 from ..field_overrides import (
+    clear_resolved_overrides,
     disable_overrides,
     FieldOverrideProvider,
+    get_override_lookup_stats,
     OverrideFieldData,
     resolve_dotted,
 )
@@ -89,6 +92,21 @@ class OverrideFieldDataTests(ModuleStoreTestCase):
         with disable_overrides():
             self.assertEqual(data.get('block', 'foo'), 'baz')
 
+    def test_resolved_overrides_cached(self):
+        data = self.make_one()
+        with mock.patch.object(
+            TestOverrideProvider, 'get', autospec=True, side_effect=TestOverrideProvider.get
+        ) as provider_get:
+            self.assertEqual(data.get('block', 'foo'), 'fu')
+            self.assertEqual(data.get('block', 'foo'), 'fu')
+            self.assertEqual(provider_get.call_count, 1)
+            self.assertEqual(get_override_lookup_stats(), {'provider_lookups': 1, 'cache_hits': 1})
+
+            clear_resolved_overrides()
+            self.assertEqual(data.get('block', 'foo'), 'fu')
+            self.assertEqual(provider_get.call_count, 2)
+            self.assertEqual(get_override_lookup_stats(), {'provider_lookups': 2, 'cache_hits': 1})
+
     @override_settings(FIELD_OVERRIDE_PROVIDERS=())
     def test_no_overrides_configured(self):
         data = self.make_one()
@@ -1,18 +1,38 @@
 """
 Test grade calculation.
 """
+from datetime import datetime, timedelta
+
 from django.http import Http404
 from django.test import TestCase
 from django.test.client import RequestFactory
 
+import ddt
 from mock import patch, MagicMock
 from nose.plugins.attrib import attr
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from opaque_keys.edx.locator import CourseLocator, BlockUsageLocator
-
-from courseware.grades import field_data_cache_for_grading, grade, iterate_grades_for, MaxScoresCache, ProgressSummary
+from pytz import UTC
+
+from courseware.grades import (
+    field_data_cache_for_grading,
+    grade,
+    invalidate_subsection_grade,
+    iterate_grades_for,
+    mismatched_persisted_grades,
+    MaxScoresCache,
+    ProgressSummary,
+    _section_score_entries,
+)
+from courseware.model_data import ScoresClient
+from courseware.models import PersistentSubsectionGrade, StudentModule
+from courseware.student_field_overrides import PREFETCHED_OVERRIDES_CACHE_NAME, clear_prefetched_overrides
+from courseware.tests.factories import StudentModuleFactory
+from openedx.core.djangoapps.course_groups.models import CourseUserGroup
+from request_cache.middleware import RequestCache
 from student.tests.factories import UserFactory
 from student.models import CourseEnrollment
+from student.roles import CourseBetaTesterRole
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
@@ -128,6 +148,188 @@ class TestGradeIteration(ModuleStoreTestCase):
         return students_to_gradesets, students_to_errors
 
 
+@attr('shard_1')
+@ddt.ddt
+class TestBulkGradeIteration(ModuleStoreTestCase):
+    """
+    Test that grading students in batches matches grading them one at a time.
+    """
+    def setUp(self):
+        super(TestBulkGradeIteration, self).setUp()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        sequential = ItemFactory.create(
+            category='sequential', parent=chapter, graded=True, format='Homework'
+        )
+        vertical = ItemFactory.create(category='vertical', parent=sequential)
+        self.problems = [
+            ItemFactory.create(category='problem', parent=vertical)
+            for __ in xrange(2)
+        ]
+        self.course = self.store.get_course(self.course.id)
+        self.students = [UserFactory.create() for __ in xrange(5)]
+        for student in self.students:
+            CourseEnrollment.enroll(student, self.course.id)
+
+        # Give a couple of students a score on the first problem.
+        for student, grade_value in zip(self.students[:2], [1, 0]):
+            StudentModuleFactory.create(
+                student=student,
+                course_id=self.course.id,
+                module_state_key=self.problems[0].location,
+                grade=grade_value,
+                max_grade=1,
+            )
+
+    @ddt.data(1, 2, 10)
+    def test_batched_gradesets_match(self, batch_size):
+        unbatched = list(iterate_grades_for(self.course, self.students, keep_raw_scores=True))
+        batched = list(iterate_grades_for(self.course, self.students, keep_raw_scores=True, batch_size=batch_size))
+        self.assertEqual(unbatched, batched)
+
+    def test_scores_fetched_once_per_batch(self):
+        with patch('courseware.grades.ScoresClient.create_for_users', wraps=ScoresClient.create_for_users) as mock:
+            results = list(iterate_grades_for(self.course, self.students, batch_size=2))
+        self.assertEqual(len(results), 5)
+        self.assertEqual(mock.call_count, 3)
+
+    @ddt.data(None, 2)
+    def test_resolved_overrides_cleared_per_student(self, batch_size):
+        with patch('courseware.grades.clear_resolved_overrides') as mock:
+            list(iterate_grades_for(self.course, self.students, batch_size=batch_size))
+        self.assertEqual(mock.call_count, 5)
+
+    @ddt.data((None, 5), (2, 3))
+    @ddt.unpack
+    @patch.dict('django.conf.settings.FEATURES', {'PREFETCH_STUDENT_FIELD_OVERRIDES': True})
+    def test_prefetched_overrides_cleared(self, batch_size, expected_clears):
+        with patch('courseware.grades.clear_prefetched_overrides', wraps=clear_prefetched_overrides) as mock:
+            list(iterate_grades_for(self.course, self.students, batch_size=batch_size))
+        self.assertEqual(mock.call_count, expected_clears)
+        self.assertEqual(RequestCache.get_request_cache(PREFETCHED_OVERRIDES_CACHE_NAME), {})
+
+    @patch.dict('django.conf.settings.FEATURES', {'PREFETCH_STUDENT_FIELD_OVERRIDES': True})
+    def test_prefetched_overrides_cleared_when_abandoned(self):
+        gradesets = iterate_grades_for(self.course, self.students, batch_size=2)
+        next(gradesets)
+        self.assertNotEqual(RequestCache.get_request_cache(PREFETCHED_OVERRIDES_CACHE_NAME), {})
+        gradesets.close()
+        self.assertEqual(RequestCache.get_request_cache(PREFETCHED_OVERRIDES_CACHE_NAME), {})
+
+
+@attr('shard_1')
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_PERSISTENT_SUBSECTION_GRADES': True})
+class TestPersistentSubsectionGrades(ModuleStoreTestCase):
+    """
+    Test that subsection grades are persisted, reused and invalidated.
+    """
+    def setUp(self):
+        super(TestPersistentSubsectionGrades, self).setUp()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        self.sequentials = []
+        self.problems = []
+        for __ in xrange(2):
+            sequential = ItemFactory.create(
+                category='sequential', parent=chapter, graded=True, format='Homework'
+            )
+            vertical = ItemFactory.create(category='vertical', parent=sequential)
+            self.sequentials.append(sequential)
+            self.problems.append(ItemFactory.create(category='problem', parent=vertical))
+        self.course = self.store.get_course(self.course.id)
+        self.student = UserFactory.create()
+        CourseEnrollment.enroll(self.student, self.course.id)
+        for problem in self.problems:
+            StudentModuleFactory.create(
+                student=self.student,
+                course_id=self.course.id,
+                module_state_key=problem.location,
+                grade=1,
+                max_grade=1,
+            )
+
+    def _grade(self):
+        """Grade the student, returning the grade summary."""
+        request = RequestFactory().get('/')
+        request.user = self.student
+        request.session = {}
+        return grade(self.student, request, self.course, keep_raw_scores=True)
+
+    def _persisted_locations(self):
+        """Return the locations of the student's persisted subsection grades."""
+        return set(
+            persisted.usage_key.map_into_course(self.course.id)
+            for persisted in PersistentSubsectionGrade.objects.filter(user=self.student)
+        )
+
+    def test_grades_persisted_and_reused(self):
+        first_summary = self._grade()
+        self.assertEqual(
+            self._persisted_locations(),
+            set(sequential.location for sequential in self.sequentials)
+        )
+
+        with patch('courseware.grades._section_score_entries') as mock_entries:
+            second_summary = self._grade()
+        self.assertFalse(mock_entries.called)
+        self.assertEqual(first_summary, second_summary)
+
+    def test_score_change_invalidates_subsection(self):
+        self._grade()
+        invalidate_subsection_grade(self.student.id, unicode(self.course.id), unicode(self.problems[0].location))
+        self.assertEqual(self._persisted_locations(), set([self.sequentials[1].location]))
+
+    def test_deleted_state_invalidates_subsection(self):
+        self._grade()
+        StudentModule.objects.get(student=self.student, module_state_key=self.problems[0].location).delete()
+        self.assertEqual(self._persisted_locations(), set([self.sequentials[1].location]))
+
+    def test_cohort_change_invalidates_grades(self):
+        self._grade()
+        cohort = CourseUserGroup.objects.create(
+            name='Cohort', course_id=self.course.id, group_type=CourseUserGroup.COHORT
+        )
+        cohort.users.add(self.student)
+        self.assertEqual(self._persisted_locations(), set())
+
+    def test_course_role_change_invalidates_grades(self):
+        self._grade()
+        CourseBetaTesterRole(self.course.id).add_users(self.student)
+        self.assertEqual(self._persisted_locations(), set())
+
+    def test_subsection_with_inaccessible_blocks_not_persisted(self):
+        ItemFactory.create(
+            category='problem',
+            parent_location=self.problems[0].parent,
+            start=datetime.now(UTC) + timedelta(days=1),
+        )
+        self.course = self.store.get_course(self.course.id)
+        self._grade()
+        self.assertEqual(self._persisted_locations(), set([self.sequentials[1].location]))
+
+    def test_outdated_course_version_ignored(self):
+        self._grade()
+        PersistentSubsectionGrade.objects.filter(user=self.student).update(course_version='outdated')
+        with patch('courseware.grades._section_score_entries', wraps=_section_score_entries) as mock_entries:
+            self._grade()
+        self.assertEqual(mock_entries.call_count, 2)
+
+    def test_unversioned_course_not_persisted(self):
+        with patch.object(type(self.course), 'subtree_edited_on', None):
+            self._grade()
+            self.assertEqual(mismatched_persisted_grades(self.student, self.course), [])
+        self.assertEqual(self._persisted_locations(), set())
+
+    def test_consistency_check(self):
+        self._grade()
+        self.assertEqual(mismatched_persisted_grades(self.student, self.course), [])
+
+        StudentModule.objects.filter(
+            student=self.student, module_state_key=self.problems[1].location
+        ).update(grade=0)
+        self.assertEqual(mismatched_persisted_grades(self.student, self.course), [self.sequentials[1].location])
+
+
 class TestMaxScoresCache(ModuleStoreTestCase):
     """
     Tests for the MaxScoresCache
@@ -4,12 +4,15 @@ Tests for courseware middleware
 
 from django.core.urlresolvers import reverse
 from django.test.client import RequestFactory
-from django.http import Http404
+from django.http import Http404, HttpResponse
+from django.test import TestCase
 from mock import patch
 from nose.plugins.attrib import attr
+from request_cache.middleware import RequestCache
 
 import courseware.courses as courses
-from courseware.middleware import RedirectUnenrolledMiddleware
+from courseware.field_overrides import _increment_lookup_stat
+from courseware.middleware import FieldOverrideLookupStatsMiddleware, RedirectUnenrolledMiddleware
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory
 
@@ -52,3 +55,32 @@ class CoursewareMiddlewareTestCase(ModuleStoreTestCase):
             request, Http404()
         )
         self.assertIsNone(response)
+
+
+class FieldOverrideLookupStatsMiddlewareTestCase(TestCase):
+    """Tests that the field override lookups of requests are reported"""
+
+    def setUp(self):
+        super(FieldOverrideLookupStatsMiddlewareTestCase, self).setUp()
+        RequestCache.clear_request_cache()
+        self.addCleanup(RequestCache.clear_request_cache)
+
+    @patch('courseware.middleware.dog_stats_api.histogram')
+    def test_lookups_reported(self, mock_histogram):
+        _increment_lookup_stat('provider_lookups')
+        _increment_lookup_stat('provider_lookups')
+        _increment_lookup_stat('cache_hits')
+        response = HttpResponse()
+        self.assertIs(
+            FieldOverrideLookupStatsMiddleware().process_response(RequestFactory().get("dummy_url"), response),
+            response
+        )
+        self.assertEqual(
+            sorted(call[0] for call in mock_histogram.call_args_list),
+            [('lms.field_overrides.cache_hits', 1), ('lms.field_overrides.provider_lookups', 2)]
+        )
+
+    @patch('courseware.middleware.dog_stats_api.histogram')
+    def test_no_lookups_not_reported(self, mock_histogram):
+        FieldOverrideLookupStatsMiddleware().process_response(RequestFactory().get("dummy_url"), HttpResponse())
+        self.assertFalse(mock_histogram.called)
@@ -0,0 +1,110 @@
+"""
+Tests for `student_field_overrides` module.
+"""
+import datetime
+import json
+
+from django.utils.timezone import utc
+from nose.plugins.attrib import attr
+import mock
+
+from request_cache.middleware import RequestCache
+from student.tests.factories import UserFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+from ..models import StudentFieldOverride
+from ..student_field_overrides import (
+    IndividualStudentOverrideProvider,
+    clear_override_for_user,
+    get_override_for_user,
+    override_field_for_user,
+    prefetch_overrides_for_users,
+)
+
+
+@attr('shard_1')
+class TestPrefetchOverrides(ModuleStoreTestCase):
+    """
+    Tests for prefetching individual student overrides.
+    """
+    def setUp(self):
+        super(TestPrefetchOverrides, self).setUp()
+        RequestCache.clear_request_cache()
+        self.due = datetime.datetime(2010, 5, 12, 2, 42, tzinfo=utc)
+        self.extended = datetime.datetime(2013, 12, 25, 0, 0, tzinfo=utc)
+        self.course = CourseFactory.create()
+        self.week1 = ItemFactory.create(due=self.due, parent=self.course)
+        self.week2 = ItemFactory.create(due=self.due, parent=self.course)
+        self.user1 = UserFactory.create()
+        self.user2 = UserFactory.create()
+
+        override_field_for_user(self.user1, self.week1, 'due', self.extended)
+        override_field_for_user(self.user2, self.week2, 'due', self.extended)
+
+    def tearDown(self):
+        super(TestPrefetchOverrides, self).tearDown()
+        RequestCache.clear_request_cache()
+
+    def _forget_overrides(self):
+        """
+        Discard the overrides memoized on the blocks under test.
+        """
+        for block in (self.week1, self.week2):
+            if hasattr(block, '_student_overrides'):
+                del block._student_overrides  # pylint: disable=protected-access
+
+    def test_prefetch_for_users(self):
+        with self.assertNumQueries(1):
+            prefetch_overrides_for_users([self.user1, self.user2], self.course.id)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_override_for_user(self.user1, self.week1, 'due'), self.extended)
+            self.assertIsNone(get_override_for_user(self.user1, self.week2, 'due'))
+            self.assertIsNone(get_override_for_user(self.user2, self.week1, 'due'))
+            self.assertEqual(get_override_for_user(self.user2, self.week2, 'due'), self.extended)
+
+    def test_prefetch_stored_rows(self):
+        # a row stored without going through override_field_for_user, with
+        # its location read back from the database as a string
+        StudentFieldOverride.objects.create(
+            course_id=self.course.id,
+            location=self.week2.location,
+            student=self.user1,
+            field='due',
+            value=json.dumps(self.week2.fields['due'].to_json(self.extended)),
+        )
+        self._forget_overrides()
+        prefetch_overrides_for_users([self.user1], self.course.id)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_override_for_user(self.user1, self.week1, 'due'), self.extended)
+            self.assertEqual(get_override_for_user(self.user1, self.week2, 'due'), self.extended)
+
+    def test_without_prefetch(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(get_override_for_user(self.user1, self.week1, 'due'), self.extended)
+            self.assertIsNone(get_override_for_user(self.user1, self.week2, 'due'))
+
+    def test_changes_after_prefetch(self):
+        prefetch_overrides_for_users([self.user1], self.course.id)
+        override_field_for_user(self.user1, self.week2, 'due', self.extended)
+        clear_override_for_user(self.user1, self.week1, 'due')
+        self._forget_overrides()
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_override_for_user(self.user1, self.week1, 'due'))
+            self.assertEqual(get_override_for_user(self.user1, self.week2, 'due'), self.extended)
+
+    @mock.patch.dict('django.conf.settings.FEATURES', {'PREFETCH_STUDENT_FIELD_OVERRIDES': True})
+    def test_provider_prefetches(self):
+        provider = IndividualStudentOverrideProvider(self.user1)
+        with self.assertNumQueries(1):
+            self.assertEqual(provider.get(self.week1, 'due', None), self.extended)
+            self.assertIsNone(provider.get(self.week2, 'due', None))
+
+    def test_provider_without_prefetch(self):
+        provider = IndividualStudentOverrideProvider(self.user1)
+        with self.assertNumQueries(2):
+            self.assertEqual(provider.get(self.week1, 'due', None), self.extended)
+            self.assertIsNone(provider.get(self.week2, 'due', None))
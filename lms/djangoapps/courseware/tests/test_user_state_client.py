@@ -3,14 +3,15 @@ Black-box tests of the DjangoUserStateClient against the semantics
 defined in edx_user_state_client.
 """
 
-from collections import defaultdict
-from unittest import skip
+from collections import OrderedDict, defaultdict
+import json
 
 from django.test import TestCase
 
 from edx_user_state_client.tests import UserStateClientTestBase
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from courseware.user_state_client import DjangoXBlockUserStateClient
-from courseware.tests.factories import UserFactory
+from courseware.tests.factories import StudentModuleFactory, UserFactory
 
 
 class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
@@ -32,36 +33,79 @@ class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
 
-    # We're skipping these tests because the iter_all_by_block and iter_all_by_course
-    # are not implemented in the DjangoXBlockUserStateClient
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_deleted_block(self):
-        pass
 
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_many_users(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_deleted_block(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_many_users(self):
-        pass
+class TestDjangoUserStateClientIteration(TestCase):
+    """
+    Tests of the batching of DjangoUserStateClient.iter_all_for_block and iter_all_for_course.
+    """
+    def setUp(self):
+        super(TestDjangoUserStateClientIteration, self).setUp()
+        self.client = DjangoXBlockUserStateClient()
+        self.course_key = SlashSeparatedCourseKey(u'edX', u'test_course', u'test')
+        self.problem_key = self.course_key.make_usage_key(u'problem', u'problem')
+        self.html_key = self.course_key.make_usage_key(u'html', u'html')
+        for index in range(5):
+            student = UserFactory.create(username=u'user{}'.format(index))
+            StudentModuleFactory.create(
+                student=student,
+                course_id=self.course_key,
+                module_state_key=self.problem_key,
+                state=json.dumps({'index': index}),
+            )
+            StudentModuleFactory.create(
+                student=student,
+                course_id=self.course_key,
+                module_type=u'html',
+                module_state_key=self.html_key,
+                state=json.dumps({'index': index}),
+            )
+        # Rows without any stored state, or whose state has been deleted, are skipped.
+        StudentModuleFactory.create(course_id=self.course_key, module_state_key=self.problem_key, state=None)
+        StudentModuleFactory.create(course_id=self.course_key, module_state_key=self.problem_key, state='{}')
+
+    def test_iter_all_for_block(self):
+        # 7 matching rows are fetched in batches of 2, plus the query that finds no more rows.
+        with self.assertNumQueries(4):
+            states = list(self.client.iter_all_for_block(self.problem_key, batch_size=2))
+        self.assertEqual(
+            sorted((state.username, state.block_key, state.state) for state in states),
+            [(u'user{}'.format(index), self.problem_key, {'index': index}) for index in range(5)]
+        )
+
+    def test_iter_all_for_block_order(self):
+        # The states of a block are yielded by user, however their rows were created,
+        # with their fields in the order they were stored in.
+        block_key = self.course_key.make_usage_key(u'problem', u'other_problem')
+        stored_states = {}
+        for index in reversed(range(5)):
+            user = UserFactory.create(username=u'other_user{}'.format(index))
+            stored_states[user.username] = json.dumps(OrderedDict([('seed', index), ('done', True), ('attempts', 1)]))
+            StudentModuleFactory.create(
+                student=user,
+                course_id=self.course_key,
+                module_state_key=block_key,
+                state=stored_states[user.username],
+            )
+
+        states = list(self.client.iter_all_for_block(block_key, batch_size=2))
+        self.assertEqual(
+            [state.username for state in states],
+            [u'other_user{}'.format(index) for index in reversed(range(5))]
+        )
+        self.assertEqual(
+            [json.dumps(state.state) for state in states],
+            [stored_states[state.username] for state in states]
+        )
+
+    def test_iter_all_for_course(self):
+        with self.assertNumQueries(7):
+            states = list(self.client.iter_all_for_course(self.course_key, batch_size=2))
+        self.assertEqual(len(states), 10)
+        self.assertEqual(set(state.block_key for state in states), set([self.problem_key, self.html_key]))
+
+    def test_iter_all_for_course_by_block_type(self):
+        states = list(self.client.iter_all_for_course(self.course_key, block_type=u'html', batch_size=2))
+        self.assertEqual(
+            sorted((state.username, state.block_key) for state in states),
+            [(u'user{}'.format(index), self.html_key) for index in range(5)]
+        )
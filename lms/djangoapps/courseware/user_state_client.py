@@ -4,6 +4,7 @@ data in a Django ORM model.
 """
 
 import itertools
+from collections import OrderedDict
 from operator import attrgetter
 from time import time
 
@@ -13,7 +14,9 @@ except ImportError:
     import json
 
 import dogstats_wrapper as dog_stats_api
+from django.conf import settings
 from django.contrib.auth.models import User
+from opaque_keys.edx.keys import UsageKey
 from xblock.fields import Scope, ScopeBase
 from courseware.models import StudentModule, StudentModuleHistory
 from edx_user_state_client.interface import XBlockUserStateClient, XBlockUserState
@@ -346,24 +349,118 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
             yield XBlockUserState(username, block_key, state, history_entry.created, scope)
 
+    @donottrack(StudentModule, StudentModuleHistory)
+    def _iter_student_module_values(self, fields, batch_size=None, key_field='id', **filters):
+        """
+        Yield tuples of the values of ``fields`` of each :class:`~StudentModule` matching
+        ``filters``, ordered by ``key_field``, fetching ``batch_size`` rows per query.
+
+        Rows are paged by ``key_field`` (rather than with OFFSET), so each query is an index
+        range scan no matter how far into the table it starts, and only a batch of rows is
+        held in memory at a time.
+
+        Arguments:
+            fields (list): The names of the fields to fetch. ``key_field`` is prepended to each tuple.
+            batch_size (int): The number of rows to fetch per query. Defaults to
+                ``settings.USER_STATE_BATCH_SIZE``.
+            key_field (str): The name of the field to page by, which must be unique among the
+                rows matching ``filters``.
+            filters: Field lookups that the rows must match.
+        """
+        if batch_size is None:
+            batch_size = settings.USER_STATE_BATCH_SIZE
+
+        query = StudentModule.objects.filter(**filters).order_by(key_field).values_list(key_field, *fields)
+        last_key = None
+        while True:
+            batch_query = query if last_key is None else query.filter(**{key_field + '__gt': last_key})
+            batch = list(batch_query[:batch_size])
+            for values in batch:
+                yield values
+            if len(batch) < batch_size:
+                return
+            last_key = batch[-1][0]
+
     @donottrack(StudentModule, StudentModuleHistory)
     def iter_all_for_block(self, block_key, scope=Scope.user_state, batch_size=None):
         """
-        You get no ordering guarantees. Fetching will happen in batch_size
-        increments. If you're using this method, you should be running in an
-        async task.
+        Yield the stored XBlock state of every user for the specified XBlock usage.
+
+        States are yielded in order of user id, with their fields in the order
+        they are stored. Fetching will happen in batch_size increments. If
+        you're using this method, you should be running in an async task.
+
+        Arguments:
+            block_key (UsageKey): The XBlock usage to load state for.
+            scope (Scope): The scope to load data from.
+            batch_size (int): The number of states to fetch per query.
+
+        Yields:
+            XBlockUserState tuples for each user that has stored state for the block.
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+
+        # A user has a single StudentModule per block, so they are paged by user.
+        values = self._iter_student_module_values(
+            ['student__username', 'state', 'modified'],
+            batch_size,
+            key_field='student_id',
+            course_id=block_key.course_key,
+            module_state_key=block_key,
+        )
+        for __, username, state, modified in values:
+            state = _load_state(state)
+            if state:
+                yield XBlockUserState(username, block_key, state, modified, scope)
 
     @donottrack(StudentModule, StudentModuleHistory)
     def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None):
         """
+        Yield the stored XBlock state of every user for every XBlock usage in the specified course.
+
         You get no ordering guarantees. Fetching will happen in batch_size
         increments. If you're using this method, you should be running in an
         async task.
+
+        Arguments:
+            course_key (CourseKey): The course to load state for.
+            block_type (str): If not None, only load state for XBlocks of this type.
+            scope (Scope): The scope to load data from.
+            batch_size (int): The number of states to fetch per query.
+
+        Yields:
+            XBlockUserState tuples for each user and XBlock usage with stored state.
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+
+        filters = {'course_id': course_key}
+        if block_type is not None:
+            filters['module_type'] = block_type
+
+        values = self._iter_student_module_values(
+            ['student__username', 'module_state_key', 'state', 'modified'],
+            batch_size,
+            **filters
+        )
+        for __, username, module_state_key, state, modified in values:
+            state = _load_state(state)
+            if state:
+                # values_list returns the key as it is stored, without parsing it
+                usage_key = UsageKey.from_string(module_state_key).map_into_course(course_key)
+                yield XBlockUserState(username, usage_key, state, modified, scope)
+
+
+def _load_state(state):
+    """
+    Return the deserialized value of the serialized ``state`` of a :class:`~StudentModule`,
+    or None if no state has been stored.
+
+    As in :meth:`DjangoXBlockUserStateClient.get_many`, a state that is the empty dict has been
+    deleted, so it is treated as if it doesn't exist. The fields are kept in the order they are
+    stored in, so serializing the state again gives back the stored value.
+    """
+    if state is None:
+        return None
+    return json.loads(state, object_pairs_hook=OrderedDict) or None
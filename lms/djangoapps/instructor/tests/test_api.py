@@ -2674,8 +2674,10 @@ class TestInstructorAPILevelsDataDump(SharedModuleStoreTestCase, LoginEnrollment
         response = self.client.get(url, {})
         self.assertIn('The detailed enrollment report is being created.', response.content)
 
-    @patch.object(instructor.views.api, 'anonymous_id_for_user', Mock(return_value='42'))
-    @patch.object(instructor.views.api, 'unique_id_for_user', Mock(return_value='41'))
+    @patch.object(
+        instructor.views.api, 'anonymous_ids_for_users',
+        Mock(side_effect=lambda users, course_id, save: {user.id: '42' if course_id else '41' for user in users})
+    )
     def test_get_anon_ids(self):
         """
         Test the CSV output for the anonymized user ids.
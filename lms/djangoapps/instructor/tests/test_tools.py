@@ -12,6 +12,7 @@ from django.test.utils import override_settings
 from nose.plugins.attrib import attr
 
 from courseware.field_overrides import OverrideFieldData  # pylint: disable=import-error
+from courseware.student_field_overrides import get_override_for_user  # pylint: disable=import-error
 from lms.djangoapps.ccx.tests.test_overrides import inject_field_overrides
 from student.tests.factories import UserFactory  # pylint: disable=import-error
 from xmodule.fields import Date
@@ -246,6 +247,17 @@ class TestSetDueDateExtension(ModuleStoreTestCase):
             tools.set_due_date_extension(self.course, self.week1, self.user, extended)
             self._clear_field_data_cache()
 
+    def test_inherited_overrides_resolved_once(self):
+        extended = datetime.datetime(2013, 12, 25, 0, 0, tzinfo=utc)
+        tools.set_due_date_extension(self.course, self.week1, self.user, extended)
+        self._clear_field_data_cache()
+        self.assertEqual(self.assignment.due, extended)
+        with mock.patch(
+            'courseware.student_field_overrides.get_override_for_user', wraps=get_override_for_user
+        ) as get_override:
+            self.assertEqual(self.homework.due, extended)
+            self.assertFalse(get_override.called)
+
     def test_set_due_date_extension_invalid_date(self):
         extended = datetime.datetime(2009, 1, 1, 0, 0, tzinfo=utc)
         with self.assertRaises(tools.DashboardError):
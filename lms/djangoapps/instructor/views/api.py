@@ -62,7 +62,7 @@ from shoppingcart.models import (
     CourseRegistrationCodeInvoiceItem,
 )
 from student.models import (
-    CourseEnrollment, unique_id_for_user, anonymous_id_for_user,
+    CourseEnrollment, anonymous_ids_for_users,
     UserProfile, Registration, EntranceExamConfiguration,
     ManualEnrollmentAudit, UNENROLLED_TO_ALLOWEDTOENROLL, ALLOWEDTOENROLL_TO_ENROLLED,
     ENROLLED_TO_ENROLLED, ENROLLED_TO_UNENROLLED, UNENROLLED_TO_ENROLLED,
@@ -1783,7 +1783,9 @@ def get_anon_ids(request, course_id):  # pylint: disable=unused-argument
         courseenrollment__course_id=course_id,
     ).order_by('id')
     header = ['User ID', 'Anonymized User ID', 'Course Specific Anonymized User ID']
-    rows = [[s.id, unique_id_for_user(s, save=False), anonymous_id_for_user(s, course_id, save=False)] for s in students]
+    unique_ids = anonymous_ids_for_users(students, None, save=False)
+    anonymous_ids = anonymous_ids_for_users(students, course_id, save=False)
+    rows = [[s.id, unique_ids[s.id], anonymous_ids[s.id]] for s in students]
     return csv_response(course_id.to_deprecated_string().replace('/', '-') + '-anon-ids.csv', header, rows)
 
 
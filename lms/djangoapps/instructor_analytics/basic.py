@@ -19,7 +19,7 @@ import xmodule.graders as xmgraders
 from microsite_configuration import microsite
 from student.models import CourseEnrollmentAllowed
 from edx_proctoring.api import get_all_exam_attempts
-from courseware.models import StudentModule
+from courseware.user_state_client import DjangoXBlockUserStateClient
 from certificates.models import GeneratedCertificate
 from django.db.models import Count
 from certificates.models import CertificateStatuses
@@ -375,7 +375,16 @@ def list_problem_responses(course_key, problem_location):
     ]
 
     where `state` represents a student's response to the problem
-    identified by `problem_location`.
+    identified by `problem_location`.  Students who have no stored state
+    for the problem, or whose state has been deleted, aren't listed.
+    """
+    return list(iter_problem_responses(course_key, problem_location))
+
+
+def iter_problem_responses(course_key, problem_location):
+    """
+    Yield the responses of `list_problem_responses`, in the same order (by
+    student), as they are fetched in batches by the user state client.
     """
     problem_key = UsageKey.from_string(problem_location)
     # Are we dealing with an "old-style" problem location?
@@ -383,18 +392,10 @@ def list_problem_responses(course_key, problem_location):
     if not run:
         problem_key = course_key.make_usage_key_from_deprecated_string(problem_location)
     if problem_key.course_key != course_key:
-        return []
+        return
 
-    smdat = StudentModule.objects.filter(
-        course_id=course_key,
-        module_state_key=problem_key
-    )
-    smdat = smdat.order_by('student')
-
-    return [
-        {'username': response.student.username, 'state': response.state}
-        for response in smdat
-    ]
+    for response in DjangoXBlockUserStateClient().iter_all_for_block(problem_key):
+        yield {'username': response.username, 'state': json.dumps(response.state)}
 
 
 def course_registration_features(features, registration_codes, csv_type):
@@ -23,6 +23,7 @@ import urllib
 
 from boto.s3.connection import S3Connection
 from boto.s3.key import Key
+from boto.s3.multipart import MultiPartUpload
 
 from django.conf import settings
 from django.contrib.auth.models import User
@@ -57,6 +58,8 @@ class InstructorTask(models.Model):
     `requester` stores id of user who submitted the task
     `created` stores date that entry was first created
     `updated` stores date that entry was last modified
+    `checkpoint` stores the progress of a task that can resume where it stopped
+        if it is retried.  Format is a JSON-serialized dict.  Content varies by task_type.
     """
     task_type = models.CharField(max_length=50, db_index=True)
     course_id = CourseKeyField(max_length=255, db_index=True)
@@ -69,6 +72,7 @@ class InstructorTask(models.Model):
     created = models.DateTimeField(auto_now_add=True, null=True)
     updated = models.DateTimeField(auto_now=True)
     subtasks = models.TextField(blank=True)  # JSON dictionary
+    checkpoint = models.TextField(blank=True)  # JSON dictionary
 
     def __repr__(self):
         return 'InstructorTask<%r>' % ({
@@ -134,6 +138,22 @@ class InstructorTask(models.Model):
         """
         self.save()
 
+    def get_checkpoint(self):
+        """
+        Returns the dict saved by the last call to `save_checkpoint`, or None
+        if no checkpoint has been saved.
+        """
+        return json.loads(self.checkpoint) if self.checkpoint else None
+
+    def save_checkpoint(self, checkpoint):
+        """
+        Saves the JSON-serializable `checkpoint` dict, or clears the
+        checkpoint if `checkpoint` is None, committing it immediately so that
+        it survives a crash of the task.
+        """
+        self.checkpoint = json.dumps(checkpoint) if checkpoint is not None else ''
+        self.save_now()
+
     @staticmethod
     def create_output_for_success(returned_result):
         """
@@ -196,7 +216,20 @@ class ReportStore(object):
     download. Should probably refactor later to create a ReportFile object that
     can simply be appended to for the sake of memory efficiency, rather than
     passing in the whole dataset. Doing that for now just because it's simpler.
+
+    Large reports can instead be stored in parts with a `ReportPartsWriter`,
+    which uses the `begin_parts`, `store_part`, `complete_parts` and
+    `abort_parts` methods.
     """
+    # Minimum size, in bytes, of every part but the last of a report stored in
+    # parts, as given to `store_part`.
+    min_part_size = 0
+
+    # Whether the parts given to `store_part` are gzip-compressed.
+    gzip_parts = False
+
+    # Suffix of the files of reports that are incomplete, which aren't listed by `links_for`.
+    PARTIAL_SUFFIX = '.partial'
     @classmethod
     def from_config(cls, config_name):
         """
@@ -218,6 +251,91 @@ class ReportStore(object):
         for row in rows:
             yield [unicode(item).encode('utf-8') for item in row]
 
+    def _get_unicode_rows(self, rows):
+        """
+        Given `rows` read from a utf-8 encoded CSV file, yields them with
+        their strings decoded to unicode.
+        """
+        for row in rows:
+            yield [item.decode('utf-8') for item in row]
+
+
+class ReportPartsWriter(object):
+    """
+    Writes the rows of a CSV report to a `ReportStore` in parts of at least
+    `part_size` bytes, so that the whole report is never held in memory.
+    The rows of stores whose parts are gzip-compressed are compressed as they
+    are written, and the size of a part is that of its compressed data.
+
+    The writer's `state` describes the parts stored so far, and is
+    JSON-serializable.  A writer created with the `state` of an earlier
+    writer for the same file continues the report after its last stored
+    part, which lets a retried task resume a partially written report.
+    Rows that were buffered but not yet stored are lost in that case, so
+    callers should checkpoint their progress whenever `writerow` reports
+    that a part was stored.
+    """
+    def __init__(self, report_store, course_id, filename, state=None, part_size=1024 * 1024):
+        self.report_store = report_store
+        self.course_id = course_id
+        self.filename = filename
+        if state is None:
+            state = report_store.begin_parts(course_id, filename)
+        self.state = state
+        self.part_size = max(part_size, report_store.min_part_size)
+        self._reset_buffer()
+
+    def _reset_buffer(self):
+        """
+        Starts a new, empty buffer of rows.
+        """
+        self._buffer = StringIO()
+        if self.report_store.gzip_parts:
+            self._file = GzipFile(fileobj=self._buffer, mode="wb")
+        else:
+            self._file = self._buffer
+        self._csvwriter = csv.writer(self._file)
+        self._num_buffered_rows = 0
+
+    def writerow(self, row):
+        """
+        Buffers the given row, storing the buffered rows as a new part if
+        they have reached `part_size`.  Returns True if a part was stored.
+        """
+        self._csvwriter.writerows(self.report_store._get_utf8_encoded_rows([row]))  # pylint: disable=protected-access
+        self._num_buffered_rows += 1
+        # A gzip file writes its compressed data to the buffer in blocks, so a
+        # part can exceed part_size by up to a block.
+        if self._buffer.tell() >= self.part_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        """
+        Stores the buffered rows, if any, as a new part.
+        """
+        if self._num_buffered_rows:
+            if self._file is not self._buffer:
+                self._file.close()
+            data = self._buffer.getvalue()
+            self.state = self.report_store.store_part(self.course_id, self.filename, self.state, data)
+            self._reset_buffer()
+
+    def close(self):
+        """
+        Stores any buffered rows and completes the report, making it
+        available for download.
+        """
+        self.flush()
+        self.report_store.complete_parts(self.course_id, self.filename, self.state)
+
+    def abort(self):
+        """
+        Discards the report, including the parts already stored.
+        """
+        self.report_store.abort_parts(self.course_id, self.filename, self.state)
+
 
 class S3ReportStore(ReportStore):
     """
@@ -230,7 +348,15 @@ class S3ReportStore(ReportStore):
     grouping and querying, but right now it simply depends on its own
     conventions on where files are stored to know what to display. Clients using
     this class can name the final file whatever they want.
+
+    Reports stored in parts use an S3 multipart upload, which is invisible
+    until it is completed.  Each part is a separate gzip member; a sequence of
+    gzip members is itself a valid gzip file.
     """
+    # S3 rejects multipart upload parts smaller than 5MB, except for the last.
+    min_part_size = 5 * 1024 * 1024
+    gzip_parts = True
+
     def __init__(self, bucket_name, root_path):
         self.root_path = root_path
 
@@ -310,6 +436,53 @@ class S3ReportStore(ReportStore):
             }
         )
 
+    def begin_parts(self, course_id, filename):
+        """
+        Starts a multipart upload of the file, and returns its initial state.
+        """
+        key = self.key_for(course_id, filename)
+        multipart_upload = self.bucket.initiate_multipart_upload(
+            key.key,
+            headers={"Content-Encoding": "gzip", "Content-Type": "text/csv"},
+        )
+        return {'upload_id': multipart_upload.id, 'num_parts': 0}
+
+    def store_part(self, course_id, filename, state, data):
+        """
+        Uploads the gzip-compressed `data` as the next part of the file, and
+        returns the new state.
+        """
+        part_num = state['num_parts'] + 1
+        self._multipart_upload(course_id, filename, state).upload_part_from_file(StringIO(data), part_num)
+        return dict(state, num_parts=part_num)
+
+    def complete_parts(self, course_id, filename, state):
+        """
+        Completes the multipart upload of the file.  S3 can't complete an
+        upload without parts, so an empty file is stored directly instead.
+        """
+        multipart_upload = self._multipart_upload(course_id, filename, state)
+        if state['num_parts']:
+            multipart_upload.complete_upload()
+        else:
+            multipart_upload.cancel_upload()
+            self.store_rows(course_id, filename, [])
+
+    def abort_parts(self, course_id, filename, state):
+        """
+        Aborts the multipart upload of the file, deleting its parts.
+        """
+        self._multipart_upload(course_id, filename, state).cancel_upload()
+
+    def _multipart_upload(self, course_id, filename, state):
+        """
+        Returns the multipart upload of the file described by `state`.
+        """
+        multipart_upload = MultiPartUpload(self.bucket)
+        multipart_upload.key_name = self.key_for(course_id, filename).key
+        multipart_upload.id = state['upload_id']
+        return multipart_upload
+
     def store_rows(self, course_id, filename, rows):
         """
         Given a `course_id`, `filename`, and `rows` (each row is an iterable of
@@ -336,8 +509,26 @@ class S3ReportStore(ReportStore):
         return [
             (key.key.split("/")[-1], key.generate_url(expires_in=300))
             for key in sorted(self.bucket.list(prefix=course_dir.key), reverse=True, key=lambda k: k.last_modified)
+            if not key.key.endswith(self.PARTIAL_SUFFIX)
         ]
 
+    def read_rows(self, course_id, filename):
+        """
+        Returns the rows of the csv file stored by `store_rows`, as lists of
+        unicode strings, or None if the file doesn't exist.
+        """
+        key = self.bucket.get_key(self.key_for(course_id, filename).key)
+        if key is None:
+            return None
+        gzip_file = GzipFile(fileobj=StringIO(key.get_contents_as_string()), mode="rb")
+        return list(self._get_unicode_rows(csv.reader(gzip_file)))
+
+    def delete(self, course_id, filename):
+        """
+        Deletes the file, if it exists.
+        """
+        self.bucket.delete_key(self.key_for(course_id, filename).key)
+
 
 class LocalFSReportStore(ReportStore):
     """
@@ -391,6 +582,41 @@ class LocalFSReportStore(ReportStore):
         with open(full_path, "wb") as f:
             f.write(buff.getvalue())
 
+    def begin_parts(self, course_id, filename):
+        """
+        Starts a partial file, and returns its initial state.  The partial
+        file isn't listed by `links_for` until it is completed.
+        """
+        self.store(course_id, filename + self.PARTIAL_SUFFIX, StringIO())
+        return {'size': 0}
+
+    def store_part(self, course_id, filename, state, data):
+        """
+        Appends `data` to the partial file, and returns the new state.
+        Anything written to the file after `state` was returned is discarded
+        first.
+        """
+        with open(self.path_to(course_id, filename + self.PARTIAL_SUFFIX), "r+b") as f:
+            f.truncate(state['size'])
+            f.seek(state['size'])
+            f.write(data)
+        return {'size': state['size'] + len(data)}
+
+    def complete_parts(self, course_id, filename, state):
+        """
+        Renames the partial file to `filename`.
+        """
+        partial_path = self.path_to(course_id, filename + self.PARTIAL_SUFFIX)
+        with open(partial_path, "r+b") as f:
+            f.truncate(state['size'])
+        os.rename(partial_path, self.path_to(course_id, filename))
+
+    def abort_parts(self, course_id, filename, state):  # pylint: disable=unused-argument
+        """
+        Deletes the partial file.
+        """
+        self.delete(course_id, filename + self.PARTIAL_SUFFIX)
+
     def store_rows(self, course_id, filename, rows):
         """
         Given a course_id, filename, and rows (each row is an iterable of strings),
@@ -413,10 +639,33 @@ class LocalFSReportStore(ReportStore):
         course_dir = self.path_to(course_id, '')
         if not os.path.exists(course_dir):
             return []
-        files = [(filename, os.path.join(course_dir, filename)) for filename in os.listdir(course_dir)]
+        files = [
+            (filename, os.path.join(course_dir, filename))
+            for filename in os.listdir(course_dir)
+            if not filename.endswith(self.PARTIAL_SUFFIX)
+        ]
         files.sort(key=lambda (filename, full_path): os.path.getmtime(full_path), reverse=True)
 
         return [
             (filename, ("file://" + urllib.quote(full_path)))
             for filename, full_path in files
         ]
+
+    def read_rows(self, course_id, filename):
+        """
+        Returns the rows of the csv file stored by `store_rows`, as lists of
+        unicode strings, or None if the file doesn't exist.
+        """
+        full_path = self.path_to(course_id, filename)
+        if not os.path.exists(full_path):
+            return None
+        with open(full_path, "rb") as f:
+            return list(self._get_unicode_rows(csv.reader(f)))
+
+    def delete(self, course_id, filename):
+        """
+        Deletes the file, if it exists.
+        """
+        full_path = self.path_to(course_id, filename)
+        if os.path.exists(full_path):
+            os.remove(full_path)
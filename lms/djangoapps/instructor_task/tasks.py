@@ -20,6 +20,7 @@ of the query for traversing StudentModule objects.
 
 """
 import logging
+import sys
 from functools import partial
 
 from django.conf import settings
@@ -36,7 +37,9 @@ from instructor_task.tasks_helper import (
     delete_problem_module_state,
     upload_problem_responses_csv,
     upload_grades_csv,
+    abort_grades_csv,
     upload_problem_grade_report,
+    perform_grade_report_shard,
     upload_students_csv,
     cohort_students_and_upload,
     upload_enrollment_report,
@@ -159,10 +162,21 @@ def calculate_problem_responses_csv(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
-@task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+@task(  # pylint: disable=not-callable
+    base=BaseInstructorTask,
+    routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+    acks_late=True,
+    default_retry_delay=settings.GRADES_DOWNLOAD_DEFAULT_RETRY_DELAY,
+    max_retries=settings.GRADES_DOWNLOAD_MAX_RETRIES,
+)
 def calculate_grades_csv(entry_id, xmodule_instance_args):
     """
     Grade a course and push the results to an S3 bucket for download.
+
+    The task is only acknowledged once it has finished, so the broker
+    redelivers it if its worker goes away, and it is retried when it fails.
+    Either way, the report resumes from its last checkpoint (see
+    `upload_grades_csv`).  Once out of retries, the report is discarded.
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('graded')
@@ -172,7 +186,29 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
     )
 
     task_fn = partial(upload_grades_csv, xmodule_instance_args)
-    return run_main_task(entry_id, task_fn, action_name)
+    try:
+        return run_main_task(entry_id, task_fn, action_name)
+    except Exception as exc:  # pylint: disable=broad-except
+        if calculate_grades_csv.request.retries < calculate_grades_csv.max_retries:
+            TASK_LOG.warning(
+                u"Task: %s, InstructorTask ID: %s, Task type: %s, Retrying after error: %s",
+                xmodule_instance_args.get('task_id'), entry_id, action_name, exc
+            )
+            raise calculate_grades_csv.retry(exc=exc)
+        exc_info = sys.exc_info()
+        abort_grades_csv(entry_id)
+        raise exc_info[0], exc_info[1], exc_info[2]
+
+
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def generate_grade_report_shard(entry_id, report_name, shard_index, student_ids, report_filenames, subtask_status_dict):
+    """
+    Grade a shard of the students of a grade report generated by subtasks,
+    merging the shards into the report once all of them are generated.
+    """
+    return perform_grade_report_shard(
+        entry_id, report_name, shard_index, student_ids, report_filenames, subtask_status_dict
+    )
 
 
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
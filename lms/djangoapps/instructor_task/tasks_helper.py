@@ -5,11 +5,12 @@ running state of a course.
 """
 import json
 import re
+import traceback
 from collections import OrderedDict
 from datetime import datetime
 from django.conf import settings
 from eventtracking import tracker
-from itertools import chain
+from itertools import chain, count
 from time import time
 import unicodecsv
 import logging
@@ -17,6 +18,7 @@ import logging
 from celery import Task, current_task
 from celery.states import SUCCESS, FAILURE
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.storage import DefaultStorage
 from django.db import transaction, reset_queries
 from django.db.models import Q
@@ -45,18 +47,27 @@ from certificates.models import (
 )
 from certificates.api import generate_user_certificates
 from courseware.courses import get_course_by_id, get_problems_in_section
+from courseware.field_overrides import clear_resolved_overrides
 from courseware.grades import iterate_grades_for
 from courseware.models import StudentModule
+from courseware.student_field_overrides import clear_prefetched_overrides
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
 from instructor_analytics.basic import (
     enrolled_students_features,
     get_proctored_exam_results,
-    list_may_enroll,
-    list_problem_responses
+    iter_problem_responses,
+    list_may_enroll
 )
 from instructor_analytics.csvs import format_dictlist
-from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.models import ReportPartsWriter, ReportStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SUBTASK_LOCK_EXPIRE,
+    SubtaskStatus,
+    check_subtask_is_valid,
+    queue_subtasks_for_query,
+    update_subtask_status,
+)
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
@@ -77,6 +88,14 @@ FILTERED_OUT_ROLES = ['staff', 'instructor', 'finance_admin', 'sales_admin']
 UPDATE_STATUS_SUCCEEDED = 'succeeded'
 UPDATE_STATUS_FAILED = 'failed'
 UPDATE_STATUS_SKIPPED = 'skipped'
+# size, in bytes, of the parts in which grade reports are stored; a retried
+# grade report task regrades at most one part's worth of students
+GRADE_REPORT_PART_SIZE = 1024 * 1024
+# header row of the grade error report
+GRADE_REPORT_ERR_HEADER_ROW = ["id", "username", "error_msg"]
+# display names of the student fields in the problem grade report, keyed by
+# the django User field names of those fields
+PROBLEM_GRADE_REPORT_STUDENT_FIELDS = OrderedDict([('id', 'Student ID'), ('email', 'Email'), ('username', 'Username')])
 
 # The setting name used for events when "settings" (account settings, preferences, profile information) change.
 REPORT_REQUESTED_EVENT_NAME = u'edx.instructor.report.requested'
@@ -390,6 +409,10 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
                 task_progress.skipped += 1
             else:
                 raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+        # Discard the overrides resolved and prefetched for this module's
+        # student, as the request cache is only cleared once the task is done.
+        clear_resolved_overrides()
+        clear_prefetched_overrides()
 
     return task_progress.update_task_state()
 
@@ -612,18 +635,22 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name
         course_id: ID of the course
     """
     report_store = ReportStore.from_config(config_name)
-    report_store.store_rows(
-        course_id,
-        u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
-            course_prefix=course_filename_prefix_generator(course_id),
-            csv_name=csv_name,
-            timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
-        ),
-        rows
-    )
+    report_store.store_rows(course_id, _report_filename(csv_name, course_id, timestamp), rows)
     tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": csv_name, })
 
 
+def _report_filename(csv_name, course_id, timestamp):
+    """
+    Returns the name of the file for the `csv_name` report of the course
+    generated at `timestamp`.
+    """
+    return u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
+        course_prefix=course_filename_prefix_generator(course_id),
+        csv_name=csv_name,
+        timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
+    )
+
+
 def upload_exec_summary_to_store(data_dict, report_name, course_id, generated_at, config_name='FINANCIAL_REPORTS'):
     """
     Upload Executive Summary Html file using ReportStore.
@@ -659,18 +686,20 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     For a given `course_id`, generate a grades CSV file for all students that
     are enrolled, and store using a `ReportStore`. Once created, the files can
     be accessed by instantiating another `ReportStore` (via
-    `ReportStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
-    that are visible in ReportStore will be complete ones.
-
-    As we start to add more CSV downloads, it will probably be worthwhile to
-    make a more general CSVDoc class instead of building out the rows like we
-    do here.
+    `ReportStore.from_config()`) and calling `link_for()` on it. Rows are
+    stored in parts as they are generated, but the file only becomes visible
+    in the ReportStore once it is complete.
+
+    Students are graded in order of id, and whenever a part is stored, the
+    id of the last student graded is checkpointed in the InstructorTask, so
+    that a retried task (see `calculate_grades_csv`) resumes the report where
+    it stopped.  Once the task won't be retried, `abort_grades_csv` discards
+    the parts stored so far.
     """
     start_time = time()
     start_date = datetime.now(UTC)
     status_interval = 100
-    enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id)
+    enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id).order_by('id')
     task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
 
     fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Input: {task_input}'
@@ -682,27 +711,59 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     )
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
-    course = get_course_by_id(course_id)
-    course_is_cohorted = is_course_cohorted(course.id)
-    teams_enabled = course.teams_enabled
-    cohorts_header = ['Cohort Name'] if course_is_cohorted else []
-    teams_header = ['Team Name'] if teams_enabled else []
-
-    experiment_partitions = get_split_user_partitions(course.user_partitions)
-    group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
-
-    certificate_info_header = ['Certificate Eligible', 'Certificate Delivered', 'Certificate Type']
-    certificate_whitelist = CertificateWhitelist.objects.filter(course_id=course_id, whitelist=True)
-    whitelisted_user_ids = [entry.user_id for entry in certificate_whitelist]
-
-    # Loop over all our students and build our CSV lists in memory
-    header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
+    if _use_grade_report_subtasks(_entry_id, task_progress.total):
+        return _queue_grade_report_subtasks(_entry_id, course_id, action_name, 'grade_report', enrolled_students)
+
+    context = _grade_report_context(get_course_by_id(course_id))
+
+    entry = InstructorTask.objects.get(pk=_entry_id) if _entry_id is not None else None
+    checkpoint = entry.get_checkpoint() if entry is not None else None
+    if checkpoint is None:
+        checkpoint = {
+            'filename': _report_filename('grade_report', course_id, start_date),
+            'err_filename': _report_filename('grade_report_err', course_id, start_date),
+            'writer_state': None,
+            'header': None,
+            'err_rows': [GRADE_REPORT_ERR_HEADER_ROW],
+            'last_user_id': None,
+            'attempted': 0,
+            'succeeded': 0,
+            'failed': 0,
+        }
+    elif checkpoint['last_user_id'] is not None:
+        TASK_LOG.info(
+            u'%s, Task type: %s, Resuming after student %s',
+            task_info_string,
+            action_name,
+            checkpoint['last_user_id']
+        )
+        enrolled_students = enrolled_students.filter(id__gt=checkpoint['last_user_id'])
+        task_progress.attempted = checkpoint['attempted']
+        task_progress.succeeded = checkpoint['succeeded']
+        task_progress.failed = checkpoint['failed']
+
+    # Loop over all our students, storing the CSV rows in parts as we go
+    report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+    writer = ReportPartsWriter(
+        report_store,
+        course_id,
+        checkpoint['filename'],
+        state=checkpoint['writer_state'],
+        part_size=GRADE_REPORT_PART_SIZE
+    )
+    if entry is not None and checkpoint['writer_state'] is None:
+        # checkpointed before grading anyone, so that the parts can be
+        # discarded however soon the task fails
+        checkpoint['writer_state'] = writer.state
+        entry.save_checkpoint(checkpoint)
+    header = checkpoint['header']
+    # copied, so that the checkpoint only has the rows of the students up to
+    # its last_user_id
+    err_rows = list(checkpoint['err_rows'])
     current_step = {'step': 'Calculating Grades'}
 
-    total_enrolled_students = enrolled_students.count()
-    student_counter = 0
+    total_enrolled_students = task_progress.total
+    student_counter = task_progress.attempted
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Starting grade calculation for total students: %s',
         task_info_string,
@@ -711,17 +772,54 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
 
         total_enrolled_students
     )
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
-        # Periodically update task status (this is a cache write)
-        if task_progress.attempted % status_interval == 0:
-            task_progress.update_task_state(extra_meta=current_step)
-        task_progress.attempted += 1
+    try:
+        for student, gradeset, err_msg in iterate_grades_for(
+                course_id, enrolled_students.iterator(), batch_size=settings.GRADES_DOWNLOAD_BATCH_SIZE
+        ):
+            # Periodically update task status (this is a cache write)
+            if task_progress.attempted % status_interval == 0:
+                task_progress.update_task_state(extra_meta=current_step)
+            task_progress.attempted += 1
+
+            # Now add a log entry after each student is graded to get a sense
+            # of the task's progress
+            student_counter += 1
+            TASK_LOG.info(
+                u'%s, Task type: %s, Current step: %s, Grade calculation in-progress for students: %s/%s',
+                task_info_string,
+                action_name,
+                current_step,
+                student_counter,
+                total_enrolled_students
+            )
+
+            if gradeset:
+                # We were able to successfully grade this student for this course.
+                task_progress.succeeded += 1
+                if header is None:
+                    header = [section['label'] for section in gradeset[u'section_breakdown']]
+                    writer.writerow(_grade_report_header_row(context, header))
+                part_stored = writer.writerow(_grade_report_row(context, header, student, gradeset))
+            else:
+                # An empty gradeset means we failed to grade a student.
+                task_progress.failed += 1
+                err_rows.append([student.id, student.username, err_msg])
+                part_stored = False
+
+            if part_stored and entry is not None:
+                checkpoint.update({
+                    'writer_state': writer.state,
+                    'header': header,
+                    'err_rows': list(err_rows),
+                    'last_user_id': student.id,
+                    'attempted': task_progress.attempted,
+                    'succeeded': task_progress.succeeded,
+                    'failed': task_progress.failed,
+                })
+                entry.save_checkpoint(checkpoint)
 
-        # Now add a log entry after each student is graded to get a sense
-        # of the task's progress
-        student_counter += 1
         TASK_LOG.info(
-            u'%s, Task type: %s, Current step: %s, Grade calculation in-progress for students: %s/%s',
+            u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
             task_info_string,
             action_name,
             current_step,
@@ -729,95 +827,335 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             total_enrolled_students
         )
 
-        if gradeset:
-            # We were able to successfully grade this student for this course.
-            task_progress.succeeded += 1
-            if not header:
-                header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
-                    ["id", "email", "username", "grade"] + header + cohorts_header +
-                    group_configs_header + teams_header +
-                    ['Enrollment Track', 'Verification Status'] + certificate_info_header
-                )
+        # By this point, all that's left is to complete our CSV files.
+        current_step = {'step': 'Uploading CSVs'}
+        task_progress.update_task_state(extra_meta=current_step)
+        TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-            percents = {
-                section['label']: section.get('percent', 0.0)
-                for section in gradeset[u'section_breakdown']
-                if 'label' in section
-            }
+        writer.close()
+    except Exception:
+        # Without an InstructorTask to checkpoint in, the report can't be resumed.
+        if entry is None:
+            writer.abort()
+        raise
+    tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": 'grade_report', })
 
-            cohorts_group_name = []
-            if course_is_cohorted:
-                group = get_cohort(student, course_id, assign=False)
-                cohorts_group_name.append(group.name if group else '')
+    # If there are any error rows (don't count the header), write them out as well
+    if len(err_rows) > 1:
+        report_store.store_rows(course_id, checkpoint['err_filename'], err_rows)
+        tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": 'grade_report_err', })
 
-            group_configs_group_names = []
-            for partition in experiment_partitions:
-                group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
-                group_configs_group_names.append(group.name if group else '')
+    if entry is not None:
+        entry.save_checkpoint(None)
 
-            team_name = []
-            if teams_enabled:
-                try:
-                    membership = CourseTeamMembership.objects.get(user=student, team__course_id=course_id)
-                    team_name.append(membership.team.name)
-                except CourseTeamMembership.DoesNotExist:
-                    team_name.append('')
-
-            enrollment_mode = CourseEnrollment.enrollment_mode_for_user(student, course_id)[0]
-            verification_status = SoftwareSecurePhotoVerification.verification_status_for_user(
-                student,
-                course_id,
-                enrollment_mode
-            )
-            certificate_info = certificate_info_for_user(
-                student,
-                course_id,
-                gradeset['grade'],
-                student.id in whitelisted_user_ids
-            )
+    # One last update before we close out...
+    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
+    return task_progress.update_task_state(extra_meta=current_step)
 
-            # Not everybody has the same gradable items. If the item is not
-            # found in the user's gradeset, just assume it's a 0. The aggregated
-            # grades for their sections and overall course will be calculated
-            # without regard for the item they didn't have access to, so it's
-            # possible for a student to have a 0.0 show up in their row but
-            # still have 100% for the course.
-            row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
-                [student.id, student.email, student.username, gradeset['percent']] +
-                row_percents + cohorts_group_name + group_configs_group_names + team_name +
-                [enrollment_mode] + [verification_status] + certificate_info
-            )
+
+def abort_grades_csv(entry_id):
+    """
+    Discards the parts of the grade report checkpointed by `upload_grades_csv`
+    for the InstructorTask `entry_id`, and its checkpoint, once the task
+    generating it has failed for good.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    checkpoint = entry.get_checkpoint()
+    if checkpoint is None:
+        return
+    if checkpoint['writer_state'] is not None:
+        report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+        report_store.abort_parts(entry.course_id, checkpoint['filename'], checkpoint['writer_state'])
+    entry.save_checkpoint(None)
+
+
+def _grade_report_context(course):
+    """
+    Returns a dict of the course-wide data used to build the rows of the
+    grade report of `course`.
+    """
+    certificate_whitelist = CertificateWhitelist.objects.filter(course_id=course.id, whitelist=True)
+    return {
+        'course_id': course.id,
+        'course_is_cohorted': is_course_cohorted(course.id),
+        'teams_enabled': course.teams_enabled,
+        'experiment_partitions': get_split_user_partitions(course.user_partitions),
+        'whitelisted_user_ids': set(entry.user_id for entry in certificate_whitelist),
+    }
+
+
+def _grade_report_header_row(context, header):
+    """
+    Returns the header row of a grade report, given the labels of the
+    graded sections in `header`.
+    """
+    cohorts_header = ['Cohort Name'] if context['course_is_cohorted'] else []
+    teams_header = ['Team Name'] if context['teams_enabled'] else []
+    group_configs_header = [
+        u'Experiment Group ({})'.format(partition.name) for partition in context['experiment_partitions']
+    ]
+    certificate_info_header = ['Certificate Eligible', 'Certificate Delivered', 'Certificate Type']
+    return (
+        ["id", "email", "username", "grade"] + header + cohorts_header +
+        group_configs_header + teams_header +
+        ['Enrollment Track', 'Verification Status'] + certificate_info_header
+    )
+
+
+def _grade_report_row(context, header, student, gradeset):
+    """
+    Returns the grade report row of a successfully graded student.
+    """
+    course_id = context['course_id']
+    percents = {
+        section['label']: section.get('percent', 0.0)
+        for section in gradeset[u'section_breakdown']
+        if 'label' in section
+    }
+
+    cohorts_group_name = []
+    if context['course_is_cohorted']:
+        group = get_cohort(student, course_id, assign=False)
+        cohorts_group_name.append(group.name if group else '')
+
+    group_configs_group_names = []
+    for partition in context['experiment_partitions']:
+        group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
+        group_configs_group_names.append(group.name if group else '')
+
+    team_name = []
+    if context['teams_enabled']:
+        try:
+            membership = CourseTeamMembership.objects.get(user=student, team__course_id=course_id)
+            team_name.append(membership.team.name)
+        except CourseTeamMembership.DoesNotExist:
+            team_name.append('')
+
+    enrollment_mode = CourseEnrollment.enrollment_mode_for_user(student, course_id)[0]
+    verification_status = SoftwareSecurePhotoVerification.verification_status_for_user(
+        student,
+        course_id,
+        enrollment_mode
+    )
+    certificate_info = certificate_info_for_user(
+        student,
+        course_id,
+        gradeset['grade'],
+        student.id in context['whitelisted_user_ids']
+    )
+
+    # Not everybody has the same gradable items. If the item is not
+    # found in the user's gradeset, just assume it's a 0. The aggregated
+    # grades for their sections and overall course will be calculated
+    # without regard for the item they didn't have access to, so it's
+    # possible for a student to have a 0.0 show up in their row but
+    # still have 100% for the course.
+    row_percents = [percents.get(label, 0.0) for label in header]
+    return (
+        [student.id, student.email, student.username, gradeset['percent']] +
+        row_percents + cohorts_group_name + group_configs_group_names + team_name +
+        [enrollment_mode] + [verification_status] + certificate_info
+    )
+
+
+def _grade_report_shard_rows(course_id, students):
+    """
+    Grades `students` and returns a tuple of the rows of their grade report
+    and of their grade error report, each starting with its header row if
+    not empty.
+    """
+    context = _grade_report_context(get_course_by_id(course_id))
+    header = None
+    rows = []
+    err_rows = []
+    for student, gradeset, err_msg in iterate_grades_for(
+            course_id, students, batch_size=settings.GRADES_DOWNLOAD_BATCH_SIZE
+    ):
+        if gradeset:
+            if header is None:
+                header = [section['label'] for section in gradeset[u'section_breakdown']]
+                rows.append(_grade_report_header_row(context, header))
+            rows.append(_grade_report_row(context, header, student, gradeset))
         else:
-            # An empty gradeset means we failed to grade a student.
-            task_progress.failed += 1
+            if not err_rows:
+                err_rows.append(GRADE_REPORT_ERR_HEADER_ROW)
             err_rows.append([student.id, student.username, err_msg])
+    return rows, err_rows
 
-    TASK_LOG.info(
-        u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
-        task_info_string,
+
+def _use_grade_report_subtasks(entry_id, num_students):
+    """
+    Returns whether a grade report of `num_students` students should be
+    generated by subtasks rather than by the task itself.
+    """
+    students_per_task = settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK
+    return entry_id is not None and bool(students_per_task) and num_students > students_per_task
+
+
+def _queue_grade_report_subtasks(entry_id, course_id, action_name, report_name, enrolled_students):
+    """
+    Queues subtasks that each grade settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK
+    of the `enrolled_students` and store their rows of the `report_name`
+    report as a shard.  The last subtask to complete merges the shards into
+    the report.
+
+    Returns the task progress as stored in the InstructorTask object.
+    """
+    # Imported here to avoid a circular import, since instructor_task.tasks
+    # imports this module.
+    from instructor_task.tasks import generate_grade_report_shard
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # As with bulk email, if the subtasks have already been queued by an
+    # earlier run of this task, don't queue them again.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already queued subtasks for %s: %s", entry.task_id, report_name, entry)
+        return json.loads(entry.task_output)
+
+    start_date = datetime.now(UTC)
+    report_filenames = {
+        report_name: _report_filename(report_name, course_id, start_date),
+        report_name + '_err': _report_filename(report_name + '_err', course_id, start_date),
+    }
+    shard_indices = count()
+
+    def _create_shard_subtask(student_list, initial_subtask_status):
+        """Creates a subtask to generate the next shard of the report."""
+        return generate_grade_report_shard.subtask(
+            (
+                entry_id,
+                report_name,
+                next(shard_indices),
+                [student['pk'] for student in student_list],
+                report_filenames,
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
         action_name,
-        current_step,
-        student_counter,
-        total_enrolled_students
+        _create_shard_subtask,
+        [enrolled_students],
+        [],
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK,
+        enrolled_students.count(),
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    current_step = {'step': 'Uploading CSVs'}
-    task_progress.update_task_state(extra_meta=current_step)
-    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
+def perform_grade_report_shard(entry_id, report_name, shard_index, student_ids, report_filenames, subtask_status_dict):
+    """
+    Grades the students with the given ids and stores their rows of the
+    `report_name` report, and of its error report, as the `shard_index`
+    shards of the files named in `report_filenames`.  If this completes the
+    last of the subtasks of the InstructorTask, successfully or not, the
+    shards are merged into the report, and only then is the InstructorTask
+    marked as complete.
+
+    Returns the status of the subtask as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
 
-    # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
-        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+    course_id = InstructorTask.objects.get(pk=entry_id).course_id
+    students = User.objects.filter(id__in=student_ids).order_by('id')
+    try:
+        rows, err_rows = GRADE_REPORT_SHARD_GENERATORS[report_name](course_id, students)
+        report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+        for csv_name, shard_rows in ((report_name, rows), (report_name + '_err', err_rows)):
+            report_store.store_rows(
+                course_id,
+                _shard_filename(report_filenames[csv_name], shard_index),
+                shard_rows
+            )
+    except Exception:
+        # Count all of the students as failed, to keep the counts consistent.
+        TASK_LOG.exception(u"Grade report subtask %s for instructor task %s failed", current_task_id, entry_id)
+        subtask_status.increment(failed=len(student_ids), state=FAILURE)
+        raise
+    else:
+        num_failed = max(len(err_rows) - 1, 0)
+        subtask_status.increment(succeeded=len(student_ids) - num_failed, failed=num_failed, state=SUCCESS)
+    finally:
+        # The last subtask to complete merges the shards even if it failed,
+        # and marks the InstructorTask as complete once the report is stored.
+        update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False)
+        _merge_grade_report_shards_if_complete(entry_id, report_filenames)
+    return subtask_status.to_dict()
 
-    # One last update before we close out...
-    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
-    return task_progress.update_task_state(extra_meta=current_step)
+
+def _shard_filename(filename, shard_index):
+    """
+    Returns the name of the file storing the `shard_index` shard of the
+    report named `filename`.
+    """
+    return u"{}.{:05d}{}".format(filename, shard_index, ReportStore.PARTIAL_SUFFIX)
+
+
+def _merge_grade_report_shards_if_complete(entry_id, report_filenames):
+    """
+    If all of the subtasks of the InstructorTask have completed, merges the
+    shards of each file named in `report_filenames`, in order, into that
+    file, and deletes the shards.  Files without any rows aren't stored.
+
+    The InstructorTask's state is then changed to SUCCESS, or to FAILURE if
+    the shards couldn't be merged.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    subtask_dict = json.loads(entry.subtasks)
+    if subtask_dict['succeeded'] + subtask_dict['failed'] < subtask_dict['total']:
+        return
+
+    # More than one subtask may see all of the subtasks completed, but only
+    # one of them should merge the shards.
+    if not cache.add(u"grade-report-merge-{}".format(entry_id), 'true', SUBTASK_LOCK_EXPIRE):
+        return
+
+    try:
+        _merge_grade_report_shards(entry, subtask_dict['total'], report_filenames)
+    except Exception as exc:
+        TASK_LOG.exception(u"Instructor task %s: failed to merge the grade report shards", entry_id)
+        InstructorTask.objects.filter(pk=entry_id).update(
+            task_state=FAILURE,
+            task_output=InstructorTask.create_output_for_failure(exc, traceback.format_exc()),
+        )
+        raise
+    InstructorTask.objects.filter(pk=entry_id).update(task_state=SUCCESS)
+
+
+def _merge_grade_report_shards(entry, num_shards, report_filenames):
+    """
+    Merges the `num_shards` shards of each file named in `report_filenames`
+    for the InstructorTask `entry`, in order, into that file, and deletes
+    the shards.
+    """
+    report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+    for csv_name, filename in report_filenames.iteritems():
+        writer = None
+        shard_filenames = [_shard_filename(filename, index) for index in range(num_shards)]
+        for shard_filename in shard_filenames:
+            shard_rows = report_store.read_rows(entry.course_id, shard_filename)
+            if shard_rows is None:
+                TASK_LOG.warning(u"Instructor task %s: missing grade report shard %s", entry.id, shard_filename)
+                continue
+            if not shard_rows:
+                continue
+            if writer is None:
+                writer = ReportPartsWriter(report_store, entry.course_id, filename, part_size=GRADE_REPORT_PART_SIZE)
+                # Every shard starts with the same header row; only keep the first one.
+                writer.writerow(shard_rows[0])
+            for row in shard_rows[1:]:
+                writer.writerow(row)
+
+        if writer is not None:
+            writer.close()
+            tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": csv_name, })
+        for shard_filename in shard_filenames:
+            report_store.delete(entry.course_id, shard_filename)
 
 
 def _order_problems(blocks):
@@ -882,24 +1220,32 @@ def upload_problem_responses_csv(_xmodule_instance_args, _entry_id, course_id, t
     current_step = {'step': 'Calculating students answers to problem'}
     task_progress.update_task_state(extra_meta=current_step)
 
-    # Compute result table and format it
+    # Compute the result table, storing it in parts as the responses are
+    # fetched, so that the responses of large courses are never all in memory
     problem_location = task_input.get('problem_location')
-    student_data = list_problem_responses(course_id, problem_location)
+    csv_name = 'student_state_from_{}'.format(re.sub(r'[:/]', '_', problem_location))
     features = ['username', 'state']
-    header, rows = format_dictlist(student_data, features)
+    writer = ReportPartsWriter(
+        ReportStore.from_config('GRADES_DOWNLOAD'),
+        course_id,
+        _report_filename(csv_name, course_id, start_date),
+        part_size=GRADE_REPORT_PART_SIZE
+    )
+    writer.writerow(features)
+    num_rows = 0
+    for response in iter_problem_responses(course_id, problem_location):
+        writer.writerow([response[feature] for feature in features])
+        num_rows += 1
 
-    task_progress.attempted = task_progress.succeeded = len(rows)
+    task_progress.attempted = task_progress.succeeded = num_rows
     task_progress.skipped = task_progress.total - task_progress.attempted
 
-    rows.insert(0, header)
-
     current_step = {'step': 'Uploading CSV'}
     task_progress.update_task_state(extra_meta=current_step)
 
-    # Perform the upload
-    problem_location = re.sub(r'[:/]', '_', problem_location)
-    csv_name = 'student_state_from_{}'.format(problem_location)
-    upload_csv_to_report_store(rows, csv_name, course_id, start_date)
+    # Complete the upload
+    writer.close()
+    tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": csv_name, })
 
     return task_progress.update_task_state(extra_meta=current_step)
 
@@ -915,55 +1261,35 @@ def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _t
     enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id)
     task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
 
-    # This struct encapsulates both the display names of each static item in the
-    # header row as values as well as the django User field names of those items
-    # as the keys.  It is structured in this way to keep the values related.
-    header_row = OrderedDict([('id', 'Student ID'), ('email', 'Email'), ('username', 'Username')])
-
     try:
-        course_structure = CourseStructure.objects.get(course_id=course_id)
-        blocks = course_structure.ordered_blocks
-        problems = _order_problems(blocks)
+        problems = _problem_grade_report_problems(course_id)
     except CourseStructure.DoesNotExist:
         return task_progress.update_task_state(
             extra_meta={'step': 'Generating course structure. Please refresh and try again.'}
         )
 
+    if _use_grade_report_subtasks(_entry_id, task_progress.total):
+        return _queue_grade_report_subtasks(
+            _entry_id, course_id, action_name, 'problem_grade_report', enrolled_students.order_by('id')
+        )
+
     # Just generate the static fields for now.
-    rows = [list(header_row.values()) + ['Final Grade'] + list(chain.from_iterable(problems.values()))]
-    error_rows = [list(header_row.values()) + ['error_msg']]
+    header_row, error_header_row = _problem_grade_report_header_rows(problems)
+    rows = [header_row]
+    error_rows = [error_header_row]
     current_step = {'step': 'Calculating Grades'}
 
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students, keep_raw_scores=True):
-        student_fields = [getattr(student, field_name) for field_name in header_row]
+    for student, gradeset, err_msg in iterate_grades_for(
+            course_id, enrolled_students, keep_raw_scores=True, batch_size=settings.GRADES_DOWNLOAD_BATCH_SIZE
+    ):
         task_progress.attempted += 1
-
-        if 'percent' not in gradeset or 'raw_scores' not in gradeset:
-            # There was an error grading this student.
-            # Generally there will be a non-empty err_msg, but that is not always the case.
-            if not err_msg:
-                err_msg = u"Unknown error"
-            error_rows.append(student_fields + [err_msg])
+        row, error_row = _problem_grade_report_row(problems, student, gradeset, err_msg)
+        if error_row is not None:
+            error_rows.append(error_row)
             task_progress.failed += 1
             continue
 
-        final_grade = gradeset['percent']
-        # Only consider graded problems
-        problem_scores = {unicode(score.module_id): score for score in gradeset['raw_scores'] if score.graded}
-        earned_possible_values = list()
-        for problem_id in problems:
-            try:
-                problem_score = problem_scores[problem_id]
-                earned_possible_values.append([problem_score.earned, problem_score.possible])
-            except KeyError:
-                # The student has not been graded on this problem.  For example,
-                # iterate_grades_for skips problems that students have never
-                # seen in order to speed up report generation.  It could also be
-                # the case that the student does not have access to it (e.g. A/B
-                # test or cohorted courseware).
-                earned_possible_values.append(['N/A', 'N/A'])
-        rows.append(student_fields + [final_grade] + list(chain.from_iterable(earned_possible_values)))
-
+        rows.append(row)
         task_progress.succeeded += 1
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
@@ -978,6 +1304,90 @@ def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _t
     return task_progress.update_task_state(extra_meta={'step': 'Uploading CSV'})
 
 
+def _problem_grade_report_problems(course_id):
+    """
+    Returns the problem grade report headers of the graded problems of the
+    course, keyed by problem id, in course order.  Raises
+    CourseStructure.DoesNotExist if the course structure hasn't been
+    generated yet.
+    """
+    course_structure = CourseStructure.objects.get(course_id=course_id)
+    return _order_problems(course_structure.ordered_blocks)
+
+
+def _problem_grade_report_header_rows(problems):
+    """
+    Returns the header rows of the problem grade report and of its error
+    report.
+    """
+    return (
+        list(PROBLEM_GRADE_REPORT_STUDENT_FIELDS.values()) + ['Final Grade'] +
+        list(chain.from_iterable(problems.values())),
+        list(PROBLEM_GRADE_REPORT_STUDENT_FIELDS.values()) + ['error_msg'],
+    )
+
+
+def _problem_grade_report_row(problems, student, gradeset, err_msg):
+    """
+    Returns a tuple of the problem grade report row of the student and None,
+    or of None and the student's error report row if the student couldn't be
+    graded.
+    """
+    student_fields = [getattr(student, field_name) for field_name in PROBLEM_GRADE_REPORT_STUDENT_FIELDS]
+
+    if 'percent' not in gradeset or 'raw_scores' not in gradeset:
+        # There was an error grading this student.
+        # Generally there will be a non-empty err_msg, but that is not always the case.
+        if not err_msg:
+            err_msg = u"Unknown error"
+        return None, student_fields + [err_msg]
+
+    final_grade = gradeset['percent']
+    # Only consider graded problems
+    problem_scores = {unicode(score.module_id): score for score in gradeset['raw_scores'] if score.graded}
+    earned_possible_values = list()
+    for problem_id in problems:
+        try:
+            problem_score = problem_scores[problem_id]
+            earned_possible_values.append([problem_score.earned, problem_score.possible])
+        except KeyError:
+            # The student has not been graded on this problem.  For example,
+            # iterate_grades_for skips problems that students have never
+            # seen in order to speed up report generation.  It could also be
+            # the case that the student does not have access to it (e.g. A/B
+            # test or cohorted courseware).
+            earned_possible_values.append(['N/A', 'N/A'])
+    return student_fields + [final_grade] + list(chain.from_iterable(earned_possible_values)), None
+
+
+def _problem_grade_report_shard_rows(course_id, students):
+    """
+    Grades `students` and returns a tuple of the rows of their problem grade
+    report and of their problem grade error report, each starting with its
+    header row if not empty.
+    """
+    problems = _problem_grade_report_problems(course_id)
+    header_row, error_header_row = _problem_grade_report_header_rows(problems)
+    rows = []
+    error_rows = []
+    for student, gradeset, err_msg in iterate_grades_for(
+            course_id, students, keep_raw_scores=True, batch_size=settings.GRADES_DOWNLOAD_BATCH_SIZE
+    ):
+        row, error_row = _problem_grade_report_row(problems, student, gradeset, err_msg)
+        if error_row is not None:
+            error_rows.append(error_row)
+        else:
+            rows.append(row)
+    return ([header_row] + rows if rows else []), ([error_header_row] + error_rows if error_rows else [])
+
+
+# functions that generate the rows of a shard of each report generated by subtasks
+GRADE_REPORT_SHARD_GENERATORS = {
+    'grade_report': _grade_report_shard_rows,
+    'problem_grade_report': _problem_grade_report_shard_rows,
+}
+
+
 def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
     """
     For a given `course_id`, generate a CSV file containing profile
@@ -3,12 +3,15 @@ Tests for instructor_task/models.py.
 """
 
 from cStringIO import StringIO
+from gzip import GzipFile
 import mock
+import os.path
 import time
 from datetime import datetime
 from unittest import TestCase
+from uuid import uuid4
 
-from instructor_task.models import LocalFSReportStore, S3ReportStore
+from instructor_task.models import LocalFSReportStore, ReportPartsWriter, S3ReportStore
 from instructor_task.tests.test_base import TestReportMixin
 from opaque_keys.edx.locator import CourseLocator
 
@@ -30,10 +33,42 @@ class MockKey(object):
         return "http://fake-edx-s3.edx.org/"
 
 
+class MockMultiPartUpload(object):
+    """
+    Mocking a boto S3 MultiPartUpload object.
+    """
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.id = None  # pylint: disable=invalid-name
+        self.key_name = None
+
+    def upload_part_from_file(self, fp, part_num):
+        """ Expected method on a MultiPartUpload object. """
+        self.bucket.parts[self.id].append((part_num, fp.read()))
+
+    def complete_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        self.bucket.completed_uploads.append(self.id)
+
+    def cancel_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        del self.bucket.parts[self.id]
+
+
 class MockBucket(object):
     """ Mocking a boto S3 Bucket object. """
     def __init__(self, _name):
         self.keys = []
+        self.parts = {}
+        self.completed_uploads = []
+
+    def initiate_multipart_upload(self, key_name, headers):  # pylint: disable=unused-argument
+        """ Expected method on a Bucket object. """
+        multipart_upload = MockMultiPartUpload(self)
+        multipart_upload.id = str(uuid4())
+        multipart_upload.key_name = key_name
+        self.parts[multipart_upload.id] = []
+        return multipart_upload
 
     def store_key(self, key):
         """ Not a Bucket method, created just to store the keys in the Bucket for testing purposes. """
@@ -93,9 +128,59 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase
         """ Create and return a LocalFSReportStore. """
         return LocalFSReportStore.from_config(config_name='GRADES_DOWNLOAD')
 
+    def test_read_and_delete_rows(self):
+        """
+        Test that rows stored with store_rows() can be read back, and that
+        reading a deleted file returns None.
+        """
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'rows.csv', [['a', 1], [u'\xf1', 2]])
+        self.assertEqual(report_store.read_rows(self.course_id, 'rows.csv'), [[u'a', u'1'], [u'\xf1', u'2']])
+
+        report_store.delete(self.course_id, 'rows.csv')
+        self.assertIsNone(report_store.read_rows(self.course_id, 'rows.csv'))
+
+    def test_store_in_parts(self):
+        """
+        Test that a report stored in parts is only listed once complete, and
+        that a writer can resume from the state of an earlier one.
+        """
+        report_store = self.create_report_store()
+        writer = ReportPartsWriter(report_store, self.course_id, 'report.csv', part_size=1)
+        self.assertTrue(writer.writerow(['a', 1]))
+        self.assertEqual(report_store.links_for(self.course_id), [])
+
+        # Rows buffered after the saved state are discarded on resumption.
+        state = writer.state
+        writer.part_size = 1024
+        self.assertFalse(writer.writerow(['lost', 0]))
+        writer.flush()
+
+        writer = ReportPartsWriter(report_store, self.course_id, 'report.csv', state=state)
+        writer.writerow([u'\xf1', 2])
+        writer.close()
+
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['report.csv'])
+        with open(report_store.path_to(self.course_id, 'report.csv')) as report_file:
+            self.assertEqual(report_file.read(), 'a,1\r\n\xc3\xb1,2\r\n')
+
+    def test_abort_parts(self):
+        """
+        Test that aborting a report stored in parts deletes its partial file.
+        """
+        report_store = self.create_report_store()
+        writer = ReportPartsWriter(report_store, self.course_id, 'report.csv', part_size=1)
+        writer.writerow(['a', 1])
+        writer.abort()
+
+        partial_path = report_store.path_to(self.course_id, 'report.csv' + report_store.PARTIAL_SUFFIX)
+        self.assertFalse(os.path.exists(partial_path))
+        self.assertEqual(report_store.links_for(self.course_id), [])
+
 
 @mock.patch('instructor_task.models.S3Connection', new=MockS3Connection)
 @mock.patch('instructor_task.models.Key', new=MockKey)
+@mock.patch('instructor_task.models.MultiPartUpload', new=MockMultiPartUpload)
 @mock.patch('instructor_task.models.settings.AWS_SECRET_ACCESS_KEY', create=True, new="access_key")
 @mock.patch('instructor_task.models.settings.AWS_ACCESS_KEY_ID', create=True, new="access_id")
 class S3ReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
@@ -105,3 +190,37 @@ class S3ReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     def create_report_store(self):
         """ Create and return a S3ReportStore. """
         return S3ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+
+    @mock.patch.object(S3ReportStore, 'min_part_size', 1024)
+    def test_store_in_parts(self):
+        """
+        Test that every part of a report but the last is at least the minimum
+        part size once compressed, and that the parts decompress to the rows.
+        """
+        report_store = self.create_report_store()
+        writer = ReportPartsWriter(report_store, self.course_id, 'report.csv', part_size=1)
+        rows = [[uuid4().hex, index] for index in range(2000)]
+        for row in rows:
+            writer.writerow(row)
+        writer.close()
+
+        (upload_id, parts), = report_store.bucket.parts.items()
+        self.assertEqual(report_store.bucket.completed_uploads, [upload_id])
+        self.assertGreater(len(parts), 1)
+        self.assertEqual([part_num for part_num, _data in parts], range(1, len(parts) + 1))
+        for _part_num, data in parts[:-1]:
+            self.assertGreaterEqual(len(data), 1024)
+        report_file = GzipFile(fileobj=StringIO(''.join(data for _part_num, data in parts)))
+        self.assertEqual(report_file.read(), ''.join('{},{}\r\n'.format(*row) for row in rows))
+
+    def test_abort_parts(self):
+        """
+        Test that aborting a report stored in parts cancels its upload.
+        """
+        report_store = self.create_report_store()
+        writer = ReportPartsWriter(report_store, self.course_id, 'report.csv', part_size=1)
+        writer.writerow(['a', 1])
+        writer.abort()
+
+        self.assertEqual(report_store.bucket.parts, {})
+        self.assertEqual(report_store.bucket.completed_uploads, [])
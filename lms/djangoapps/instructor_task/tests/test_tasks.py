@@ -27,6 +27,7 @@ from instructor_task.tasks import (
     reset_problem_attempts,
     delete_problem_state,
     generate_certificates,
+    calculate_grades_csv,
 )
 from instructor_task.tasks_helper import UpdateProblemModuleStateError
 
@@ -471,3 +472,38 @@ class TestCertificateGenerationnstructorTask(TestInstructorTasks):
             expected_attempted=1,
             expected_total=1
         )
+
+
+class TestGradeReportInstructorTask(TestInstructorTasks):
+    """Tests the instructor task that generates grade reports."""
+
+    @patch.object(calculate_grades_csv, 'max_retries', 2)
+    @patch('instructor_task.tasks.abort_grades_csv')
+    def test_retry_after_failure(self, mock_abort):
+        """
+        Test that a failed grade report is retried, and not aborted, when a
+        retry succeeds.
+        """
+        task_entry = self._create_input_entry()
+        progress = {'action_name': 'graded', 'attempted': 1, 'succeeded': 1, 'failed': 0}
+        with patch('instructor_task.tasks.upload_grades_csv') as mock_upload:
+            mock_upload.side_effect = [TestTaskFailure('Worker lost'), progress]
+            status = self._run_task_with_mock_celery(calculate_grades_csv, task_entry.id, task_entry.task_id)
+        self.assertEqual(status, progress)
+        self.assertEqual(mock_upload.call_count, 2)
+        self.assertFalse(mock_abort.called)
+
+    @patch.object(calculate_grades_csv, 'max_retries', 2)
+    @patch('instructor_task.tasks.abort_grades_csv')
+    def test_abort_after_retries(self, mock_abort):
+        """
+        Test that a grade report is aborted once it has failed on every retry.
+        """
+        task_entry = self._create_input_entry()
+        with patch('instructor_task.tasks.upload_grades_csv') as mock_upload:
+            mock_upload.side_effect = TestTaskFailure('Worker lost')
+            with self.assertRaises(TestTaskFailure):
+                self._run_task_with_mock_celery(calculate_grades_csv, task_entry.id, task_entry.task_id)
+        self.assertEqual(mock_upload.call_count, 3)
+        mock_abort.assert_called_once_with(task_entry.id)
+        self.assertEqual(InstructorTask.objects.get(id=task_entry.id).task_state, FAILURE)
@@ -6,10 +6,13 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 Tests that CSV grade report generation works with unicode emails.
 
 """
+from celery.states import SUCCESS, FAILURE
 import ddt
 from mock import Mock, patch
 import tempfile
 import json
+import os.path
+from uuid import uuid4
 from openedx.core.djangoapps.course_groups import cohorts
 import unicodecsv
 from django.core.urlresolvers import reverse
@@ -32,7 +35,9 @@ from student.models import CourseEnrollment, CourseEnrollmentAllowed, ManualEnro
 from verify_student.tests.factories import SoftwareSecurePhotoVerificationFactory
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.partitions.partitions import Group, UserPartition
-from instructor_task.models import ReportStore
+from instructor_task import tasks_helper
+from instructor_task.models import InstructorTask, ReportStore
+from instructor_task.tests.factories import InstructorTaskFactory
 from survey.models import SurveyForm, SurveyAnswer
 from instructor_task.tasks_helper import (
     cohort_students_and_upload,
@@ -111,6 +116,178 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
         self.assertTrue(any('grade_report_err' in item[0] for item in report_store.links_for(self.course.id)))
 
+    @patch('instructor_task.tasks_helper.GRADE_REPORT_PART_SIZE', 1)
+    @patch('instructor_task.tasks_helper._get_current_task')
+    @patch('instructor_task.tasks_helper.iterate_grades_for')
+    def test_resume_from_checkpoint(self, mock_iterate_grades_for, _mock_current_task):
+        """
+        Test that a retried grade report task resumes after the last student
+        checkpointed by the failed attempt.
+        """
+        student_1 = self.create_student('student_1')
+        student_2 = self.create_student('student_2')
+        student_3 = self.create_student('student_3')
+        gradeset = {u'section_breakdown': [{'label': u'HW 01', 'percent': 0.5}], 'percent': 0.5, 'grade': None}
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_key='dummy_task_key',
+            task_type='grade_course',
+        )
+
+        def crash_after_second_student(*args, **kwargs):  # pylint: disable=unused-argument
+            """ Grade the first student, fail to grade the second, then fail. """
+            yield student_1, gradeset, ''
+            yield student_2, {}, 'Cannot grade student'
+            raise ValueError('Worker lost')
+
+        mock_iterate_grades_for.side_effect = crash_after_second_student
+        with self.assertRaises(ValueError):
+            upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+        checkpoint = InstructorTask.objects.get(pk=entry.id).get_checkpoint()
+        self.assertEqual(checkpoint['last_user_id'], student_1.id)
+        self.assertEqual(checkpoint['err_rows'], [tasks_helper.GRADE_REPORT_ERR_HEADER_ROW])
+
+        mock_iterate_grades_for.side_effect = None
+        mock_iterate_grades_for.return_value = [
+            (student_2, {}, 'Cannot grade student'),
+            (student_3, gradeset, ''),
+        ]
+        result = upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+        self.assertDictContainsSubset({'attempted': 3, 'succeeded': 2, 'failed': 1}, result)
+        self.assertEqual(list(mock_iterate_grades_for.call_args[0][1]), [student_2, student_3])
+        self.assertIsNone(InstructorTask.objects.get(pk=entry.id).get_checkpoint())
+
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        links = dict(report_store.links_for(self.course.id))
+        report_filename, = [filename for filename in links if 'grade_report_err' not in filename]
+        err_filename, = [filename for filename in links if 'grade_report_err' in filename]
+        self.assertEqual(
+            [row[2] for row in report_store.read_rows(self.course.id, report_filename)[1:]],
+            ['student_1', 'student_3']
+        )
+        self.assertEqual(
+            report_store.read_rows(self.course.id, err_filename)[1:],
+            [[unicode(student_2.id), u'student_2', u'Cannot grade student']]
+        )
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    @patch('instructor_task.tasks_helper.iterate_grades_for')
+    def test_abort_after_failure(self, mock_iterate_grades_for, _mock_current_task):
+        """
+        Test that the parts of a grade report are discarded when it fails
+        without an InstructorTask to resume from, or when it is aborted.
+        """
+        student = self.create_student('student')
+        gradeset = {u'section_breakdown': [{'label': u'HW 01', 'percent': 0.5}], 'percent': 0.5, 'grade': None}
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_key='dummy_task_key',
+            task_type='grade_course',
+        )
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        course_dir = os.path.dirname(report_store.path_to(self.course.id, 'report.csv'))
+
+        def crash_after_first_student(*args, **kwargs):  # pylint: disable=unused-argument
+            """ Grade the first student, then fail. """
+            yield student, gradeset, ''
+            raise ValueError('Worker lost')
+
+        mock_iterate_grades_for.side_effect = crash_after_first_student
+        with self.assertRaises(ValueError):
+            upload_grades_csv(None, None, self.course.id, None, 'graded')
+        self.assertEqual(os.listdir(course_dir), [])
+
+        with self.assertRaises(ValueError):
+            upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+        self.assertEqual(len(os.listdir(course_dir)), 1)
+
+        tasks_helper.abort_grades_csv(entry.id)
+        self.assertEqual(os.listdir(course_dir), [])
+        self.assertIsNone(InstructorTask.objects.get(pk=entry.id).get_checkpoint())
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_grading_in_subtasks(self, _mock_current_task):
+        """
+        Test that a grade report generated by subtasks merges the rows of
+        all of the subtasks, in order, into a single report.
+        """
+        usernames = ['student_{}'.format(index) for index in range(5)]
+        for username in usernames:
+            self.create_student(username)
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_key='dummy_task_key',
+            task_type='grade_course',
+        )
+
+        upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertEqual(json.loads(entry.subtasks)['total'], 3)
+        self.assertDictContainsSubset({'attempted': 5, 'succeeded': 5, 'failed': 0}, json.loads(entry.task_output))
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(len(report_store.links_for(self.course.id)), 1)
+        self.verify_rows_in_csv([{'username': username} for username in usernames], ignore_other_columns=True)
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_last_subtask_failing(self, _mock_current_task):
+        """
+        Test that the shards are merged, and the task completed, even when the
+        last subtask to complete fails.
+        """
+        usernames = ['student_{}'.format(index) for index in range(5)]
+        for username in usernames:
+            self.create_student(username)
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_key='dummy_task_key',
+            task_type='grade_course',
+        )
+        generate_rows = tasks_helper.GRADE_REPORT_SHARD_GENERATORS['grade_report']
+
+        def fail_last_shard(course_id, students):
+            """ Fail to grade the shard of the last student. """
+            if any(student.username == usernames[-1] for student in students):
+                raise ValueError('Worker lost')
+            return generate_rows(course_id, students)
+
+        with patch.dict(tasks_helper.GRADE_REPORT_SHARD_GENERATORS, {'grade_report': fail_last_shard}):
+            upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertDictContainsSubset({'attempted': 5, 'succeeded': 4, 'failed': 1}, json.loads(entry.task_output))
+        self.verify_rows_in_csv([{'username': username} for username in usernames[:-1]], ignore_other_columns=True)
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_merge_failing(self, _mock_current_task):
+        """
+        Test that a task whose shards can't be merged isn't marked successful.
+        """
+        for index in range(3):
+            self.create_student('student_{}'.format(index))
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_key='dummy_task_key',
+            task_type='grade_course',
+        )
+
+        with patch('instructor_task.tasks_helper._merge_grade_report_shards', side_effect=IOError('Storage is down')):
+            upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertEqual(json.loads(entry.task_output)['message'], 'Storage is down')
+
     def test_cohort_data_in_grading(self):
         """
         Test that cohort data is included in grades csv if cohort configuration is enabled for course.
@@ -339,7 +516,7 @@ class TestProblemResponsesReport(TestReportMixin, InstructorTaskCourseTestCase):
     def test_success(self):
         task_input = {'problem_location': ''}
         with patch('instructor_task.tasks_helper._get_current_task'):
-            with patch('instructor_task.tasks_helper.list_problem_responses') as patched_data_source:
+            with patch('instructor_task.tasks_helper.iter_problem_responses') as patched_data_source:
                 patched_data_source.return_value = [
                     {'username': 'user0', 'state': u'state0'},
                     {'username': 'user1', 'state': u'state1'},
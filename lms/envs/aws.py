@@ -295,6 +295,8 @@ for name, value in ENV_TOKENS.get("CODE_JAIL", {}).items():
         CODE_JAIL[name] = value
 
 COURSES_WITH_UNSAFE_CODE = ENV_TOKENS.get("COURSES_WITH_UNSAFE_CODE", [])
+SAFE_EXEC_POOL_SIZE = ENV_TOKENS.get('SAFE_EXEC_POOL_SIZE', SAFE_EXEC_POOL_SIZE)
+SCRIPT_CONTEXT_CACHE_MAX_ENTRIES = ENV_TOKENS.get('SCRIPT_CONTEXT_CACHE_MAX_ENTRIES', SCRIPT_CONTEXT_CACHE_MAX_ENTRIES)
 
 ASSET_IGNORE_REGEX = ENV_TOKENS.get('ASSET_IGNORE_REGEX', ASSET_IGNORE_REGEX)
 
@@ -438,6 +440,13 @@ XQUEUE_INTERFACE = AUTH_TOKENS['XQUEUE_INTERFACE']
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
 CONTENTSTORE = AUTH_TOKENS.get('CONTENTSTORE', CONTENTSTORE)
 DOC_STORE_CONFIG = AUTH_TOKENS.get('DOC_STORE_CONFIG', DOC_STORE_CONFIG)
+COURSE_STRUCTURE_MEMORY_CACHE_SIZE = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_MEMORY_CACHE_SIZE', COURSE_STRUCTURE_MEMORY_CACHE_SIZE
+)
+STATIC_CONTENT_FILE_CACHE_DIR = ENV_TOKENS.get('STATIC_CONTENT_FILE_CACHE_DIR', STATIC_CONTENT_FILE_CACHE_DIR)
+STATIC_CONTENT_FILE_CACHE_MAX_SIZE = ENV_TOKENS.get(
+    'STATIC_CONTENT_FILE_CACHE_MAX_SIZE', STATIC_CONTENT_FILE_CACHE_MAX_SIZE
+)
 MONGODB_LOG = AUTH_TOKENS.get('MONGODB_LOG', {})
 
 OPEN_ENDED_GRADING_INTERFACE = AUTH_TOKENS.get('OPEN_ENDED_GRADING_INTERFACE',
@@ -515,6 +524,18 @@ VERIFY_STUDENT = AUTH_TOKENS.get("VERIFY_STUDENT", VERIFY_STUDENT)
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
+GRADES_DOWNLOAD_BATCH_SIZE = ENV_TOKENS.get("GRADES_DOWNLOAD_BATCH_SIZE", GRADES_DOWNLOAD_BATCH_SIZE)
+GRADES_DOWNLOAD_MAX_RETRIES = ENV_TOKENS.get("GRADES_DOWNLOAD_MAX_RETRIES", GRADES_DOWNLOAD_MAX_RETRIES)
+GRADES_DOWNLOAD_DEFAULT_RETRY_DELAY = ENV_TOKENS.get(
+    "GRADES_DOWNLOAD_DEFAULT_RETRY_DELAY", GRADES_DOWNLOAD_DEFAULT_RETRY_DELAY
+)
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = ENV_TOKENS.get(
+    "GRADES_DOWNLOAD_STUDENTS_PER_TASK", GRADES_DOWNLOAD_STUDENTS_PER_TASK
+)
+USER_STATE_BATCH_SIZE = ENV_TOKENS.get("USER_STATE_BATCH_SIZE", USER_STATE_BATCH_SIZE)
+
+# Block structure cache
+BLOCK_STRUCTURES_CACHE = ENV_TOKENS.get("BLOCK_STRUCTURES_CACHE", BLOCK_STRUCTURES_CACHE)
 
 # financial reports
 FINANCIAL_REPORTS = ENV_TOKENS.get("FINANCIAL_REPORTS", FINANCIAL_REPORTS)
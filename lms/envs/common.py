@@ -402,6 +402,21 @@ FEATURES = {
     # Enable the max score cache to speed up grading
     'ENABLE_MAX_SCORE_CACHE': True,
 
+    # Persist each student's subsection grades, so that grading only
+    # recomputes the subsections in which a score has changed.
+    'ENABLE_PERSISTENT_SUBSECTION_GRADES': False,
+
+    # Load all of a student's individual field overrides in a course with a
+    # single query, and cache them for the rest of the request.
+    'PREFETCH_STUDENT_FIELD_OVERRIDES': False,
+
+    # Save the AnonymousUserId rows used to look learners up by their ids
+    # when they enroll, and note saved ids in the cache so that computing an
+    # id only queries the database when the cache doesn't know it is saved.
+    # Rows for existing enrollments can be saved up front with the
+    # backfill_anonymous_ids management command.
+    'SAVE_ANONYMOUS_IDS_ON_ENROLLMENT': False,
+
     # Enable LTI Provider feature.
     'ENABLE_LTI_PROVIDER': False,
 }
@@ -751,6 +766,20 @@ MODULESTORE = {
     }
 }
 
+# Total size, in bytes, of the deserialized course structures that split keeps
+# in each process's memory, in front of the course_structure_cache. Sizes are
+# measured as the length of the pickled structures. 0 disables it.
+COURSE_STRUCTURE_MEMORY_CACHE_SIZE = 0
+
+# Directory in which the StaticContentServer keeps copies of the assets too
+# large for the cache backend, so that they are served from disk rather than
+# streamed from the contentstore. It may be shared by all the processes of a
+# host, or by several hosts. None disables it.
+STATIC_CONTENT_FILE_CACHE_DIR = None
+# Total size, in bytes, of the assets kept in STATIC_CONTENT_FILE_CACHE_DIR,
+# beyond which the least recently used ones are removed.
+STATIC_CONTENT_FILE_CACHE_MAX_SIZE = 10 * 1024 * 1024 * 1024
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -766,6 +795,14 @@ CODE_JAIL = {
     },
 }
 
+# The number of sandboxes which run batches of problem code at once, when
+# many learners' problems are processed together (see capa.safe_exec.safe_exec_batch).
+SAFE_EXEC_POOL_SIZE = 4
+
+# The most results of problems' scripts precomputed (by the
+# precompute_script_contexts command) and kept in the database.
+SCRIPT_CONTEXT_CACHE_MAX_ENTRIES = 500000
+
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
 # of them must match the course id for that course to run unsafe code.
 #
@@ -1178,6 +1215,9 @@ MIDDLEWARE_CLASSES = (
     # to redirected unenrolled students to the course info page
     'courseware.middleware.RedirectUnenrolledMiddleware',
 
+    # to report the field override lookups of each request
+    'courseware.middleware.FieldOverrideLookupStatsMiddleware',
+
     'course_wiki.middleware.WikiAccessMiddleware',
 
     # This must be last
@@ -1829,6 +1869,7 @@ INSTALLED_APPS = (
     'pipeline',
     'django.contrib.staticfiles',
     'static_replace',
+    'contentserver',
 
     # Theming
     'openedx.core.djangoapps.theming',
@@ -1961,6 +2002,7 @@ INSTALLED_APPS = (
     # Course data caching
     'openedx.core.djangoapps.content.course_overviews',
     'openedx.core.djangoapps.content.course_structures',
+    'openedx.core.djangoapps.content.script_contexts',
     'lms.djangoapps.course_blocks',
 
     # Old course structure API
@@ -2212,6 +2254,41 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Number of students graded together by grade reports. The scores for each
+# batch are fetched with a single query.
+GRADES_DOWNLOAD_BATCH_SIZE = 100
+
+# Number of times, and initial delay in seconds, that a failed grade report is
+# retried, resuming from its last checkpoint.
+GRADES_DOWNLOAD_MAX_RETRIES = 3
+GRADES_DOWNLOAD_DEFAULT_RETRY_DELAY = 60
+
+# Number of students graded by each subtask of grade reports of larger
+# courses. Each subtask stores its rows as a shard of the report, and the
+# last one to complete merges the shards. If None, grade reports are
+# generated by a single task.
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = None
+
+# Number of StudentModule rows fetched by each query when iterating over the
+# state of all users of a block or course, as reports do.
+USER_STATE_BATCH_SIZE = 1000
+
+###################### Block Structure Cache ######################
+BLOCK_STRUCTURES_CACHE = {
+    # Total size, in bytes, of the serialized block structures held in
+    # each process's in-memory cache.
+    'MEMORY_CACHE_SIZE': 64 * 1024 * 1024,
+    # Serialized block structures larger than this are split across
+    # multiple keys in the Django cache (memcached's item limit is 1MB).
+    'CHUNK_SIZE': 1000 * 1000,
+    # If set, serialized block structures are also stored in files under
+    # this directory, shared by all processes on the host.
+    'FILE_CACHE_ROOT': None,
+    # Total size, in bytes, of those files, beyond which the least recently
+    # used are removed.
+    'FILE_CACHE_MAX_SIZE': 1024 * 1024 * 1024,
+}
+
 FINANCIAL_REPORTS = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-financial-reports',
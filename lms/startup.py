@@ -18,6 +18,7 @@ import analytics
 
 import xmodule.x_module
 import lms_xblock.runtime
+import capa.safe_exec
 
 log = logging.getLogger(__name__)
 
@@ -45,6 +46,8 @@ def run():
     if settings.LMS_SEGMENT_KEY:
         analytics.write_key = settings.LMS_SEGMENT_KEY
 
+    capa.safe_exec.configure_pool(settings.SAFE_EXEC_POOL_SIZE)
+
     # register any dependency injections that we need to support in edx_proctoring
     # right now edx_proctoring is dependent on the openedx.core.djangoapps.credit
     if settings.FEATURES.get('ENABLE_SPECIAL_EXAMS'):
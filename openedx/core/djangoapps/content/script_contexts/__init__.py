@@ -0,0 +1,12 @@
+"""
+A durable cache of the results of capa problems' scripts.
+
+Randomized problems execute their script code with the learner's seed each
+time they're shown, and the results are cached in memcached, from which they
+can be evicted at any time. There are only so many seeds per problem, though,
+so the precompute_script_contexts command executes each problem's scripts
+with all its seeds, in batches, when its course is published, and stores the
+results in the ScriptContext table. ScriptContextCache, the LMS's
+script_context_cache service, finds them there when memcached doesn't have
+them, so learners never wait for the code to execute.
+"""
@@ -0,0 +1,119 @@
+"""
+Management command to precompute the results of courses' problems' scripts.
+"""
+import logging
+from textwrap import dedent
+
+from codejail.django_integration import ConfigureCodeJailMiddleware
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from capa.capa_problem import LoncapaProblem, LoncapaSystem
+from util.sandboxing import can_execute_unsafe_code, get_python_lib_zip
+from xmodule.capa_base import MAX_RANDOMIZATION_BINS, NUM_RANDOMIZATION_BINS
+from xmodule.capa_base_constants import RANDOMIZATION
+from xmodule.contentstore.django import contentstore
+from xmodule.modulestore.django import modulestore
+
+from openedx.core.djangoapps.content.script_contexts.models import ScriptContext
+from openedx.core.djangoapps.content.script_contexts.services import ScriptContextCache
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Executes the script code of every problem of the given courses with each
+    seed learners can get, and stores the results, so that learners never
+    wait for the code to execute. Run it whenever the courses are published.
+
+    Example:
+
+        ./manage.py lms precompute_script_contexts <course_id_1> <course_id_2>
+    """
+    help = dedent(__doc__)
+
+    args = "<course_id course_id ...>"
+
+    def handle(self, *args, **options):
+        if not args:
+            raise CommandError("precompute_script_contexts requires one or more arguments: <course_id course_id ...>")
+        try:
+            course_keys = [CourseKey.from_string(arg) for arg in args]
+        except InvalidKeyError as exception:
+            raise CommandError(u"Invalid course_key: {}".format(exception))
+
+        # Codejail is configured by a middleware, which commands don't run.
+        try:
+            ConfigureCodeJailMiddleware()
+        except MiddlewareNotUsed:
+            pass
+
+        for course_key in course_keys:
+            precomputed, skipped = precompute_course_script_contexts(course_key)
+            self.stdout.write(u"{}: {} problems precomputed, {} skipped\n".format(course_key, precomputed, skipped))
+
+
+def problem_seeds(descriptor):
+    """
+    Returns the seeds learners can get for the given problem (see CapaMixin.choose_new_seed).
+    """
+    if descriptor.rerandomize == RANDOMIZATION.NEVER:
+        return [1]
+    elif descriptor.rerandomize == RANDOMIZATION.PER_STUDENT:
+        return range(NUM_RANDOMIZATION_BINS)
+    return range(MAX_RANDOMIZATION_BINS)
+
+
+def precompute_course_script_contexts(course_key):
+    """
+    Precomputes the results of the scripts of the given course's problems,
+    removes the results of their old versions, and returns the numbers of
+    problems which were precomputed, and which were skipped because their
+    scripts use the learner's anonymous id, or failed.
+    """
+    # The database may not store fractions of seconds.
+    start = timezone.now().replace(microsecond=0)
+    store = modulestore()
+    zip_lib = get_python_lib_zip(contentstore, course_key)
+    precomputed = skipped = 0
+    with store.bulk_operations(course_key):
+        for descriptor in store.get_items(course_key, qualifiers={'category': 'problem'}):
+            capa_system = LoncapaSystem(
+                ajax_url=None,
+                anonymous_student_id=None,
+                cache=None,
+                can_execute_unsafe_code=lambda: can_execute_unsafe_code(course_key),
+                get_python_lib_zip=lambda: zip_lib,
+                DEBUG=settings.DEBUG,
+                filestore=descriptor.runtime.resources_fs,
+                i18n=None,
+                node_path=None,
+                render_template=None,
+                seed=None,
+                STATIC_URL=None,
+                xqueue=None,
+                context_cache=ScriptContextCache(course_key, durable=True),
+            )
+            try:
+                errors = LoncapaProblem.precompute_script_contexts(
+                    descriptor.data, descriptor.location.html_id(), capa_system, problem_seeds(descriptor)
+                )
+            except Exception:  # pylint: disable=broad-except
+                log.exception(u"Error precomputing the script contexts of %s", descriptor.location)
+                skipped += 1
+                continue
+            if errors is None:
+                skipped += 1
+                continue
+            if errors:
+                log.warning(u"The script of %s failed with %d seeds", descriptor.location, errors)
+            precomputed += 1
+
+    ScriptContext.objects.filter(course_id=course_key, modified__lt=start).delete()
+    ScriptContext.remove_oldest(settings.SCRIPT_CONTEXT_CACHE_MAX_ENTRIES)
+    return precomputed, skipped
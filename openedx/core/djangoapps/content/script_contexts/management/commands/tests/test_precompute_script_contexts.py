@@ -0,0 +1,81 @@
+"""
+Tests for the precompute_script_contexts management command.
+"""
+import random
+import sys
+import textwrap
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from mock import patch
+
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+from openedx.core.djangoapps.content.script_contexts.management.commands.precompute_script_contexts import (
+    precompute_course_script_contexts,
+)
+from openedx.core.djangoapps.content.script_contexts.models import ScriptContext
+
+PROBLEM_XML = textwrap.dedent("""
+    <problem>
+    <script type="loncapa/python">
+    number = random.randint(0, 1000)
+    </script>
+    <p>What is $number squared?</p>
+    </problem>
+""")
+
+
+class PrecomputeScriptContextsTest(ModuleStoreTestCase):
+    """
+    Tests for precomputing the results of a course's problems' scripts.
+    """
+    def setUp(self):
+        super(PrecomputeScriptContextsTest, self).setUp()
+        self.course = CourseFactory.create()
+        self.problem = ItemFactory.create(
+            parent=self.course, category='problem', data=PROBLEM_XML, rerandomize='per_student'
+        )
+        ItemFactory.create(parent=self.course, category='problem', data=PROBLEM_XML, rerandomize='never')
+        ItemFactory.create(parent=self.course, category='problem', data='<problem><p>No script</p></problem>')
+
+    def test_precompute(self):
+        self.assertEqual(precompute_course_script_contexts(self.course.id), (3, 0))
+        # 20 seeds with rerandomize=per_student, and seed 1 with never, which is one of them
+        self.assertEqual(ScriptContext.objects.filter(course_id=self.course.id).count(), 20)
+        numbers = sorted(entry.value[1]['number'] for entry in ScriptContext.objects.all())
+        self.assertEqual(numbers, sorted(random.Random(seed).randint(0, 1000) for seed in range(20)))
+
+        # a second run executes nothing
+        with patch.object(sys.modules['capa.safe_exec.safe_exec'], '_exec') as mock_exec:
+            self.assertEqual(precompute_course_script_contexts(self.course.id), (3, 0))
+        self.assertFalse(mock_exec.called)
+        self.assertEqual(ScriptContext.objects.count(), 20)
+
+    def test_old_versions_removed(self):
+        precompute_course_script_contexts(self.course.id)
+        old_keys = set(ScriptContext.objects.values_list('key', flat=True))
+
+        self.problem.data = PROBLEM_XML.replace('1000', '100')
+        self.store.update_item(self.problem, self.user.id)
+        precompute_course_script_contexts(self.course.id)
+        keys = set(ScriptContext.objects.values_list('key', flat=True))
+        # seed 1's old entry is still used by the rerandomize=never problem
+        self.assertEqual(len(keys), 21)
+        self.assertEqual(len(keys & old_keys), 1)
+
+    def test_anonymous_id_skipped(self):
+        self.problem.data = PROBLEM_XML.replace('random.randint(0, 1000)', 'len(anonymous_student_id)')
+        self.store.update_item(self.problem, self.user.id)
+        self.assertEqual(precompute_course_script_contexts(self.course.id), (2, 1))
+        self.assertEqual(ScriptContext.objects.count(), 1)
+
+    def test_max_entries(self):
+        with self.settings(SCRIPT_CONTEXT_CACHE_MAX_ENTRIES=5):
+            precompute_course_script_contexts(self.course.id)
+        self.assertLessEqual(ScriptContext.objects.count(), 5)
+
+    def test_invalid_course_key(self):
+        with self.assertRaises(CommandError):
+            call_command('precompute_script_contexts', 'not a course key')
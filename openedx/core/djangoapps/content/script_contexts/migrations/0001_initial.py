@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'ScriptContext'
+        db.create_table('script_contexts_scriptcontext', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('created', self.gf('model_utils.fields.AutoCreatedField')(default=datetime.datetime.now)),
+            ('modified', self.gf('model_utils.fields.AutoLastModifiedField')(default=datetime.datetime.now)),
+            ('course_id', self.gf('xmodule_django.models.CourseKeyField')(max_length=255, db_index=True)),
+            ('key', self.gf('django.db.models.fields.CharField')(max_length=255)),
+            ('value_json', self.gf('util.models.CompressedTextField')()),
+        ))
+        db.send_create_signal('script_contexts', ['ScriptContext'])
+
+        # Adding unique constraint on 'ScriptContext', fields ['course_id', 'key']
+        db.create_unique('script_contexts_scriptcontext', ['course_id', 'key'])
+
+
+    def backwards(self, orm):
+        # Removing unique constraint on 'ScriptContext', fields ['course_id', 'key']
+        db.delete_unique('script_contexts_scriptcontext', ['course_id', 'key'])
+
+        # Deleting model 'ScriptContext'
+        db.delete_table('script_contexts_scriptcontext')
+
+
+    models = {
+        'script_contexts.scriptcontext': {
+            'Meta': {'unique_together': "(('course_id', 'key'),)", 'object_name': 'ScriptContext'},
+            'course_id': ('xmodule_django.models.CourseKeyField', [], {'max_length': '255', 'db_index': 'True'}),
+            'created': ('model_utils.fields.AutoCreatedField', [], {'default': 'datetime.datetime.now'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'key': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'modified': ('model_utils.fields.AutoLastModifiedField', [], {'default': 'datetime.datetime.now'}),
+            'value_json': ('util.models.CompressedTextField', [], {})
+        }
+    }
+
+    complete_apps = ['script_contexts']
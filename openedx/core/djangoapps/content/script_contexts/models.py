@@ -0,0 +1,48 @@
+"""
+Django ORM model specifications for the Script Contexts sub-application
+"""
+import json
+
+from django.db import models
+from model_utils.models import TimeStampedModel
+
+from util.models import CompressedTextField
+from xmodule_django.models import CourseKeyField
+
+
+class ScriptContext(TimeStampedModel):
+    """
+    The results of executing a problem's script code with one seed.
+
+    The key is capa.safe_exec's cache key, a hash of the code, the seed and
+    the course's python_lib.zip, so each version of a problem has its own
+    entries. `modified` is updated whenever an entry is precomputed again,
+    so the entries of problems' old versions are the ones not modified by
+    the latest run of precompute_script_contexts.
+    """
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    key = models.CharField(max_length=255)
+    value_json = CompressedTextField()
+
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = ('course_id', 'key')
+
+    @property
+    def value(self):
+        """
+        The (exception message, globals) pair cached by capa.safe_exec.
+        """
+        return json.loads(self.value_json)
+
+    @classmethod
+    def remove_oldest(cls, max_entries):
+        """
+        Removes the least recently precomputed entries, leaving at most
+        `max_entries`, and returns whether any were removed.
+        """
+        try:
+            cutoff = cls.objects.order_by('-modified').values_list('modified', flat=True)[max_entries]
+        except IndexError:
+            return False
+        cls.objects.filter(modified__lte=cutoff).delete()
+        return True
@@ -0,0 +1,58 @@
+"""
+The script_context_cache service, for capa problems in the LMS.
+"""
+import json
+
+from django.core.cache import cache
+
+from .models import ScriptContext
+
+
+class ScriptContextCache(object):
+    """
+    A cache of the results of a course's problems' scripts, for capa's
+    LoncapaSystem.context_cache: memcached, in front of the ScriptContext
+    entries precomputed by the precompute_script_contexts command.
+    """
+    def __init__(self, course_id, durable=False):
+        """
+        Arguments:
+            course_id (CourseKey): the course of the problems.
+            durable (bool): whether to read and write the ScriptContext
+                entries only, as precompute_script_contexts does.
+        """
+        self.course_id = course_id
+        self.durable = durable
+
+    def get(self, key):
+        """
+        Returns the cached results with the given key, or None.
+        """
+        if not self.durable:
+            value = cache.get(key)
+            if value is not None:
+                return value
+        try:
+            entry = ScriptContext.objects.get(course_id=self.course_id, key=key)
+        except ScriptContext.DoesNotExist:
+            return None
+        if self.durable:
+            # Still in use: keep it, when the old versions' entries are removed.
+            entry.save()
+        else:
+            cache.set(key, entry.value)
+        return entry.value
+
+    def set(self, key, value):
+        """
+        Caches the given results with the given key.
+        """
+        if not self.durable:
+            cache.set(key, value)
+            return
+        entry, created = ScriptContext.objects.get_or_create(
+            course_id=self.course_id, key=key, defaults={'value_json': json.dumps(value)}
+        )
+        if not created:
+            entry.value_json = json.dumps(value)
+            entry.save()
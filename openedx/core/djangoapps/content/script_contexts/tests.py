@@ -0,0 +1,61 @@
+"""
+Script Contexts sub-application test cases
+"""
+import datetime
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from opaque_keys.edx.locator import CourseLocator
+
+from openedx.core.djangoapps.content.script_contexts.models import ScriptContext
+from openedx.core.djangoapps.content.script_contexts.services import ScriptContextCache
+
+
+class ScriptContextCacheTests(TestCase):
+    """
+    Tests for the script_context_cache service.
+    """
+    def setUp(self):
+        super(ScriptContextCacheTests, self).setUp()
+        self.course_id = CourseLocator('TestX', 'TS101', 'T1')
+        self.addCleanup(cache.clear)
+
+    def test_get_precomputed(self):
+        context_cache = ScriptContextCache(self.course_id)
+        self.assertIsNone(context_cache.get('safe_exec.1.abc'))
+
+        ScriptContext.objects.create(
+            course_id=self.course_id, key='safe_exec.1.abc', value_json=json.dumps([None, {'a': 1}])
+        )
+        self.assertEqual(context_cache.get('safe_exec.1.abc'), [None, {'a': 1}])
+        # then from memcached
+        self.assertEqual(cache.get('safe_exec.1.abc'), [None, {'a': 1}])
+        # but not for other courses
+        self.assertIsNone(ScriptContextCache(CourseLocator('TestX', 'TS101', 'T2')).get('safe_exec.1.abc'))
+
+    def test_set(self):
+        ScriptContextCache(self.course_id).set('safe_exec.1.abc', (None, {'a': 1}))
+        self.assertEqual(cache.get('safe_exec.1.abc'), (None, {'a': 1}))
+        self.assertFalse(ScriptContext.objects.exists())
+
+    def test_durable(self):
+        context_cache = ScriptContextCache(self.course_id, durable=True)
+        context_cache.set('safe_exec.1.abc', (None, {'a': 1}))
+        context_cache.set('safe_exec.1.abc', (None, {'a': 2}))
+        self.assertIsNone(cache.get('safe_exec.1.abc'))
+        entry = ScriptContext.objects.get(course_id=self.course_id, key='safe_exec.1.abc')
+        self.assertEqual(entry.value, [None, {'a': 2}])
+
+        # getting an entry marks it as in use
+        ScriptContext.objects.update(modified=entry.modified - datetime.timedelta(days=1))
+        self.assertEqual(context_cache.get('safe_exec.1.abc'), [None, {'a': 2}])
+        self.assertGreaterEqual(ScriptContext.objects.get(pk=entry.pk).modified, entry.modified)
+
+    def test_remove_oldest(self):
+        for index in range(3):
+            entry = ScriptContext.objects.create(course_id=self.course_id, key=str(index), value_json='[]')
+            ScriptContext.objects.filter(pk=entry.pk).update(modified=entry.modified + datetime.timedelta(days=index))
+        self.assertFalse(ScriptContext.remove_oldest(3))
+        self.assertTrue(ScriptContext.remove_oldest(1))
+        self.assertEqual(list(ScriptContext.objects.values_list('key', flat=True)), ['2'])
@@ -53,24 +53,26 @@ def get_blocks(cache, modulestore, usage_info, root_block_usage_key, transformer
         )
 
     # Load the cached block structure.
-    root_block_structure = BlockStructureFactory.create_from_cache(root_block_usage_key, cache, transformers)
-
-    # On cache miss, execute the collect phase and update the cache.
-    if not root_block_structure:
-
-        # Create the block structure from the modulestore.
-        root_block_structure = BlockStructureFactory.create_from_modulestore(root_block_usage_key, modulestore)
-
-        # Collect data from each registered transformer.
-        for transformer in TransformerRegistry.get_registered_transformers():
-            root_block_structure._add_transformer(transformer)  # pylint: disable=protected-access
-            transformer.collect(root_block_structure)
-
-        # Collect all fields that were requested by the transformers.
-        root_block_structure._collect_requested_xblock_fields()  # pylint: disable=protected-access
-
-        # Cache this information.
-        BlockStructureFactory.serialize_to_cache(root_block_structure, cache)
+    root_block_structure = BlockStructureFactory.create_from_cache(root_block_usage_key, cache)
+
+    # Execute the collect phase for any transformers whose data is
+    # missing or outdated, and update the cache.
+    if root_block_structure:
+        outdated_transformers = BlockStructureFactory.get_outdated_transformers(root_block_structure, transformers)
+        if outdated_transformers:
+            # Since the modulestore needs to be accessed anyway, also
+            # recollect any other registered transformers that are
+            # outdated, so that they don't each trigger another update.
+            outdated_transformers = BlockStructureFactory.get_outdated_transformers(
+                root_block_structure, TransformerRegistry.get_registered_transformers()
+            )
+    else:
+        outdated_transformers = TransformerRegistry.get_registered_transformers()
+
+    if outdated_transformers:
+        root_block_structure = _collect(
+            cache, modulestore, root_block_usage_key, outdated_transformers, root_block_structure
+        )
 
     # Execute requested transforms on block structure.
     for transformer in transformers:
@@ -82,6 +84,52 @@ def get_blocks(cache, modulestore, usage_info, root_block_usage_key, transformer
     return root_block_structure
 
 
+def _collect(cache, modulestore, root_block_usage_key, transformers, cached_block_structure=None):
+    """
+    Creates the block structure starting at root_block_usage_key from
+    the modulestore, executes the collect phase of the given
+    transformers, and updates the cache.
+
+    If a cached block structure is given, the collected data of all
+    other registered transformers is kept from it instead of being
+    collected again.
+
+    Arguments:
+        cache, modulestore, root_block_usage_key - See the
+            descriptions in get_blocks.
+
+        transformers ([BlockStructureTransformer]) - The transformers
+            whose collect methods are to be called.
+
+        cached_block_structure (BlockStructureBlockData) - The
+            previously cached block structure, if any.
+
+    Returns:
+        BlockStructureModulestoreData - The block structure with
+            up-to-date collected data for all registered transformers.
+    """
+    # Create the block structure from the modulestore.
+    block_structure = BlockStructureFactory.create_from_modulestore(root_block_usage_key, modulestore)
+
+    # Keep the still valid data of the cached block structure.
+    if cached_block_structure:
+        transformers_to_keep = TransformerRegistry.get_registered_transformers() - set(transformers)
+        block_structure._copy_collected_data(cached_block_structure, transformers_to_keep)  # pylint: disable=protected-access
+
+    # Collect data from each of the given transformers.
+    for transformer in transformers:
+        block_structure._add_transformer(transformer)  # pylint: disable=protected-access
+        transformer.collect(block_structure)
+
+    # Collect all fields that were requested by the transformers.
+    block_structure._collect_requested_xblock_fields()  # pylint: disable=protected-access
+
+    # Cache this information.
+    BlockStructureFactory.serialize_to_cache(block_structure, cache)
+
+    return block_structure
+
+
 def clear_block_cache(cache, root_block_usage_key):
     """
     Removes the block structure associated with the given root block
@@ -513,6 +513,50 @@ class BlockStructureBlockData(BlockStructure):
 
         return self.get_transformer_data(transformer, TRANSFORMER_VERSION_KEY, 0)
 
+    def _copy_collected_data(self, source_block_structure, transformers):
+        """
+        Copies the collected xBlock fields of all blocks, and the
+        collected data of the given transformers, from the given block
+        structure into this block structure.  Data for blocks that are
+        not in this block structure is ignored.
+
+        Arguments:
+            source_block_structure (BlockStructureBlockData) - The
+                block structure from which to copy collected data.
+
+            transformers ([BlockStructureTransformer]) - The
+                transformers whose collected data is to be copied.
+        """
+        transformer_names = [transformer.name() for transformer in transformers]
+        for transformer_name in transformer_names:
+            if transformer_name in source_block_structure._transformer_data:
+                self._transformer_data[transformer_name] = source_block_structure._transformer_data[transformer_name]
+
+        for usage_key in self.get_block_keys():
+            source_block_data = source_block_structure._get_block_data(usage_key)
+            if not source_block_data:
+                continue
+            block_data = self._block_data_map[usage_key]
+            block_data.xblock_fields.update(source_block_data.xblock_fields)
+            for transformer_name in transformer_names:
+                if transformer_name in source_block_data.transformer_data:
+                    block_data.transformer_data[transformer_name] = source_block_data.transformer_data[transformer_name]
+
+    def _get_block_data(self, usage_key):
+        """
+        Returns the collected data of the block identified by the given
+        usage_key, or None if there isn't any.
+
+        Arguments:
+            usage_key (UsageKey) - Usage key of the block whose
+                collected data is requested.
+
+        Returns:
+            _BlockData - The block's collected xBlock fields and
+                transformer data.
+        """
+        return self._block_data_map.get(usage_key)
+
     def _add_transformer(self, transformer):
         """
         Adds the given transformer to the block structure by recording
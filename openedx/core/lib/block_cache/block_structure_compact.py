@@ -0,0 +1,467 @@
+"""
+Compact representation of block structures.
+
+BlockStructureBlockData keeps a _BlockRelations object, with lists of
+parent and child usage keys, and a _BlockData object, with a dict per
+transformer, for every block in the structure.  Instead, the block
+structures in this module intern each block's usage key to an integer
+index and store:
+
+    - the children and the parents of all blocks as integer arrays in
+      compressed sparse row (CSR) form: the children of the block at
+      index i are child_indices[child_offsets[i]:child_offsets[i + 1]].
+    - each collected xBlock field and each transformer's block data as a
+      column: a list of the values of all blocks, by index.
+
+CompactBlockStructureBlockData is the block structure loaded from the
+cache, on which transformers run.  pack_block_structure and
+unpack_block_structure convert block structures to and from the format
+in which they are cached, in which the children are stored as above, and
+the columns hold the values of the blocks that have one only.
+"""
+# pylint: disable=protected-access
+from array import array
+from collections import defaultdict
+
+from openedx.core.lib.graph_traversals import traverse_topologically, traverse_post_order
+
+from .block_structure import BlockStructureBlockData, _BlockData
+
+
+# Version of the packed format.  Packed data of any other version is
+# treated as not found.
+PACKED_FORMAT_VERSION = 1
+
+# Type code of the integer arrays in the packed format.
+_INDEX_TYPE_CODE = 'l'
+
+# Value of an xBlock field column for the blocks that have no value.
+_NO_VALUE = object()
+
+
+class CompactBlockStructureBlockData(BlockStructureBlockData):
+    """
+    A BlockStructureBlockData holding its relations and data in integer
+    arrays and columns indexed by block, as described in this module's
+    docstring, instead of objects per block.
+
+    The structure's relations are read from the CSR arrays it is created
+    with.  Blocks are removed by marking them absent, and the blocks
+    whose relations change when a block is removed are given lists of
+    the indices of their parents or children instead, so the arrays are
+    never rebuilt.  Traversals, remove_block_if and _prune_unreachable
+    work on indices, mapping them to usage keys only for the callers'
+    functions.
+    """
+    def __init__(self, root_block_usage_key, block_keys, child_offsets, child_indices):  # pylint: disable=super-init-not-called
+        """
+        Arguments:
+            root_block_usage_key (UsageKey) - The usage_key for the root
+                of the block structure.
+
+            block_keys ([UsageKey]) - The usage keys of all the blocks
+                in the block structure, by index.
+
+            child_offsets, child_indices (array) - The children of all
+                the blocks, in CSR form.
+        """
+        self.root_block_usage_key = root_block_usage_key
+
+        # The usage keys of the blocks by index, and their indices by
+        # usage key.
+        self._block_keys = block_keys
+        self._block_indices = {usage_key: index for index, usage_key in enumerate(block_keys)}
+        self._root_index = self._block_indices[root_block_usage_key]
+
+        # Whether the block at each index is still in the structure.
+        self._present = bytearray('\x01') * len(block_keys)
+
+        # The relations of the blocks, in CSR form, and the lists of the
+        # children and parents of the blocks whose relations changed
+        # since, by index.
+        self._child_offsets = child_offsets
+        self._child_indices = child_indices
+        self._parent_offsets, self._parent_indices = _invert_relations(len(block_keys), child_offsets, child_indices)
+        self._changed_children = {}
+        self._changed_parents = {}
+
+        # Map of an xBlock field name to the column of its values, in
+        # which blocks without a value hold _NO_VALUE.
+        # dict {string: [any picklable type]}
+        self._xblock_field_columns = {}
+
+        # Map of a transformer's name to the column of its block data,
+        # in which blocks without data hold None.
+        # dict {string: [dict]}
+        self._transformer_block_data_columns = {}
+
+        # Map of a transformer's name to its non-block-specific data.
+        # defaultdict {string: dict}
+        self._transformer_data = defaultdict(dict)
+
+    #--- Block structure relation methods ---#
+
+    def get_parents(self, usage_key):
+        index = self._get_index(usage_key)
+        if index is None:
+            return []
+        return [self._block_keys[parent_index] for parent_index in self._get_parent_indices(index)]
+
+    def get_children(self, usage_key):
+        index = self._get_index(usage_key)
+        if index is None:
+            return []
+        return [self._block_keys[child_index] for child_index in self._get_child_indices(index)]
+
+    def has_block(self, usage_key):
+        return self._get_index(usage_key) is not None
+
+    def get_block_keys(self):
+        return (usage_key for index, usage_key in enumerate(self._block_keys) if self._present[index])
+
+    #--- Block structure traversal methods ---#
+
+    def topological_traversal(
+            self,
+            filter_func=None,
+            yield_descendants_of_unyielded=False,
+    ):
+        indices = traverse_topologically(
+            start_node=self._root_index,
+            get_parents=self._get_parent_indices,
+            get_children=self._get_child_indices,
+            filter_func=self._index_filter(filter_func),
+            yield_descendants_of_unyielded=yield_descendants_of_unyielded,
+        )
+        return (self._block_keys[index] for index in indices)
+
+    def post_order_traversal(
+            self,
+            filter_func=None,
+    ):
+        indices = traverse_post_order(
+            start_node=self._root_index,
+            get_children=self._get_child_indices,
+            filter_func=self._index_filter(filter_func),
+        )
+        return (self._block_keys[index] for index in indices)
+
+    #--- Block data methods ---#
+
+    def get_xblock_field(self, usage_key, field_name, default=None):
+        index = self._block_indices.get(usage_key)
+        column = self._xblock_field_columns.get(field_name)
+        if index is None or column is None or column[index] is _NO_VALUE:
+            return default
+        return column[index]
+
+    def set_transformer_block_field(self, usage_key, transformer, key, value):
+        index = self._block_indices[usage_key]
+        column = self._transformer_block_data_columns.get(transformer.name())
+        if column is None:
+            column = self._transformer_block_data_columns[transformer.name()] = [None] * len(self._block_keys)
+        if column[index] is None:
+            column[index] = {}
+        column[index][key] = value
+
+    def get_transformer_block_data(self, usage_key, transformer):
+        index = self._block_indices.get(usage_key)
+        column = self._transformer_block_data_columns.get(transformer.name())
+        if index is None or column is None or column[index] is None:
+            return {}
+        return column[index]
+
+    def remove_block(self, usage_key, keep_descendants):
+        index = self._get_index(usage_key)
+        if index is not None:
+            self._remove_block(index, keep_descendants)
+
+    def remove_block_if(self, removal_condition, keep_descendants=False, **kwargs):
+        def filter_func(index):
+            """
+            Filter function for removing blocks that satisfy the
+            removal_condition.
+            """
+            if removal_condition(self._block_keys[index]):
+                self._remove_block(index, keep_descendants)
+                return False
+            return True
+
+        for _ in traverse_topologically(
+                start_node=self._root_index,
+                get_parents=self._get_parent_indices,
+                get_children=self._get_child_indices,
+                filter_func=filter_func,
+                **kwargs
+        ):
+            pass
+
+    #--- Internal methods ---#
+    # To be used within the block_cache framework or by tests.
+
+    def _prune_unreachable(self):
+        """
+        Mutates this block structure by removing any unreachable blocks.
+        """
+        reachable = bytearray(len(self._block_keys))
+        for index in traverse_post_order(start_node=self._root_index, get_children=self._get_child_indices):
+            reachable[index] = 1
+
+        for index, present in enumerate(self._present):
+            if not present:
+                continue
+            if not reachable[index]:
+                self._present[index] = 0
+                continue
+            # The children of reachable blocks are reachable, but some
+            # of their parents may not be.
+            parent_indices = self._get_parent_indices(index)
+            if not all(reachable[parent_index] for parent_index in parent_indices):
+                self._changed_parents[index] = [
+                    parent_index for parent_index in parent_indices if reachable[parent_index]
+                ]
+
+    def _add_relation(self, parent_key, child_key):
+        parent_index = self._block_indices[parent_key]
+        child_index = self._block_indices[child_key]
+        self._add_index_relation(parent_index, child_index)
+
+    def _get_block_data(self, usage_key):
+        index = self._get_index(usage_key)
+        if index is None:
+            return None
+        block_data = _BlockData()
+        for field_name, column in self._xblock_field_columns.iteritems():
+            if column[index] is not _NO_VALUE:
+                block_data.xblock_fields[field_name] = column[index]
+        for transformer_name, column in self._transformer_block_data_columns.iteritems():
+            if column[index] is not None:
+                block_data.transformer_data[transformer_name] = column[index]
+        return block_data
+
+    def _get_index(self, usage_key):
+        """
+        Returns the index of the block with the given usage_key, or None
+        if the block is not in this block structure.
+        """
+        index = self._block_indices.get(usage_key)
+        if index is None or not self._present[index]:
+            return None
+        return index
+
+    def _get_child_indices(self, index):
+        """
+        Returns the indices of the children of the block at the given
+        index.
+        """
+        if index in self._changed_children:
+            return self._changed_children[index]
+        if not self._present[index]:
+            return []
+        return self._child_indices[self._child_offsets[index]:self._child_offsets[index + 1]].tolist()
+
+    def _get_parent_indices(self, index):
+        """
+        Returns the indices of the parents of the block at the given
+        index.
+        """
+        if index in self._changed_parents:
+            return self._changed_parents[index]
+        if not self._present[index]:
+            return []
+        return self._parent_indices[self._parent_offsets[index]:self._parent_offsets[index + 1]].tolist()
+
+    def _index_filter(self, filter_func):
+        """
+        Returns a filter function on block indices calling the given
+        filter function on usage keys, or None if it's None.
+        """
+        if filter_func is None:
+            return None
+        return lambda index: filter_func(self._block_keys[index])
+
+    def _add_index_relation(self, parent_index, child_index):
+        """
+        Adds a parent to child relationship between the blocks at the
+        given indices.
+        """
+        self._changed_children[parent_index] = self._get_child_indices(parent_index) + [child_index]
+        self._changed_parents[child_index] = self._get_parent_indices(child_index) + [parent_index]
+
+    def _remove_block(self, index, keep_descendants):
+        """
+        Removes the block at the given index and its data, as in
+        remove_block.
+        """
+        child_indices = self._get_child_indices(index)
+        parent_indices = self._get_parent_indices(index)
+
+        for child_index in child_indices:
+            self._changed_parents[child_index] = [
+                parent_index for parent_index in self._get_parent_indices(child_index) if parent_index != index
+            ]
+        for parent_index in parent_indices:
+            self._changed_children[parent_index] = [
+                sibling_index for sibling_index in self._get_child_indices(parent_index) if sibling_index != index
+            ]
+
+        self._present[index] = 0
+        self._changed_children[index] = []
+        self._changed_parents[index] = []
+        for column in self._xblock_field_columns.itervalues():
+            column[index] = _NO_VALUE
+        for column in self._transformer_block_data_columns.itervalues():
+            column[index] = None
+
+        if keep_descendants:
+            for child_index in child_indices:
+                for parent_index in parent_indices:
+                    self._add_index_relation(parent_index, child_index)
+
+
+def pack_block_structure(block_structure):
+    """
+    Returns a compact, picklable representation of the relations,
+    transformer data and block data of the given block structure.
+
+    Arguments:
+        block_structure (BlockStructureBlockData) - The block structure
+            to pack.
+    """
+    block_keys = list(block_structure.get_block_keys())
+    block_indices = {usage_key: index for index, usage_key in enumerate(block_keys)}
+
+    child_offsets = array(_INDEX_TYPE_CODE, [0])
+    child_indices = array(_INDEX_TYPE_CODE)
+    for usage_key in block_keys:
+        child_indices.extend(block_indices[child_key] for child_key in block_structure.get_children(usage_key))
+        child_offsets.append(len(child_indices))
+
+    xblock_field_columns = {}
+    transformer_block_data_columns = {}
+    for index, usage_key in enumerate(block_keys):
+        block_data = block_structure._get_block_data(usage_key)
+        if not block_data:
+            continue
+        for field_name, value in block_data.xblock_fields.iteritems():
+            _append_to_column(xblock_field_columns, field_name, index, value)
+        for transformer_name, transformer_block_data in block_data.transformer_data.iteritems():
+            _append_to_column(transformer_block_data_columns, transformer_name, index, transformer_block_data)
+
+    return (
+        PACKED_FORMAT_VERSION,
+        block_keys,
+        child_offsets.tostring(),
+        child_indices.tostring(),
+        dict(block_structure._transformer_data),
+        _columns_to_strings(xblock_field_columns),
+        _columns_to_strings(transformer_block_data_columns),
+    )
+
+
+def unpack_block_structure(root_block_usage_key, packed_data):
+    """
+    Returns a CompactBlockStructureBlockData created from the given
+    output of pack_block_structure, or None if the data is not in the
+    current packed format.
+
+    Arguments:
+        root_block_usage_key (UsageKey) - The usage_key for the root of
+            the packed block structure.
+
+        packed_data (tuple) - The output of pack_block_structure.
+    """
+    if not isinstance(packed_data, tuple) or packed_data[0] != PACKED_FORMAT_VERSION:
+        return None
+    (
+        __,
+        block_keys,
+        child_offsets_string,
+        child_indices_string,
+        transformer_data,
+        xblock_field_columns,
+        transformer_block_data_columns,
+    ) = packed_data
+
+    block_structure = CompactBlockStructureBlockData(
+        root_block_usage_key,
+        block_keys,
+        _indices_from_string(child_offsets_string),
+        _indices_from_string(child_indices_string),
+    )
+    block_structure._transformer_data.update(transformer_data)
+
+    for field_name, (indices_string, values) in xblock_field_columns.iteritems():
+        block_structure._xblock_field_columns[field_name] = _dense_column(
+            len(block_keys), indices_string, values, _NO_VALUE
+        )
+    for transformer_name, (indices_string, values) in transformer_block_data_columns.iteritems():
+        block_structure._transformer_block_data_columns[transformer_name] = _dense_column(
+            len(block_keys), indices_string, values, None
+        )
+
+    return block_structure
+
+
+def _invert_relations(block_count, offsets, indices):
+    """
+    Returns the offsets and indices, in CSR form, of the inverse of the
+    given relations, e.g. of the parents of all blocks given their
+    children.  The blocks related to each block are in index order.
+    """
+    inverse_offsets = array(_INDEX_TYPE_CODE, [0] * (block_count + 1))
+    for index in indices:
+        inverse_offsets[index + 1] += 1
+    for index in xrange(block_count):
+        inverse_offsets[index + 1] += inverse_offsets[index]
+
+    inverse_indices = array(_INDEX_TYPE_CODE, [0] * len(indices))
+    positions = inverse_offsets[:-1]
+    for index in xrange(block_count):
+        for related_index in indices[offsets[index]:offsets[index + 1]]:
+            inverse_indices[positions[related_index]] = index
+            positions[related_index] += 1
+    return inverse_offsets, inverse_indices
+
+
+def _dense_column(block_count, indices_string, values, missing_value):
+    """
+    Returns the list of the values of all blocks, by index, of a packed
+    column, with the given missing_value for the blocks without one.
+    """
+    column = [missing_value] * block_count
+    for index, value in zip(_indices_from_string(indices_string), values):
+        column[index] = value
+    return column
+
+
+def _append_to_column(columns, column_name, index, value):
+    """
+    Appends the value of the block at the given index to the named
+    column, creating the column if needed.
+    """
+    if column_name not in columns:
+        columns[column_name] = (array(_INDEX_TYPE_CODE), [])
+    indices, values = columns[column_name]
+    indices.append(index)
+    values.append(value)
+
+
+def _columns_to_strings(columns):
+    """
+    Returns the given columns with their index arrays converted to
+    strings, which pickle much more compactly than arrays.
+    """
+    return {
+        column_name: (indices.tostring(), values)
+        for column_name, (indices, values) in columns.iteritems()
+    }
+
+
+def _indices_from_string(indices_string):
+    """
+    Returns the integer array stored in the given string.
+    """
+    indices = array(_INDEX_TYPE_CODE)
+    indices.fromstring(indices_string)
+    return indices
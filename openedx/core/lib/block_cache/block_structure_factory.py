@@ -6,7 +6,8 @@ from logging import getLogger
 
 from openedx.core.lib.cache_utils import zpickle, zunpickle
 
-from .block_structure import BlockStructureBlockData, BlockStructureModulestoreData
+from .block_structure import BlockStructureModulestoreData
+from .block_structure_compact import pack_block_structure, unpack_block_structure
 
 
 logger = getLogger(__name__)  # pylint: disable=C0103
@@ -72,7 +73,8 @@ class BlockStructureFactory(object):
 
         The key in the cache is 'root.key.<root_block_usage_key>'.
         The data stored in the cache includes the structure's
-        block relations, transformer data, and block data.
+        block relations, transformer data, and block data, packed
+        by block_structure_compact.pack_block_structure.
 
         Arguments:
             block_structure (BlockStructure) - The block structure
@@ -82,12 +84,7 @@ class BlockStructureFactory(object):
                 cache into which cacheable data of the block structure
                 is to be serialized.
         """
-        data_to_cache = (
-            block_structure._block_relations,
-            block_structure._transformer_data,
-            block_structure._block_data_map
-        )
-        zp_data_to_cache = zpickle(data_to_cache)
+        zp_data_to_cache = zpickle(pack_block_structure(block_structure))
         cache.set(
             cls._encode_root_cache_key(block_structure.root_block_usage_key),
             zp_data_to_cache
@@ -99,7 +96,7 @@ class BlockStructureFactory(object):
         )
 
     @classmethod
-    def create_from_cache(cls, root_block_usage_key, cache, transformers):
+    def create_from_cache(cls, root_block_usage_key, cache, transformers=None):
         """
         Deserializes and returns the block structure starting at
         root_block_usage_key from the given cache, if it's found in the cache.
@@ -118,7 +115,8 @@ class BlockStructureFactory(object):
 
             transformers ([BlockStructureTransformer]) - A list of
                 transformers for which the block structure will be
-                transformed.
+                transformed.  If None, the cached data is returned
+                without verifying any transformer versions.
 
         Returns:
             BlockStructure - The deserialized block structure starting
@@ -144,31 +142,64 @@ class BlockStructureFactory(object):
                 len(zp_data_from_cache),
             )
 
-        # Deserialize and construct the block structure.
-        block_relations, transformer_data, block_data_map = zunpickle(zp_data_from_cache)
-        block_structure = BlockStructureBlockData(root_block_usage_key)
-        block_structure._block_relations = block_relations
-        block_structure._transformer_data = transformer_data
-        block_structure._block_data_map = block_data_map
+        # Deserialize and construct the block structure.  Corrupt data, e.g.
+        # from a cache backend failure, is treated as a cache miss.
+        try:
+            block_structure = unpack_block_structure(root_block_usage_key, zunpickle(zp_data_from_cache))
+        except Exception:  # pylint: disable=broad-except
+            logger.exception(
+                "Failed to deserialize cached BlockStructure %r.",
+                root_block_usage_key,
+            )
+            return None
+        if block_structure is None:
+            logger.info(
+                "Cached BlockStructure %r is in an outdated format.",
+                root_block_usage_key,
+            )
+            return None
 
         # Verify that the cached data for all the given transformers are
         # for their latest versions.
-        outdated_transformers = {}
-        for transformer in transformers:
-            cached_transformer_version = block_structure._get_transformer_data_version(transformer)
-            if transformer.VERSION != cached_transformer_version:
-                outdated_transformers[transformer.name()] = "version: {}, cached: {}".format(
-                    transformer.VERSION,
-                    cached_transformer_version,
-                )
+        if transformers is not None and cls.get_outdated_transformers(block_structure, transformers):
+            return None
+
+        return block_structure
+
+    @classmethod
+    def get_outdated_transformers(cls, block_structure, transformers):
+        """
+        Returns the subset of the given transformers whose collected
+        data in the given block structure is missing or is for an
+        older version of the transformer.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - The block
+                structure whose collected data is to be verified.
+
+            transformers ([BlockStructureTransformer]) - A list of
+                transformers whose collected data is to be verified.
+
+        Returns:
+            [BlockStructureTransformer] - The outdated transformers.
+        """
+        outdated_transformers = [
+            transformer for transformer in transformers
+            if transformer.VERSION != block_structure._get_transformer_data_version(transformer)
+        ]
         if outdated_transformers:
             logger.info(
                 "Collected data for the following transformers are outdated:\n%s.",
-                '\n'.join([t_name + ": " + t_value for t_name, t_value in outdated_transformers.iteritems()]),
+                '\n'.join([
+                    "{}: version: {}, cached: {}".format(
+                        transformer.name(),
+                        transformer.VERSION,
+                        block_structure._get_transformer_data_version(transformer),
+                    )
+                    for transformer in outdated_transformers
+                ]),
             )
-            return None
-
-        return block_structure
+        return outdated_transformers
 
     @classmethod
     def remove_from_cache(cls, root_block_usage_key, cache):
@@ -0,0 +1,174 @@
+"""
+Benchmark of the compact block structure representation.
+
+Builds the block structure of a synthetic course of about 10,000 blocks, with
+a few collected xBlock fields and transformer data, and compares
+BlockStructureBlockData, as it was cached before block_structure_compact, with
+CompactBlockStructureBlockData:
+
+    - the size of the block structure in memory
+    - the time to serialize it to, and deserialize it from, the cache, and
+      the size of the cached data
+    - the time to remove the blocks of a transform with remove_block_if and
+      prune the structure
+
+Run with:
+
+    python -m openedx.core.lib.block_cache.perf_tests.benchmark_block_structure
+"""
+# pylint: disable=protected-access
+import sys
+import timeit
+
+from opaque_keys.edx.locator import CourseLocator
+
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+from ..block_structure import BlockStructureBlockData
+from ..block_structure_compact import pack_block_structure, unpack_block_structure
+from ..tests.test_utils import MockTransformer
+
+
+def make_block_structure(chapters=10, sequentials=10, verticals=10, leaves=9):
+    """
+    Returns a BlockStructureBlockData for a synthetic course with
+    chapters * sequentials * verticals * (leaves + 1) blocks.
+    """
+    course_key = CourseLocator('edX', 'bench', 'run')
+    root = course_key.make_usage_key('course', 'course')
+    block_structure = BlockStructureBlockData(root)
+    block_structure._add_transformer(MockTransformer)
+
+    def add_block(parent, category, name):
+        """
+        Adds a block with collected data under the given parent.
+        """
+        usage_key = course_key.make_usage_key(category, name)
+        block_structure._add_relation(parent, usage_key)
+        block_data = block_structure._block_data_map[usage_key]
+        block_data.xblock_fields['display_name'] = u'{} {}'.format(category, name)
+        block_data.xblock_fields['graded'] = category == 'sequential'
+        block_structure.set_transformer_block_field(usage_key, MockTransformer, 'visible_to_staff_only', False)
+        return usage_key
+
+    for chapter_index in xrange(chapters):
+        chapter = add_block(root, 'chapter', chapter_index)
+        for sequential_index in xrange(sequentials):
+            sequential = add_block(chapter, 'sequential', '{}_{}'.format(chapter_index, sequential_index))
+            for vertical_index in xrange(verticals):
+                vertical_name = '{}_{}_{}'.format(chapter_index, sequential_index, vertical_index)
+                vertical = add_block(sequential, 'vertical', vertical_name)
+                for leaf_index in xrange(leaves):
+                    add_block(vertical, 'problem', '{}_{}'.format(vertical_name, leaf_index))
+    return block_structure
+
+
+def legacy_serialize(block_structure):
+    """
+    Returns the data that BlockStructureFactory cached before
+    block_structure_compact.
+    """
+    return zpickle((
+        block_structure._block_relations,
+        block_structure._transformer_data,
+        block_structure._block_data_map,
+    ))
+
+
+def legacy_deserialize(root_block_usage_key, zp_data):
+    """
+    Returns the BlockStructureBlockData deserialized from the output of
+    legacy_serialize.
+    """
+    block_relations, transformer_data, block_data_map = zunpickle(zp_data)
+    block_structure = BlockStructureBlockData(root_block_usage_key)
+    block_structure._block_relations = block_relations
+    block_structure._transformer_data = transformer_data
+    block_structure._block_data_map = block_data_map
+    return block_structure
+
+
+def deep_size(obj, seen=None):
+    """
+    Returns the approximate size in bytes of the given object and of all
+    the objects it references, counting each object once.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.iteritems())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_size(obj.__dict__, seen)
+    return size
+
+
+def remove_problems(block_structure):
+    """
+    Removes every other problem from the given block structure, as a
+    transformer would, and prunes it.
+    """
+    block_structure.remove_block_if(
+        lambda usage_key: usage_key.block_type == 'problem' and usage_key.block_id.endswith(('0', '2', '4', '6', '8'))
+    )
+    block_structure._prune_unreachable()
+
+
+def main(repeat=5):
+    """
+    Prints the benchmark's results.
+    """
+    block_structure = make_block_structure()
+    root = block_structure.root_block_usage_key
+    print 'Course of {} blocks'.format(len(list(block_structure.get_block_keys())))
+
+    def best_time(func):
+        """
+        Returns the best time in ms of repeat calls of func.
+        """
+        return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+    legacy_data = legacy_serialize(block_structure)
+    compact_data = zpickle(pack_block_structure(block_structure))
+
+    legacy_structure = legacy_deserialize(root, legacy_data)
+    compact_structure = unpack_block_structure(root, zunpickle(compact_data))
+    # the usage keys themselves are the same in both representations
+    key_size = sum(deep_size(usage_key) for usage_key in block_structure.get_block_keys())
+
+    print 'Memory without keys, legacy:  {:10d} bytes'.format(deep_size(legacy_structure) - key_size)
+    print 'Memory without keys, compact: {:10d} bytes'.format(deep_size(compact_structure) - key_size)
+
+    print 'Cached size, legacy:          {:10d} bytes'.format(len(legacy_data))
+    print 'Cached size, compact:         {:10d} bytes'.format(len(compact_data))
+
+    print 'Serialize, legacy:            {:10.2f} ms'.format(
+        best_time(lambda: legacy_serialize(block_structure))
+    )
+    print 'Serialize, compact:           {:10.2f} ms'.format(
+        best_time(lambda: zpickle(pack_block_structure(block_structure)))
+    )
+    print 'Deserialize, legacy:          {:10.2f} ms'.format(
+        best_time(lambda: legacy_deserialize(root, legacy_data))
+    )
+    print 'Deserialize, compact:         {:10.2f} ms'.format(
+        best_time(lambda: unpack_block_structure(root, zunpickle(compact_data)))
+    )
+
+    print 'Remove and prune, legacy:     {:10.2f} ms'.format(
+        best_time(lambda: remove_problems(legacy_deserialize(root, legacy_data)))
+        - best_time(lambda: legacy_deserialize(root, legacy_data))
+    )
+    print 'Remove and prune, compact:    {:10.2f} ms'.format(
+        best_time(lambda: remove_problems(unpack_block_structure(root, zunpickle(compact_data))))
+        - best_time(lambda: unpack_block_structure(root, zunpickle(compact_data)))
+    )
+
+
+if __name__ == '__main__':
+    main()
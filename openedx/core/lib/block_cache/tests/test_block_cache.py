@@ -111,3 +111,36 @@ class TestBlockCache(TestCase, ChildrenMapTestMixin):
                 self.assertGreater(self.modulestore.get_items_call_count, 0)
             else:
                 self.assertEquals(self.modulestore.get_items_call_count, 0)
+
+    def test_outdated_transformer_recollection(self, mock_available_transforms):
+        class TestTransformer2(MockTransformer):
+            """
+            Test Transformer class that counts calls to its collect method.
+            """
+            collect_call_count = 0
+
+            @classmethod
+            def collect(cls, block_structure):
+                cls.collect_call_count += 1
+
+        transformer1 = self.transformers[0]
+        transformer2 = TestTransformer2()
+        transformers = [transformer1, transformer2]
+        mock_available_transforms.return_value = {transformer.name(): transformer for transformer in transformers}
+        get_blocks(self.mock_cache, self.modulestore, self.usage_info, root_block_usage_key=0, transformers=transformers)
+        self.assertEquals(TestTransformer2.collect_call_count, 1)
+
+        # Only the outdated transformer is recollected, and the data
+        # collected by the other transformer is kept.
+        transformer2.VERSION = 2
+        with patch.object(transformer1, 'collect') as mock_collect:
+            block_structure = get_blocks(
+                self.mock_cache, self.modulestore, self.usage_info, root_block_usage_key=0, transformers=transformers
+            )
+        self.assertFalse(mock_collect.called)
+        self.assertEquals(TestTransformer2.collect_call_count, 2)
+        self.assert_block_structure(block_structure, self.children_map)
+
+        # The updated data is cached.
+        get_blocks(self.mock_cache, self.modulestore, self.usage_info, root_block_usage_key=0, transformers=transformers)
+        self.assertEquals(TestTransformer2.collect_call_count, 2)
@@ -0,0 +1,154 @@
+"""
+Tests for block_structure_compact.py
+"""
+# pylint: disable=protected-access
+import cPickle as pickle
+import ddt
+import itertools
+from unittest import TestCase
+
+from ..block_structure import BlockStructureBlockData, BlockStructureModulestoreData
+from ..block_structure_compact import (
+    CompactBlockStructureBlockData,
+    PACKED_FORMAT_VERSION,
+    pack_block_structure,
+    unpack_block_structure,
+)
+from .test_utils import MockTransformer, ChildrenMapTestMixin
+
+
+CHILDREN_MAPS = [
+    ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+    ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+    ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+]
+
+
+@ddt.ddt
+class TestBlockStructureCompact(TestCase, ChildrenMapTestMixin):
+    """
+    Tests for packing and unpacking block structures, and for
+    CompactBlockStructureBlockData against BlockStructureBlockData.
+    """
+    def create_block_structure_with_data(self, children_map):
+        """
+        Returns a block structure for the given children_map, with
+        xBlock fields and transformer data collected for some blocks.
+        """
+        block_structure = self.create_block_structure(BlockStructureBlockData, children_map)
+        block_structure._add_transformer(MockTransformer)
+        block_structure.set_transformer_data(MockTransformer, 'course_key', 'course data')
+        for block_key in block_structure.get_block_keys():
+            if block_key % 2 == 0:
+                block_structure._block_data_map[block_key].xblock_fields['display_name'] = 'Block {}'.format(block_key)
+            block_structure.set_transformer_block_field(block_key, MockTransformer, 'key', block_key * 10)
+        return block_structure
+
+    def create_block_structures(self, children_map):
+        """
+        Returns a BlockStructureBlockData for the given children_map, and
+        the CompactBlockStructureBlockData it is unpacked to from the
+        cache.
+        """
+        block_structure = self.create_block_structure_with_data(children_map)
+        packed_data = pickle.loads(pickle.dumps(pack_block_structure(block_structure), pickle.HIGHEST_PROTOCOL))
+        return block_structure, unpack_block_structure(0, packed_data)
+
+    def assert_same_block_structures(self, expected, actual):
+        """
+        Verifies that the given block structures have the same blocks,
+        relations and data.
+        """
+        self.assertEquals(set(actual.get_block_keys()), set(expected.get_block_keys()))
+        for block_key in expected.get_block_keys():
+            self.assertEquals(set(actual.get_children(block_key)), set(expected.get_children(block_key)))
+            self.assertEquals(set(actual.get_parents(block_key)), set(expected.get_parents(block_key)))
+            self.assertEquals(
+                actual.get_xblock_field(block_key, 'display_name'),
+                expected.get_xblock_field(block_key, 'display_name'),
+            )
+            self.assertEquals(
+                actual.get_transformer_block_data(block_key, MockTransformer),
+                expected.get_transformer_block_data(block_key, MockTransformer),
+            )
+
+    @ddt.data(*CHILDREN_MAPS)
+    def test_round_trip(self, children_map):
+        block_structure, unpacked = self.create_block_structures(children_map)
+
+        self.assertIsInstance(unpacked, CompactBlockStructureBlockData)
+        self.assert_block_structure(unpacked, children_map)
+        self.assert_same_block_structures(block_structure, unpacked)
+        self.assertEquals(unpacked.get_transformer_data(MockTransformer, 'course_key'), 'course data')
+        self.assertEquals(unpacked._get_transformer_data_version(MockTransformer), MockTransformer.VERSION)
+        for block_key in unpacked.get_block_keys():
+            self.assertEquals(
+                unpacked.get_xblock_field(block_key, 'display_name'),
+                'Block {}'.format(block_key) if block_key % 2 == 0 else None,
+            )
+            self.assertEquals(
+                unpacked.get_transformer_block_field(block_key, MockTransformer, 'key'),
+                block_key * 10,
+            )
+
+        # a compact block structure packs to the same data
+        self.assertEquals(pack_block_structure(unpacked), pack_block_structure(block_structure))
+
+    def test_outdated_format(self):
+        block_structure = self.create_block_structure_with_data(self.SIMPLE_CHILDREN_MAP)
+        packed_data = pack_block_structure(block_structure)
+        self.assertIsNone(unpack_block_structure(0, (PACKED_FORMAT_VERSION + 1,) + packed_data[1:]))
+        self.assertIsNone(unpack_block_structure(0, [None, None, None]))
+
+    @ddt.data(*CHILDREN_MAPS)
+    def test_traversals(self, children_map):
+        block_structure, unpacked = self.create_block_structures(children_map)
+        self.assertEquals(list(unpacked.topological_traversal()), list(block_structure.topological_traversal()))
+        self.assertEquals(list(unpacked.post_order_traversal()), list(block_structure.post_order_traversal()))
+        self.assertEquals(
+            list(unpacked.topological_traversal(filter_func=lambda block_key: block_key != 1)),
+            list(block_structure.topological_traversal(filter_func=lambda block_key: block_key != 1)),
+        )
+
+    @ddt.data(*itertools.product([True, False], range(1, 7), CHILDREN_MAPS))
+    @ddt.unpack
+    def test_remove_block(self, keep_descendants, block_to_remove, children_map):
+        if block_to_remove >= len(children_map):
+            return
+        block_structure, unpacked = self.create_block_structures(children_map)
+
+        for structure in (block_structure, unpacked):
+            structure.remove_block(block_to_remove, keep_descendants)
+        self.assertFalse(unpacked.has_block(block_to_remove))
+        self.assert_same_block_structures(block_structure, unpacked)
+
+        for structure in (block_structure, unpacked):
+            structure._prune_unreachable()
+        self.assert_same_block_structures(block_structure, unpacked)
+
+    @ddt.data(*itertools.product([True, False], CHILDREN_MAPS))
+    @ddt.unpack
+    def test_remove_block_if(self, keep_descendants, children_map):
+        block_structure, unpacked = self.create_block_structures(children_map)
+
+        for structure in (block_structure, unpacked):
+            structure.remove_block_if(lambda block_key: block_key in (1, 3), keep_descendants)
+            structure._prune_unreachable()
+        self.assert_same_block_structures(block_structure, unpacked)
+
+    def test_set_transformer_block_field(self):
+        __, unpacked = self.create_block_structures(self.SIMPLE_CHILDREN_MAP)
+        unpacked.set_transformer_block_field(1, MockTransformer, 'key', 'new value')
+        unpacked.set_transformer_block_field(1, MockTransformer, 'other key', 'other value')
+        self.assertEquals(
+            unpacked.get_transformer_block_data(1, MockTransformer),
+            {'key': 'new value', 'other key': 'other value'},
+        )
+        unpacked.remove_transformer_block_field(1, MockTransformer, 'key')
+        self.assertEquals(unpacked.get_transformer_block_data(1, MockTransformer), {'other key': 'other value'})
+
+    def test_copy_collected_data(self):
+        __, unpacked = self.create_block_structures(self.SIMPLE_CHILDREN_MAP)
+        block_structure = self.create_block_structure(BlockStructureModulestoreData, self.SIMPLE_CHILDREN_MAP)
+        block_structure._copy_collected_data(unpacked, [MockTransformer])
+        self.assert_same_block_structures(unpacked, block_structure)
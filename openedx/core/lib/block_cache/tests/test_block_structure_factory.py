@@ -94,6 +94,21 @@ class TestBlockStructureFactory(TestCase, ChildrenMapTestMixin):
         self.assert_block_structure(from_cache_block_structure, self.children_map)
         self.assertEquals(self.modulestore.get_items_call_count, 0)
 
+    def test_corrupt_cache_data(self):
+        cache = MockCache()
+        self.add_transformers()
+        BlockStructureFactory.serialize_to_cache(self.block_structure, cache)
+        for key, value in cache.map.items():
+            cache.map[key] = value[:len(value) / 2]
+
+        self.assertIsNone(
+            BlockStructureFactory.create_from_cache(
+                root_block_usage_key=0,
+                cache=cache,
+                transformers=self.transformers,
+            )
+        )
+
     def test_remove_from_cache(self):
         cache = MockCache()
 
@@ -0,0 +1,165 @@
+"""
+Tests for tiered_cache.py
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from ..tiered_cache import ChunkedDjangoCacheTier, FileSystemTier, LocalMemoryTier, TieredCache
+from .test_utils import MockCache
+
+
+class TestLocalMemoryTier(TestCase):
+    """
+    Tests for LocalMemoryTier.
+    """
+    def test_lru_eviction(self):
+        tier = LocalMemoryTier(max_size=10)
+        tier.set('a', '1234')
+        tier.set('b', '1234')
+        # Touch 'a' so that 'b' is the least recently used.
+        self.assertEquals(tier.get('a'), '1234')
+        tier.set('c', '1234')
+
+        self.assertEquals(tier.get('a'), '1234')
+        self.assertIsNone(tier.get('b'))
+        self.assertEquals(tier.get('c'), '1234')
+        self.assertEquals(tier.size, 8)
+
+    def test_value_too_large(self):
+        tier = LocalMemoryTier(max_size=3)
+        tier.set('a', '1234')
+        self.assertIsNone(tier.get('a'))
+        self.assertEquals(tier.size, 0)
+
+    def test_stats(self):
+        tier = LocalMemoryTier(max_size=10)
+        tier.get('a')
+        tier.set('a', '123')
+        tier.get('a')
+        self.assertEquals(
+            tier.stats.as_dict(),
+            {'hits': 1, 'misses': 1, 'sets': 1, 'bytes_read': 3, 'bytes_written': 3},
+        )
+
+
+class TestChunkedDjangoCacheTier(TestCase):
+    """
+    Tests for ChunkedDjangoCacheTier.
+    """
+    def setUp(self):
+        super(TestChunkedDjangoCacheTier, self).setUp()
+        self.cache = MockCache()
+        self.tier = ChunkedDjangoCacheTier(self.cache, chunk_size=3)
+
+    def test_chunking(self):
+        self.tier.set('key', 'abcdefgh')
+        self.assertEquals(self.cache.get('key'), u'{}:3'.format(hashlib.sha1('abcdefgh').hexdigest()))
+        self.assertEquals(self.tier.get('key'), 'abcdefgh')
+
+    def test_evicted_chunk(self):
+        self.tier.set('key', 'abcdefgh')
+        self.cache.delete(u'key.chunk.{}.1'.format(hashlib.sha1('abcdefgh').hexdigest()))
+        self.assertIsNone(self.tier.get('key'))
+
+    def test_concurrent_rewrite(self):
+        self.tier.set('key', 'abcdefgh')
+        old_chunk_info = self.cache.get('key')
+        self.tier.set('key', 'ijklmnopqrst')
+        # A reader of the old chunk info still reads the old value's chunks.
+        self.cache.set('key', old_chunk_info)
+        self.assertEquals(self.tier.get('key'), 'abcdefgh')
+
+
+class TestFileSystemTier(TestCase):
+    """
+    Tests for FileSystemTier.
+    """
+    def setUp(self):
+        super(TestFileSystemTier, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.tier = FileSystemTier(self.root)
+
+    def test_set_get_delete(self):
+        self.assertIsNone(self.tier.get(u'key'))
+        self.tier.set(u'key', 'value')
+        self.assertEquals(FileSystemTier(self.root).get(u'key'), 'value')
+        self.tier.delete(u'key')
+        self.assertIsNone(self.tier.get(u'key'))
+
+    def test_size_bounded_eviction(self):
+        tier = FileSystemTier(self.root, max_size=10)
+        tier.set(u'a', '1234')
+        tier.set(u'b', '1234')
+        # Make 'b' the least recently used.
+        os.utime(tier._path(u'b'), (0, 0))  # pylint: disable=protected-access
+        tier.set(u'c', '1234')
+
+        self.assertEquals(tier.get(u'a'), '1234')
+        self.assertIsNone(tier.get(u'b'))
+        self.assertEquals(tier.get(u'c'), '1234')
+
+    def test_eviction_counts_other_processes_files(self):
+        FileSystemTier(self.root).set(u'a', '1234567')
+        tier = FileSystemTier(self.root, max_size=10)
+        os.utime(tier._path(u'a'), (0, 0))  # pylint: disable=protected-access
+        tier.set(u'b', '1234')
+        self.assertEquals(len(os.listdir(self.root)), 1)
+
+
+class TestTieredCache(TestCase):
+    """
+    Tests for TieredCache.
+    """
+    def setUp(self):
+        super(TestTieredCache, self).setUp()
+        self.shared_cache = MockCache()
+        self.cache = self._create_cache()
+
+    def _create_cache(self, version='1'):
+        """
+        Returns a TieredCache for the given version as another process
+        would have it, sharing only self.shared_cache.
+        """
+        return TieredCache(
+            [LocalMemoryTier(max_size=100), ChunkedDjangoCacheTier(self.shared_cache, chunk_size=4)],
+        ).for_version(version)
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEquals(self.cache.get('key', 'default'), 'default')
+
+    def test_set_get(self):
+        self.cache.set('key', 'value')
+        self.assertEquals(self.cache.get('key'), 'value')
+        self.assertEquals(self.cache.stats()['memory']['hits'], 1)
+        self.assertEquals(self.cache.stats()['django']['hits'], 0)
+
+    def test_backfill_from_later_tier(self):
+        self.cache.set('key', 'value')
+        other_cache = self._create_cache()
+        for __ in range(2):
+            self.assertEquals(other_cache.get('key'), 'value')
+        self.assertEquals(other_cache.stats()['memory'], {
+            'hits': 1, 'misses': 1, 'sets': 1, 'bytes_read': 5, 'bytes_written': 5,
+        })
+        self.assertEquals(other_cache.stats()['django']['hits'], 1)
+
+    def test_versions(self):
+        self.cache.set('key', 'value')
+        new_version_cache = self.cache.for_version('2')
+        self.assertIsNone(new_version_cache.get('key'))
+
+        new_version_cache.set('key', 'new value')
+        self.assertEquals(new_version_cache.get('key'), 'new value')
+        self.assertEquals(self._create_cache('2').get('key'), 'new value')
+        self.assertEquals(self.cache.get('key'), 'value')
+
+    def test_delete(self):
+        self.cache.set('key', 'value')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertIsNone(self._create_cache().get('key'))
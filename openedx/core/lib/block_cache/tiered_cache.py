@@ -0,0 +1,373 @@
+"""
+A tiered cache for serialized block structures.
+
+Serialized block structures of large courses can exceed the item size limit
+of memcached, in which case they silently fail to be cached and are rebuilt
+from the modulestore on every request.  The TieredCache in this module layers
+an in-process LRU, a chunking wrapper around a Django cache, and an optional
+durable local-file tier behind the subset of the Django cache API that the
+Block Cache framework uses (get, set and delete).
+
+Since the in-process and file tiers can't be invalidated across processes,
+values are stored under a version, normally the published version of the
+course whose block structure is cached, so that no process reads the values
+of an older version once a new one is published.  The values of older
+versions are left to each tier to evict.
+"""
+from collections import OrderedDict
+import errno
+import hashlib
+from logging import getLogger
+import os
+import tempfile
+
+
+logger = getLogger(__name__)  # pylint: disable=C0103
+
+# Prefix of the temporary files FileSystemTier writes values to.
+TEMP_FILE_PREFIX = 'tmp.'
+
+# Fraction of its max_size a FileSystemTier evicts files down to once their
+# total size exceeds it.
+FILE_EVICTION_RATIO = 0.9
+
+
+class CacheTierStats(object):
+    """
+    Hit, miss and size counters for a single cache tier.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def record_get(self, value):
+        """
+        Records the result of a read of the given value, which is None
+        on a cache miss.
+        """
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.bytes_read += len(value)
+
+    def record_set(self, value):
+        """
+        Records a write of the given value.
+        """
+        self.sets += 1
+        self.bytes_written += len(value)
+
+    def as_dict(self):
+        """
+        Returns the counters as a dictionary.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'sets': self.sets,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+        }
+
+
+class LocalMemoryTier(object):
+    """
+    An in-process, least-recently-used cache tier bounded by the total
+    size, in bytes, of the values it holds.
+    """
+    name = 'memory'
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.stats = CacheTierStats()
+        self._values = OrderedDict()
+
+    def get(self, key):
+        """
+        Returns the value for the given key, or None if not found.
+        """
+        value = self._values.pop(key, None)
+        if value is not None:
+            # Re-insert to mark the key as the most recently used.
+            self._values[key] = value
+        self.stats.record_get(value)
+        return value
+
+    def set(self, key, value):
+        """
+        Stores the given value, evicting least recently used values as
+        needed to stay within max_size.  Values larger than max_size
+        are not stored.
+        """
+        self.delete(key)
+        if len(value) > self.max_size:
+            return
+        while self._values and self.size + len(value) > self.max_size:
+            __, evicted_value = self._values.popitem(last=False)
+            self.size -= len(evicted_value)
+        self._values[key] = value
+        self.size += len(value)
+        self.stats.record_set(value)
+
+    def delete(self, key):
+        """
+        Removes the given key, if present.
+        """
+        value = self._values.pop(key, None)
+        if value is not None:
+            self.size -= len(value)
+
+
+class ChunkedDjangoCacheTier(object):
+    """
+    A cache tier that stores values in a Django cache, splitting values
+    larger than chunk_size across multiple cache keys so that they fit
+    within the item size limit of the cache backend.
+
+    The chunk keys include a digest of the value, stored with the chunk
+    count under the value's key, so that a reader never combines the
+    chunks of different values written under the same key.
+    """
+    name = 'django'
+
+    def __init__(self, cache, chunk_size):
+        self.cache = cache
+        self.chunk_size = chunk_size
+        self.stats = CacheTierStats()
+
+    def get(self, key):
+        """
+        Returns the value for the given key, or None if not found or if
+        any of its chunks has been evicted.
+        """
+        value = None
+        chunk_info = self.cache.get(key)
+        if chunk_info is not None:
+            digest, __, num_chunks = chunk_info.partition(':')
+            chunk_keys = [self._chunk_key(key, digest, index) for index in range(int(num_chunks))]
+            chunks = self.cache.get_many(chunk_keys)
+            if len(chunks) == len(chunk_keys):
+                value = ''.join(chunks[chunk_key] for chunk_key in chunk_keys)
+        self.stats.record_get(value)
+        return value
+
+    def set(self, key, value):
+        """
+        Stores the given value as one or more chunks.
+        """
+        digest = hashlib.sha1(value).hexdigest()
+        chunks = [value[index:index + self.chunk_size] for index in range(0, len(value), self.chunk_size)]
+        self.cache.set_many({
+            self._chunk_key(key, digest, index): chunk for index, chunk in enumerate(chunks)
+        })
+        # Write the chunk info last, so that readers never see it for
+        # chunks that haven't been written yet.
+        self.cache.set(key, u"{}:{}".format(digest, len(chunks)))
+        self.stats.record_set(value)
+
+    def delete(self, key):
+        """
+        Removes the given key.  Its chunks are left to expire, since they
+        are unreachable without the chunk info.
+        """
+        self.cache.delete(key)
+
+    @classmethod
+    def _chunk_key(cls, key, digest, index):
+        """
+        Returns the cache key for the chunk at the given index of the
+        value with the given digest.
+        """
+        return u"{}.chunk.{}.{}".format(key, digest, index)
+
+
+class FileSystemTier(object):
+    """
+    A durable cache tier that stores each value in a file under the
+    given root directory, so that values survive process restarts and
+    are shared by all processes on the host.
+
+    If max_size is given, the least recently used files are removed once
+    the total size of the files exceeds it, since the values of older
+    versions are never deleted otherwise.  The total size is counted
+    when the directory is scanned, plus the size of the values written
+    by this process since, so files written by other processes are only
+    counted by the next scan.
+    """
+    name = 'file'
+
+    def __init__(self, root, max_size=None):
+        self.root = root
+        self.max_size = max_size
+        self.stats = CacheTierStats()
+        self._size = None
+
+    def get(self, key):
+        """
+        Returns the value for the given key, or None if not found.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                value = cache_file.read()
+        except IOError:
+            value = None
+        else:
+            # Mark the file as recently used.
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+        self.stats.record_get(value)
+        return value
+
+    def set(self, key, value):
+        """
+        Stores the given value.  The file is written to a temporary path
+        and then renamed, so readers never see a partially written value.
+        """
+        try:
+            os.makedirs(self.root)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.root, prefix=TEMP_FILE_PREFIX)
+        try:
+            with os.fdopen(file_descriptor, 'wb') as temp_file:
+                temp_file.write(value)
+            os.rename(temp_path, self._path(key))
+        except (IOError, OSError):
+            logger.exception("Failed to write block cache file for key %s", key)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.stats.record_set(value)
+
+        if self.max_size is not None:
+            self._evict(len(value))
+
+    def delete(self, key):
+        """
+        Removes the given key, if present.
+        """
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _path(self, key):
+        """
+        Returns the path of the file for the given key.
+        """
+        return os.path.join(self.root, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _evict(self, written_size):
+        """
+        Counts a value of written_size bytes as written, and if the total
+        size of the files exceeds max_size, removes the least recently
+        used ones until it's within FILE_EVICTION_RATIO of max_size.
+        """
+        if self._size is not None:
+            self._size += written_size
+            if self._size <= self.max_size:
+                return
+
+        files = self._scan()
+        self._size = sum(size for __, size, __ in files)
+        if self._size <= self.max_size:
+            return
+        for __, size, path in sorted(files):
+            if self._size <= self.max_size * FILE_EVICTION_RATIO:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Removed by another process meanwhile.
+                pass
+            self._size -= size
+
+    def _scan(self):
+        """
+        Returns the (last use time, size, path) of each value's file.
+        """
+        files = []
+        for filename in os.listdir(self.root):
+            if filename.startswith(TEMP_FILE_PREFIX):
+                continue
+            path = os.path.join(self.root, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+
+class TieredCache(object):
+    """
+    A cache that reads from the given tiers in order, populating the
+    earlier tiers on a hit in a later one, and writes to all of them.
+
+    Values are stored under the given version.  Use for_version to get
+    the cache of the current version of the cached data.
+    """
+    def __init__(self, tiers, version=None):
+        self.tiers = tiers
+        self.version = version
+
+    def for_version(self, version):
+        """
+        Returns a TieredCache sharing this cache's tiers, which stores
+        values under the given version.
+        """
+        return TieredCache(self.tiers, version)
+
+    def get(self, key, default=None):
+        """
+        Returns the value for the given key from the first tier that has
+        it; returns default if not found in any tier.
+        """
+        versioned_key = self._versioned_key(key)
+        for index, tier in enumerate(self.tiers):
+            value = tier.get(versioned_key)
+            if value is not None:
+                for earlier_tier in self.tiers[:index]:
+                    earlier_tier.set(versioned_key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        """
+        Stores the given value in all tiers.
+        """
+        versioned_key = self._versioned_key(key)
+        for tier in self.tiers:
+            tier.set(versioned_key, value)
+
+    def delete(self, key):
+        """
+        Removes the value of the given key from all tiers.  The in-process
+        tiers of other processes keep the value until they evict it.
+        """
+        versioned_key = self._versioned_key(key)
+        for tier in self.tiers:
+            tier.delete(versioned_key)
+
+    def stats(self):
+        """
+        Returns a dictionary mapping each tier's name to its counters.
+        """
+        return {tier.name: tier.stats.as_dict() for tier in self.tiers}
+
+    def _versioned_key(self, key):
+        """
+        Returns the key under which the value of key is stored for this
+        cache's version.
+        """
+        return u"{}.{}".format(key, self.version)